@@ -0,0 +1,308 @@
+#!/usr/bin/env python
+
+"""
+@package mi.core.checksum
+@file mi/core/checksum.py
+@brief Checksums used to validate instrument data framing.  Each checksum
+    has a table driven pure Python implementation, and a faster one built on
+    the C checksum routines in the standard library where one applies, or on
+    NumPy for the byte sums.  The fastest available implementation is
+    selected at import time.
+"""
+
+__license__ = 'Apache 2.0'
+
+import string
+import struct
+import operator
+import binascii
+from warnings import warn
+try:
+    import numpy
+except ImportError:
+    warn("Failed to import numpy; byte sum checksums will be slower.")
+    numpy = None
+
+
+def _reflect(value, width):
+    """
+    Reverse the order of the lowest width bits of value
+    """
+    result = 0
+    for i in range(width):
+        if value & (1 << i):
+            result |= 1 << (width - 1 - i)
+    return result
+
+
+def _reflected_crc16_table(poly):
+    """
+    Build the byte lookup table for a reflected (LSB first) 16 bit CRC
+    @param poly reflected CRC polynomial
+    """
+    table = []
+    for byte in range(256):
+        crc = byte
+        for i in range(8):
+            if crc & 1:
+                crc = (crc >> 1) ^ poly
+            else:
+                crc >>= 1
+        table.append(crc)
+    return table
+
+
+def _crc16_table(poly):
+    """
+    Build the byte lookup table for a non-reflected (MSB first) 16 bit CRC
+    @param poly CRC polynomial
+    """
+    table = []
+    for byte in range(256):
+        crc = byte << 8
+        for i in range(8):
+            if crc & 0x8000:
+                crc = ((crc << 1) ^ poly) & 0xFFFF
+            else:
+                crc = (crc << 1) & 0xFFFF
+        table.append(crc)
+    return table
+
+# CRC-16/X-25 (reflected CCITT polynomial, initial value and final xor 0xFFFF),
+# used for the SIO controller block checksum.
+X25_POLY = 0x8408
+X25_TABLE = _reflected_crc16_table(X25_POLY)
+
+# CRC-16/CCITT-FALSE (initial value 0xFFFF) and CRC-16/XMODEM (initial value
+# 0), the non-reflected CCITT CRC that binascii.crc_hqx implements
+CCITT_POLY = 0x1021
+CCITT_TABLE = _crc16_table(CCITT_POLY)
+
+# Byte sums of data at least this long are faster in NumPy than the
+# builtin sum
+NUMPY_SUM_MIN_SIZE = 384
+
+# XORs of data at least this long are faster in NumPy than xor8_words
+NUMPY_XOR_MIN_SIZE = 128
+
+# Bytes folded together per XOR in xor8_words
+XOR_WORD_SIZE = 8
+
+# translation table reversing the bits of every byte, and the 16 bit
+# reflection of every CRC value, used to compute reflected CRCs with the
+# non-reflected binascii.crc_hqx
+_REFLECT_BYTES = string.maketrans(''.join(chr(i) for i in range(256)),
+                                  ''.join(chr(_reflect(i, 8)) for i in range(256)))
+_REFLECT_BYTE_VALUES = [_reflect(i, 8) for i in range(256)]
+
+
+def _string(data):
+    """
+    Get the bytes of a string, bytearray or memoryview as a string
+    """
+    if isinstance(data, memoryview):
+        return data.tobytes()
+    return str(data)
+
+
+def crc16_x25_table(data):
+    """
+    Table driven CRC-16/X-25
+    @param data string to checksum
+    @retval checksum as an integer
+    """
+    crc = 0xFFFF
+    table = X25_TABLE
+    for byte in bytearray(data):
+        crc = (crc >> 8) ^ table[(crc ^ byte) & 0xFF]
+    return crc ^ 0xFFFF
+
+
+def crc16_x25_hqx(data):
+    """
+    CRC-16/X-25 computed in C by binascii.crc_hqx, which implements the
+    non-reflected CCITT CRC.  Reversing the bits of each input byte and of
+    the result gives the reflected CRC.
+    @param data string to checksum
+    @retval checksum as an integer
+    """
+    crc = binascii.crc_hqx(_string(data).translate(_REFLECT_BYTES), 0xFFFF)
+    return ((_REFLECT_BYTE_VALUES[crc & 0xFF] << 8) | _REFLECT_BYTE_VALUES[crc >> 8]) ^ 0xFFFF
+
+
+def crc16_kermit_table(data):
+    """
+    Table driven CRC-16/KERMIT, the reflected CCITT CRC with initial value 0
+    and no final xor
+    @param data string to checksum
+    @retval checksum as an integer
+    """
+    crc = 0
+    table = X25_TABLE
+    for byte in bytearray(data):
+        crc = (crc >> 8) ^ table[(crc ^ byte) & 0xFF]
+    return crc
+
+
+def crc16_kermit_hqx(data):
+    """
+    CRC-16/KERMIT computed in C by binascii.crc_hqx, reflecting the input
+    bytes and the result as in crc16_x25_hqx
+    @param data string to checksum
+    @retval checksum as an integer
+    """
+    crc = binascii.crc_hqx(_string(data).translate(_REFLECT_BYTES), 0)
+    return (_REFLECT_BYTE_VALUES[crc & 0xFF] << 8) | _REFLECT_BYTE_VALUES[crc >> 8]
+
+
+def crc16_ccitt_table(data, crc=0xFFFF):
+    """
+    Table driven non-reflected CCITT CRC
+    @param data string to checksum
+    @param crc initial value, 0xFFFF for CRC-16/CCITT-FALSE, 0 for
+        CRC-16/XMODEM, or the result of a previous call to continue it
+    @retval checksum as an integer
+    """
+    table = CCITT_TABLE
+    for byte in bytearray(data):
+        crc = ((crc << 8) & 0xFF00) ^ table[(crc >> 8) ^ byte]
+    return crc
+
+
+def crc16_ccitt_hqx(data, crc=0xFFFF):
+    """
+    Non-reflected CCITT CRC computed in C by binascii.crc_hqx
+    @param data string to checksum
+    @param crc initial value, 0xFFFF for CRC-16/CCITT-FALSE, 0 for
+        CRC-16/XMODEM, or the result of a previous call to continue it
+    @retval checksum as an integer
+    """
+    return binascii.crc_hqx(_string(data), crc)
+
+
+def xor8_loop(data):
+    """
+    XOR of all the bytes in data one at a time, as used by NMEA sentences
+    @param data string, bytearray or buffer to checksum
+    @retval checksum as an int 0-255
+    """
+    return reduce(operator.xor, bytearray(data), 0)
+
+
+def xor8_words(data):
+    """
+    XOR of all the bytes in data.  The data is unpacked eight bytes at a time
+    and the words XORed together in C by reduce, then the resulting word is
+    folded down to a single byte, which is equivalent to XORing the bytes one
+    at a time.
+    @param data string, bytearray or buffer to checksum
+    @retval checksum as an int 0-255
+    """
+    length = len(data)
+    words = length // XOR_WORD_SIZE
+    checksum = 0
+    if words:
+        checksum = reduce(operator.xor,
+                          struct.unpack_from('>%dQ' % words, data), 0)
+        checksum ^= checksum >> 32
+        checksum ^= checksum >> 16
+        checksum ^= checksum >> 8
+        checksum &= 0xff
+    for byte in bytearray(data[words * XOR_WORD_SIZE:length]):
+        checksum ^= byte
+    return checksum
+
+
+def _byte_array(data):
+    """
+    View data as a NumPy array of bytes without copying it, except for
+    memoryviews, which NumPy can't read under Python 2
+    """
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    return numpy.frombuffer(data, numpy.uint8)
+
+
+def xor8_numpy(data):
+    """
+    XOR of all the bytes in data reduced by NumPy, which is fastest for long
+    data
+    @param data string, bytearray or buffer to checksum
+    @retval checksum as an int 0-255
+    """
+    return int(numpy.bitwise_xor.reduce(_byte_array(data)))
+
+
+def xor8_select(data):
+    """
+    XOR of all the bytes in data, using NumPy for long data and xor8_words
+    for short data
+    @param data string, bytearray or buffer to checksum
+    @retval checksum as an int 0-255
+    """
+    if len(data) >= NUMPY_XOR_MIN_SIZE:
+        return xor8_numpy(data)
+    return xor8_words(data)
+
+
+def sum16_loop(data):
+    """
+    Sum of all the bytes in data modulo 2^16, one byte at a time
+    @param data string, bytearray or buffer to checksum
+    @retval checksum as an int 0-65535
+    """
+    total = 0
+    for byte in bytearray(data):
+        total += byte
+    return total & 0xFFFF
+
+
+def sum16_builtin(data):
+    """
+    Sum of all the bytes in data modulo 2^16, added up in C by sum
+    @param data string, bytearray or buffer to checksum
+    @retval checksum as an int 0-65535
+    """
+    return sum(bytearray(data)) & 0xFFFF
+
+
+def sum16_numpy(data):
+    """
+    Sum of all the bytes in data modulo 2^16, added up by NumPy, which is
+    fastest for long records
+    @param data string, bytearray or buffer to checksum
+    @retval checksum as an int 0-65535
+    """
+    return int(_byte_array(data).sum(dtype=numpy.uint64)) & 0xFFFF
+
+
+def sum16_select(data):
+    """
+    Sum of all the bytes in data modulo 2^16, using NumPy for long data and
+    the builtin sum for short data
+    @param data string, bytearray or buffer to checksum
+    @retval checksum as an int 0-65535
+    """
+    if len(data) >= NUMPY_SUM_MIN_SIZE:
+        return sum16_numpy(data)
+    return sum(bytearray(data)) & 0xFFFF
+
+
+def sum8(data):
+    """
+    Sum of all the bytes in data modulo 2^8
+    @param data string, bytearray or buffer to checksum
+    @retval checksum as an int 0-255
+    """
+    return sum16(data) & 0xFF
+
+crc16_x25 = crc16_x25_hqx
+crc16_kermit = crc16_kermit_hqx
+crc16_ccitt = crc16_ccitt_hqx
+if numpy is not None:
+    xor8 = xor8_select
+    sum16 = sum16_select
+else:
+    xor8 = xor8_words
+    sum16 = sum16_builtin
+
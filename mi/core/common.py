@@ -96,6 +96,42 @@ class Config(object):
     def as_dict(self):
         return self.config
     
+class BaseEnumMetaclass(type):
+    """
+    Metaclass caching the values of each enum class, so listing and testing
+    enums doesn't walk dir() every time.  Setting or deleting an attribute on
+    any enum class throws away the cached values of every enum, since enums
+    inherit values from their base classes.
+    """
+    # incremented whenever an enum class attribute changes
+    _generation = 0
+
+    def __setattr__(cls, name, value):
+        type.__setattr__(cls, name, value)
+        BaseEnumMetaclass._generation += 1
+
+    def __delattr__(cls, name):
+        type.__delattr__(cls, name)
+        BaseEnumMetaclass._generation += 1
+
+    def _enum_values(cls):
+        """
+        @retval (list of (attribute, value) pairs in dir() order, frozenset of
+            the values or None if a value can't be hashed)
+        """
+        cache = cls.__dict__.get('__enum_cache__')
+        if cache is None or cache[0] != BaseEnumMetaclass._generation:
+            items = [(attr, getattr(cls, attr)) for attr in dir(cls)
+                     if not attr.startswith('__') and not callable(getattr(cls, attr))]
+            try:
+                values = frozenset(value for (attr, value) in items)
+            except TypeError:
+                values = None
+            cache = (BaseEnumMetaclass._generation, items, values)
+            type.__setattr__(cls, '__enum_cache__', cache)
+        return cache[1:]
+
+
 class BaseEnum(object):
     """Base class for enums.
     
@@ -115,21 +151,17 @@ class BaseEnum(object):
     are quicker to execute and more compartmentalized so that code can be
     re-used more easily outside of a capability container as needed.
     """
-    
+    __metaclass__ = BaseEnumMetaclass
+
     @classmethod
     def list(cls):
         """List the values of this enum."""
-        return [getattr(cls,attr) for attr in dir(cls) if\
-                not callable(getattr(cls,attr)) and not attr.startswith('__')]
+        return [value for (attr, value) in cls._enum_values()[0]]
 
     @classmethod
     def dict(cls):
         """Return a dict representation of this enum."""
-        result = {}
-        for attr in dir(cls):
-            if not callable(getattr(cls,attr)) and not attr.startswith('__'):
-                result[attr] = getattr(cls,attr)
-        return result
+        return dict(cls._enum_values()[0])
 
     @classmethod
     def has(cls, item):
@@ -144,7 +176,13 @@ class BaseEnum(object):
         @retval True if one of the class attributes has value item, false
         otherwise.
         """
-        return item in cls.list()
+        (items, values) = cls._enum_values()
+        if values is not None:
+            try:
+                return item in values
+            except TypeError:
+                pass
+        return item in [value for (attr, value) in items]
 
 class EventKey(BaseEnum):
     """Keys to the event dictionary fields as used by the InstrumentProtocol
@@ -97,6 +97,13 @@ class SampleEncodingException(SampleException):
 class UnexpectedDataException(SampleException):
     """ Data was found that was not expected. """
 
+class MissingSchemaException(SampleException):
+    """ A compact particle arrived before the schema it was encoded with. """
+    def __init__(self, msg=None, stream=None, schema_id=None):
+        super(MissingSchemaException,self).__init__(msg=msg)
+        self.stream = stream
+        self.schema_id = schema_id
+
 class DatasetHarvesterException(InstrumentException):
     """ An dataset parser encountered trouble. """
 
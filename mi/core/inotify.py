@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+
+"""
+@package mi.core.inotify
+@file mi/core/inotify.py
+@brief Minimal Linux inotify wrapper used to watch harvester directories.
+    Uses ctypes against libc so there is no extra dependency.  On platforms
+    without inotify creating an InotifyWatch raises OSError and callers fall
+    back to polling.
+"""
+
+__license__ = 'Apache 2.0'
+
+import os
+import errno
+import struct
+import ctypes
+import ctypes.util
+
+from mi.core.log import get_logger ; log = get_logger()
+
+# event masks, from sys/inotify.h
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+
+# inotify_init1 flags
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+# Events that mean a file in the directory may have been added or changed
+DEFAULT_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | \
+               IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+
+# Events that mean the watch itself is no longer valid
+WATCH_LOST_MASK = IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED
+
+# struct inotify_event header: wd, mask, cookie, len
+EVENT_HEADER = struct.Struct('iIII')
+
+READ_SIZE = 65536
+
+try:
+    _libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+    _libc.inotify_init1
+    _libc.inotify_add_watch
+except (OSError, AttributeError):
+    _libc = None
+
+
+def inotify_available():
+    """
+    @retval True if inotify can be used on this platform
+    """
+    return _libc is not None
+
+
+def _raise_errno(message):
+    error = ctypes.get_errno()
+    raise OSError(error, "%s: %s" % (message, os.strerror(error)))
+
+
+class InotifyWatch(object):
+    """
+    Watch a single directory.  Events are read without blocking, so the
+    watch can be checked from an existing polling loop.
+    """
+    def __init__(self, path, mask=DEFAULT_MASK):
+        """
+        @param path directory to watch
+        @param mask inotify event mask
+        @throws OSError if inotify isn't available or the watch can't be added
+        """
+        if _libc is None:
+            raise OSError(errno.ENOSYS, "inotify is not available")
+
+        self._fd = None
+        fd = _libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            _raise_errno("inotify_init1 failed")
+
+        if _libc.inotify_add_watch(fd, path, mask) < 0:
+            os.close(fd)
+            _raise_errno("inotify_add_watch failed for %s" % path)
+
+        self._fd = fd
+        self.path = path
+
+    def fileno(self):
+        return self._fd
+
+    def read_events(self):
+        """
+        Read all queued events
+        @retval list of (mask, name) tuples, name is '' for events on the
+            watched directory itself
+        """
+        events = []
+        while self._fd is not None:
+            try:
+                data = os.read(self._fd, READ_SIZE)
+            except OSError as e:
+                if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    break
+                raise
+
+            offset = 0
+            while offset < len(data):
+                (wd, mask, cookie, length) = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = data[offset:offset+length].rstrip('\0')
+                offset += length
+                events.append((mask, name))
+
+        log.trace("inotify events for %s: %s", self.path, events)
+        return events
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def __del__(self):
+        self.close()
@@ -11,9 +11,15 @@
 __author__ = 'Steve Foley'
 __license__ = 'Apache 2.0'
 
+import re
+import sre_parse
+import sre_compile
+import sre_constants
+from collections import deque
+
 from mi.core.log import get_logger ; log = get_logger()
 
-from mi.core.exceptions import SampleException
+from mi.core.exceptions import SampleException, NotImplementedException
 
 class Chunker(object):
     """
@@ -413,6 +419,12 @@ class Chunker(object):
 
         return (next_time, next_block)
 
+    def get_buffer_size(self):
+        """
+        @retval the number of unconsumed items in the buffer
+        """
+        return len(self.buffer)
+
     def clean_all_chunks(self):
         """
         Clean all data out of the non_data, raw, and data lists
@@ -473,4 +485,486 @@ class BinaryChunker(Chunker):
     def __init__(self, data_sieve_fn):
         Chunker.__init__(self, data_sieve_fn)
         self.buffer = []
-    
\ No newline at end of file
+
+
+class BufferedChunker(Chunker):
+    """
+    A chunker engine with the same interface as the Chunker, but backed by a
+    growable bytearray with a read offset and deques of chunk indices. Data is
+    never re-sliced out of an immutable buffer, consumed chunks are popped off
+    the front of the deques and the sieve resumes at the end of the last data
+    chunk found, so the cost of adding and removing data does not depend on
+    how much unconsumed data is sitting in the buffer.
+
+    Internally all indices are absolute positions in the stream since the
+    chunker was created. They are rebased to the current start of the buffer
+    whenever they are handed back to the caller, so the indices returned match
+    those of the original Chunker.
+    """
+    # Only compact the bytearray once this many bytes have been consumed
+    COMPACT_THRESHOLD = 4096
+
+    def __init__(self, data_sieve_fn, max_chunk_length=None):
+        """
+        @param data_sieve_fn The sieve function, see Chunker.__init__
+        @param max_chunk_length If set, the longest data block the sieve can
+            ever return. Newly added data is then sieved starting at most
+            this many bytes before the new data instead of at the end of the
+            last data block, which bounds the sieve cost when a long run of
+            unrecognized data sits in the buffer. Leave as None to sieve
+            everything after the last data block, like the original Chunker.
+        """
+        self.sieve = data_sieve_fn
+        self.max_chunk_length = max_chunk_length
+
+        self._buffer = bytearray()
+        # absolute index of self._buffer[0]
+        self._buffer_base = 0
+        # absolute index of the first unconsumed byte
+        self._head = 0
+
+        self._raw_chunks = deque()
+        self._data_chunks = deque()
+        self._nondata_chunks = deque()
+
+        # unsieved (or not yet matched) data at the end of the buffer
+        self._tail_start = 0
+        self._tail_time = None
+
+    def _block(self, start, end):
+        """
+        Return a copy of the buffer between the absolute indices start and end
+        in the format handed to the sieve and returned to the caller.
+        To be filled out by the subclass.
+        """
+        raise NotImplementedException("_block() not overridden!")
+
+    def _end(self):
+        """
+        @retval absolute index one past the last byte in the buffer
+        """
+        return self._buffer_base + len(self._buffer)
+
+    def _rebase(self, chunks):
+        """
+        Convert a collection of absolute (start, end, timestamp) tuples to a
+        list of tuples relative to the start of the buffer.
+        """
+        head = self._head
+        return [(s - head, e - head, t) for (s, e, t) in chunks]
+
+    def _timestamp_at(self, index):
+        """
+        Find the timestamp of the raw chunk containing the absolute index.
+        New data is always near the end of the buffer so search backwards.
+        """
+        for (s, e, t) in reversed(self._raw_chunks):
+            if s <= index < e:
+                return t
+        return None
+
+    @property
+    def buffer(self):
+        return self._block(self._head, self._end())
+
+    @property
+    def raw_chunk_list(self):
+        return self._rebase(self._raw_chunks)
+
+    @property
+    def data_chunk_list(self):
+        return self._rebase(self._data_chunks)
+
+    @property
+    def nondata_chunk_list(self):
+        chunks = list(self._nondata_chunks)
+        if self._tail_start < self._end():
+            chunks.append((self._tail_start, self._end(), self._tail_timestamp()))
+        return self._rebase(chunks)
+
+    def _tail_timestamp(self):
+        if self._tail_time is None:
+            self._tail_time = self._timestamp_at(self._tail_start)
+        return self._tail_time
+
+    def add_chunk(self, raw_data, timestamp):
+        """
+        Adds a chunk of data to the end of the buffer and sieves the data that
+        has not yet been matched.
+
+        @param raw_data The bunch of raw data as a string (or bytearray)
+        @param timestamp The time (in NTP4 float format) that the data was
+            collected at the port agent
+        """
+        assert isinstance(timestamp, float)
+        start_index = self._end()
+        self._buffer.extend(raw_data)
+        end_index = self._end()
+        self._raw_chunks.append((start_index, end_index, timestamp))
+
+        sieve_start = self._tail_start
+        if self.max_chunk_length is not None:
+            sieve_start = max(sieve_start, start_index - self.max_chunk_length)
+
+        result = self.sieve(self._block(sieve_start, end_index))
+        if self.overlaps(result):
+            raise SampleException("Overlapping blocks in sieve list: %s" % result)
+        result.sort()
+
+        for (s, e) in result:
+            s += sieve_start
+            e += sieve_start
+            if s > self._tail_start:
+                self._nondata_chunks.append((self._tail_start, s,
+                                             self._tail_timestamp()))
+            self._data_chunks.append((s, e, self._timestamp_at(s)))
+            self._tail_start = e
+            self._tail_time = None
+
+        log.trace("Added chunk, data_chunk_list: %s, nondata_chunk_list: %s",
+                  self._data_chunks, self._nondata_chunks)
+
+    def _generate_data_lists(self, timestamp, start_index=0):
+        """
+        Sieve the buffer from a starting place without changing any state.
+
+        @param timestamp The timestamp to use for non-data after start_index
+            if none can be found in the raw chunk list
+        @param start_index The beginning index relative to the buffer
+        @retval A dict with keys "data_chunk_list" and "non_data_chunk_list"
+            with indices relative to the buffer
+        """
+        start = self._head + start_index
+        return_list = {'data_chunk_list': [], 'non_data_chunk_list': []}
+        result = self.sieve(self._block(start, self._end()))
+        if self.overlaps(result):
+            raise SampleException("Overlapping blocks in sieve list: %s" % result)
+        result.sort()
+
+        previous_end = start
+        for (s, e) in result:
+            s += start
+            e += start
+            if s > previous_end:
+                return_list['non_data_chunk_list'].append(
+                    (previous_end, s, self._timestamp_at(previous_end)))
+            return_list['data_chunk_list'].append((s, e, self._timestamp_at(s)))
+            previous_end = e
+
+        # like the original, trailing non-data is only reported if nothing
+        # was found at all
+        if result == []:
+            time = self._timestamp_at(start)
+            if time is None:
+                time = timestamp
+            return_list['non_data_chunk_list'].append((start, self._end(), time))
+
+        return_list['data_chunk_list'] = self._rebase(return_list['data_chunk_list'])
+        return_list['non_data_chunk_list'] = self._rebase(return_list['non_data_chunk_list'])
+        return return_list
+
+    def _consume(self, index):
+        """
+        Drop everything in the buffer before the absolute index and bring the
+        chunk deques in line. A data chunk that is only partly consumed can no
+        longer be parsed so its remainder becomes non-data.
+
+        @param index absolute index to clean up to
+        """
+        if index <= self._head:
+            return
+        self._head = index
+
+        raw = self._raw_chunks
+        while raw and raw[0][1] <= index:
+            raw.popleft()
+        if raw and raw[0][0] < index:
+            (s, e, t) = raw.popleft()
+            raw.appendleft((index, e, t))
+
+        remainder = None
+        data = self._data_chunks
+        while data and data[0][0] < index:
+            (s, e, t) = data.popleft()
+            if e > index:
+                remainder = e
+
+        nondata = self._nondata_chunks
+        while nondata and nondata[0][1] <= index:
+            nondata.popleft()
+        if nondata and nondata[0][0] < index:
+            (s, e, t) = nondata.popleft()
+            nondata.appendleft((index, e, t))
+
+        if remainder is not None:
+            time = self._timestamp_at(index)
+            if nondata and nondata[0][0] == remainder:
+                (s, e, t) = nondata.popleft()
+                nondata.appendleft((index, e, time))
+            elif self._tail_start == remainder:
+                self._tail_start = index
+                self._tail_time = None
+            else:
+                nondata.appendleft((index, remainder, time))
+
+        if self._tail_start < index:
+            self._tail_start = index
+            self._tail_time = None
+
+        consumed = index - self._buffer_base
+        if consumed >= self.COMPACT_THRESHOLD and consumed * 2 >= len(self._buffer):
+            del self._buffer[:consumed]
+            self._buffer_base = index
+
+    def _clean_buffer(self, end_index):
+        """
+        Clean up the buffer and chunk lists up to an index
+        @param end_index index relative to the buffer to clean up to
+        """
+        self._consume(self._head + end_index)
+
+    def get_next_data_with_index(self, clean=True):
+        """
+        Get the next chunk of data from the buffer. By default, it clears all
+        that comes before it.
+
+        @param clean If set to false, do not clear the buffer when fetching the
+            data, but simply return the data block and make no further changes.
+        @return A tuple of (timestamp, data_chunk, start_index, end_index),
+            (None, None, None, None) if no data
+        """
+        if not self._data_chunks:
+            return (None, None, None, None)
+
+        (start, end, timestamp) = self._data_chunks[0]
+        next_block = self._block(start, end)
+        head = self._head
+        if clean:
+            self._consume(end)
+
+        return (timestamp, next_block, start - head, end - head)
+
+    def get_next_non_data_with_index(self, clean=True):
+        """
+        Get the next chunk of non-data from the buffer. By default, it clears
+        all that comes before it.
+
+        @param clean Remove the buffer contents before and including this data
+        @return A tuple of (timestamp, data_chunk, start_index, end_index),
+            (None, None, None, None) if no data
+        """
+        if self._nondata_chunks:
+            (start, end, timestamp) = self._nondata_chunks[0]
+        elif self._tail_start < self._end():
+            (start, end, timestamp) = (self._tail_start, self._end(),
+                                       self._tail_timestamp())
+        else:
+            return (None, None, None, None)
+
+        next_block = self._block(start, end)
+        head = self._head
+        if clean:
+            self._consume(end)
+
+        return (timestamp, next_block, start - head, end - head)
+
+    def get_next_raw(self, clean=True):
+        """
+        Get the next chunk of raw characters from the buffer, clearing all
+        that comes before it.
+
+        @param clean Remove the buffer contents before and including this data
+        @return A tuple of (timestamp, data_chunk), (None, None) if empty
+        """
+        if not self._raw_chunks:
+            return (None, None)
+
+        (start, end, timestamp) = self._raw_chunks[0]
+        next_block = self._block(start, end)
+        if clean:
+            self._consume(end)
+
+        return (timestamp, next_block)
+
+    def get_buffer_size(self):
+        """
+        @retval the number of unconsumed bytes in the buffer
+        """
+        return self._end() - self._head
+
+    def clean_all_chunks(self):
+        """
+        Clean all data out of the non_data, raw, and data lists
+        """
+        self._consume(self._end())
+
+
+class BufferedStringChunker(BufferedChunker):
+    """
+    Drop in replacement for the StringChunker. The sieve is handed, and the
+    get methods return, strings.
+    """
+    def _block(self, start, end):
+        base = self._buffer_base
+        return str(self._buffer[start - base:end - base])
+
+
+class BufferedBinaryChunker(BufferedChunker):
+    """
+    Drop in replacement for the BinaryChunker. The sieve is handed, and the
+    get methods return, bytearrays.
+    """
+    def _block(self, start, end):
+        base = self._buffer_base
+        return self._buffer[start - base:end - base]
+
+
+def _literal_prefix(parsed):
+    """
+    @param parsed sre_parse subpattern
+    @retval (list of prefix characters, True if the whole subpattern is literal)
+    """
+    prefix = []
+    for (op, value) in parsed:
+        if op == sre_constants.AT and value in (sre_constants.AT_BEGINNING, sre_constants.AT_BEGINNING_STRING):
+            continue
+        if op == sre_constants.LITERAL and value <= 127:
+            prefix.append(chr(value))
+        elif op == sre_constants.SUBPATTERN:
+            (group_prefix, complete) = _literal_prefix(value[-1])
+            prefix.extend(group_prefix)
+            if not complete:
+                return (prefix, False)
+        else:
+            return (prefix, False)
+    return (prefix, True)
+
+
+def regex_literal_prefix(regex):
+    """
+    Get the literal text every match of a compiled regex must start with,
+    looking into leading groups
+    @param regex compiled regular expression
+    @retval prefix string, empty if the regex doesn't start with a literal or
+        matches case insensitively
+    """
+    parsed = sre_parse.parse(regex.pattern, regex.flags)
+    if parsed.pattern.flags & (re.IGNORECASE | re.LOCALE | re.UNICODE):
+        return ''
+    return ''.join(_literal_prefix(parsed)[0])
+
+
+class ParticleRegexMatcher(object):
+    """
+    Find the first of a list of particle classes whose regex matches a line.
+    Rather than trying every regex in turn, only the regexes whose literal
+    prefix (e.g. 'LILY,') the line starts with are tried, in list order.
+    """
+    def __init__(self, particle_regexes):
+        """
+        @param particle_regexes list of (particle_class, compiled regex) pairs
+            in the order they should be tried
+        """
+        self._entries = [(particle_class, regex, regex_literal_prefix(regex))
+                         for (particle_class, regex) in particle_regexes]
+
+        # entries to try for each first character, and for lines starting
+        # with any other character
+        self._unprefixed = [entry for entry in self._entries if not entry[2]]
+        self._by_first_char = {}
+        for (particle_class, regex, prefix) in self._entries:
+            if prefix and prefix[0] not in self._by_first_char:
+                self._by_first_char[prefix[0]] = [entry for entry in self._entries
+                                                  if not entry[2] or entry[2][0] == prefix[0]]
+
+    def match(self, line):
+        """
+        @param line string to match
+        @retval (particle_class, match object), or (None, None) if no regex matches
+        """
+        for (particle_class, regex, prefix) in self._by_first_char.get(line[:1], self._unprefixed):
+            if prefix and not line.startswith(prefix):
+                continue
+            match = regex.match(line)
+            if match:
+                return (particle_class, match)
+        return (None, None)
+
+
+class ParticleSieve(ParticleRegexMatcher):
+    """
+    Sieve function finding the data blocks of several particle types in one
+    pass over the data, rather than running finditer over the data once per
+    regex.  The regexes are compiled into a single alternation, tried in list
+    order at each position, with an empty group closing each alternative so
+    the lastindex of a match tells which particle it belongs to.  Regexes
+    compiled with different flags can't be combined, and are run over the
+    data one at a time.
+
+    An instance is passed to the chunker as its sieve function, and since the
+    sieve is also a ParticleRegexMatcher the protocol can use it to find the
+    particle class of each chunk:
+        sieve = ParticleSieve([(particle_class, regex), ...])
+        chunker = BufferedStringChunker(sieve)
+    """
+    def __init__(self, particle_regexes):
+        """
+        @param particle_regexes list of (particle_class, compiled regex) pairs
+            in the order they should be tried
+        """
+        ParticleRegexMatcher.__init__(self, particle_regexes)
+        regexes = [regex for (particle_class, regex) in particle_regexes]
+
+        self._combined = None
+        if regexes and len(set(regex.flags & ~re.VERBOSE for regex in regexes)) == 1:
+            # every alternative numbers its own groups from 1, the marker
+            # groups come after the largest of them
+            self._first_marker = max(regex.groups for regex in regexes) + 1
+            state = sre_parse.Pattern()
+            state.flags = regexes[0].flags & ~re.VERBOSE
+            branches = []
+            for (index, regex) in enumerate(regexes):
+                parsed = sre_parse.parse(regex.pattern, regex.flags)
+                parsed.append((sre_constants.SUBPATTERN,
+                               (self._first_marker + index, sre_parse.SubPattern(state))))
+                branches.append(parsed)
+            state.groups = self._first_marker + len(regexes)
+            try:
+                self._combined = sre_compile.compile(
+                    sre_parse.SubPattern(state, [(sre_constants.BRANCH, (None, branches))]), state.flags)
+            except (AssertionError, sre_constants.error) as e:
+                log.debug("Sieving particle regexes one at a time: %s", e)
+
+    def __call__(self, raw_data):
+        """
+        @param raw_data data to search for data blocks
+        @retval list of (start, end) tuples in order and without overlap
+        """
+        return [(start, end) for (start, end, particle_class) in self.spans(raw_data)]
+
+    def spans(self, raw_data):
+        """
+        Find the data blocks and the particle class each one matched.  Where
+        matches of different regexes overlap the one starting first is kept.
+        @param raw_data data to search for data blocks
+        @retval list of (start, end, particle_class) tuples in order and
+            without overlap
+        """
+        entries = self._entries
+        if self._combined is not None:
+            first_marker = self._first_marker
+            return [(match.start(), match.end(), entries[match.lastindex - first_marker][0])
+                    for match in self._combined.finditer(raw_data)]
+
+        spans = []
+        for (particle_class, regex, prefix) in entries:
+            spans.extend((match.start(), match.end(), particle_class)
+                         for match in regex.finditer(raw_data))
+        spans.sort(key=lambda span: span[0])
+
+        result = []
+        for span in spans:
+            if result and span[0] < result[-1][1]:
+                continue
+            result.append(span)
+        return result
@@ -11,11 +11,12 @@ the driver and agent. This involves a JSON interchange format
 __author__ = 'Steve Foley'
 __license__ = 'Apache 2.0'
 
-import time
 import copy
+import zlib
 import ntplib
 import base64
 import logging
+import msgpack
 from warnings import warn
 try:
     import simplejson as json
@@ -25,7 +26,9 @@ except ImportError:
 
 from mi.core.common import BaseEnum
 from mi.core.exceptions import SampleException, ReadOnlyException, NotImplementedException, InstrumentParameterException
+from mi.core.exceptions import MissingSchemaException
 from mi.core.log import get_logger ; log = get_logger()
+from mi.core.time import ntp_now
 
 class CommonDataParticleType(BaseEnum):
     """
@@ -57,7 +60,289 @@ class DataParticleValue(BaseEnum):
     OUT_OF_RANGE = "out_of_range"
     INVALID = "invalid"
     QUESTIONABLE = "questionable"
-    
+
+class DataParticleEncoding(BaseEnum):
+    """
+    Wire formats generated particles can be serialized to.  JSON is the
+    default, MSGPACK is the compact positional format produced by
+    CompactParticleEncoder.
+    """
+    JSON = "json"
+    MSGPACK = "msgpack"
+
+# Order of the header fields in a compact particle
+COMPACT_HEADER_KEYS = [
+    DataParticleKey.PKT_FORMAT_ID,
+    DataParticleKey.PKT_VERSION,
+    DataParticleKey.PORT_TIMESTAMP,
+    DataParticleKey.INTERNAL_TIMESTAMP,
+    DataParticleKey.DRIVER_TIMESTAMP,
+    DataParticleKey.PREFERRED_TIMESTAMP,
+    DataParticleKey.QUALITY_FLAG,
+    DataParticleKey.NEW_SEQUENCE,
+]
+
+# Header fields left out of the particle dict when they are not set
+COMPACT_OPTIONAL_KEYS = [
+    DataParticleKey.PORT_TIMESTAMP,
+    DataParticleKey.INTERNAL_TIMESTAMP,
+    DataParticleKey.NEW_SEQUENCE,
+]
+
+# Number of particles of a stream sent before its value schema is repeated,
+# so subscribers that connect late can start decoding without asking for it
+COMPACT_SCHEMA_INTERVAL = 1000
+
+# First byte of a compact particle, a msgpack array of five items.  JSON
+# particles start with '{'.
+COMPACT_PARTICLE_MARKER = '\x95'
+
+def encode_particle_dict(particle_dict, sorted=False):
+    """
+    Serialize a particle dict from DataParticle.generate_dict as JSON
+    @param sorted sort the keys, useful for testing but slow
+    @retval JSON string
+    """
+    return json.dumps(particle_dict, sort_keys=sorted)
+
+def compact_schema_id(schema):
+    """
+    Identify a compact particle value schema by a hash of its contents, so
+    the same schema has the same id in every process
+    @param schema list of value dicts without the values
+    @retval schema id as an integer
+    """
+    return zlib.crc32(msgpack.packb([sorted(item.items()) for item in schema])) & 0xffffffff
+
+def is_compact_particle(data):
+    """
+    Check whether a serialized particle is in the compact format
+    @param data serialized particle
+    @retval True for a compact particle, False for JSON
+    """
+    return isinstance(data, str) and data[:1] == COMPACT_PARTICLE_MARKER
+
+class CompactParticleEncoder(object):
+    """
+    Serialize particle dicts to msgpack as [stream_name, header, values,
+    schema_id, schema].  The header and values are positional vectors, the
+    value_id and any other per value keys live in the schema.  Every
+    particle carries the id of its schema, the schema itself is only sent
+    the first time a stream is seen, when it changes, every schema_interval
+    particles and after a decoder asks for it through resend_schema.
+    Otherwise the schema slot is None.
+    """
+    def __init__(self, schema_interval=COMPACT_SCHEMA_INTERVAL):
+        """
+        @param schema_interval number of particles per stream between
+            repeated schemas
+        """
+        self._schema_interval = schema_interval
+        # stream name -> [last schema sent, its id, particles since it was sent]
+        self._schemas = {}
+
+    def resend_schema(self, stream=None):
+        """
+        Send the schema again with the next particle of a stream, for a
+        decoder that missed it
+        @param stream stream name, None for every stream
+        """
+        if stream is None:
+            self._schemas.clear()
+        else:
+            self._schemas.pop(stream, None)
+
+    def encode(self, particle_dict):
+        """
+        Encode a particle dict as returned from DataParticle.generate_dict
+        @param particle_dict particle to encode
+        @retval msgpack string
+        """
+        values = particle_dict[DataParticleKey.VALUES]
+        vector = [item.get(DataParticleKey.VALUE) for item in values]
+        schema = [dict((key, value) for (key, value) in item.iteritems()
+                       if key != DataParticleKey.VALUE)
+                  for item in values]
+        return self._pack(particle_dict, vector, schema)
+
+    def encode_particle(self, particle):
+        """
+        Encode a particle.  Particles that declare a schema are encoded from
+        their value vector without building the value dicts.
+        @param particle DataParticle to encode
+        @retval msgpack string
+        """
+        schema = particle.schema()
+        if schema is None:
+            return self.encode(particle.generate_dict())
+        (header, vector) = particle.generate_vector()
+        return self._pack(header, vector, schema.value_schema)
+
+    def _pack(self, header, vector, schema):
+        """
+        Pack a particle, leaving out the schema if it was recently sent
+        @param header particle dict holding at least the header fields
+        @param vector list of values
+        @param schema list of value dicts without the values
+        @retval msgpack string
+        """
+        stream = header[DataParticleKey.STREAM_NAME]
+
+        sent = self._schemas.get(stream)
+        if sent is None or (sent[0] is not schema and sent[0] != schema):
+            sent = [schema, compact_schema_id(schema), self._schema_interval]
+            self._schemas[stream] = sent
+
+        if sent[2] >= self._schema_interval:
+            sent[2] = 1
+        else:
+            sent[2] += 1
+            schema = None
+
+        header = [header.get(key) for key in COMPACT_HEADER_KEYS]
+        return msgpack.packb([stream, header, vector, sent[1], schema])
+
+class CompactParticleDecoder(object):
+    """
+    Rebuild particle dicts from the output of a CompactParticleEncoder.
+    Schemas are kept by id, so a decoder can read particles from any number
+    of encoders.
+    """
+    def __init__(self):
+        # schema id -> schema
+        self._schemas = {}
+
+    def has_schema(self, schema_id):
+        """
+        @param schema_id id of a schema
+        @retval True if the schema has been received
+        """
+        return schema_id in self._schemas
+
+    def decode(self, data):
+        """
+        Decode a compact particle
+        @param data msgpack string from CompactParticleEncoder.encode
+        @retval particle dict in the same form as DataParticle.generate_dict
+        @throws MissingSchemaException if the schema hasn't been received, the
+            encoder should be asked to resend it
+        @throws SampleException if the particle can't be decoded
+        """
+        try:
+            (stream, header, vector, schema_id, schema) = msgpack.unpackb(data)
+        except (ValueError, TypeError, msgpack.exceptions.UnpackException) as e:
+            raise SampleException("Invalid compact particle: %s" % e)
+
+        if schema is None:
+            schema = self._schemas.get(schema_id)
+            if schema is None:
+                raise MissingSchemaException("No value schema %s received for stream %s" %
+                                             (schema_id, stream), stream, schema_id)
+        else:
+            self._schemas[schema_id] = schema
+
+        if len(schema) != len(vector):
+            raise SampleException("Compact particle for %s has %d values, schema has %d" %
+                                  (stream, len(vector), len(schema)))
+
+        result = dict(zip(COMPACT_HEADER_KEYS, header))
+        for key in COMPACT_OPTIONAL_KEYS:
+            if result[key] is None:
+                del result[key]
+
+        values = []
+        for (item, value) in zip(schema, vector):
+            item = dict(item)
+            item[DataParticleKey.VALUE] = value
+            values.append(item)
+
+        result[DataParticleKey.STREAM_NAME] = stream
+        result[DataParticleKey.VALUES] = values
+        return result
+
+class DataParticleSchema(object):
+    """
+    Ordered list of particle fields, compiled once per particle class from
+    DataParticle._schema.  Values are encoded from a sequence in field order
+    and the {value_id, value} dicts are only built when they are asked for.
+    """
+    def __init__(self, fields):
+        """
+        @param fields list of value_ids, (value_id, encoder) pairs or
+            (value_id, encoder, extras) triples.  The encoder may be None to
+            pass the value through, extras is a dict of keys added to the
+            value dict, e.g. {DataParticleKey.BINARY: True}
+        """
+        names = []
+        encoders = []
+        self.value_schema = []
+        for field in fields:
+            if isinstance(field, basestring):
+                field = (field,)
+            names.append(field[0])
+            encoders.append(field[1] if len(field) > 1 else None)
+
+            item = {DataParticleKey.VALUE_ID: field[0]}
+            if len(field) > 2 and field[2]:
+                item.update(field[2])
+            self.value_schema.append(item)
+
+        self.names = tuple(names)
+        self.encoders = tuple(encoders)
+        self._pass_through = not any(encoders)
+
+    def __len__(self):
+        return len(self.names)
+
+    def encode(self, values, encoding_errors):
+        """
+        Encode a sequence of values.  Fields that fail to encode are None and
+        are recorded in encoding_errors, like DataParticle._encode_value.
+        @param values sequence of values in field order
+        @param encoding_errors list to append {value_id: value} failures to
+        @retval list of encoded values
+        @throws SampleException if the number of values doesn't match
+        """
+        if len(values) != len(self.names):
+            raise SampleException("Expected %d particle values, got %d" %
+                                  (len(self.names), len(values)))
+
+        if self._pass_through:
+            return list(values)
+
+        try:
+            return [value if encoder is None else encoder(value)
+                    for (encoder, value) in zip(self.encoders, values)]
+        except Exception:
+            pass
+
+        # encode field by field to find the ones that failed
+        result = []
+        for (name, encoder, value) in zip(self.names, self.encoders, values):
+            encoded_val = value
+            if encoder is not None:
+                try:
+                    encoded_val = encoder(value)
+                except Exception:
+                    log.error("Data particle error encoding. Name:%s Value:%s", name, value)
+                    encoding_errors.append({name: value})
+                    encoded_val = None
+            result.append(encoded_val)
+        return result
+
+    def value_list(self, encoded_values):
+        """
+        Build the {value_id, value} dict list for encoded values
+        @param encoded_values list from encode
+        @retval list of value dicts
+        """
+        result = []
+        for (item, value) in zip(self.value_schema, encoded_values):
+            item = dict(item)
+            item[DataParticleKey.VALUE] = value
+            result.append(item)
+        return result
+
 class DataParticle(object):
     """
     This class is responsible for storing and ultimately generating data
@@ -75,6 +360,11 @@ class DataParticle(object):
     # data_particle_type()
     _data_particle_type = None
 
+    # Optional declarative list of fields, see DataParticleSchema.  Particles
+    # declaring a schema implement _build_value_tuple rather than
+    # _build_parsed_values.
+    _schema = None
+
     def __init__(self, raw_data,
                  port_timestamp=None,
                  internal_timestamp=None,
@@ -93,7 +383,7 @@ class DataParticle(object):
             DataParticleKey.PKT_VERSION: 1,
             DataParticleKey.PORT_TIMESTAMP: port_timestamp,
             DataParticleKey.INTERNAL_TIMESTAMP: internal_timestamp,
-            DataParticleKey.DRIVER_TIMESTAMP: ntplib.system_to_ntp_time(time.time()),
+            DataParticleKey.DRIVER_TIMESTAMP: ntp_now(),
             DataParticleKey.PREFERRED_TIMESTAMP: preferred_timestamp,
             DataParticleKey.QUALITY_FLAG: quality_flag,
         }
@@ -176,6 +466,19 @@ class DataParticle(object):
             raise NotImplementedException("Value %s not available in particle!", id)
         
 
+    @classmethod
+    def schema(cls):
+        """
+        Return the compiled schema for this particle class, compiling it on
+        first use
+        @retval DataParticleSchema, None if the class doesn't declare one
+        """
+        compiled = cls.__dict__.get('_compiled_schema')
+        if compiled is None and cls._schema is not None:
+            compiled = DataParticleSchema(cls._schema)
+            cls._compiled_schema = compiled
+        return compiled
+
     def data_particle_type(self):
         """
         Return the data particle type (aka stream name)
@@ -215,6 +518,26 @@ class DataParticle(object):
 
         #log.debug("Serialize result: %s", result)
         return result
+
+    def generate_vector(self):
+        """
+        Generate the header and the encoded values of a particle declaring a
+        schema without building the value dicts.  The value_ids are in
+        schema().names.
+        @retval (header dict without the values, list of encoded values)
+        @throws NotImplementedException if the class has no schema
+        """
+        if self.schema() is None:
+            raise NotImplementedException("%s does not declare a schema" % self.__class__.__name__)
+
+        if not self._check_preferred_timestamps():
+            raise SampleException("Preferred timestamp not in particle!")
+
+        self._encoding_errors = []
+        values = self._build_encoded_values()
+        result = self._build_base_structure()
+        result[DataParticleKey.STREAM_NAME] = self.data_particle_type()
+        return (result, values)
         
     def generate(self, sorted=False):
         """
@@ -229,9 +552,7 @@ class DataParticle(object):
            and driver timestamp
         @throws InstrumentDriverException If there is a problem with the inputs
         """
-        result = self.generate_dict()
-        json_result = json.dumps(result, sort_keys=sorted)
-        return json_result
+        return encode_particle_dict(self.generate_dict(), sorted)
         
     def _build_parsed_values(self):
         """
@@ -242,7 +563,27 @@ class DataParticle(object):
         @return the values tag for this data structure ready to JSONify
         @raises SampleException when parsed values can not be properly returned
         """
-        raise SampleException("Parsed values block not overridden")
+        schema = self.schema()
+        if schema is None:
+            raise SampleException("Parsed values block not overridden")
+        return schema.value_list(self._build_encoded_values())
+
+    def _build_value_tuple(self):
+        """
+        Build the values of a particle declaring a schema, in schema order.
+        The values are encoded with the schema encoders.
+
+        @return sequence of values
+        @raises SampleException when the values can not be built
+        """
+        raise SampleException("Value tuple not overridden")
+
+    def _build_encoded_values(self):
+        """
+        Encode the values from _build_value_tuple with the class schema
+        @return list of encoded values
+        """
+        return self.schema().encode(self._build_value_tuple(), self._encoding_errors)
 
 
     def _build_base_structure(self):
@@ -273,7 +614,7 @@ class DataParticle(object):
             return False
         
         # is it sufficiently in the future to be unreasonable?
-        if timestamp > ntplib.system_to_ntp_time(time.time()+(86400*365)):
+        if timestamp > ntp_now() + 86400*365:
             return False
         else:
             return True
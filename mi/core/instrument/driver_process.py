@@ -19,11 +19,249 @@ import os
 import sys
 import time
 import traceback
+import tempfile
+import cPickle
+from collections import deque
+from threading import Condition
+from mi.core.common import BaseEnum
 from mi.core.exceptions import InstrumentException, InstrumentCommandException
+from mi.core.exceptions import InstrumentParameterException
 from mi.core.instrument.instrument_driver import DriverAsyncEvent
 
 from ooi.logging import log
 
+class EventQueuePolicy(BaseEnum):
+    """
+    What a bounded event queue does with new events once it is full
+    """
+    # wait for the messaging thread to make room
+    BLOCK = 'block'
+    # drop the oldest sample, state and error events are always kept and
+    # wait for room when there is no sample to drop
+    DROP_OLDEST = 'drop_oldest'
+    # write new events to a temporary file until the queue drains
+    SPILL = 'spill'
+
+
+class EventQueueStat(BaseEnum):
+    """
+    Keys of the event queue statistics dict
+    """
+    DEPTH = 'depth'
+    HIGH_WATER = 'high_water'
+    DROPPED = 'dropped'
+    SPILLED = 'spilled'
+    BLOCKED = 'blocked'
+
+# placeholder for a sample dropped from the middle of the queue
+_DROPPED = object()
+
+
+class EventQueue(object):
+    """
+    Queue of driver events waiting to be published. Events are appended by
+    the driver and removed by the messaging thread, which can block until an
+    event arrives instead of polling an empty list.
+
+    A queue with a max_size holds at most that many events in memory. When
+    it is full new events are handled by the queue policy, so a driver that
+    produces events faster than they are published slows down, loses samples
+    or uses disk instead of running out of memory.
+    """
+    def __init__(self, max_size=None, policy=EventQueuePolicy.BLOCK, spill_dir=None):
+        """
+        @param max_size Most events held in memory, None for no limit.
+        @param policy EventQueuePolicy applied when the queue is full.
+        @param spill_dir Directory for the spill file, the system temporary
+        directory if None.
+        @throws InstrumentParameterException on a bad size or policy.
+        """
+        if max_size is not None and max_size < 1:
+            raise InstrumentParameterException('event queue size must be positive: %s' % max_size)
+        if not EventQueuePolicy.has(policy):
+            raise InstrumentParameterException('unknown event queue policy: %s' % policy)
+
+        self.max_size = max_size
+        self.policy = policy
+        self.spill_dir = spill_dir
+
+        # entries are [event, is_sample] lists so a dropped sample can be
+        # blanked in place, _samples holds the sample entries oldest first
+        # and _blanked counts the blanked entries still in _events
+        self._events = deque()
+        self._samples = deque()
+        self._blanked = 0
+        self._depth = 0
+        self._condition = Condition()
+
+        self._spill_file = None
+        self._spill_read_pos = 0
+        self._spill_count = 0
+
+        self._high_water = 0
+        self._dropped = 0
+        self._spilled = 0
+        self._blocked = 0
+
+    def __len__(self):
+        return self._depth + self._spill_count
+
+    def stats(self):
+        """
+        Get the queue statistics
+        @retval dict of EventQueueStat values, the depth includes spilled
+        events
+        """
+        with self._condition:
+            return {
+                EventQueueStat.DEPTH: self._depth + self._spill_count,
+                EventQueueStat.HIGH_WATER: self._high_water,
+                EventQueueStat.DROPPED: self._dropped,
+                EventQueueStat.SPILLED: self._spilled,
+                EventQueueStat.BLOCKED: self._blocked,
+            }
+
+    def append(self, evt):
+        """
+        Add an event to the end of the queue and wake a waiting consumer.
+        """
+        with self._condition:
+            self._put(evt)
+            self._condition.notify()
+
+    def extend(self, evts):
+        """
+        Add a list of events to the end of the queue.
+        """
+        with self._condition:
+            for evt in evts:
+                self._put(evt)
+            self._condition.notify()
+
+    def popleft(self, timeout=None):
+        """
+        Remove and return the oldest event.
+        @param timeout Seconds to wait for an event if the queue is empty,
+        None to return immediately.
+        @retval The oldest event.
+        @throws IndexError if no event arrived before the timeout.
+        """
+        with self._condition:
+            if not len(self) and timeout:
+                self._condition.wait(timeout)
+
+            if not self._depth and self._spill_count:
+                self._unspill()
+
+            while True:
+                (evt, is_sample) = self._events.popleft()
+                if evt is not _DROPPED:
+                    break
+                self._blanked -= 1
+
+            self._depth -= 1
+            if is_sample:
+                self._samples.popleft()
+            if self.max_size is not None and self.policy != EventQueuePolicy.SPILL:
+                self._condition.notify_all()
+            return evt
+
+    def _put(self, evt):
+        """
+        Add an event, applying the queue policy if the queue is full. Must be
+        called holding the condition.
+        """
+        if self.max_size is not None and self._depth >= self.max_size:
+            if self.policy == EventQueuePolicy.BLOCK:
+                self._blocked += 1
+                while self._depth >= self.max_size:
+                    self._condition.wait()
+
+            elif self.policy == EventQueuePolicy.DROP_OLDEST:
+                if self._samples:
+                    self._drop_oldest_sample()
+                elif _is_sample(evt):
+                    self._dropped += 1
+                    return
+                else:
+                    # only other events are queued, they are never dropped
+                    # so wait for the consumer as the BLOCK policy does
+                    self._blocked += 1
+                    while self._depth >= self.max_size:
+                        self._condition.wait()
+                        if self._samples and self._depth >= self.max_size:
+                            self._drop_oldest_sample()
+
+        # once events are spilled, later ones follow them so order is kept
+        if self.policy == EventQueuePolicy.SPILL and (self._spill_count or
+                (self.max_size is not None and self._depth >= self.max_size)):
+            self._spill(evt)
+            return
+
+        entry = [evt, self.policy == EventQueuePolicy.DROP_OLDEST and _is_sample(evt)]
+        self._events.append(entry)
+        if entry[1]:
+            self._samples.append(entry)
+        self._depth += 1
+        self._high_water = max(self._high_water, self._depth)
+
+    def _drop_oldest_sample(self):
+        """
+        Blank the oldest queued sample. The blanked entries are removed from
+        the event deque once there are more of them than the queue size, so
+        memory stays bounded while dropping stays cheap.
+        """
+        self._samples.popleft()[0] = _DROPPED
+        self._depth -= 1
+        self._dropped += 1
+        self._blanked += 1
+
+        if self._blanked > self.max_size:
+            self._events = deque(entry for entry in self._events if entry[0] is not _DROPPED)
+            self._blanked = 0
+
+    def _spill(self, evt):
+        """
+        Write an event to the end of the spill file
+        """
+        if self._spill_file is None:
+            self._spill_file = tempfile.TemporaryFile(prefix='driver_events_', dir=self.spill_dir)
+        try:
+            data = cPickle.dumps(evt, cPickle.HIGHEST_PROTOCOL)
+        except (cPickle.PicklingError, TypeError) as e:
+            log.error('Dropping event that cannot be spilled: %s', e)
+            self._dropped += 1
+            return
+        self._spill_file.seek(0, os.SEEK_END)
+        self._spill_file.write(data)
+        self._spill_count += 1
+        self._spilled += 1
+
+    def _unspill(self):
+        """
+        Read spilled events back into memory, up to the queue size
+        """
+        self._spill_file.seek(self._spill_read_pos)
+        while self._spill_count and self._depth < self.max_size:
+            evt = cPickle.load(self._spill_file)
+            self._spill_count -= 1
+            self._events.append([evt, False])
+            self._depth += 1
+        self._spill_read_pos = self._spill_file.tell()
+
+        if not self._spill_count:
+            self._spill_file.seek(0)
+            self._spill_file.truncate()
+            self._spill_read_pos = 0
+
+
+def _is_sample(evt):
+    """
+    Test if an event is a sample, which the DROP_OLDEST policy may drop
+    """
+    return isinstance(evt, dict) and evt.get('type') == DriverAsyncEvent.SAMPLE
+
+
 class DriverProcess(object):
     """
     Base class for messaging enabled OS-level driver processes. Provides
@@ -47,16 +285,21 @@ class DriverProcess(object):
         spawnargs = ['bin/python', '-c', cmd_str]
         return Popen(spawnargs, close_fds=True)
         
-    def __init__(self, driver_module, driver_class, ppid):
+    def __init__(self, driver_module, driver_class, ppid,
+                 event_queue_size=None, event_queue_policy=EventQueuePolicy.BLOCK):
         """
         @param driver_module The python module containing the driver code.
         @param driver_class The python driver class.
+        @param event_queue_size Most events waiting to be published, None
+        for no limit.
+        @param event_queue_policy EventQueuePolicy applied when the event
+        queue is full.
         """
         self.driver_module = driver_module
         self.driver_class = driver_class
         self.ppid = ppid
         self.driver = None
-        self.events = []
+        self.events = EventQueue(event_queue_size, event_queue_policy)
         self.messaging_started = False
         
     def construct_driver(self):
@@ -129,6 +372,7 @@ class DriverProcess(object):
         not forwarded to the driver are:
         'stop_driver_process' - signal to close messaging and terminate.
         'test_events' - populate event queue with test data.
+        'event_queue_stats' - returns the event queue statistics.
         'process_echo' - echos the message back.
         If the command is not found in the driver, an echo message is
         replied to the client.
@@ -145,8 +389,10 @@ class DriverProcess(object):
             return'stop_driver_process'
         elif cmd == 'test_events':
             events = kwargs['events']
-            self.events += events
+            self.events.extend(events)
             reply = 'test_events'
+        elif cmd == 'event_queue_stats':
+            reply = self.events.stats()
         elif cmd == 'process_echo':
             reply = 'ping from resource ppid:%s, resource:%s' % (str(self.ppid), str(self.driver))
             #try:
@@ -187,7 +433,7 @@ class DriverProcess(object):
             
     def send_event(self, evt):
         """
-        Append an event to the list to be sent by the event threaed.
+        Append an event to the queue to be sent by the event thread.
         """
         self.events.append(evt)
             
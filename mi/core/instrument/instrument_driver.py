@@ -43,6 +43,7 @@ class DriverConfigKey(BaseEnum):
     """
     PARAMETERS = 'parameters'
     SCHEDULER = 'scheduler'
+    PARTICLE_ENCODING = 'particle_encoding'
 
 # This is a copy since we can't import from pyon.
 class ResourceAgentState(BaseEnum):
@@ -775,6 +776,16 @@ class SingleConnectionInstrumentDriver(InstrumentDriver):
         # know which is better.
         self._protocol._protocol_fsm.current_state = state
 
+    def resend_particle_schema(self, stream=None):
+        """
+        Ask the protocol to send the value schema again with the next compact
+        particle of a stream.  Called by clients that received a particle
+        they could not decode.
+        @param stream stream name, None for every stream
+        """
+        if self._protocol:
+            self._protocol.resend_particle_schema(stream)
+
     ########################################################################
     # Unconfigured handlers.
     ########################################################################
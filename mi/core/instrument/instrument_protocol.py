@@ -15,7 +15,6 @@ __license__ = 'Apache 2.0'
 
 import re
 import time
-import json
 from functools import partial
 
 from mi.core.log import get_logger ; log = get_logger()
@@ -25,6 +24,9 @@ from threading import Thread
 from mi.core.instrument.protocol_param_dict import ParameterDictVisibility
 from mi.core.common import BaseEnum, InstErrorCode
 from mi.core.instrument.data_particle import RawDataParticle
+from mi.core.instrument.data_particle import DataParticleEncoding
+from mi.core.instrument.data_particle import CompactParticleEncoder
+from mi.core.instrument.data_particle import encode_particle_dict
 from mi.core.instrument.instrument_driver import DriverConfigKey
 from mi.core.driver_scheduler import DriverScheduler
 from mi.core.driver_scheduler import DriverSchedulerConfigKey
@@ -90,6 +92,10 @@ class InstrumentProtocol(object):
         # Driver configuration passed from the user
         self._startup_config = {}
 
+        # Encoder for the compact particle format, None when particles are
+        # published as JSON
+        self._particle_encoder = None
+
         # scheduler config is a bit redundant now, but if we ever want to
         # re-initialize a scheduler we will need it.
         self._scheduler = None
@@ -243,21 +249,78 @@ class InstrumentProtocol(object):
                two different events are published: one to notify raw data and
                the other to notify parsed data.
 
-        @retval dict of dicts {'parsed': parsed_sample, 'raw': raw_sample} if
-                the line can be parsed for a sample. Otherwise, None.
+        @retval particle dict if the line can be parsed for a sample.
+                Otherwise, None.
         @todo Figure out how the agent wants the results for a single poll
             and return them that way from here
         """
         sample = None
         if regex.match(line):
-        
-            particle = particle_class(line, port_timestamp=timestamp)
-            parsed_sample = particle.generate()
+            sample = self._create_sample(particle_class, line, timestamp, publish)
 
-            if publish and self._driver_event:
-                self._driver_event(DriverAsyncEvent.SAMPLE, parsed_sample)
-    
-            sample = json.loads(parsed_sample)
+        return sample
+
+    def _extract_first_sample(self, matcher, line, timestamp, publish=True):
+        """
+        Extract a sample with the first particle class whose regex matches the
+        line, for protocols that produce several particle types from one chunker
+        @param matcher ParticleRegexMatcher holding the particle classes to try
+        @param line string to match for sample.
+        @param timestamp port agent timestamp to include with the particle
+        @param publish boolean to publish samples (default True)
+        @retval (particle_class, particle dict), or (None, None) if no particle
+                regex matches the line
+        """
+        (particle_class, match) = matcher.match(line)
+        if particle_class is None:
+            return (None, None)
+        return (particle_class, self._create_sample(particle_class, line, timestamp, publish))
+
+    def _create_sample(self, particle_class, line, timestamp, publish=True):
+        """
+        Build and publish a particle from a line known to match its regex.
+        Override to pass extra arguments to the particle.
+        @retval particle dict
+        """
+        return self._generate_sample(particle_class(line, port_timestamp=timestamp), publish)
+
+    def _generate_particle(self, particle):
+        """
+        Serialize a particle in the wire format selected in the startup
+        config.  Drivers publishing particles they build themselves should
+        serialize them with this rather than particle.generate().
+        @param particle DataParticle to serialize
+        @retval JSON string, or a compact msgpack particle if configured
+        """
+        if self._particle_encoder is None:
+            return particle.generate()
+        return self._particle_encoder.encode_particle(particle)
+
+    def resend_particle_schema(self, stream=None):
+        """
+        Send the value schema again with the next compact particle of a
+        stream, for a client that missed it.  Does nothing for JSON.
+        @param stream stream name, None for every stream
+        """
+        if self._particle_encoder is not None:
+            self._particle_encoder.resend_schema(stream)
+
+    def _generate_sample(self, particle, publish=True):
+        """
+        Build the dict for a particle once, and only serialize it when it is
+        published
+        @param particle DataParticle to generate
+        @param publish publish a sample event with the serialized particle
+        @retval particle dict
+        """
+        sample = particle.generate_dict()
+
+        if publish and self._driver_event:
+            if self._particle_encoder is None:
+                parsed_sample = encode_particle_dict(sample)
+            else:
+                parsed_sample = self._particle_encoder.encode(sample)
+            self._driver_event(DriverAsyncEvent.SAMPLE, parsed_sample)
 
         return sample
 
@@ -535,6 +598,14 @@ class InstrumentProtocol(object):
             raise InstrumentParameterException("Invalid init config format")
 
         self._startup_config = config
+
+        encoding = config.get(DriverConfigKey.PARTICLE_ENCODING, DataParticleEncoding.JSON)
+        if not DataParticleEncoding.has(encoding):
+            raise InstrumentParameterException("Invalid particle encoding: %s" % encoding)
+        if encoding == DataParticleEncoding.MSGPACK:
+            self._particle_encoder = CompactParticleEncoder()
+        else:
+            self._particle_encoder = None
         
         param_config = config.get(DriverConfigKey.PARAMETERS)
         if(param_config):
@@ -1118,7 +1189,7 @@ class CommandResponseInstrumentProtocol(InstrumentProtocol):
                                    port_timestamp=port_agent_packet.get_timestamp())
 
         if self._driver_event:
-            self._driver_event(DriverAsyncEvent.SAMPLE, particle.generate())
+            self._driver_event(DriverAsyncEvent.SAMPLE, self._generate_particle(particle))
 
     def add_to_buffer(self, data):
         '''
@@ -24,10 +24,12 @@ import subprocess
 
 from mi.core.log import get_logger ; log = get_logger()
 from mi.core.exceptions import InstrumentConnectionException
+from mi.core.checksum import xor8 as xor_checksum
 
 HEADER_SIZE = 16 # BBBBHHLL = 1 + 1 + 1 + 1 + 2 + 2 + 4 + 4 = 16
 
 
+OFFSET_P_LENGTH = 4
 OFFSET_P_CHECKSUM_LOW = 6
 OFFSET_P_CHECKSUM_HIGH = 7
 
@@ -58,6 +60,8 @@ MIN_RETRY_WINDOW = 2 # 2 seconds
 
 MAX_SEND_ATTEMPTS = 15              # Max number of times we can get EAGAIN
 
+RECV_BUFFER_SIZE = 65536            # Initial receive buffer size in batched mode
+
 
 class SocketClosed(Exception): pass
 
@@ -165,26 +169,20 @@ class PortAgentPacket():
         self.__data = data
 
     def calculate_checksum(self):
-        checksum = 0
-        for i in range(HEADER_SIZE):
-            if i < OFFSET_P_CHECKSUM_LOW or i > OFFSET_P_CHECKSUM_HIGH:
-                checksum ^= struct.unpack_from('B', str(self.__header[i]))[0]
-                
-        for i in range(self.__length):
-            checksum ^= struct.unpack_from('B', str(self.__data[i]))[0]
-            
+        """
+        XOR of all the header bytes, skipping the checksum field, and all the
+        data bytes.
+        """
+        header = bytearray(self.__header[0:HEADER_SIZE])
+        checksum = xor_checksum(header[0:OFFSET_P_CHECKSUM_LOW])
+        checksum ^= xor_checksum(header[OFFSET_P_CHECKSUM_HIGH + 1:HEADER_SIZE])
+        checksum ^= xor_checksum(self.__data[0:self.__length])
         return checksum
             
                                 
     def verify_checksum(self):
-        checksum = 0
-        for i in range(HEADER_SIZE):
-            if i < OFFSET_P_CHECKSUM_LOW or i > OFFSET_P_CHECKSUM_HIGH:
-                checksum ^= struct.unpack_from('B', self.__header[i])[0]
-                
-        for i in range(self.__length):
-            checksum ^= struct.unpack_from('B', self.__data[i])[0]
-            
+        checksum = self.calculate_checksum()
+
         if checksum == self.__recv_checksum:
             self.__isValid = True
         else:
@@ -257,9 +255,12 @@ class PortAgentClient(object):
     HEARTBEAT_INTERVAL_COMMAND = "heartbeat_interval "
     BREAK_COMMAND = "break "
     
-    def __init__(self, host, port, cmd_port, delim=None):
+    def __init__(self, host, port, cmd_port, delim=None, batched_recv=False):
         """
         PortAgentClient constructor.
+        @param batched_recv If True the listener receives into one large
+        buffer and frames as many packets as are available out of each recv,
+        otherwise each packet is read with separate header and data recvs.
         """
         self.host = host
         self.port = port
@@ -268,6 +269,7 @@ class PortAgentClient(object):
         self.listener_thread = None
         self.stop_event = None
         self.delim = delim
+        self.batched_recv = batched_recv
         self.heartbeat = 0
         self.max_missed_heartbeats = None
         self.send_attempts = MAX_SEND_ATTEMPTS
@@ -310,7 +312,8 @@ class PortAgentClient(object):
                                                 self.callback_raw,
                                                 self.listener_callback_error,
                                                 self.callback_error,
-                                                self.user_callback_error)
+                                                self.user_callback_error,
+                                                self.batched_recv)
                 self.listener_thread.start()
 
             ###
@@ -594,7 +597,8 @@ class Listener(threading.Thread):
                  callback_data = None, callback_raw = None,
                  default_callback_error = None,
                  local_callback_error = None,
-                 user_callback_error = None):
+                 user_callback_error = None,
+                 batched_recv = False):
         """
         Listener thread constructor.
         @param sock The socket to listen on.
@@ -609,9 +613,14 @@ class Listener(threading.Thread):
         @param default_callback_data A callback to handle non-network exceptions
         @param local_callback_data The local callback when error encountered.
         @param user_callback_data The user callback on error_encountered.
+        @param batched_recv Receive into one large buffer and frame as many
+        packets as are available out of each recv.
         """
         threading.Thread.__init__(self)
         self.sock = sock
+        self.batched_recv = batched_recv
+        self.recv_buffer = None
+        self.recv_length = 0
         self.recovery_attempt = recovery_attempt
         self._done = False
         self.linebuf = ''
@@ -770,6 +779,118 @@ class Listener(threading.Thread):
                 
             self.heartbeat_missed_count = self.max_missed_heartbeats
 
+    def _receive_packet(self):
+        """
+        Receive a single packet, first the header and then the data, and
+        hand it to handle_packet.
+        """
+        log.debug('RX NEW PACKET')
+        header = bytearray(HEADER_SIZE)
+        headerview = memoryview(header)
+        bytes_left = HEADER_SIZE
+        while bytes_left and not self._done:
+            try:
+                bytesrx = self.sock.recv_into(headerview[HEADER_SIZE - bytes_left:], bytes_left)
+                log.debug('RX HEADER BYTES %d LEFT %d SOCK %r' % (
+                                            bytesrx, bytes_left, self.sock,))
+                if bytesrx <= 0:
+                    raise SocketClosed()
+                bytes_left -= bytesrx
+            except socket.error as e:
+                if e.errno == errno.EWOULDBLOCK:
+                    time.sleep(.1)
+                else:
+                    raise
+
+        """
+        Only do this if we've received the whole header, otherwise (ex. during shutdown)
+        we can have a completely invalid header, resulting in negative count exceptions.
+        """
+        if (bytes_left == 0):
+            paPacket = PortAgentPacket()
+            paPacket.unpack_header(str(header))
+            data_size = paPacket.get_data_length()
+            bytes_left = data_size
+            data = bytearray(data_size)
+            dataview = memoryview(data)
+            log.debug('Expecting DATA BYTES %d' % data_size)
+            
+        while bytes_left and not self._done:
+            try:
+                bytesrx = self.sock.recv_into(dataview[data_size - bytes_left:], bytes_left)
+                log.debug('RX DATA BYTES %d LEFT %d SOCK %r' % (
+                                            bytesrx, bytes_left, self.sock,))
+                if bytesrx <= 0:
+                    raise SocketClosed()
+                bytes_left -= bytesrx
+            except socket.error as e:
+                if e.errno == errno.EWOULDBLOCK:
+                    time.sleep(.1)
+                else:
+                    raise
+
+        if not self._done:
+            """
+            Should have complete port agent packet.
+            """
+            paPacket.attach_data(str(data))
+            log.debug("HANDLE PACKET")
+            self.handle_packet(paPacket)
+
+    def _receive_batch(self):
+        """
+        Fill as much of the receive buffer as the socket has available with a
+        single recv_into, then frame every complete packet in the buffer and
+        hand it to handle_packet. Framing works on memoryview slices of the
+        buffer so only the packet data is copied. A trailing partial packet
+        is moved to the front of the buffer and completed on the next call.
+        """
+        if self.recv_buffer is None:
+            self.recv_buffer = bytearray(RECV_BUFFER_SIZE)
+            self.recv_length = 0
+
+        view = memoryview(self.recv_buffer)
+        try:
+            bytesrx = self.sock.recv_into(view[self.recv_length:],
+                                          len(self.recv_buffer) - self.recv_length)
+            log.debug('RX BATCH BYTES %d SOCK %r' % (bytesrx, self.sock,))
+            if bytesrx <= 0:
+                raise SocketClosed()
+        except socket.error as e:
+            if e.errno == errno.EWOULDBLOCK:
+                time.sleep(.1)
+                return
+            raise
+        self.recv_length += bytesrx
+
+        # compact in a finally so packets already handed off are dropped
+        # from the buffer even if a callback raises part way through
+        start = 0
+        try:
+            while not self._done and self.recv_length - start >= HEADER_SIZE:
+                paPacket = PortAgentPacket()
+                paPacket.unpack_header(view[start:start + HEADER_SIZE].tobytes())
+                packet_size = HEADER_SIZE + paPacket.get_data_length()
+                if packet_size < HEADER_SIZE:
+                    start = self.recv_length
+                    raise ValueError('Invalid port agent packet length: %d' % packet_size)
+                if self.recv_length - start < packet_size:
+                    break
+                paPacket.attach_data(view[start + HEADER_SIZE:start + packet_size].tobytes())
+                start += packet_size
+                log.debug("HANDLE PACKET")
+                self.handle_packet(paPacket)
+        finally:
+            # keep the partial packet, growing the buffer if it can't hold it
+            remaining = self.recv_length - start
+            del view
+            if start:
+                self.recv_buffer[0:remaining] = self.recv_buffer[start:self.recv_length]
+            self.recv_length = remaining
+            if remaining >= HEADER_SIZE:
+                packet_size = struct.unpack_from('>H', self.recv_buffer, OFFSET_P_LENGTH)[0]
+                if packet_size > len(self.recv_buffer):
+                    self.recv_buffer.extend(bytearray(packet_size - len(self.recv_buffer)))
 
     def run(self):
         """
@@ -786,58 +907,10 @@ class Listener(threading.Thread):
 
         while not self._done:
             try:
-                log.debug('RX NEW PACKET')
-                header = bytearray(HEADER_SIZE)
-                headerview = memoryview(header)
-                bytes_left = HEADER_SIZE
-                while bytes_left and not self._done:
-                    try:
-                        bytesrx = self.sock.recv_into(headerview[HEADER_SIZE - bytes_left:], bytes_left)
-                        log.debug('RX HEADER BYTES %d LEFT %d SOCK %r' % (
-                                                    bytesrx, bytes_left, self.sock,))
-                        if bytesrx <= 0:
-                            raise SocketClosed()
-                        bytes_left -= bytesrx
-                    except socket.error as e:
-                        if e.errno == errno.EWOULDBLOCK:
-                            time.sleep(.1)
-                        else:
-                            raise
-
-                """
-                Only do this if we've received the whole header, otherwise (ex. during shutdown)
-                we can have a completely invalid header, resulting in negative count exceptions.
-                """
-                if (bytes_left == 0):
-                    paPacket = PortAgentPacket()
-                    paPacket.unpack_header(str(header))
-                    data_size = paPacket.get_data_length()
-                    bytes_left = data_size
-                    data = bytearray(data_size)
-                    dataview = memoryview(data)
-                    log.debug('Expecting DATA BYTES %d' % data_size)
-                    
-                while bytes_left and not self._done:
-                    try:
-                        bytesrx = self.sock.recv_into(dataview[data_size - bytes_left:], bytes_left)
-                        log.debug('RX DATA BYTES %d LEFT %d SOCK %r' % (
-                                                    bytesrx, bytes_left, self.sock,))
-                        if bytesrx <= 0:
-                            raise SocketClosed()
-                        bytes_left -= bytesrx
-                    except socket.error as e:
-                        if e.errno == errno.EWOULDBLOCK:
-                            time.sleep(.1)
-                        else:
-                            raise
-
-                if not self._done:
-                    """
-                    Should have complete port agent packet.
-                    """
-                    paPacket.attach_data(str(data))
-                    log.debug("HANDLE PACKET")
-                    self.handle_packet(paPacket)
+                if self.batched_recv:
+                    self._receive_batch()
+                else:
+                    self._receive_packet()
 
             except SocketClosed:
                 errorString = 'Listener thread: %s SocketClosed exception from port_agent socket' \
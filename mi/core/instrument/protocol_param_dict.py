@@ -12,8 +12,8 @@ __author__ = 'Edward Hunter'
 __license__ = 'Apache 2.0'
 
 import re
-import ntplib
-import time
+import sre_parse
+import sre_constants
 import yaml
 import pkg_resources
 
@@ -21,12 +21,48 @@ from mi.core.common import BaseEnum
 from mi.core.exceptions import InstrumentParameterException
 from mi.core.exceptions import InstrumentParameterExpirationException
 from mi.core.instrument.instrument_dict import InstrumentDict
+from mi.core.time import ntp_now
 
 from mi.core.log import get_logger ; log = get_logger()
 
 EGG_PATH = "resource"
 DEFAULT_FILENAME = "strings.yml"
 
+def _required_literals(parsed):
+    """
+    @param parsed sre_parse subpattern
+    @retval list of literal strings every match of the subpattern contains
+    """
+    literals = []
+    current = []
+    for (op, value) in parsed:
+        if op == sre_constants.LITERAL and value <= 127:
+            current.append(chr(value))
+            continue
+        if current:
+            literals.append(''.join(current))
+            current = []
+        if op == sre_constants.SUBPATTERN:
+            literals.extend(_required_literals(value[-1]))
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT) and value[0] >= 1:
+            literals.extend(_required_literals(value[2]))
+    if current:
+        literals.append(''.join(current))
+    return literals
+
+def regex_anchor(regex):
+    """
+    Find the longest literal string that any text matching a regex must
+    contain, so text without it can be skipped without searching.
+    @param regex compiled regular expression
+    @retval anchor string, empty if the regex has no required literal or
+    matches case insensitively
+    """
+    parsed = sre_parse.parse(regex.pattern, regex.flags)
+    if parsed.pattern.flags & re.IGNORECASE:
+        return ''
+    return max(_required_literals(parsed) or [''], key=len)
+
 class ParameterDictType(BaseEnum):
     BOOL = "bool"
     INT = "int"
@@ -116,7 +152,7 @@ class ParameterValue(object):
         self.value = value
         self.f_format = f_format
         self.expiration = expiration
-        self.timestamp = ntplib.system_to_ntp_time(time.time())
+        self.timestamp = ntp_now()
                 
     def set_value(self, new_val):
         """
@@ -124,7 +160,7 @@ class ParameterValue(object):
         @param new_val The new value to set for the parameter
         """
         self.value = new_val
-        self.timestamp = ntplib.system_to_ntp_time(time.time())
+        self.timestamp = ntp_now()
     
     def get_value(self, baseline_timestamp=None):
         """
@@ -134,7 +170,7 @@ class ParameterValue(object):
         too old to work with. Original value is in exception.
         """
         if(baseline_timestamp == None):
-            baseline_timestamp = ntplib.system_to_ntp_time(time.time())
+            baseline_timestamp = ntp_now()
 
         if (self.expiration != None) and  baseline_timestamp > (self.timestamp + self.expiration):
             raise InstrumentParameterExpirationException("Value for %s expired!" % self.name, self.value)
@@ -284,7 +320,9 @@ class RegexParameter(Parameter):
             self.regex = re.compile(pattern)
         else:
             self.regex = re.compile(pattern, regex_flags)
-            
+
+        # text the input must contain for the regex to match
+        self.anchor = regex_anchor(self.regex)
         self.f_getval = f_getval
 
     def update(self, input):
@@ -295,10 +333,12 @@ class RegexParameter(Parameter):
         @retval True if an update was successful, False otherwise.
         """
         if not (isinstance(input, str)):
-            match = self.regex.search(str(input))
-        else:
-            match = self.regex.search(input)
+            input = str(input)
 
+        if self.anchor not in input:
+            return False
+
+        match = self.regex.search(input)
         if match:
             self.value.set_value(self.f_getval(match))
             return True
@@ -394,6 +434,7 @@ class ProtocolParameterDict(InstrumentDict):
         Constructor.        
         """
         self._param_dict = {}
+        self._update_index = None
         
     def add(self,
             name,
@@ -480,6 +521,7 @@ class ProtocolParameterDict(InstrumentDict):
                              value_description=value_description)
 
         self._param_dict[name] = val
+        self._update_index = None
 
     def add_parameter(self, parameter):
         """
@@ -494,6 +536,7 @@ class ProtocolParameterDict(InstrumentDict):
             raise InstrumentParameterException(
                 "Invalid Parameter added! Attempting to add: %s" % parameter)
         self._param_dict[parameter.name] = parameter
+        self._update_index = None
         
     def get(self, name, timestamp=None):
         """
@@ -510,7 +553,7 @@ class ProtocolParameterDict(InstrumentDict):
         @param offset: seconds from the current time to offset the timestamp
         @return: a unix timestamp
         """
-        return ntplib.system_to_ntp_time(time.time()) + offset
+        return ntp_now() + offset
 
     def get_config_value(self, name):
         """
@@ -663,6 +706,32 @@ class ProtocolParameterDict(InstrumentDict):
 
         return self._param_dict[name].description.submenu_write
 
+    def _get_update_index(self):
+        """
+        Get the parameters in dictionary order with the anchor text each one
+        needs in the input, so updates only run the regexes of parameters
+        whose anchor is in the input. Parameters without an anchor are
+        always updated.
+        @retval list of (name, parameter, anchor, True for regex parameters)
+        """
+        if self._update_index is None:
+            self._update_index = [(name, val, getattr(val, 'anchor', ''), isinstance(val, RegexParameter))
+                                  for (name, val) in self._param_dict.iteritems()]
+        return self._update_index
+
+    @staticmethod
+    def _update_param(val, anchor, is_regex, input, text):
+        """
+        Update a parameter from an input, skipping regex parameters whose
+        anchor isn't in the input
+        @param input the input as given
+        @param text the input as a string
+        @retval True if the parameter was updated
+        """
+        if is_regex:
+            return anchor in text and val.update(text)
+        return val.update(input)
+
     # RAU Added
     def multi_match_update(self, input):
         """
@@ -673,10 +742,11 @@ class ProtocolParameterDict(InstrumentDict):
         """
         hit_count = 0
         multi_mode = False
-        for (name, val) in self._param_dict.iteritems():
+        text = input if isinstance(input, str) else str(input)
+        for (name, val, anchor, is_regex) in self._get_update_index():
             if multi_mode == True and val.description.multi_match == False:
                 continue
-            if val.update(input):
+            if self._update_param(val, anchor, is_regex, input, text):
                 hit_count =hit_count +1
                 if False == val.description.multi_match:
                     return hit_count
@@ -694,8 +764,9 @@ class ProtocolParameterDict(InstrumentDict):
         @retval A dict with the names and values that were updated
         """
         result = {}
-        for (name, val) in self._param_dict.iteritems():
-            update_result = val.update(input)
+        text = input if isinstance(input, str) else str(input)
+        for (name, val, anchor, is_regex) in self._get_update_index():
+            update_result = self._update_param(val, anchor, is_regex, input, text)
             if update_result:
                 result[name] = update_result 
         return result
@@ -722,14 +793,21 @@ class ProtocolParameterDict(InstrumentDict):
         elif(target_params and isinstance(target_params, list)):
             params = target_params
         elif(target_params == None):
-            params = self._param_dict.keys()
+            params = None
         else:
             raise InstrumentParameterException("invalid target_params, must be name or list")
 
+        text = input if isinstance(input, str) else str(input)
+        if params is None:
+            for (name, val, anchor, is_regex) in self._get_update_index():
+                if self._update_param(val, anchor, is_regex, input, text):
+                    found = True
+            return found
+
         for name in params:
             log.trace("update param dict name: %s", name)
             val = self._param_dict[name]
-            if val.update(input):
+            if self._update_param(val, getattr(val, 'anchor', ''), isinstance(val, RegexParameter), input, text):
                 found = True
         return found
 
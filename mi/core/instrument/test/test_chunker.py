@@ -19,7 +19,8 @@ from pyon.util.unit_test import IonUnitTestCase
 from ooi.logging import log
 
 from mi.core.exceptions import SampleException
-from mi.core.instrument.chunker import StringChunker
+from mi.core.instrument.chunker import StringChunker, BufferedStringChunker
+from mi.core.instrument.chunker import ParticleRegexMatcher, ParticleSieve, regex_literal_prefix
 
 @attr('UNIT', group='mi')
 class UnitTestStringChunker(MiUnitTestCase):
@@ -380,3 +381,181 @@ class UnitTestBinaryChunker(MiUnitTestCase):
         """
         pass
     
+
+@attr('UNIT', group='mi')
+class UnitTestBufferedStringChunker(UnitTestStringChunker):
+    """
+    Run the string chunker tests against the bytearray backed chunker
+    """
+    def setUp(self):
+        """ Setup a chunker for use in tests """
+        self._chunker = BufferedStringChunker(UnitTestStringChunker.sieve_function)
+
+    def test_get_raw_split_data(self):
+        """
+        Consuming raw data that ends inside a data block turns the rest of that
+        block into non-data
+        """
+        self._chunker.add_chunk(self.FRAGMENT_1, self.TIMESTAMP_1)
+        self._chunker.add_chunk(self.FRAGMENT_2, self.TIMESTAMP_2)
+        self._chunker.add_chunk("Foo", self.TIMESTAMP_3)
+        self._chunker.add_chunk(self.SAMPLE_1, self.TIMESTAMP_3)
+
+        (time, result) = self._chunker.get_next_raw()
+        self.assertEquals(result, self.FRAGMENT_1)
+        (time, result) = self._chunker.get_next_non_data()
+        self.assertEquals(result, self.FRAGMENT_2 + "Foo")
+        self.assertEquals(time, self.TIMESTAMP_2)
+        (time, result) = self._chunker.get_next_data()
+        self.assertEquals(result, self.SAMPLE_1)
+        self.assertEquals(time, self.TIMESTAMP_3)
+        self.assertEquals(self._chunker.buffer, "")
+
+    def test_max_chunk_length(self):
+        """
+        Only sieve back as far as the longest possible data block
+        """
+        sieved = []
+        def sieve(raw_data):
+            sieved.append(raw_data)
+            return UnitTestStringChunker.sieve_function(raw_data)
+
+        self._chunker = BufferedStringChunker(sieve, max_chunk_length=len(self.SAMPLE_1))
+        self._chunker.add_chunk("x" * 100, self.TIMESTAMP_1)
+        self._chunker.add_chunk("x" * 100, self.TIMESTAMP_1)
+        self._chunker.add_chunk(self.FRAGMENT_1, self.TIMESTAMP_2)
+        self._chunker.add_chunk(self.FRAGMENT_2, self.TIMESTAMP_3)
+        self.assertEquals(len(sieved[-1]), len(self.SAMPLE_1) + len(self.FRAGMENT_2))
+
+        (time, result) = self._chunker.get_next_data()
+        self.assertEquals(result, self.FRAGMENT_SAMPLE)
+        self.assertEquals(time, self.TIMESTAMP_2)
+        self.assertEquals(self._chunker.nondata_chunk_list, [])
+
+    def test_bounded_sieve_window(self):
+        """
+        With a max chunk length the data sieved on each add stays the same
+        size however much unmatched data builds up, without one it grows
+        with every add
+        """
+        def sieved_lengths(chunker, sieved):
+            for i in range(100):
+                chunker.add_chunk("x" * 10, self.TIMESTAMP_1)
+            chunker.add_chunk(self.SAMPLE_1, self.TIMESTAMP_2)
+            (time, result) = chunker.get_next_data()
+            self.assertEquals(result, self.SAMPLE_1)
+            return [len(raw_data) for raw_data in sieved]
+
+        def sieve(sieved, raw_data):
+            sieved.append(raw_data)
+            return UnitTestStringChunker.sieve_function(raw_data)
+
+        bounded = []
+        lengths = sieved_lengths(BufferedStringChunker(partial(sieve, bounded), max_chunk_length=50), bounded)
+        self.assertEquals(max(lengths[:100]), 60)
+        self.assertEquals(lengths[100], 50 + len(self.SAMPLE_1))
+
+        unbounded = []
+        lengths = sieved_lengths(BufferedStringChunker(partial(sieve, unbounded)), unbounded)
+        self.assertEquals(lengths[99], 1000)
+        self.assertEquals(lengths[100], 1000 + len(self.SAMPLE_1))
+
+    def test_compact(self):
+        """
+        Consumed data is dropped from the underlying buffer
+        """
+        for i in range(1000):
+            self._chunker.add_chunk(self.MULTI_SAMPLE_1, self.TIMESTAMP_1)
+            (time, result) = self._chunker.get_next_data()
+            self.assertEquals(result, self.SAMPLE_1)
+            (time, result) = self._chunker.get_next_data()
+            self.assertEquals(result, self.SAMPLE_2)
+
+        self.assertTrue(len(self._chunker._buffer) < BufferedStringChunker.COMPACT_THRESHOLD * 2)
+        self.assertEquals(self._chunker.raw_chunk_list, [])
+        self.assertEquals(self._chunker.data_chunk_list, [])
+
+
+
+@attr('UNIT', group='mi')
+class UnitTestParticleSieve(MiUnitTestCase):
+    """
+    Test finding particle regexes by their literal prefix
+    """
+    REGEXES = [('lily_int', re.compile(r'LILY,(\d+)')),
+               ('lily_word', re.compile(r'LILY,([a-z]+)')),
+               ('heat', re.compile(r'(HEAT,\d+)\n', re.DOTALL)),
+               ('iris', re.compile(r'(?i)iris,')),
+               ('number', re.compile(r'#\d+|\d+#'))]
+
+    def test_regex_literal_prefix(self):
+        self.assertEqual([regex_literal_prefix(regex) for (name, regex) in self.REGEXES],
+                         ['LILY,', 'LILY,', 'HEAT,', '', ''])
+        self.assertEqual(regex_literal_prefix(re.compile(r'(<Sample (?:Num))=\d')), '<Sample Num=')
+        self.assertEqual(regex_literal_prefix(re.compile(r'(?x) NANO, \d')), 'NANO,')
+        self.assertEqual(regex_literal_prefix(re.compile(r'^LILY,\d')), 'LILY,')
+
+    def test_particle_regex_matcher(self):
+        """
+        Only the regexes with a literal prefix of the line are tried, in the
+        order they were given
+        """
+        matcher = ParticleRegexMatcher(self.REGEXES)
+        self.assertEqual(matcher.match('LILY,12')[0], 'lily_int')
+        self.assertEqual(matcher.match('LILY,ab')[0], 'lily_word')
+        self.assertEqual(matcher.match('HEAT,1\n')[0], 'heat')
+        self.assertEqual(matcher.match('IRIS,1')[0], 'iris')
+        self.assertEqual(matcher.match('42#')[0], 'number')
+        self.assertEqual(matcher.match('LIL'), (None, None))
+        self.assertEqual(matcher.match(''), (None, None))
+
+        (name, match) = matcher.match('LILY,12')
+        self.assertEqual(match.group(1), '12')
+
+    def test_sieve(self):
+        """
+        The sieve finds the same blocks as running each regex over the data,
+        whether or not the regexes could be combined
+        """
+        data = 'xxLILY,12 HEAT,5\nIRIS,LILY,ab HEAT,\n #7 LILY,'
+        spans = [(2, 9, 'lily_int'),
+                 (10, 17, 'heat'),
+                 (17, 22, 'iris'),
+                 (22, 29, 'lily_word'),
+                 (37, 39, 'number')]
+        same_flags = [(name, re.compile(regex.pattern, re.DOTALL))
+                      for (name, regex) in self.REGEXES if name != 'iris']
+
+        for (regexes, combined) in [(self.REGEXES, False), (same_flags, True)]:
+            sieve = ParticleSieve(regexes)
+            names = [name for (name, regex) in regexes]
+            self.assertEqual(sieve._combined is not None, combined)
+            self.assertEqual(sieve.spans(data), [span for span in spans if span[2] in names])
+            self.assertEqual(sieve(data), sorted(StringChunker.regex_sieve_function(
+                data, [regex for (name, regex) in regexes])))
+            self.assertEqual(sieve(''), [])
+
+    def test_sieve_overlap(self):
+        """
+        Where matches overlap the first one is kept
+        """
+        sieve = ParticleSieve([('sample', re.compile(r'S,\d+,E')),
+                               ('status', re.compile(r'S,1')),
+                               ('end', re.compile(r'\d,E'))])
+        self.assertEqual(sieve.spans('S,12,E S,1'), [(0, 6, 'sample'), (7, 10, 'status')])
+
+    def test_chunker(self):
+        """
+        Chunk a stream with the sieve
+        """
+        sieve = ParticleSieve(self.REGEXES)
+        chunker = BufferedStringChunker(sieve)
+        for fragment in ['LI', 'LY,12 HEA', 'T,5\n', 'junk #3']:
+            chunker.add_chunk(fragment, 3569168821.102485)
+
+        chunks = []
+        (timestamp, chunk) = chunker.get_next_data()
+        while chunk is not None:
+            chunks.append((sieve.match(chunk)[0], chunk))
+            (timestamp, chunk) = chunker.get_next_data()
+        self.assertEqual(chunks, [('lily_int', 'LILY,12'), ('heat', 'HEAT,5\n'), ('number', '#3')])
@@ -21,8 +21,11 @@ from mi.core.unit_test import MiUnitTestCase
 
 from mi.core.log import get_logger ; log = get_logger()
 from mi.core.exceptions import SampleException, ReadOnlyException, NotImplementedException, InstrumentParameterException
+from mi.core.exceptions import MissingSchemaException
 from mi.core.instrument.data_particle import DataParticle, DataParticleKey, DataParticleValue
 from mi.core.instrument.data_particle import RawDataParticle, CommonDataParticleType
+from mi.core.instrument.data_particle import CompactParticleEncoder, CompactParticleDecoder
+from mi.core.instrument.data_particle import compact_schema_id, is_compact_particle
 from mi.core.instrument.port_agent_client import PortAgentPacket
 
 TEST_PARTICLE_VERSION = 1
@@ -55,6 +58,20 @@ class TestUnitDataParticle(MiUnitTestCase):
                        DataParticleKey.VALUE: "305.16"}]
             return result
 
+    class SchemaDataParticle(DataParticle):
+        """
+        Test DataParticle declaring a schema, parsing a comma separated
+        raw data string
+        """
+        _data_particle_type = TEST_PARTICLE_TYPE
+        _schema = [("serial", None),
+                   ("temp", float),
+                   ("count", int),
+                   ("raw", base64.b64encode, {DataParticleKey.BINARY: True})]
+
+        def _build_value_tuple(self):
+            return self.raw_data.split(',')
+
     class BadDataParticle(DataParticle):
          """
          Define a data particle that doesn't initialize _data_particle_type.
@@ -211,7 +228,120 @@ class TestUnitDataParticle(MiUnitTestCase):
         standard = json.dumps(self.sample_raw_particle, sort_keys=True)
 
         self.assertEqual(raw_result, standard)
+
+    def test_compact_generate(self):
+        """
+        Test the compact msgpack format decodes to the same dict as
+        generate_dict for parsed and raw particles
+        """
+        encoder = CompactParticleEncoder()
+        decoder = CompactParticleDecoder()
+
+        for particle in [self.parsed_test_particle, self.raw_test_particle]:
+            dict_result = particle.generate_dict()
+            compact = encoder.encode(dict_result)
+            self.assertEqual(decoder.decode(compact), dict_result)
+
+            # the second particle of a stream doesn't carry the schema
+            compact_next = encoder.encode(dict_result)
+            self.assertLess(len(compact_next), len(compact))
+            self.assertEqual(decoder.decode(compact_next), dict_result)
+
+        # new_sequence is carried in the header
+        particle = self.TestDataParticle(self.sample_raw_data,
+                                         port_timestamp=self.sample_port_timestamp,
+                                         new_sequence=False)
+        dict_result = particle.generate_dict()
+        self.assertEqual(decoder.decode(encoder.encode(dict_result)), dict_result)
+
+    def test_compact_schema(self):
+        """
+        Test the compact format schema is resent on change, interval and
+        request and a decoder that hasn't seen it raises an exception
+        """
+        encoder = CompactParticleEncoder(schema_interval=2)
+        dict_result = self.parsed_test_particle.generate_dict()
+
+        first = encoder.encode(dict_result)
+        second = encoder.encode(dict_result)
+        third = encoder.encode(dict_result)
+        self.assertEqual(len(first), len(third))
+        self.assertLess(len(second), len(first))
+        self.assertTrue(is_compact_particle(first))
+        self.assertFalse(is_compact_particle(self.parsed_test_particle.generate()))
+
+        # a late subscriber fails until the schema is repeated
+        decoder = CompactParticleDecoder()
+        with self.assertRaises(MissingSchemaException) as context:
+            decoder.decode(second)
+        self.assertEqual(context.exception.stream, dict_result[DataParticleKey.STREAM_NAME])
+        self.assertFalse(decoder.has_schema(context.exception.schema_id))
+        self.assertEqual(decoder.decode(third), dict_result)
+        self.assertTrue(decoder.has_schema(context.exception.schema_id))
+
+        # or until it asks for the schema
+        decoder = CompactParticleDecoder()
+        self.assertRaises(MissingSchemaException, decoder.decode, encoder.encode(dict_result))
+        encoder.resend_schema(dict_result[DataParticleKey.STREAM_NAME])
+        self.assertEqual(decoder.decode(encoder.encode(dict_result)), dict_result)
+        self.assertEqual(decoder.decode(encoder.encode(dict_result)), dict_result)
+
+        # schema ids are the same for every encoder
+        other_encoder = CompactParticleEncoder()
+        other_encoder.encode(dict_result)
+        self.assertEqual(decoder.decode(other_encoder.encode(dict_result)), dict_result)
+        self.assertEqual(compact_schema_id([{'value_id': 'a', 'binary': True}]),
+                         compact_schema_id([{'binary': True, 'value_id': 'a'}]))
+
+        # a changed value list is sent with its schema
+        dict_result[DataParticleKey.VALUES].append({DataParticleKey.VALUE_ID: "pressure",
+                                                    DataParticleKey.VALUE: [1.5, 2.5]})
+        self.assertEqual(decoder.decode(encoder.encode(dict_result)), dict_result)
+
+        self.assertRaises(SampleException, decoder.decode, "not a particle")
         
+    def test_schema_generate(self):
+        """
+        Test generation of a particle declaring a schema
+        """
+        particle = self.SchemaDataParticle(self.sample_raw_data,
+                                           port_timestamp=self.sample_port_timestamp)
+        dict_result = particle.generate_dict()
+        self.assertEqual(dict_result[DataParticleKey.VALUES], [
+            {DataParticleKey.VALUE_ID: "serial", DataParticleKey.VALUE: "SATPAR0229"},
+            {DataParticleKey.VALUE_ID: "temp", DataParticleKey.VALUE: 10.01},
+            {DataParticleKey.VALUE_ID: "count", DataParticleKey.VALUE: 2206748544},
+            {DataParticleKey.VALUE_ID: "raw", DataParticleKey.VALUE: base64.b64encode("234"),
+             DataParticleKey.BINARY: True}])
+        self.assertEqual(particle.get_encoding_errors(), [])
+
+        # the schema is compiled once per class
+        self.assertIs(particle.schema(), self.SchemaDataParticle.schema())
+        self.assertEqual(particle.schema().names, ("serial", "temp", "count", "raw"))
+        self.assertIsNone(self.TestDataParticle.schema())
+
+        # the value vector matches the dict values
+        (header, values) = particle.generate_vector()
+        self.assertEqual(values, [item[DataParticleKey.VALUE]
+                                  for item in dict_result[DataParticleKey.VALUES]])
+        self.assertEqual(header[DataParticleKey.STREAM_NAME], TEST_PARTICLE_TYPE)
+        self.assertNotIn(DataParticleKey.VALUES, header)
+        self.assertRaises(NotImplementedException, self.parsed_test_particle.generate_vector)
+
+        # and encodes to the same compact particle
+        encoder = CompactParticleEncoder()
+        self.assertEqual(CompactParticleDecoder().decode(encoder.encode_particle(particle)), dict_result)
+
+        # failed fields are None and recorded as encoding errors
+        particle = self.SchemaDataParticle("SATPAR0229,warm,12,234")
+        (header, values) = particle.generate_vector()
+        self.assertEqual(values, ["SATPAR0229", None, 12, base64.b64encode("234")])
+        self.assertEqual(particle.get_encoding_errors(), [{"temp": "warm"}])
+
+        # the number of values has to match the schema
+        particle = self.SchemaDataParticle("SATPAR0229,10.01")
+        self.assertRaises(SampleException, particle.generate_dict)
+
     def test_timestamps(self):
         """
         Test bad timestamp configurations
@@ -11,6 +11,7 @@ __author__ = 'Steve Foley'
 __license__ = 'Apache 2.0'
 
 import re
+import json
 import time
 import ntplib
 import datetime
@@ -31,6 +32,9 @@ from mi.core.instrument.protocol_cmd_dict import Command, CommandArgument
 from mi.core.instrument.driver_dict import DriverDictKey
 from mi.core.driver_scheduler import DriverScheduler
 from mi.core.instrument.instrument_driver import DriverConfigKey
+from mi.core.instrument.instrument_driver import DriverAsyncEvent
+from mi.core.instrument.data_particle import DataParticleEncoding
+from mi.core.instrument.data_particle import CompactParticleDecoder
 from mi.core.driver_scheduler import DriverSchedulerConfigKey
 from mi.core.driver_scheduler import TriggerType
 
@@ -40,6 +44,7 @@ from mi.core.exceptions import InstrumentTimeoutException
 from mi.core.exceptions import InstrumentProtocolException
 from mi.core.exceptions import InstrumentParameterException
 from mi.core.exceptions import NotImplementedException
+from mi.core.exceptions import MissingSchemaException
 from mi.core.common import BaseEnum
 
 Directions = MenuInstrumentProtocol.MenuTree.Directions
@@ -118,6 +123,67 @@ class TestUnitInstrumentProtocol(MiUnitTestCase):
         # Test the format of the result in the individual driver tests. Here,
         # just tests that the result is there.
 
+    def test_extraction_compact(self):
+        """
+        Test samples are published in the compact format when it is selected
+        in the startup config
+        """
+        published = []
+        self.protocol._driver_event = lambda event, value: published.append((event, value))
+
+        self.assertRaises(InstrumentParameterException, self.protocol.set_init_params,
+                          {DriverConfigKey.PARTICLE_ENCODING: 'xml'})
+        self.protocol.set_init_params({DriverConfigKey.PARTICLE_ENCODING: DataParticleEncoding.MSGPACK})
+
+        sample_line = "SATPAR0229,10.01,2206748544,234\r\n"
+        ntptime = ntplib.system_to_ntp_time(time.time())
+        result = self.protocol._extract_sample(SatlanticPARDataParticle,
+                                               SAMPLE_REGEX,
+                                               sample_line,
+                                               ntptime)
+
+        self.assertEqual(len(published), 1)
+        (event, value) = published[0]
+        self.assertEqual(event, DriverAsyncEvent.SAMPLE)
+        self.assertEqual(CompactParticleDecoder().decode(value), result)
+
+        # a client that missed the schema gets it after asking for it
+        decoder = CompactParticleDecoder()
+        self.protocol._extract_sample(SatlanticPARDataParticle, SAMPLE_REGEX, sample_line, ntptime)
+        self.assertRaises(MissingSchemaException, decoder.decode, published[-1][1])
+        self.protocol.resend_particle_schema(result['stream_name'])
+        self.protocol._extract_sample(SatlanticPARDataParticle, SAMPLE_REGEX, sample_line, ntptime)
+        self.assertEqual(decoder.decode(published[-1][1])['values'], result['values'])
+
+        # back to JSON when the encoding isn't configured
+        self.protocol.set_init_params({})
+        self.assertIsNone(self.protocol._particle_encoder)
+        self.protocol.resend_particle_schema()
+
+    def test_extraction_publish(self):
+        """
+        The sample dict is returned as built, and only serialized when it is
+        published
+        """
+        published = []
+        self.protocol._driver_event = lambda event, value: published.append((event, value))
+
+        sample_line = "SATPAR0229,10.01,2206748544,234\r\n"
+        ntptime = ntplib.system_to_ntp_time(time.time())
+        result = self.protocol._extract_sample(SatlanticPARDataParticle, SAMPLE_REGEX,
+                                               sample_line, ntptime, publish=False)
+        self.assertEqual(published, [])
+
+        result = self.protocol._extract_sample(SatlanticPARDataParticle, SAMPLE_REGEX,
+                                               sample_line, ntptime)
+        self.assertEqual(len(published), 1)
+        (event, value) = published[0]
+        self.assertEqual(event, DriverAsyncEvent.SAMPLE)
+        self.assertEqual(json.loads(value), result)
+
+        self.assertIsNone(self.protocol._extract_sample(SatlanticPARDataParticle, SAMPLE_REGEX,
+                                                        "garbage\r\n", ntptime))
+
     def test_get_param_list(self):
         """
         verify get_param_list returns correct parameter lists.
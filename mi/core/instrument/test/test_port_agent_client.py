@@ -22,6 +22,7 @@ import datetime
 import array
 import struct
 import ctypes
+import socket
 from nose.plugins.attrib import attr
 from mock import Mock
 
@@ -40,6 +41,7 @@ from mi.idk.unit_test import InstrumentDriverIntegrationTestCase
 
 from mi.core.instrument.port_agent_client import PortAgentClient, PortAgentPacket, Listener
 from mi.core.instrument.port_agent_client import HEADER_SIZE
+from mi.core.instrument.port_agent_client import xor_checksum
 from mi.core.instrument.instrument_driver import DriverConnectionState
 from mi.core.instrument.instrument_driver import DriverProtocolState
 
@@ -420,6 +422,96 @@ class PAClientTestPortAgentPacket(MiUnitTest):
         #self.assertEqual(got_timestamp, 1105890970.110589)
         self.assertEqual(self.pap.get_header_recv_checksum(), 3729) 
 
+    def test_xor_checksum(self):
+        """
+        The word at a time checksum must match a byte at a time XOR for
+        every length, including the leftover bytes.
+        """
+        test_data = "".join([chr((i * 37) % 256) for i in range(100)])
+        for length in range(len(test_data)):
+            expected = 0
+            for c in test_data[:length]:
+                expected ^= ord(c)
+            self.assertEqual(xor_checksum(test_data[:length]), expected)
+            self.assertEqual(xor_checksum(bytearray(test_data[:length])), expected)
+
+    @staticmethod
+    def build_packet(data):
+        """build a port agent data packet with a valid checksum"""
+        header = struct.pack('>BBBBHHII', 0xa3, 0x9d, 0x7a, PortAgentPacket.DATA_FROM_INSTRUMENT,
+                             len(data) + HEADER_SIZE, 0, 0, 0)
+        checksum = xor_checksum(header[:6]) ^ xor_checksum(header[8:]) ^ xor_checksum(data)
+        return header[:6] + struct.pack('>H', checksum) + header[8:] + data
+
+    def test_batched_recv(self):
+        """
+        Send several packets, split at arbitrary points, and make sure the
+        batched listener frames all of them, including ones larger than the
+        receive buffer.
+        """
+        build_packet = self.build_packet
+
+        received = []
+        def callback_data(packet):
+            packet.verify_checksum()
+            self.assertTrue(packet.is_valid())
+            received.append(packet.get_data())
+
+        (listener_sock, sender_sock) = socket.socketpair()
+        listener_sock.setblocking(0)
+        listener = Listener(listener_sock, 0, callback_data=callback_data,
+                            callback_raw=Mock(), batched_recv=True)
+        listener.recv_buffer = bytearray(64)
+
+        payloads = ["sample %d" % i * i for i in range(20)]
+        stream = "".join([build_packet(payload) for payload in payloads])
+        listener.start()
+        for index in range(0, len(stream), 50):
+            sender_sock.sendall(stream[index:index + 50])
+
+        timeout = time.time() + 5
+        while len(received) < len(payloads) and time.time() < timeout:
+            time.sleep(.1)
+        listener.done()
+        listener.join()
+        sender_sock.close()
+        listener_sock.close()
+
+        self.assertEqual(received, payloads)
+
+    def test_batched_recv_callback_error(self):
+        """
+        A callback raising part way through a batch must not cause the
+        packets already handled to be delivered again on the next receive.
+        """
+        received = []
+        def callback_data(packet):
+            received.append(packet.get_data())
+            if packet.get_data() == "bad":
+                raise ValueError("callback failed")
+
+        (listener_sock, sender_sock) = socket.socketpair()
+        listener_sock.setblocking(0)
+        listener = Listener(listener_sock, 0, callback_data=callback_data,
+                            callback_raw=Mock(), batched_recv=True)
+
+        payloads = ["first", "second", "bad", "third"]
+        sender_sock.sendall("".join([self.build_packet(payload) for payload in payloads]))
+        # hold back part of the last packet so it stays buffered
+        partial = self.build_packet("fourth")
+        sender_sock.sendall(partial[:HEADER_SIZE + 2])
+
+        self.assertRaises(ValueError, listener._receive_batch)
+        self.assertEqual(received, payloads[:3])
+
+        sender_sock.sendall(partial[HEADER_SIZE + 2:])
+        listener._receive_batch()
+        sender_sock.close()
+        listener_sock.close()
+
+        self.assertEqual(received, payloads + ["fourth"])
+        self.assertEqual(listener.recv_length, 0)
+
 @attr('INT', group='mi')
 class PAClientIntTestCase(InstrumentDriverTestCase):
     def initialize(cls, *args, **kwargs):
@@ -23,6 +23,7 @@ from mi.core.instrument.protocol_param_dict import ParameterDictVisibility
 from mi.core.instrument.protocol_param_dict import ParameterDictType
 from mi.core.instrument.protocol_param_dict import ParameterDictKey
 from mi.core.instrument.protocol_param_dict import Parameter, FunctionParameter, RegexParameter
+from mi.core.instrument.protocol_param_dict import regex_anchor
 
 @attr('UNIT', group='mi')
 class TestUnitProtocolParameterDict(TestUnitStringsDict):
@@ -619,6 +620,55 @@ bar=200, baz=300
                           regex_flags="bad flag",
                           value=12)
             
+    def test_regex_anchor(self):
+        """
+        The anchor is the longest literal text every match contains
+        """
+        self.assertEqual(regex_anchor(re.compile(r'.*foo=(\d+).*')), 'foo=')
+        self.assertEqual(regex_anchor(re.compile(r'Ext Volt 2 = ([\w]+)')), 'Ext Volt 2 = ')
+        self.assertEqual(regex_anchor(re.compile(r'SBE\s?63 = (yes|no)')), '63 = ')
+        self.assertEqual(regex_anchor(re.compile(r'status = (not )?logging')), 'status = ')
+        self.assertEqual(regex_anchor(re.compile(r'(?:ab)+cd(xyz)')), 'xyz')
+        self.assertEqual(regex_anchor(re.compile(r'(foo|bar)=(\d+)')), '=')
+        self.assertEqual(regex_anchor(re.compile(r'.')), '')
+        self.assertEqual(regex_anchor(re.compile(r'foo', re.IGNORECASE)), '')
+        self.assertEqual(regex_anchor(re.compile(r'(?i)foo')), '')
+
+    def test_anchored_update(self):
+        """
+        Updates skip parameters whose anchor isn't in the input and match
+        the same parameters as searching every regex
+        """
+        self.param_dict.add("alt", r'(?:foo|qux)=(\d+)',
+                            lambda match : int(match.group(1)),
+                            lambda x : str(x))
+        self.param_dict.add("dot", r'.',
+                            lambda match : match.group(0),
+                            lambda x : str(x))
+        self.param_dict.add_parameter(FunctionParameter("func",
+                                                        lambda x : x,
+                                                        lambda x : str(x)))
+
+        self.assertTrue(self.param_dict.update("qux=5"))
+        self.assertEqual(self.param_dict.get("alt"), 5)
+        self.assertEqual(self.param_dict.get("foo"), None)
+        self.assertEqual(self.param_dict.get("dot"), "q")
+        self.assertEqual(self.param_dict.get("func"), "qux=5")
+
+        # non string input is converted for regex parameters only
+        self.assertTrue(self.param_dict.update(7))
+        self.assertEqual(self.param_dict.get("dot"), "7")
+        self.assertEqual(self.param_dict.get("func"), 7)
+
+        # parameters added after an update are indexed
+        self.param_dict.add("new", r'new=(\d+)',
+                            lambda match : int(match.group(1)),
+                            lambda x : str(x))
+        self.assertEqual(self.param_dict.update_many("new=3 bar=4"),
+                         {"new": True, "bar": True, "dot": True, "func": True})
+        self.assertEqual(self.param_dict.get("new"), 3)
+        self.assertEqual(self.param_dict.get("bar"), 4)
+
     def test_format_current(self):
         self.param_dict.add("test_format", r'.*foo=(\d+).*',
                              lambda match : int(match.group(1)),
@@ -13,15 +13,25 @@ __license__ = 'Apache 2.0'
 from gevent import monkey; monkey.patch_all()
 
 import time
+import json
+import cPickle
+import threading
 import unittest
 import logging
 
+import zmq
+from mock import patch
 from nose.plugins.attrib import attr
 
 from pyon.util.unit_test import PyonTestCase
 
+from mi.core.instrument import zmq_driver_process
 from mi.core.instrument.zmq_driver_client import ZmqDriverClient
-from mi.core.instrument.zmq_driver_process import ZmqDriverProcess
+from mi.core.instrument.zmq_driver_process import ZmqDriverProcess, SAMPLE_BATCH_FRAME
+from mi.core.instrument.driver_process import EventQueue, EventQueuePolicy, EventQueueStat
+from mi.core.instrument.instrument_driver import DriverAsyncEvent
+from mi.core.instrument.data_particle import CompactParticleEncoder
+from mi.core.exceptions import InstrumentParameterException
 import mi.core.mi_logger
 from mi.core.unit_test import MiTestCase
 
@@ -105,4 +115,408 @@ class TestZmqDriverProcess(MiTestCase):
         """
         """
         
-        pass 
+        pass
+
+
+class FakeClock(object):
+    """
+    Stands in for the time module in the driver process.  Time only moves
+    on while the publisher waits for events.
+    """
+    def __init__(self):
+        self.now = 0.0
+
+    def time(self):
+        return self.now
+
+
+class RecordingSocket(object):
+    """
+    Stands in for the event PUB socket, keeping what was sent and when.
+    The process is stopped after a number of sends if one is given.  The
+    sends listed in fail_sends, counting from 0, raise a ZMQError.
+    """
+    def __init__(self, process, clock, stop_after=None, fail_sends=()):
+        self.process = process
+        self.clock = clock
+        self.stop_after = stop_after
+        self.fail_sends = fail_sends
+        self.sends = 0
+        self.sent = []
+
+    def _sent(self, frame, obj):
+        self.sends += 1
+        if self.sends - 1 in self.fail_sends:
+            raise zmq.ZMQError(zmq.EAGAIN)
+        self.sent.append((self.clock.time(), frame, obj))
+        if len(self.sent) == self.stop_after:
+            self.process.stop_evt_thread = True
+
+    def send_multipart(self, frames):
+        self._sent(frames[0], cPickle.loads(frames[1]))
+
+    def send_pyobj(self, obj):
+        # pickle like the real socket does
+        self._sent(None, cPickle.loads(cPickle.dumps(obj, cPickle.HIGHEST_PROTOCOL)))
+
+
+@attr('UNIT', group='mi')
+class TestSampleBatching(MiTestCase):
+    """
+    Unit tests for batching sample events in the driver process and
+    unbatching them in the client.
+    """
+    def sample(self, value):
+        return {'type': DriverAsyncEvent.SAMPLE, 'value': value}
+
+    def publish(self, batch_size, batch_latency, events, stop_after=None, until=60, fail_sends=()):
+        """
+        Publish events from a driver process on a recording socket, using a
+        fake clock that moves on by the publisher's timeout whenever the
+        event queue is empty.
+        @param stop_after Stop the publisher after this many sends.
+        @param until Stop the publisher once the clock reaches this time.
+        @param fail_sends Sends that raise a ZMQError, counting from 0.
+        @retval list of (time, first frame, event or batch) sent
+        """
+        process = ZmqDriverProcess('dvr_mod', 'DvrClass', 'cmd_port.txt', 'evt_port.txt', None,
+                                   batch_size=batch_size, batch_latency=batch_latency)
+        process.events.extend(events)
+        clock = FakeClock()
+        sock = RecordingSocket(process, clock, stop_after, fail_sends)
+
+        popleft = process.events.popleft
+        def wait_popleft(timeout=None):
+            try:
+                return popleft()
+            except IndexError:
+                clock.now += timeout
+                if clock.now >= until:
+                    process.stop_evt_thread = True
+                raise
+        process.events.popleft = wait_popleft
+
+        with patch.object(zmq_driver_process, 'time', clock):
+            process.publish_events(sock)
+        return sock.sent
+
+    def test_size_flush(self):
+        """
+        A batch is sent as soon as it is full, without waiting for the latency.
+        """
+        sent = self.publish(3, 10, [self.sample(i) for i in range(4)], until=5)
+        self.assertEqual(sent[0], (0, SAMPLE_BATCH_FRAME, [self.sample(0), self.sample(1), self.sample(2)]))
+
+        # the fourth sample is held for the next batch, until the publisher stops
+        self.assertEqual(len(sent), 2)
+        (sent_time, frame, batch) = sent[1]
+        self.assertEqual(batch, [self.sample(3)])
+        self.assertTrue(sent_time >= 5)
+
+    def test_latency_flush(self):
+        """
+        A batch that doesn't fill is sent once its oldest sample has waited
+        the batch latency.
+        """
+        sent = self.publish(100, .3, [self.sample(1), self.sample(2)], stop_after=1)
+        self.assertEqual(len(sent), 1)
+        (sent_time, frame, batch) = sent[0]
+        self.assertEqual(frame, SAMPLE_BATCH_FRAME)
+        self.assertEqual(batch, [self.sample(1), self.sample(2)])
+        self.assertAlmostEqual(sent_time, .3)
+
+    def test_flush_before_event(self):
+        """
+        Other events send the pending samples first so order is kept.
+        """
+        state = {'type': DriverAsyncEvent.STATE_CHANGE, 'value': 'command'}
+        sent = self.publish(100, 10, [self.sample(1), self.sample(2), state, self.sample(3)], stop_after=2)
+        self.assertEqual(sent[:2], [(0, SAMPLE_BATCH_FRAME, [self.sample(1), self.sample(2)]),
+                                    (0, None, state)])
+
+    def test_bad_events(self):
+        """
+        Events that can't be pickled or sent are dropped and the publisher
+        keeps going with the rest.
+        """
+        state = {'type': DriverAsyncEvent.STATE_CHANGE, 'value': 'command'}
+        bad_state = {'type': DriverAsyncEvent.STATE_CHANGE, 'value': lambda: None}
+        events = [self.sample(1), self.sample(lambda: None), self.sample(2), bad_state,
+                  state, self.sample(3), state, self.sample(4)]
+        # the send of the batch holding sample 3 fails
+        sent = self.publish(100, 10, events, stop_after=4, fail_sends=[2])
+        self.assertEqual([(frame, obj) for (sent_time, frame, obj) in sent],
+                         [(SAMPLE_BATCH_FRAME, [self.sample(1), self.sample(2)]),
+                          (None, state),
+                          (None, state),
+                          (SAMPLE_BATCH_FRAME, [self.sample(4)])])
+
+    def test_client_unbatch(self):
+        """
+        The client hands each event of a batch to the callback in order.
+        """
+        received = []
+        client = ZmqDriverClient('localhost', 5556, 5557)
+        client.evt_callback = received.append
+        state = {'type': DriverAsyncEvent.STATE_CHANGE, 'value': 'command'}
+
+        client.dispatch_event_frames([SAMPLE_BATCH_FRAME, cPickle.dumps([self.sample(1), self.sample(2)])])
+        client.dispatch_event_frames([cPickle.dumps(state)])
+        self.assertEqual(received, [self.sample(1), self.sample(2), state])
+
+    def test_client_compact_particles(self):
+        """
+        The client decodes compact particles to JSON, and holds particles it
+        can't decode yet while it asks the driver to resend their schema.
+        """
+        class RequestSocket(object):
+            def __init__(self):
+                self.requests = []
+            def send_pyobj(self, obj, flags=0):
+                self.requests.append(obj)
+            def recv_pyobj(self, flags=0):
+                return None
+
+        received = []
+        client = ZmqDriverClient('localhost', 5556, 5557)
+        client.evt_callback = received.append
+        client._schema_socket = RequestSocket()
+
+        encoder = CompactParticleEncoder()
+        particle = {'stream_name': 'ctd_parsed', 'pkt_format_id': 'JSON_Data', 'pkt_version': 1,
+                    'port_timestamp': 3600000000.0, 'driver_timestamp': 3600000001.0,
+                    'preferred_timestamp': 'port_timestamp', 'quality_flag': 'ok',
+                    'values': [{'value_id': 'temp', 'value': 10.5}]}
+        encoder.encode(particle)
+
+        # the schema went with the first particle, which the client missed
+        for i in range(2):
+            evt = {'type': DriverAsyncEvent.SAMPLE, 'value': encoder.encode(particle), 'time': float(i)}
+            client.dispatch_event_frames([cPickle.dumps(evt)])
+        self.assertEqual(received, [])
+        self.assertEqual(client._schema_socket.requests,
+                         [{'cmd': 'resend_particle_schema', 'args': ('ctd_parsed', ), 'kwargs': {}}])
+
+        # the held particles come out ahead of the one bringing the schema
+        encoder.resend_schema('ctd_parsed')
+        for i in range(2, 4):
+            evt = {'type': DriverAsyncEvent.SAMPLE, 'value': encoder.encode(particle), 'time': float(i)}
+            client.dispatch_event_frames([SAMPLE_BATCH_FRAME, cPickle.dumps([evt])])
+        self.assertEqual([sample['time'] for sample in received], [0.0, 1.0, 2.0, 3.0])
+        for sample in received:
+            self.assertEqual(json.loads(sample['value']), particle)
+        self.assertEqual(client._pending_samples, {})
+
+    def test_client_particle_dicts(self):
+        """
+        A client asking for particle dicts gets them without the JSON encoding.
+        """
+        received = []
+        client = ZmqDriverClient('localhost', 5556, 5557, particle_dicts=True)
+        client.evt_callback = received.append
+
+        encoder = CompactParticleEncoder()
+        particle = {'stream_name': 'ctd_parsed', 'pkt_format_id': 'JSON_Data', 'pkt_version': 1,
+                    'port_timestamp': 3600000000.0, 'driver_timestamp': 3600000001.0,
+                    'preferred_timestamp': 'port_timestamp', 'quality_flag': 'ok',
+                    'values': [{'value_id': 'temp', 'value': 10.5}]}
+        evt = {'type': DriverAsyncEvent.SAMPLE, 'value': encoder.encode(particle), 'time': 1.0}
+        client.dispatch_event_frames([cPickle.dumps(evt)])
+        self.assertEqual(received, [dict(evt, value=particle)])
+
+
+class ScriptedCmdSocket(object):
+    """
+    Stands in for the command REP socket.  Each step is a message to
+    receive, or a ZMQError to raise from the next recv or send.  The process
+    is stopped once every step has been used.
+    """
+    def __init__(self, process, steps):
+        self.process = process
+        self.steps = list(steps)
+        self.replies = []
+
+    def _next_error(self):
+        if self.steps and isinstance(self.steps[0], zmq.ZMQError):
+            raise self.steps.pop(0)
+
+    def poll(self, timeout):
+        if not self.steps:
+            self.process.stop_cmd_thread = True
+        return len(self.steps)
+
+    def recv(self):
+        self._next_error()
+        return self.steps.pop(0)
+
+    def send(self, data):
+        self._next_error()
+        self.replies.append(cPickle.loads(data))
+
+
+@attr('UNIT', group='mi')
+class TestCommandLoop(MiTestCase):
+    """
+    Unit tests for the driver process command loop.
+    """
+    def setUp(self):
+        self.process = ZmqDriverProcess('dvr_mod', 'DvrClass', 'cmd_port.txt', 'evt_port.txt', None)
+        self.echo = cPickle.dumps({'cmd': 'process_echo', 'args': (), 'kwargs': {}})
+
+    def serve(self, steps):
+        sock = ScriptedCmdSocket(self.process, steps)
+        self.process.serve_commands(sock)
+        return sock.replies
+
+    def assertEncodedException(self, reply):
+        self.assertIsInstance(reply, tuple)
+        self.assertEqual(len(reply), 3)
+        self.assertTrue(reply[1].startswith('UnexpectedError'))
+
+    def test_bad_command(self):
+        """
+        A command that can't be unpickled is answered with an exception and
+        the next command is still handled.
+        """
+        replies = self.serve(['not a pickle', cPickle.dumps('not a dict'), self.echo])
+        self.assertEqual(len(replies), 3)
+        self.assertEncodedException(replies[0])
+        self.assertEncodedException(replies[1])
+        self.assertTrue(replies[2].startswith('ping from resource'))
+
+    def test_unpicklable_reply(self):
+        """
+        A reply that can't be pickled is answered with an exception.
+        """
+        self.process.cmd_driver = lambda msg: (lambda: None)
+        replies = self.serve([self.echo])
+        self.assertEqual(len(replies), 1)
+        self.assertEncodedException(replies[0])
+
+    def test_socket_errors(self):
+        """
+        Socket errors don't end the loop, and a reply that failed to send
+        is sent again before the next command is received.
+        """
+        replies = self.serve([zmq.ZMQError(zmq.EAGAIN), self.echo,
+                              zmq.ZMQError(zmq.EAGAIN), self.echo])
+        self.assertEqual(len(replies), 2)
+        for reply in replies:
+            self.assertTrue(reply.startswith('ping from resource'))
+
+
+@attr('UNIT', group='mi')
+class TestEventQueue(MiTestCase):
+    """
+    Unit tests for the driver process event queue.
+    """
+    def test_order(self):
+        """
+        Events come out in the order they went in.
+        """
+        queue = EventQueue()
+        queue.append(1)
+        queue.extend([2, 3])
+        self.assertEqual(len(queue), 3)
+        self.assertEqual([queue.popleft(), queue.popleft(), queue.popleft()], [1, 2, 3])
+        self.assertRaises(IndexError, queue.popleft)
+
+    def test_timeout(self):
+        """
+        An empty queue waits for the timeout before giving up.
+        """
+        queue = EventQueue()
+        start = time.time()
+        self.assertRaises(IndexError, queue.popleft, .2)
+        self.assertTrue(time.time() - start >= .2)
+
+    def sample(self, value):
+        return {'type': DriverAsyncEvent.SAMPLE, 'value': value}
+
+    def test_drop_oldest(self):
+        """
+        A full queue drops its oldest samples and keeps other events.
+        """
+        queue = EventQueue(3, EventQueuePolicy.DROP_OLDEST)
+        state = {'type': DriverAsyncEvent.STATE_CHANGE, 'value': 'command'}
+        error = Exception('error')
+        queue.extend([self.sample(1), state, self.sample(2), self.sample(3), error, self.sample(4)])
+        self.assertEqual(len(queue), 3)
+        self.assertEqual([queue.popleft() for i in range(3)], [state, error, self.sample(4)])
+        self.assertRaises(IndexError, queue.popleft)
+        self.assertEqual(queue.stats(), {EventQueueStat.DEPTH: 0,
+                                         EventQueueStat.HIGH_WATER: 3,
+                                         EventQueueStat.DROPPED: 3,
+                                         EventQueueStat.SPILLED: 0,
+                                         EventQueueStat.BLOCKED: 0})
+
+        # a sample is dropped when there is no older sample to drop
+        queue.extend([state, state, state, self.sample(5)])
+        self.assertEqual([queue.popleft() for i in range(3)], [state, state, state])
+        self.assertRaises(IndexError, queue.popleft)
+        self.assertEqual(queue.stats()[EventQueueStat.DROPPED], 4)
+
+    def test_drop_oldest_bounded(self):
+        """
+        Dropped samples do not pile up in memory and other events wait for
+        room instead of growing the queue.
+        """
+        queue = EventQueue(3, EventQueuePolicy.DROP_OLDEST)
+        state = {'type': DriverAsyncEvent.STATE_CHANGE, 'value': 'command'}
+        queue.append(state)
+        for i in range(1000):
+            queue.append(self.sample(i))
+            self.assertTrue(len(queue._events) <= 2 * queue.max_size + 1)
+        self.assertEqual(len(queue), 3)
+        self.assertEqual([queue.popleft() for i in range(3)], [state, self.sample(998), self.sample(999)])
+
+        queue.extend([state, state, state])
+        producer = threading.Thread(target=queue.append, args=(state, ))
+        producer.start()
+        producer.join(.2)
+        self.assertTrue(producer.is_alive())
+        self.assertEqual(len(queue._events), 3)
+        queue.popleft()
+        producer.join(5)
+        self.assertFalse(producer.is_alive())
+        self.assertEqual(len(queue), 3)
+        self.assertEqual(queue.stats()[EventQueueStat.BLOCKED], 1)
+
+    def test_spill(self):
+        """
+        Events past the queue size are spilled to disk and come back in
+        order.
+        """
+        queue = EventQueue(2, EventQueuePolicy.SPILL)
+        events = [self.sample(i) for i in range(7)]
+        queue.extend(events[:5])
+        self.assertEqual(len(queue), 5)
+        self.assertEqual([queue.popleft() for i in range(3)], events[:3])
+        queue.extend(events[5:])
+        self.assertEqual([queue.popleft() for i in range(4)], events[3:])
+        self.assertRaises(IndexError, queue.popleft)
+        stats = queue.stats()
+        self.assertEqual(stats[EventQueueStat.SPILLED], 5)
+        self.assertEqual(stats[EventQueueStat.HIGH_WATER], 2)
+        self.assertEqual(stats[EventQueueStat.DEPTH], 0)
+
+    def test_block(self):
+        """
+        Producers wait for room in a full queue.
+        """
+        queue = EventQueue(2, EventQueuePolicy.BLOCK)
+        queue.extend([1, 2])
+        producer = threading.Thread(target=queue.extend, args=([3, 4], ))
+        producer.start()
+        time.sleep(.2)
+        self.assertTrue(producer.is_alive())
+        self.assertEqual(len(queue), 2)
+
+        self.assertEqual([queue.popleft(1) for i in range(4)], [1, 2, 3, 4])
+        producer.join(1)
+        self.assertFalse(producer.is_alive())
+        self.assertTrue(queue.stats()[EventQueueStat.BLOCKED] > 0)
+
+    def test_bad_config(self):
+        self.assertRaises(InstrumentParameterException, EventQueue, 0)
+        self.assertRaises(InstrumentParameterException, EventQueue, 10, 'bad')
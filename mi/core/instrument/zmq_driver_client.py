@@ -20,6 +20,8 @@ c = zdc.ZmqDriverClient('localhost', 5556, 5557)
 import thread
 import logging
 import time
+import cPickle
+from collections import deque
 
 # We import "regular" zmq, not the patched version because
 # we handle the nonblocking sockets directly as they need to work
@@ -27,21 +29,43 @@ import time
 import zmq
 
 from mi.core.instrument.driver_client import DriverClient
+from mi.core.instrument.zmq_driver_process import SAMPLE_BATCH_FRAME, POLL_TIMEOUT
+from mi.core.instrument.instrument_driver import DriverAsyncEvent
+from mi.core.instrument.data_particle import CompactParticleDecoder, COMPACT_SCHEMA_INTERVAL
+from mi.core.instrument.data_particle import is_compact_particle, encode_particle_dict
+from mi.core.exceptions import SampleException, MissingSchemaException
 from mi.core.log import get_logger ; log = get_logger()
 
+# Least seconds between requests for the schema of a stream
+SCHEMA_REQUEST_INTERVAL = 1.0
+
+# Most samples held per schema while waiting for it.  Drivers repeat each
+# schema at least this often, so samples are only lost if it never arrives.
+MAX_PENDING_SAMPLES = COMPACT_SCHEMA_INTERVAL
+
  
 class ZmqDriverClient(DriverClient):
     """
     A class for communicating with a ZMQ-based driver process using python
-    thread for catching asynchronous driver events.
+    thread for catching asynchronous driver events. Batched sample messages
+    are unpacked and each event is handed to the callback in order.
+
+    Samples published in the compact particle format are decoded back to
+    JSON, so callbacks see the same format whatever the driver publishes,
+    or to particle dicts for callbacks that ask for them.  Compact samples
+    whose schema hasn't been received are held, and handed on in order once
+    it arrives.  The driver is asked to resend the schema on a second
+    command socket owned by the event thread.
     """
     
-    def __init__(self, host, cmd_port, event_port):
+    def __init__(self, host, cmd_port, event_port, particle_dicts=False):
         """
         Initialize members.
         @param host Host string address of the driver process.
         @param cmd_port Port number for the driver process command port.
         @param event_port Port number for the driver process event port.
+        @param particle_dicts Hand compact samples to the callback as particle
+        dicts rather than JSON, saving the JSON encoding.
         """
         DriverClient.__init__(self)
         self.host = host
@@ -53,6 +77,13 @@ class ZmqDriverClient(DriverClient):
         self.zmq_cmd_socket = None
         self.event_thread = None
         self.stop_event_thread = True
+        self._particle_dicts = particle_dicts
+        self._particle_decoder = CompactParticleDecoder()
+        # schema id -> sample events waiting for the schema, oldest first
+        self._pending_samples = {}
+        self._schema_socket = None
+        self._schema_reply_pending = False
+        self._schema_requests = {}
         
     def start_messaging(self, evt_callback=None):
         """
@@ -81,26 +112,147 @@ class ZmqDriverClient(DriverClient):
             log.info('Driver client event thread connected to %s.' %
                   driver_client.event_host_string)
 
+            # schema requests go on their own socket, the command socket
+            # belongs to the caller's thread
+            schema_sock = context.socket(zmq.REQ)
+            schema_sock.setsockopt(zmq.LINGER, 0)
+            schema_sock.connect(driver_client.cmd_host_string)
+            driver_client._schema_socket = schema_sock
+            driver_client._schema_reply_pending = False
+
             driver_client.stop_event_thread = False
             #last_time = time.time()
             while not driver_client.stop_event_thread:
                 try:
-                    evt = sock.recv_pyobj(flags=zmq.NOBLOCK)
-                    log.debug('got event: %s' % str(evt))
-                    if driver_client.evt_callback:
-                        driver_client.evt_callback(evt)
-                except zmq.ZMQError:
-                    time.sleep(.5)
+                    # wake up when an event arrives, checking the stop flag
+                    # every POLL_TIMEOUT
+                    if sock.poll(POLL_TIMEOUT * 1000):
+                        driver_client.dispatch_event_frames(sock.recv_multipart())
+                except zmq.ZMQError as e:
+                    log.error('Driver client event socket error: %s', e)
+                    time.sleep(POLL_TIMEOUT)
                 #cur_time = time.time()
                 #if cur_time - last_time > 5:
                 #    log.info('event thread listening')
                 #    last_time = cur_time
+            driver_client._schema_socket = None
+            schema_sock.close()
             sock.close()
             context.term()
             log.info('Client event socket closed.')
         self.event_thread = thread.start_new_thread(recv_evt_messages, (self,))
         log.info('Driver client messaging started.')
         
+    def dispatch_event_frames(self, frames):
+        """
+        Unpack an event message, a single pickled event or a batch of
+        sample events, and hand each event to the event callback in order.
+        @param frames The frames of the message received on the event socket.
+        """
+        if frames[0] == SAMPLE_BATCH_FRAME:
+            evts = cPickle.loads(frames[1])
+        else:
+            evts = [cPickle.loads(frames[0])]
+        for evt in evts:
+            log.debug('got event: %s' % str(evt))
+            for evt in self._decode_sample(evt):
+                if self.evt_callback:
+                    self.evt_callback(evt)
+
+    def _decode_sample(self, evt):
+        """
+        Convert a sample event holding a compact particle to JSON, or to a
+        particle dict if the client was asked for them.
+        @param evt The event received.
+        @retval list of events to hand to the callback, empty while the
+        sample waits for its schema, led by the held samples once the schema
+        arrives.
+        """
+        if not isinstance(evt, dict) or evt.get('type') != DriverAsyncEvent.SAMPLE or \
+                not is_compact_particle(evt.get('value')):
+            return [evt]
+
+        try:
+            particle = self._particle_decoder.decode(evt['value'])
+        except MissingSchemaException as e:
+            self._hold_sample(e, evt)
+            return []
+        except SampleException as e:
+            log.error('Dropped sample that could not be decoded: %s', e.msg)
+            return []
+
+        evts = [self._decoded_event(evt, particle)]
+        if self._pending_samples:
+            evts = self._release_samples() + evts
+        return evts
+
+    def _decoded_event(self, evt, particle):
+        """
+        Copy a sample event with its decoded particle
+        """
+        evt = dict(evt)
+        if self._particle_dicts:
+            evt['value'] = particle
+        else:
+            evt['value'] = encode_particle_dict(particle)
+        return evt
+
+    def _hold_sample(self, e, evt):
+        """
+        Keep a sample until its schema arrives and ask the driver for it
+        @param e The MissingSchemaException raised decoding the sample.
+        @param evt The sample event.
+        """
+        pending = self._pending_samples.setdefault(e.schema_id, deque())
+        if len(pending) >= MAX_PENDING_SAMPLES:
+            pending.popleft()
+            log.warn('Dropped sample held too long: %s', e.msg)
+        pending.append(evt)
+        log.debug('Holding sample: %s', e.msg)
+        self._request_schema(e.stream)
+
+    def _release_samples(self):
+        """
+        Decode the held samples whose schema has arrived
+        @retval list of decoded sample events, oldest first per schema
+        """
+        evts = []
+        for schema_id in [key for key in self._pending_samples
+                          if self._particle_decoder.has_schema(key)]:
+            for evt in self._pending_samples.pop(schema_id):
+                try:
+                    particle = self._particle_decoder.decode(evt['value'])
+                except SampleException as e:
+                    log.error('Dropped sample that could not be decoded: %s', e.msg)
+                    continue
+                evts.append(self._decoded_event(evt, particle))
+        return evts
+
+    def _request_schema(self, stream):
+        """
+        Ask the driver to resend the schema of a stream, at most once every
+        SCHEMA_REQUEST_INTERVAL seconds per stream.  Never blocks, a request
+        is skipped while the reply to the previous one is outstanding.
+        @param stream The stream name.
+        """
+        sock = self._schema_socket
+        now = time.time()
+        if sock is None or now - self._schema_requests.get(stream, 0) < SCHEMA_REQUEST_INTERVAL:
+            return
+
+        try:
+            if self._schema_reply_pending:
+                sock.recv_pyobj(flags=zmq.NOBLOCK)
+                self._schema_reply_pending = False
+            sock.send_pyobj({'cmd': 'resend_particle_schema', 'args': (stream, ), 'kwargs': {}},
+                            flags=zmq.NOBLOCK)
+        except zmq.ZMQError:
+            return
+
+        self._schema_reply_pending = True
+        self._schema_requests[stream] = now
+        log.info('Requested particle schema for stream %s', stream)
+
     def stop_messaging(self):
         """
         Close messaging resources for the driver process client. Close
@@ -148,17 +300,11 @@ class ZmqDriverClient(DriverClient):
                 time.sleep(.5)
             
         log.debug('Awaiting reply.')
-        while True:
-            try:
-                # Attempt reply recv. Retry if necessary.
-                reply = self.zmq_cmd_socket.recv_pyobj(flags=zmq.NOBLOCK)
-                # Reply recieved, break and return.
-                break
+        # Block until the reply is ready, then receive it.
+        while not self.zmq_cmd_socket.poll(POLL_TIMEOUT * 1000):
+            pass
+        reply = self.zmq_cmd_socket.recv_pyobj()
 
-            except zmq.ZMQError:
-                # Socket not ready with the reply. Sleep and retry later.
-                time.sleep(.5)
-                
         log.debug('Reply: %s.' % str(reply))
         
         if isinstance(reply, Exception):
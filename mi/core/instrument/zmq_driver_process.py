@@ -24,6 +24,7 @@ import time
 import logging
 import sys
 import uuid
+import cPickle
 
 import zmq
 
@@ -31,9 +32,18 @@ from ooi.exception import ApplicationException
 from mi.core.exceptions import InstrumentException, UnexpectedError
 
 import mi.core.instrument.driver_process as driver_process
+from mi.core.instrument.instrument_driver import DriverAsyncEvent
 from mi.core.log import get_logger
 log = get_logger()
 
+# How long the messaging threads block waiting for a command or event
+# before checking their stop flags.
+POLL_TIMEOUT = .1
+
+# First frame of a multipart event message holding a pickled list of
+# sample events.
+SAMPLE_BATCH_FRAME = 'SAMPLE_BATCH'
+
 def _encode_exception(reply):
     if isinstance(reply, InstrumentException):
         # InstrumentExceptions have corresponding IonException error code built-in
@@ -49,10 +59,19 @@ class ZmqDriverProcess(driver_process.DriverProcess):
     Command-REP and event-PUB sockets monitor and react to comms
     needs in separate threads, which can be signaled to end
     by setting boolean flags stop_cmd_thread and stop_evt_thread.
+    The threads block on a poller and the event queue respectively,
+    so commands and events are handled as soon as they arrive.
+
+    If a batch size is given, sample events are coalesced and published
+    as a single multipart message once batch_size samples are waiting or
+    the oldest has waited batch_latency seconds. Any other event flushes
+    the pending samples first so event order is preserved.
     """
     
     @classmethod
-    def launch_process(cls, driver_module, driver_class, workdir='/tmp/', ppid=None):
+    def launch_process(cls, driver_module, driver_class, workdir='/tmp/', ppid=None,
+                       batch_size=None, batch_latency=None,
+                       event_queue_size=None, event_queue_policy=driver_process.EventQueuePolicy.BLOCK):
         """
         Class method constructor to launch ZmqDriverProcess as a
         separate OS process. Creates command string for this
@@ -62,6 +81,14 @@ class ZmqDriverProcess(driver_process.DriverProcess):
         @param workdir The work directory when temporary port files are written.
         @param ppid ID of the parent process, used to self destruct when
         parent dies in test cases.
+        @param batch_size Maximum number of sample events per published
+        message, None to publish each event separately.
+        @param batch_latency Maximum seconds a sample event is held waiting
+        for a batch to fill.
+        @param event_queue_size Most events waiting to be published, None
+        for no limit.
+        @param event_queue_policy EventQueuePolicy applied when the event
+        queue is full.
         @retval Tuple containing (Popen object for the process, cmd port,
             evt_port)
         """
@@ -72,9 +99,10 @@ class ZmqDriverProcess(driver_process.DriverProcess):
         cmd_port_fname = workdir + cmd_port_fname
         evt_port_fname = 'dvr_evt_port_%s.txt' % tag
         evt_port_fname = workdir + evt_port_fname
-        cmd_str = 'from %s import %s; dp = %s("%s", "%s", "%s", "%s", %s);dp.run()' \
+        cmd_str = 'from %s import %s; dp = %s("%s", "%s", "%s", "%s", %s, %s, %s, %s, %r);dp.run()' \
             % (__name__, cls.__name__, cls.__name__, driver_module,
-               driver_class, cmd_port_fname, evt_port_fname, str(ppid))
+               driver_class, cmd_port_fname, evt_port_fname, str(ppid),
+               str(batch_size), str(batch_latency), str(event_queue_size), event_queue_policy)
                 
         # Call base class launch method.
         dvr_proc = driver_process.DriverProcess.launch_process(cmd_str)
@@ -101,7 +129,9 @@ class ZmqDriverProcess(driver_process.DriverProcess):
 
         return (dvr_proc, dvr_cmd_port, dvr_evt_port)
         
-    def __init__(self, driver_module, driver_class, cmd_port_fname, evt_port_fname, ppid):
+    def __init__(self, driver_module, driver_class, cmd_port_fname, evt_port_fname, ppid,
+                 batch_size=None, batch_latency=None,
+                 event_queue_size=None, event_queue_policy=driver_process.EventQueuePolicy.BLOCK):
         """
         Zmq driver process constructor.
         @param driver_module The python module containing the driver code.
@@ -110,8 +140,17 @@ class ZmqDriverProcess(driver_process.DriverProcess):
         @param evt_port_fname Filename for temp evt port file.
         @param ppid ID of the parent process, used to self destruct when
         parent dies in test cases.        
+        @param batch_size Maximum number of sample events per published
+        message, None to publish each event separately.
+        @param batch_latency Maximum seconds a sample event is held waiting
+        for a batch to fill, defaults to POLL_TIMEOUT.
+        @param event_queue_size Most events waiting to be published, None
+        for no limit.
+        @param event_queue_policy EventQueuePolicy applied when the event
+        queue is full.
         """
-        driver_process.DriverProcess.__init__(self, driver_module, driver_class, ppid)
+        driver_process.DriverProcess.__init__(self, driver_module, driver_class, ppid,
+                                              event_queue_size, event_queue_policy)
         self.cmd_port = None
         self.cmd_port_fname = cmd_port_fname
         self.evt_port = None
@@ -122,13 +161,15 @@ class ZmqDriverProcess(driver_process.DriverProcess):
         self.stop_evt_thread = True
         self.cmd_thread = None
         self.stop_cmd_thread = True
+        self.batch_size = batch_size
+        self.batch_latency = POLL_TIMEOUT if batch_latency is None else batch_latency
         
     def start_messaging(self):
         """
         Initialize and start messaging resources for the driver, blocking
         until messaging terminates. This ZMQ implementation starts and
-        joins command and event threads, managing nonblocking send/recv calls
-        on REP and PUB sockets, respectively. Terminate loops and close
+        joins command and event threads, blocking with a timeout on the REP
+        socket and event queue respectively. Terminate loops and close
         sockets when stop flag is set in driver process.
         """
         def recv_cmd_msg(zmq_driver_process):
@@ -143,27 +184,8 @@ class ZmqDriverProcess(driver_process.DriverProcess):
                            zmq_driver_process.cmd_port)
             file(zmq_driver_process.cmd_port_fname,'w+').write(str(zmq_driver_process.cmd_port)+'\n')
 
-            zmq_driver_process.stop_cmd_thread = False
-            while not zmq_driver_process.stop_cmd_thread:
-                try:
-                    msg = sock.recv_pyobj(flags=zmq.NOBLOCK)
-                    #log.trace('Processing message %s', msg)
-                    reply = zmq_driver_process.cmd_driver(msg)
-                    # if operation raised exception, encode as triple
-                    if isinstance(reply, Exception):
-                        reply = _encode_exception(reply)
-                    # send, send, and resend
-                    while True:
-                        try:
-                            sock.send_pyobj(reply, flags=zmq.NOBLOCK)
-                            break
-                        except zmq.ZMQError:
-                            time.sleep(.1)
-                            if zmq_driver_process.stop_cmd_thread:
-                                break
-                except zmq.ZMQError:
-                    time.sleep(.1)
-                
+            zmq_driver_process.serve_commands(sock)
+
             sock.close()
             context.term()
             log.info('Driver process cmd socket closed.')
@@ -179,24 +201,7 @@ class ZmqDriverProcess(driver_process.DriverProcess):
             log.info('Driver process event socket bound to %i', zmq_driver_process.evt_port)
             file(zmq_driver_process.evt_port_fname,'w+').write(str(zmq_driver_process.evt_port)+'\n')
 
-            zmq_driver_process.stop_evt_thread = False
-            while not zmq_driver_process.stop_evt_thread:
-                try:
-                    evt = zmq_driver_process.events.pop(0)
-                    #log.trace('Event thread sending event %s',evt)
-                    while evt:
-                        try:
-                            if isinstance(evt, Exception):
-                                evt = _encode_exception(evt)
-                            sock.send_pyobj(evt, flags=zmq.NOBLOCK)
-                            evt = None
-                            log.trace('Event sent!')
-                        except zmq.ZMQError:
-                            time.sleep(.1)
-                            if zmq_driver_process.stop_evt_thread:
-                                break
-                except IndexError:
-                    time.sleep(.1)
+            zmq_driver_process.publish_events(sock)
 
             sock.close()
             context.term()
@@ -208,6 +213,142 @@ class ZmqDriverProcess(driver_process.DriverProcess):
         self.evt_thread.start()
         self.messaging_started = True
     
+    def serve_commands(self, sock):
+        """
+        Answer commands received on a socket until the stop flag is set.
+        Socket errors are logged and the loop carries on, so the command
+        thread only ends when it is told to.
+        @param sock The ZMQ REP socket to receive commands on.
+        """
+        # pickled reply still to be sent.  A REP socket must send the reply
+        # to a command before it can receive the next one.
+        reply = None
+
+        self.stop_cmd_thread = False
+        while not self.stop_cmd_thread:
+            try:
+                if reply is None:
+                    if not sock.poll(POLL_TIMEOUT * 1000):
+                        continue
+                    reply = self._reply_to(sock.recv())
+                sock.send(reply)
+                reply = None
+            except zmq.ZMQError as e:
+                log.error('Driver process cmd socket error: %s', e)
+                time.sleep(POLL_TIMEOUT)
+
+    def _reply_to(self, msg):
+        """
+        Run a pickled command message against the driver.
+        @param msg The pickled command message.
+        @retval The pickled reply, or a pickled encoded exception if the
+        command could not be run or its result could not be pickled.
+        """
+        try:
+            msg = cPickle.loads(msg)
+            #log.trace('Processing message %s', msg)
+            reply = self.cmd_driver(msg)
+        except Exception as e:
+            log.error('Driver process failed to process command: %s', e)
+            reply = e
+
+        # if operation raised exception, encode as triple
+        if isinstance(reply, Exception):
+            reply = _encode_exception(reply)
+        try:
+            return cPickle.dumps(reply, cPickle.HIGHEST_PROTOCOL)
+        except (cPickle.PicklingError, TypeError) as e:
+            log.error('Driver process failed to pickle reply %r: %s', reply, e)
+            return cPickle.dumps(_encode_exception(e), cPickle.HIGHEST_PROTOCOL)
+
+    def publish_events(self, sock):
+        """
+        Publish events from the event queue on a socket until the stop flag
+        is set, batching sample events if a batch size was given.  Events
+        that can't be pickled or sent are logged and dropped, so the event
+        thread only ends when it is told to.
+        @param sock The ZMQ PUB socket to send events on.
+        """
+        def flush(batch):
+            """
+            Publish pending sample events as one multipart message, leaving
+            out any that can't be pickled.
+            """
+            if batch:
+                try:
+                    data = cPickle.dumps(batch, cPickle.HIGHEST_PROTOCOL)
+                except (cPickle.PicklingError, TypeError):
+                    batch = [evt for evt in batch if self._picklable(evt)]
+                    data = cPickle.dumps(batch, cPickle.HIGHEST_PROTOCOL) if batch else None
+                if data is not None:
+                    try:
+                        sock.send_multipart([SAMPLE_BATCH_FRAME, data])
+                        log.trace('Sent batch of %d events', len(batch))
+                    except zmq.ZMQError as e:
+                        log.error('Driver process dropped batch of %d events: %s', len(batch), e)
+            return []
+
+        def send(evt):
+            """
+            Publish a single event.
+            """
+            if isinstance(evt, Exception):
+                evt = _encode_exception(evt)
+            try:
+                # PUB sockets never block, they drop at the high water mark
+                sock.send_pyobj(evt)
+                log.trace('Event sent!')
+            except (zmq.ZMQError, cPickle.PicklingError, TypeError) as e:
+                log.error('Driver process dropped event %r: %s', evt, e)
+
+        batch_size = self.batch_size
+        batch = []
+        batch_deadline = None
+
+        self.stop_evt_thread = False
+        while not self.stop_evt_thread:
+            timeout = POLL_TIMEOUT
+            if batch:
+                # still check the stop flag while waiting out a long latency
+                timeout = min(max(batch_deadline - time.time(), 0), POLL_TIMEOUT)
+            try:
+                evt = self.events.popleft(timeout)
+            except IndexError:
+                evt = None
+
+            #log.trace('Event thread sending event %s',evt)
+            if evt:
+                if batch_size and isinstance(evt, dict) and \
+                        evt.get('type') == DriverAsyncEvent.SAMPLE:
+                    if not batch:
+                        batch_deadline = time.time() + self.batch_latency
+                    batch.append(evt)
+                    if len(batch) >= batch_size or time.time() >= batch_deadline:
+                        batch = flush(batch)
+                    continue
+
+                batch = flush(batch)
+                send(evt)
+
+            elif batch and time.time() >= batch_deadline:
+                batch = flush(batch)
+
+        flush(batch)
+
+    @staticmethod
+    def _picklable(evt):
+        """
+        Check that an event can be pickled, logging it if not.
+        @param evt The event to check.
+        @retval True if the event can be pickled.
+        """
+        try:
+            cPickle.dumps(evt, cPickle.HIGHEST_PROTOCOL)
+            return True
+        except (cPickle.PicklingError, TypeError) as e:
+            log.error('Driver process dropped event %r: %s', evt, e)
+            return False
+
     def stop_messaging(self):
         """
         Close messaging resource for the driver. Set flags to cause
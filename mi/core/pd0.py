@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+
+"""
+@package mi.core.pd0
+@file mi/core/pd0.py
+@brief Decoding of the per depth cell sections of Teledyne RDI PD0
+    ensembles.  Each section is an ID followed by one fixed size record per
+    depth cell, so the whole section is read as a NumPy structured array in
+    one call and each field becomes a list of values, one per cell.
+"""
+
+__license__ = 'Apache 2.0'
+
+import numpy
+
+from mi.core.exceptions import SampleException
+
+# bytes holding the ID at the start of each section
+ID_BYTES = 2
+
+# velocity per depth cell, one signed little endian short per beam, or per
+# component for earth coordinates (east, north, up, error)
+VELOCITY_DTYPE = numpy.dtype([('beam1', '<i2'), ('beam2', '<i2'),
+                              ('beam3', '<i2'), ('beam4', '<i2')])
+
+# correlation magnitude, echo intensity and percent good per depth cell, one
+# byte per beam
+BEAM_BYTE_DTYPE = numpy.dtype([('beam1', 'u1'), ('beam2', 'u1'),
+                               ('beam3', 'u1'), ('beam4', 'u1')])
+
+
+def decode_cells(data, dtype, num_cells=None, offset=ID_BYTES):
+    """
+    Decode the depth cells of a PD0 section
+    @param data string holding the section
+    @param dtype NumPy structured dtype of one depth cell
+    @param num_cells number of depth cells, or None to decode as many as
+        fit in data
+    @param offset position of the first depth cell in data
+    @retval list with one list of values per field of dtype, in field order
+    @throws SampleException if data is too short for num_cells
+    """
+    if num_cells is None:
+        num_cells = max(len(data) - offset, 0) // dtype.itemsize
+    elif len(data) < offset + num_cells * dtype.itemsize:
+        raise SampleException("PD0 section of %d bytes is too short for %d depth cells"
+                              % (len(data), num_cells))
+
+    if num_cells <= 0:
+        return [[] for name in dtype.names]
+
+    cells = numpy.frombuffer(data, dtype, num_cells, offset)
+    return [cells[name].tolist() for name in dtype.names]
+
+
+def decode_velocity(data, num_cells=None):
+    """
+    Decode a velocity section
+    @param data string holding the section, starting with its ID
+    @param num_cells number of depth cells, or None for as many as fit
+    @retval list of four lists of velocities, one per beam or component
+    """
+    return decode_cells(data, VELOCITY_DTYPE, num_cells)
+
+
+def decode_beam_bytes(data, num_cells=None):
+    """
+    Decode a correlation magnitude, echo intensity or percent good section
+    @param data string holding the section, starting with its ID
+    @param num_cells number of depth cells, or None for as many as fit
+    @retval list of four lists of values, one per beam
+    """
+    return decode_cells(data, BEAM_BYTE_DTYPE, num_cells)
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+
+"""
+@package mi.core.test.test_checksum
+@file mi/core/test/test_checksum.py
+@brief Test the framing checksums
+"""
+
+__license__ = 'Apache 2.0'
+
+import random
+
+from nose.plugins.attrib import attr
+from mi.core.unit_test import MiUnitTest
+
+from mi.core import checksum
+from mi.idk.benchmark import crc16_x25_bitwise
+
+# payload of the SIO block with header '\x01CS1237101_0012u51EF04CE_04_C3AF\x02'
+# in the mflm dosta node59p1.dat resource
+SIO_BLOCK = '\n18.72 17.4 2 1 1\n'
+SIO_BLOCK_CHECKSUM = 0xC3AF
+
+@attr('UNIT', group='mi')
+class TestChecksum(MiUnitTest):
+    """
+    Test the checksum implementations
+    """
+    def test_crc16_x25_golden(self):
+        """
+        Check values from the CRC-16/X-25 definition
+        """
+        for crc16 in [checksum.crc16_x25, checksum.crc16_x25_table, checksum.crc16_x25_hqx]:
+            self.assertEqual(crc16('123456789'), 0x906E)
+            self.assertEqual(crc16(''), 0x0000)
+            self.assertEqual(crc16(bytearray('123456789')), 0x906E)
+            self.assertEqual(crc16(SIO_BLOCK), SIO_BLOCK_CHECKSUM)
+
+    def test_crc16_x25_matches_bitwise(self):
+        """
+        The table driven and binascii implementations match the bit by bit CRC
+        """
+        rand = random.Random(1)
+        for length in [1, 2, 3, 17, 256, 4000]:
+            data = ''.join(chr(rand.randint(0, 255)) for i in range(length))
+            expected = crc16_x25_bitwise(data)
+            self.assertEqual(checksum.crc16_x25_table(data), expected)
+            self.assertEqual(checksum.crc16_x25_hqx(data), expected)
+
+    def test_crc16_kermit_golden(self):
+        """
+        Check values from the CRC-16/KERMIT definition and an HPIES command
+        """
+        for crc16 in [checksum.crc16_kermit, checksum.crc16_kermit_table, checksum.crc16_kermit_hqx]:
+            self.assertEqual(crc16('123456789'), 0x2189)
+            self.assertEqual(crc16(''), 0x0000)
+            self.assertEqual(crc16(bytearray('123456789')), 0x2189)
+
+    def test_crc16_ccitt_golden(self):
+        """
+        Check values from the CRC-16/CCITT-FALSE and CRC-16/XMODEM definitions
+        """
+        for crc16 in [checksum.crc16_ccitt, checksum.crc16_ccitt_table, checksum.crc16_ccitt_hqx]:
+            self.assertEqual(crc16('123456789'), 0x29B1)
+            self.assertEqual(crc16('123456789', 0), 0x31C3)
+            self.assertEqual(crc16('56789', crc16('1234')), 0x29B1)
+
+    def test_xor8_golden(self):
+        """
+        Check the NMEA checksum of a GPS sentence
+        """
+        sentence = 'GPGGA,092750.000,5321.6802,N,00630.3372,W,1,8,1.03,61.7,M,55.2,M,,'
+        for xor8 in [checksum.xor8, checksum.xor8_loop, checksum.xor8_words, checksum.xor8_numpy]:
+            self.assertEqual(xor8(sentence), 0x76)
+            self.assertEqual(xor8(''), 0)
+            self.assertEqual(xor8(bytearray(sentence * 3)), 0x76)
+
+    def test_sum16_golden(self):
+        """
+        Check byte sums, including ones that wrap
+        """
+        for sum16 in [checksum.sum16, checksum.sum16_loop, checksum.sum16_builtin, checksum.sum16_numpy]:
+            self.assertEqual(sum16('123456789'), 0x1DD)
+            self.assertEqual(sum16(''), 0)
+            self.assertEqual(sum16('\xff' * 300), (0xFF * 300) & 0xFFFF)
+            self.assertEqual(sum16('\xff' * 1000), (0xFF * 1000) & 0xFFFF)
+        self.assertEqual(checksum.sum8('123456789'), 0xDD)
+
+    def test_implementations_match(self):
+        """
+        Every implementation of a checksum gives the same result as the pure
+        Python one for data of any length and type
+        """
+        rand = random.Random(1)
+        for length in [1, 2, 7, 8, 9, 127, 128, 383, 384, 4000]:
+            data = ''.join(chr(rand.randint(0, 255)) for i in range(length))
+            for (expected, implementations) in [
+                    (checksum.crc16_kermit_table, [checksum.crc16_kermit_hqx]),
+                    (checksum.crc16_ccitt_table, [checksum.crc16_ccitt_hqx]),
+                    (checksum.xor8_loop, [checksum.xor8_words, checksum.xor8_numpy, checksum.xor8]),
+                    (checksum.sum16_loop, [checksum.sum16_builtin, checksum.sum16_numpy, checksum.sum16])]:
+                for implementation in implementations:
+                    for value in [data, bytearray(data), memoryview(data)]:
+                        self.assertEqual(implementation(value), expected(data))
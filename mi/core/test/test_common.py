@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+
+"""
+@package mi.core.test.test_common
+@file mi/core/test/test_common.py
+@brief Test the common enum base class
+"""
+
+__license__ = 'Apache 2.0'
+
+from nose.plugins.attrib import attr
+from mi.core.unit_test import MiUnitTest
+
+from mi.core.common import BaseEnum
+
+
+class FirstEnum(BaseEnum):
+    ONE = 'one'
+    TWO = 'two'
+
+
+class SecondEnum(BaseEnum):
+    THREE = 'three'
+    LIST = ['not', 'hashable']
+
+
+class CombinedEnum(FirstEnum, SecondEnum):
+    FOUR = 4
+
+    @classmethod
+    def helper(cls):
+        return 'not a value'
+
+
+@attr('UNIT', group='mi')
+class TestBaseEnum(MiUnitTest):
+    """
+    Test listing and testing enum values
+    """
+    def test_values(self):
+        self.assertEqual(FirstEnum.list(), ['one', 'two'])
+        self.assertEqual(FirstEnum.dict(), {'ONE': 'one', 'TWO': 'two'})
+        self.assertEqual(CombinedEnum.list(), [4, ['not', 'hashable'], 'one', 'three', 'two'])
+        self.assertEqual(CombinedEnum.dict(), {'ONE': 'one', 'TWO': 'two', 'THREE': 'three',
+                                               'LIST': ['not', 'hashable'], 'FOUR': 4})
+
+        self.assertTrue(FirstEnum.has('one'))
+        self.assertFalse(FirstEnum.has('three'))
+        self.assertFalse(FirstEnum.has(['not', 'hashable']))
+        self.assertTrue(CombinedEnum.has('three'))
+        self.assertTrue(CombinedEnum.has(4))
+        self.assertTrue(CombinedEnum.has(['not', 'hashable']))
+        self.assertFalse(CombinedEnum.has('not a value'))
+
+        # callers are free to change what they are given
+        FirstEnum.list().append('three')
+        FirstEnum.dict()['THREE'] = 'three'
+        self.assertEqual(FirstEnum.list(), ['one', 'two'])
+        self.assertEqual(FirstEnum.dict(), {'ONE': 'one', 'TWO': 'two'})
+
+    def test_changed_values(self):
+        """
+        Values added to or removed from an enum, or the enums it inherits
+        from, are seen straight away
+        """
+        class ChangingEnum(BaseEnum):
+            ONE = 1
+
+        class ChildEnum(ChangingEnum):
+            TWO = 2
+
+        self.assertEqual(ChildEnum.list(), [1, 2])
+        ChangingEnum.THREE = 3
+        self.assertTrue(ChildEnum.has(3))
+        self.assertEqual(ChildEnum.list(), [1, 3, 2])
+        del ChangingEnum.ONE
+        self.assertFalse(ChangingEnum.has(1))
+        self.assertEqual(ChildEnum.dict(), {'TWO': 2, 'THREE': 3})
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+
+"""
+@package mi.core.test.test_pd0
+@file mi/core/test/test_pd0.py
+@brief Test decoding the depth cell sections of PD0 ensembles
+"""
+
+__license__ = 'Apache 2.0'
+
+import random
+import struct
+from nose.plugins.attrib import attr
+from mi.core.unit_test import MiUnitTest
+
+from mi.core.exceptions import SampleException
+from mi.core.pd0 import decode_cells, decode_velocity, decode_beam_bytes, ID_BYTES, BEAM_BYTE_DTYPE
+
+
+def unpack_cells(data, fmt, num_cells):
+    """
+    Decode depth cells one at a time with struct
+    """
+    columns = [[], [], [], []]
+    size = struct.calcsize(fmt)
+    for cell in range(num_cells):
+        for (column, value) in zip(columns, struct.unpack_from(fmt, data, ID_BYTES + cell * size)):
+            column.append(value)
+    return columns
+
+
+@attr('UNIT', group='mi')
+class TestPd0(MiUnitTest):
+    """
+    Test the vectorized decoding matches decoding one cell at a time
+    """
+    def setUp(self):
+        rand = random.Random(1)
+        self.data = '\x00\x01' + ''.join(chr(rand.randint(0, 255)) for i in range(8 * 40))
+
+    def test_velocity(self):
+        self.assertEqual(decode_velocity(self.data, 40), unpack_cells(self.data, '<4h', 40))
+        self.assertEqual(decode_velocity(self.data), unpack_cells(self.data, '<4h', 40))
+        self.assertEqual(decode_velocity(self.data, 25), unpack_cells(self.data, '<4h', 25))
+        self.assertTrue(all(isinstance(value, int) for value in decode_velocity(self.data)[0]))
+
+    def test_beam_bytes(self):
+        self.assertEqual(decode_beam_bytes(self.data, 40), unpack_cells(self.data, '<4B', 40))
+        self.assertEqual(decode_beam_bytes(self.data), unpack_cells(self.data, '<4B', 80))
+        self.assertEqual(decode_beam_bytes(self.data[:81]), unpack_cells(self.data, '<4B', 19))
+
+    def test_empty(self):
+        self.assertEqual(decode_velocity(self.data, 0), [[], [], [], []])
+        self.assertEqual(decode_velocity(self.data[:ID_BYTES]), [[], [], [], []])
+        self.assertEqual(decode_cells('', BEAM_BYTE_DTYPE), [[], [], [], []])
+
+    def test_short_data(self):
+        with self.assertRaises(SampleException):
+            decode_velocity(self.data, 41)
+        with self.assertRaises(SampleException):
+            decode_beam_bytes(self.data[:-1], 80)
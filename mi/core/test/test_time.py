@@ -65,3 +65,54 @@ class TestTime(MiUnitTest):
             now = datetime.datetime.utcnow()
             self.assertLess(now.microsecond, 100)
             system_time.sleep(0.1)
+
+    def test_string_to_ntp_date_time(self):
+        """
+        Test converting ISO8601 strings to NTP time matches converting the
+        parsed date with calendar.timegm, whatever the local time zone
+        """
+        import calendar
+        from dateutil import parser
+        for datestr in ["1970-01-01T00:00:00Z", "2000-01-01T00:00:00.00Z",
+                        "2014-03-09T07:15:59.123456Z", "2013-07-04T12:00:01.5",
+                        "2012-02-29T23:59:59.99999999Z", "1969-12-31T23:59:59.25Z"]:
+            dt = parser.parse(datestr)
+            expected = calendar.timegm(dt.timetuple()) + dt.microsecond / 1000000.0
+            self.assertAlmostEqual(string_to_ntp_date_time(datestr), expected + NTP_DELTA, places=5)
+            self.assertAlmostEqual(iso8601_to_unix_time(datestr), expected, places=5)
+
+        self.assertEqual(string_to_ntp_date_time("2000-01-01T00:00:00.00Z"), 3155673600.0)
+        self.assertEqual(iso8601_to_unix_time("2014-03-09T07:15:59.123456Z"), 1394349359.123456)
+
+        self.assertRaises(IOError, string_to_ntp_date_time, 3155673600)
+        self.assertRaises(ValueError, string_to_ntp_date_time, "2014/03/09 07:15:59")
+        self.assertRaises(ValueError, string_to_ntp_date_time, "2014-02-30T00:00:00Z")
+        self.assertRaises(ValueError, string_to_ntp_date_time, "2014-01-01T24:00:00Z")
+
+    def test_utc_to_time(self):
+        """
+        Test converting date fields one at a time and as arrays
+        """
+        import calendar
+        fields = [(1970, 1, 1, 0, 0, 0), (1999, 12, 31, 23, 59, 59),
+                  (2000, 2, 29, 12, 30, 15), (2014, 11, 5, 6, 7, 8)]
+        for field in fields:
+            expected = calendar.timegm(field + (0, 0, 0))
+            self.assertEqual(utc_to_unix_time(*field), expected)
+            self.assertEqual(utc_to_ntp_time(*field), expected + NTP_DELTA)
+        self.assertEqual(utc_to_unix_time(2014, 11, 5, second=1.5), 1415145601.5)
+        self.assertRaises(ValueError, utc_to_unix_time, 2014, 13, 1)
+
+        columns = zip(*fields)
+        expected = [calendar.timegm(field + (0, 0, 0)) for field in fields]
+        self.assertEqual(list(utc_to_unix_time_array(*columns)), expected)
+        self.assertEqual(list(utc_to_ntp_time_array(*columns)), [t + NTP_DELTA for t in expected])
+        self.assertEqual(list(unix_to_ntp_time_array(expected)), [t + NTP_DELTA for t in expected])
+
+    def test_ntp_now(self):
+        """
+        Test the current NTP time matches ntplib
+        """
+        before = ntplib.system_to_ntp_time(system_time.time())
+        now = ntp_now()
+        self.assertTrue(before <= now <= ntplib.system_to_ntp_time(system_time.time()))
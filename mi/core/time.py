@@ -19,11 +19,25 @@ import datetime
 import ntplib
 import time
 import re
-from dateutil import parser
 
 DATE_PATTERN = r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(\.\d+)?Z?$'
 DATE_MATCHER = re.compile(DATE_PATTERN)
 
+# Same as DATE_PATTERN with a group for each field
+ISO8601_PATTERN = r'^(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2}):(\d{2})(?:\.(\d+))?Z?$'
+ISO8601_MATCHER = re.compile(ISO8601_PATTERN)
+
+# Seconds from the NTP epoch (jan 1 1900) to the unix epoch (jan 1 1970)
+NTP_DELTA = ntplib.NTP.NTP_DELTA
+
+# Ordinal of jan 1 1970, used to count days since the unix epoch
+_UNIX_EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+# Unix time at the start of each day already converted, keyed by
+# (year, month, day).  Data files cover few days, so this stays small.
+_day_epoch_cache = {}
+DAY_EPOCH_CACHE_SIZE = 10000
+
 def get_timestamp_delayed(format):
     '''
     Return a formatted date string of the current utc time,
@@ -85,23 +99,12 @@ def string_to_ntp_date_time(datestr):
             raise ValueError("date string not in ISO8601 format YYYY-MM-DDTHH:MM:SS.SSSSZ")
 
         try:
-            # This assumes input date string are in UTC (=GMT)
-            if datestr[-1:] != 'Z':
-                datestr += 'Z'
-
-            # the parsed date time represents a GMT time, but strftime
-            # does not take timezone into account, so these are seconds from the
-            # local start of 1970
-            local_sec = float(parser.parse(datestr).strftime("%s.%f"))
-            # remove the local time zone to convert to gmt (seconds since gmt jan 1 1970)
-            gmt_sec = local_sec - time.timezone
-            # convert to ntp (seconds since gmt jan 1 1900)
-            timestamp = ntplib.system_to_ntp_time(gmt_sec)
+            timestamp = iso8601_to_ntp_time(datestr)
 
         except ValueError as e:
             raise ValueError('Value %s could not be formatted to a date. %s' % (str(datestr), e))
 
-        log.debug("converting time string '%s', unix_ts: %s ntp: %s", datestr, gmt_sec, timestamp)
+        log.debug("converting time string '%s', ntp: %s", datestr, timestamp)
 
         return timestamp
 
@@ -116,3 +119,119 @@ def time_to_ntp_date_time(unix_time=None):
 
         timestamp = ntplib.system_to_ntp_time(unix_time)
         return float(timestamp)
+
+def ntp_now():
+    """
+    Get the current time as an NTP timestamp, the same as
+    ntplib.system_to_ntp_time(time.time())
+    @retval seconds since jan 1 1900 as a float
+    """
+    return time.time() + NTP_DELTA
+
+def day_epoch(year, month, day):
+    """
+    Get the unix time at the start of a UTC day.  Results are cached, so
+    converting many times on the same day only builds one date.
+    @param year four digit year
+    @param month month, 1 to 12
+    @param day day of the month
+    @retval seconds from jan 1 1970 to the start of the day
+    @throws ValueError if the date is not valid
+    """
+    key = (year, month, day)
+    seconds = _day_epoch_cache.get(key)
+    if seconds is None:
+        seconds = (datetime.date(year, month, day).toordinal() - _UNIX_EPOCH_ORDINAL) * 86400
+        if len(_day_epoch_cache) >= DAY_EPOCH_CACHE_SIZE:
+            _day_epoch_cache.clear()
+        _day_epoch_cache[key] = seconds
+    return seconds
+
+def utc_to_unix_time(year, month, day, hour=0, minute=0, second=0):
+    """
+    Convert UTC date and time fields to unix time without going through the
+    local time zone.  Gives the same result as calendar.timegm.
+    @param second seconds, which may include a fraction
+    @retval seconds since jan 1 1970
+    @throws ValueError if the date is not valid
+    """
+    return day_epoch(year, month, day) + hour * 3600 + minute * 60 + second
+
+def utc_to_ntp_time(year, month, day, hour=0, minute=0, second=0):
+    """
+    Convert UTC date and time fields to an NTP timestamp
+    @param second seconds, which may include a fraction
+    @retval seconds since jan 1 1900
+    @throws ValueError if the date is not valid
+    """
+    return utc_to_unix_time(year, month, day, hour, minute, second) + NTP_DELTA
+
+def iso8601_to_unix_time(datestr):
+    """
+    Convert a UTC ISO8601 date string in the fixed format
+    YYYY-MM-DDTHH:MM:SS[.SSSSSS][Z] to unix time.  Fractions of a second
+    past microseconds are truncated, as dateutil does.
+    @param datestr date string
+    @retval seconds since jan 1 1970 as a float
+    @throws ValueError if datestr is not in the format or not a valid date
+    """
+    match = ISO8601_MATCHER.match(datestr)
+    if not match:
+        raise ValueError("date string not in ISO8601 format YYYY-MM-DDTHH:MM:SS.SSSSZ")
+    (year, month, day, hour, minute, second, fraction) = match.groups()
+
+    if int(hour) > 23 or int(minute) > 59 or int(second) > 59:
+        raise ValueError("time out of range in %s" % datestr)
+    seconds = utc_to_unix_time(int(year), int(month), int(day), int(hour), int(minute), int(second))
+
+    # build the float from the decimal digits like float(strftime('%s.%f'))
+    # so results match to the last bit
+    micro = (fraction or '')[:6].ljust(6, '0')
+    if seconds < 0:
+        return seconds + int(micro) / 1000000.0
+    return float('%d.%s' % (seconds, micro))
+
+def iso8601_to_ntp_time(datestr):
+    """
+    Convert a UTC ISO8601 date string in the fixed format
+    YYYY-MM-DDTHH:MM:SS[.SSSSSS][Z] to an NTP timestamp
+    @param datestr date string
+    @retval seconds since jan 1 1900 as a float
+    @throws ValueError if datestr is not in the format or not a valid date
+    """
+    return iso8601_to_unix_time(datestr) + NTP_DELTA
+
+def utc_to_unix_time_array(year, month, day, hour=0, minute=0, second=0):
+    """
+    Convert arrays of UTC date and time fields to unix times in one pass
+    @param year sequence of four digit years
+    @param month sequence of months, 1 to 12
+    @param day sequence of days of the month
+    @param hour sequence of hours, or a single value for all times
+    @param minute sequence of minutes, or a single value for all times
+    @param second sequence of seconds, or a single value for all times
+    @retval float array of seconds since jan 1 1970
+    """
+    # numpy is only needed for the array conversions, don't make every driver import it
+    import numpy
+
+    months = (numpy.asarray(year, dtype=numpy.int64) - 1970) * 12 + numpy.asarray(month, dtype=numpy.int64) - 1
+    days = months.astype('datetime64[M]').astype('datetime64[D]').astype(numpy.int64) + \
+        numpy.asarray(day, dtype=numpy.int64) - 1
+    return days * 86400.0 + numpy.asarray(hour) * 3600 + numpy.asarray(minute) * 60 + numpy.asarray(second)
+
+def utc_to_ntp_time_array(year, month, day, hour=0, minute=0, second=0):
+    """
+    Convert arrays of UTC date and time fields to NTP timestamps in one pass
+    @retval float array of seconds since jan 1 1900
+    """
+    return utc_to_unix_time_array(year, month, day, hour, minute, second) + NTP_DELTA
+
+def unix_to_ntp_time_array(unix_times):
+    """
+    Convert a sequence of unix times to NTP timestamps
+    @retval float array of seconds since jan 1 1900
+    """
+    import numpy
+
+    return numpy.asarray(unix_times, dtype=numpy.float64) + NTP_DELTA
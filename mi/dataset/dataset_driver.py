@@ -13,9 +13,12 @@ __license__ = 'Apache 2.0'
 import os
 import gevent
 import shutil
-import hashlib
 import copy
+import cPickle
+import struct
+import tempfile
 import traceback
+import multiprocessing
 
 from mi.core.log import get_logger ; log = get_logger()
 from mi.core.exceptions import InstrumentParameterException
@@ -23,6 +26,7 @@ from mi.core.exceptions import DataSourceLocationException
 from mi.core.exceptions import ConfigurationException
 from mi.core.exceptions import SampleException
 from mi.core.exceptions import DatasetHarvesterException
+from mi.core.exceptions import DatasetParserException
 from mi.core.instrument.instrument_driver import ResourceAgentState
 from mi.core.instrument.instrument_driver import DriverEvent
 from mi.core.instrument.instrument_driver import ConfigMetadataKey
@@ -35,6 +39,7 @@ from mi.core.instrument.driver_dict import DriverDict
 from mi.core.instrument.protocol_param_dict import ParameterDictType
 from mi.core.instrument.protocol_param_dict import Parameter
 from mi.core.common import BaseEnum
+from mi.dataset.file_checksum import file_checksum
 
 class DataSourceConfigKey(BaseEnum):
     HARVESTER = 'harvester'
@@ -62,6 +67,9 @@ class DriverParameter(BaseEnum):
 class HarvesterType(BaseEnum):
     SINGLE_DIRECTORY = 'single_directory'
     SINGLE_FILE = 'single_file'
+    # single directory harvester driven by inotify events, selected with
+    # DataSetDriverConfigKeys.HARVESTER_TYPE in the harvester config
+    INOTIFY_DIRECTORY = 'inotify_directory'
 
 class DataSourceLocation(object):
     """
@@ -109,12 +117,141 @@ class DataSetDriverConfigKeys(BaseEnum):
     PATTERN = "pattern"
     FREQUENCY = "frequency"
     FILE_MOD_WAIT_TIME = "file_mod_wait_time"
+    HARVESTER_TYPE = "harvester_type"
     HARVESTER = "harvester"
     PARSER = "parser"
     MODULE = "module"
     CLASS = "class"
     URI = "uri"
     CLASS_ARGS = "class_args"
+    INGESTION_PROCESSES = "ingestion_processes"
+    READ_BLOCK_SIZE = "read_block_size"
+    MAX_READ_BLOCK_SIZE = "max_read_block_size"
+    READAHEAD_BLOCKS = "readahead_blocks"
+
+# seconds between checks for results from an ingestion worker process
+INGESTION_WORKER_POLL_INTERVAL = 0.1
+
+# length prefix of each batch written to an ingestion worker spool file
+SPOOL_LENGTH_FORMAT = '>I'
+SPOOL_LENGTH_SIZE = struct.calcsize(SPOOL_LENGTH_FORMAT)
+
+class ParsedFileRecorder(object):
+    """
+    Records the driver callbacks made by a parser running in an ingestion
+    worker process so the driver can replay them in the same order.  The
+    callbacks are written to a spool file a batch of records at a time, so
+    neither process holds the whole file in memory and the worker never
+    waits for the driver to catch up.  Exceptions are recorded by class and
+    message because MI exceptions do not survive pickling.
+    """
+    END_BATCH = None
+    FAILURE = 'failure'
+    # the worker parsed the whole file
+    DONE = 'done'
+    # the worker could not send its particles, the driver parses the rest
+    # of the file itself
+    IN_PROCESS = 'in_process'
+    EXCEPTION_CALLBACKS = ['_exception_callback', '_sample_exception_callback']
+
+    def __init__(self, spool=None):
+        """
+        @param spool File to write the recorded callbacks to
+        """
+        self._spool = spool
+        # list of (driver callback name, args) tuples not sent yet
+        self.events = []
+
+    def publish(self, *args):
+        self.events.append(('_data_callback', args))
+
+    def save_parser_state(self, *args):
+        self.events.append(('_save_parser_state', args))
+
+    def exception(self, exception):
+        self.events.append(('_exception_callback', self._exception_record(exception)))
+
+    def sample_exception(self, exception):
+        self.events.append(('_sample_exception_callback', self._exception_record(exception)))
+
+    def parse_error(self, exception):
+        """
+        A SampleException stopped the parser
+        """
+        self.events.append(('_save_parser_state_after_error', ()))
+        self.sample_exception(exception)
+
+    def failure(self, trace):
+        """
+        Any other exception stopped the parser
+        """
+        self.events.append((self.FAILURE, trace))
+
+    def end_batch(self):
+        self.events.append((self.END_BATCH, ()))
+
+    def send(self):
+        """
+        Write the callbacks recorded since the last send to the spool file
+        @retval False if they could not be pickled, they are not written
+        """
+        try:
+            data = cPickle.dumps(self.events, cPickle.HIGHEST_PROTOCOL)
+        except (cPickle.PicklingError, TypeError) as e:
+            log.debug("Unable to send parsed records: %s", e)
+            return False
+        self._write(data)
+        self.events = []
+        return True
+
+    def finish(self):
+        """
+        Send the remaining callbacks and tell the driver the worker is done,
+        or that it has to parse the rest of the file if they can't be sent.
+        """
+        if self.send():
+            self._write(cPickle.dumps([(self.DONE, ())], cPickle.HIGHEST_PROTOCOL))
+        else:
+            self._write(cPickle.dumps([(self.IN_PROCESS, ())], cPickle.HIGHEST_PROTOCOL))
+
+    def _write(self, data):
+        """
+        Write a length prefixed batch and flush it so the driver can read it
+        """
+        self._spool.write(struct.pack(SPOOL_LENGTH_FORMAT, len(data)) + data)
+        self._spool.flush()
+
+    @staticmethod
+    def read_batch(spool):
+        """
+        Read the next batch written to a spool file
+        @param spool The spool file, opened separately from the worker's
+        @retval list of recorded callbacks, None if the next batch isn't
+        completely written yet
+        """
+        position = spool.tell()
+        header = spool.read(SPOOL_LENGTH_SIZE)
+        if len(header) == SPOOL_LENGTH_SIZE:
+            (length, ) = struct.unpack(SPOOL_LENGTH_FORMAT, header)
+            data = spool.read(length)
+            if len(data) == length:
+                return cPickle.loads(data)
+        spool.seek(position)
+        return None
+
+    def _exception_record(self, exception):
+        msg = getattr(exception, 'msg', None)
+        if msg is None:
+            msg = str(exception)
+        return (exception.__class__, msg)
+
+    @staticmethod
+    def build_exception(record):
+        (exception_class, msg) = record
+        try:
+            return exception_class(msg)
+        except Exception:
+            return SampleException(msg)
 
 class DataSetDriver(object):
     """
@@ -139,6 +276,7 @@ class DataSetDriver(object):
             'pattern': '*.txt',
             'frequency': 1,
             'file_mod_wait_time': 30,
+            'ingestion_processes': 1,
         },
         'parser': {}
         'driver': {
@@ -453,9 +591,7 @@ class DataSetDriver(object):
         to the payload of the event.
         """
         s = os.stat(name)
-        checksum = ""
-        with open(name, 'rb') as filehandle:
-            checksum = hashlib.md5(filehandle.read()).hexdigest()
+        checksum = file_checksum(name)
 
         stats = {
             'name': name,
@@ -540,6 +676,9 @@ class SimpleDataSetDriver(DataSetDriver):
             #    errors.append("harvester config missing 'storage_directory")
             if not self._harvester_config.get(DataSetDriverConfigKeys.PATTERN):
                 errors.append("harvester config missing 'pattern")
+            self._ingestion_processes = self._harvester_config.get(DataSetDriverConfigKeys.INGESTION_PROCESSES, 1)
+            if not isinstance(self._ingestion_processes, int) or self._ingestion_processes < 1:
+                errors.append("harvester config 'ingestion_processes' must be a positive integer")
         else:
             errors.append("missing 'harvester' config")
 
@@ -559,7 +698,10 @@ class SimpleDataSetDriver(DataSetDriver):
         log.trace("Checking for new files in queue, count: %d", count)
         if(count > 0):
             log.debug("New file detected, resource_id: %s, array addr: %s", self._resource_id, id(self._new_file_queue))
-            self._got_file(self._new_file_queue.pop(0))
+            if self._ingestion_processes > 1:
+                self._got_files()
+            else:
+                self._got_file(self._new_file_queue.pop(0))
 
     def _stage_input_file(self, path):
         """
@@ -635,26 +777,200 @@ class SimpleDataSetDriver(DataSetDriver):
             path = os.path.join(directory, file_name)
 
             self._raise_new_file_event(path)
-            log.debug("Open new data source file: %s", path)
-            handle = open(path)
+            self._parse_file(file_name, path, count, delay)
 
-            # the file directory is initialized in the harvester, so it will exist by this point
-            parser = self._build_parser(self._driver_state[file_name][DriverStateKey.PARSER_STATE], handle)
+        except SampleException as e:
+            # need to mark the bad file as ingested so we don't re-ingest it
+            self._save_parser_state_after_error()
+            self._sample_exception_callback(e)
 
-            while(True):
-                result = parser.get_records(count)
-                if result:
-                    log.trace("Record parsed: %r delay: %f", result, delay)
-                    if delay:
-                        gevent.sleep(delay)
-                else:
+        finally:
+            self._file_in_process = None
+
+    def _parse_file(self, file_name, path, count, delay):
+        """
+        Parse a file from its saved parser state, publishing the records as they are parsed
+        @param file_name file name key in the driver state
+        @param path full path of the file
+        @param count number of records to get from the parser at a time
+        @param delay seconds to wait between getting records, None for no wait
+        """
+        log.debug("Open new data source file: %s", path)
+        handle = open(path)
+
+        # the file directory is initialized in the harvester, so it will exist by this point
+        parser = self._build_parser(self._driver_state[file_name][DriverStateKey.PARSER_STATE], handle)
+
+        while(True):
+            result = parser.get_records(count)
+            if result:
+                log.trace("Record parsed: %r delay: %f", result, delay)
+                if delay:
+                    gevent.sleep(delay)
+            else:
+                break
+
+    def _got_files(self):
+        """
+        Parse up to ingestion_processes files from the new file queue at once, each in
+        its own worker process.  The parser callbacks made by each worker are replayed
+        here in queue order, so particles are published and the parser state is saved
+        exactly as if the files had been parsed one after another.  Each worker writes
+        its callbacks to a spool file a batch of records at a time, so workers keep parsing
+        while the driver replays earlier files and memory use doesn't depend on the file
+        size.
+        """
+        file_names = self._new_file_queue[:self._ingestion_processes]
+        log.debug("Ingesting %d files in parallel, resource_id: %s", len(file_names), self._resource_id)
+
+        directory = self._harvester_config.get(DataSetDriverConfigKeys.DIRECTORY)
+        workers = []
+        try:
+            for file_name in file_names:
+                workers.append(self._start_ingestion_worker(os.path.join(directory, file_name), file_name))
+
+            for (file_name, worker) in zip(file_names, workers):
+                path = os.path.join(directory, file_name)
+                # files stay queued until they are replayed, so if one fails the files
+                # after it are parsed again on the next poll rather than lost
+                try:
+                    self._raise_new_file_event(path)
+                    if not self._replay_parsed_file(file_name, *worker):
+                        log.warn("Records parsed from %s can't be sent by the ingestion worker, parsing in process",
+                                 file_name)
+                        self._parse_file_in_process(file_name, path)
+                finally:
+                    self._new_file_queue.remove(file_name)
+        finally:
+            # stopping sampling kills the publisher thread while we wait, don't leave workers behind
+            for (process, spool) in workers:
+                if process.is_alive():
+                    process.terminate()
+                spool.close()
+
+    def _start_ingestion_worker(self, path, file_name):
+        """
+        Fork a process to parse a file
+        @param path full path of the file to parse
+        @param file_name file name key in the driver state
+        @retval (process, spool file to read the recorded callbacks from)
+        """
+        # the spool is removed once both ends are open, so it goes away with them
+        (spool_fd, spool_path) = tempfile.mkstemp(prefix='ingestion_')
+        writer = os.fdopen(spool_fd, 'wb')
+        reader = open(spool_path, 'rb')
+        os.remove(spool_path)
+
+        parser_state = self._driver_state[file_name][DriverStateKey.PARSER_STATE]
+        process = multiprocessing.Process(target=self._ingestion_worker, args=(path, parser_state, writer))
+        process.daemon = True
+        process.start()
+        writer.close()
+        return (process, reader)
+
+    def _ingestion_worker(self, path, parser_state, spool):
+        """
+        Runs in the worker process.  Parse the whole file, recording rather than making
+        the driver callbacks, and write the recording to the spool file after each batch
+        of records.  Stops if a batch can't be pickled, the driver then parses the rest
+        of the file from the last parser state it was sent.
+        """
+        recorder = ParsedFileRecorder(spool)
+        self._data_callback = recorder.publish
+        self._save_parser_state = recorder.save_parser_state
+        self._exception_callback = recorder.exception
+        self._sample_exception_callback = recorder.sample_exception
+
+        count = 1
+        if self._generate_particle_count:
+            count = self._generate_particle_count
+
+        try:
+            parser = self._build_parser(parser_state, open(path))
+            while parser.get_records(count):
+                recorder.end_batch()
+                if not recorder.send():
                     break
+        except SampleException as e:
+            recorder.parse_error(e)
+        except Exception:
+            recorder.failure(traceback.format_exc())
+
+        recorder.finish()
+        spool.close()
+
+    def _wait_for_ingestion_worker(self, file_name, process, spool):
+        """
+        Wait, without blocking other greenlets, for the next batch from a worker
+        @retval list of recorded parser callbacks
+        @throws DatasetParserException if the worker died without finishing
+        """
+        while True:
+            # check the worker before reading so a batch written just before it exited isn't missed
+            alive = process.is_alive()
+            events = ParsedFileRecorder.read_batch(spool)
+            if events is not None:
+                return events
+            if not alive:
+                process.join()
+                raise DatasetParserException("Ingestion worker for %s exited with code %s" %
+                                             (file_name, process.exitcode))
+            gevent.sleep(INGESTION_WORKER_POLL_INTERVAL)
+
+    def _replay_parsed_file(self, file_name, process, spool):
+        """
+        Make the parser callbacks recorded by an ingestion worker as they arrive,
+        pausing between batches of records the same way _got_file does.
+        @retval True if the worker parsed the whole file, False if the rest of the
+        file must be parsed in process
+        """
+        delay = None
+        if self._generate_particle_count:
+            delay = float(1) / float(self._particle_count_per_second) * float(self._generate_particle_count)
+
+        self._file_in_process = file_name
+        try:
+            while True:
+                for (callback, args) in self._wait_for_ingestion_worker(file_name, process, spool):
+                    if callback in (ParsedFileRecorder.DONE, ParsedFileRecorder.IN_PROCESS):
+                        process.join()
+                        return callback == ParsedFileRecorder.DONE
+                    self._replay_callback(file_name, callback, args, delay)
+        finally:
+            self._file_in_process = None
+
+    def _replay_callback(self, file_name, callback, args, delay):
+        """
+        Make one parser callback recorded by an ingestion worker
+        """
+        if callback == ParsedFileRecorder.END_BATCH:
+            if delay:
+                gevent.sleep(delay)
+        elif callback == ParsedFileRecorder.FAILURE:
+            raise DatasetParserException("Failed to parse %s: %s" % (file_name, args))
+        elif callback in ParsedFileRecorder.EXCEPTION_CALLBACKS:
+            getattr(self, callback)(ParsedFileRecorder.build_exception(args))
+        else:
+            getattr(self, callback)(*args)
+
+    def _parse_file_in_process(self, file_name, path):
+        """
+        Parse the rest of a file an ingestion worker couldn't send, from the last
+        parser state it sent
+        """
+        count = 1
+        delay = None
+        if self._generate_particle_count:
+            delay = float(1) / float(self._particle_count_per_second) * float(self._generate_particle_count)
+            count = self._generate_particle_count
 
+        self._file_in_process = file_name
+        try:
+            self._parse_file(file_name, path, count, delay)
         except SampleException as e:
             # need to mark the bad file as ingested so we don't re-ingest it
             self._save_parser_state_after_error()
             self._sample_exception_callback(e)
-
         finally:
             self._file_in_process = None
 
@@ -710,8 +1026,7 @@ class SimpleDataSetDriver(DataSetDriver):
             full_file_path = os.path.join(self._harvester_config[DataSetDriverConfigKeys.DIRECTORY], file_name)
             mod_time = os.path.getmtime(full_file_path)
             file_size = os.path.getsize(full_file_path)
-            with open(full_file_path, 'rb') as filehandle:
-                md5_checksum = hashlib.md5(filehandle.read()).hexdigest()
+            md5_checksum = file_checksum(full_file_path)
             self._driver_state[file_name] = {
                 DriverStateKey.FILE_SIZE: file_size,
                 DriverStateKey.FILE_MOD_DATE: mod_time,
@@ -918,10 +1233,19 @@ class MultipleHarvesterDataSetDriver(SimpleDataSetDriver):
         @param data_keys A list of keys, one for each harvester/parser pair to start
         @param harvester_type Optional dictionary of data keys associated with a harvester type.  If any single file
                               harvesters are in use, this must be specified, otherwise it defaults to directory harvesters.
+                              Inotify is selected in the harvester config of a directory harvester, not here.
+        @throws DatasetHarvesterException if the harvester type is not a dictionary of directory or single file types
         """
         self._data_keys = data_keys
         if harvester_type != None and not isinstance(harvester_type, dict):
             raise DatasetHarvesterException("Harvester type must be a dictionary, got harvester type %s" % harvester_type)
+        if harvester_type != None:
+            for (key, value) in harvester_type.iteritems():
+                if value == HarvesterType.INOTIFY_DIRECTORY:
+                    raise DatasetHarvesterException("Set %s to %s in the %s harvester config to use inotify" %
+                                                    (DataSetDriverConfigKeys.HARVESTER_TYPE, value, key))
+                if value not in (HarvesterType.SINGLE_DIRECTORY, HarvesterType.SINGLE_FILE):
+                    raise DatasetHarvesterException("Invalid harvester type %s for %s" % (value, key))
         self._harvester_type = harvester_type
 
         super(MultipleHarvesterDataSetDriver, self).__init__(config, memento, data_callback, state_callback, event_callback,
@@ -1252,8 +1576,7 @@ class MultipleHarvesterDataSetDriver(SimpleDataSetDriver):
             full_file_path = os.path.join(self._harvester_config[data_key][DataSetDriverConfigKeys.DIRECTORY], file_name)
             mod_time = os.path.getmtime(full_file_path)
             file_size = os.path.getsize(full_file_path)
-            with open(full_file_path, 'rb') as filehandle:
-                md5_checksum = hashlib.md5(filehandle.read()).hexdigest()
+            md5_checksum = file_checksum(full_file_path)
             self._driver_state[data_key][file_name] = {
                 DriverStateKey.FILE_SIZE: file_size,
                 DriverStateKey.FILE_MOD_DATE: mod_time,
@@ -1302,6 +1625,9 @@ class MultipleHarvesterDataSetDriver(SimpleDataSetDriver):
                     errors.append("harvester %s config missing 'directory" % key)
                 if not sub_config.get(DataSetDriverConfigKeys.PATTERN):
                     errors.append("harvester %s config missing 'pattern" % key)
+                # files are parsed in process, one data key at a time
+                if sub_config.get(DataSetDriverConfigKeys.INGESTION_PROCESSES, 1) != 1:
+                    errors.append("harvester %s config 'ingestion_processes' is not supported" % key)
         else:
             errors.append("missing 'harvester' config")
 
@@ -11,8 +11,14 @@ out of files and feed them into the system.
 __author__ = 'Steve Foley'
 __license__ = 'Apache 2.0'
 
+import os
 import time
+import mmap
+import Queue
 import ntplib
+import numpy
+import threading
+from collections import deque
 
 from mi.core.log import get_logger
 log = get_logger()
@@ -22,6 +28,15 @@ from mi.core.exceptions import RecoverableSampleException, SampleEncodingExcepti
 from mi.core.exceptions import NotImplementedException, UnexpectedDataException
 from mi.dataset.dataset_driver import DataSetDriverConfigKeys
 
+# Size of the first block a BufferLoadingParser reads
+DEFAULT_READ_BLOCK_SIZE = 1024
+
+# Each block read doubles in size up to this size
+DEFAULT_MAX_READ_BLOCK_SIZE = 4 * 1024 * 1024
+
+# seconds between checks for a stopped readahead while waiting on its queue
+READAHEAD_POLL_INTERVAL = 0.1
+
 
 class Parser(object):
     """ abstract class to show API needed for plugin poller objects """
@@ -150,8 +165,27 @@ class BufferLoadingParser(Parser):
     records from this buffer as they are requested. Parsers dont have
     to operate this way, but it can keep memory in check and smooth out
     stream inputs if they dont all come at once.
+
+    The record buffer holds (particle, state marker) tuples.  The marker
+    can be a copy of the state dictionary, or something smaller such as
+    the file position, in which case the parser overrides _build_state
+    to turn the marker of the last record handed out into the state.
+
+    The file is read in blocks starting at the read block size and doubling
+    with each read up to the max read block size, so large files are read in
+    a few large blocks instead of many small ones.  The sizes can be set per
+    parser class or in the parser config, and a readahead thread can read the
+    next blocks while the parser works on the current one.  Readahead should
+    only be turned on for parsers that read the file through get_block or
+    _read_block while loading the particle buffer.
     """
 
+    # block sizes and number of blocks read ahead, 0 for no readahead,
+    # unless set in the config
+    read_block_size = DEFAULT_READ_BLOCK_SIZE
+    max_read_block_size = DEFAULT_MAX_READ_BLOCK_SIZE
+    readahead_blocks = 0
+
     def __init__(self, config, stream_handle, state, sieve_fn,
                  state_callback, publish_callback, exception_callback=None):
         """
@@ -171,15 +205,32 @@ class BufferLoadingParser(Parser):
            ultimately from the agent) where we send our error events to
            be published into ION
         """
-        self._record_buffer = []
+        self._record_buffer = deque()
         self._timestamp = 0.0
         self.file_complete = False
+        self._configure_reads(config)
 
         super(BufferLoadingParser, self).__init__(config, stream_handle, state,
                                                   sieve_fn, state_callback,
                                                   publish_callback,
                                                   exception_callback)
 
+    def _configure_reads(self, config):
+        """
+        Set the block sizes and readahead from the config, keeping the class
+        values for any that aren't set
+        @param config The parser configuration
+        """
+        self.read_block_size = config.get(DataSetDriverConfigKeys.READ_BLOCK_SIZE,
+                                          self.read_block_size)
+        self.max_read_block_size = config.get(DataSetDriverConfigKeys.MAX_READ_BLOCK_SIZE,
+                                              self.max_read_block_size)
+        self.readahead_blocks = config.get(DataSetDriverConfigKeys.READAHEAD_BLOCKS,
+                                           self.readahead_blocks)
+        self._read_sizes = self._block_sizes()
+        self._last_read_size = None
+        self._readahead = None
+
     def get_records(self, num_records):
         """
         Go ahead and execute the data parsing loop up to a point. This involves
@@ -228,14 +279,13 @@ class BufferLoadingParser(Parser):
                   num_records)
 
         return_list = []
-        records_to_return = self._record_buffer[:num_to_fetch]
-        self._record_buffer = self._record_buffer[num_to_fetch:]
-        if len(records_to_return) > 0:
-            self._state = records_to_return[-1][1]  # state side of tuple of last entry
-            # strip the state info off of them now that we have what we need
-            for item in records_to_return:
-                log.debug("Record to return: %s", item)
-                return_list.append(item[0])
+        if num_to_fetch > 0:
+            popleft = self._record_buffer.popleft
+            for i in xrange(num_to_fetch):
+                (particle, marker) = popleft()
+                return_list.append(particle)
+            # only the state after the last record is needed
+            self._state = self._build_state(marker)
             self._publish_sample(return_list)
             log.trace("Sending parser state [%s] to driver", self._state)
             file_ingested = False
@@ -246,24 +296,80 @@ class BufferLoadingParser(Parser):
 
         return return_list
 
+    def _build_state(self, marker):
+        """
+        Build the parser state from the marker saved with a record in the
+        record buffer.  Parsers saving copies of their state dictionary can
+        use this as is, parsers saving smaller markers override it.
+        @param marker The state marker saved with the record
+        @retval The state dictionary
+        """
+        return marker
+
     def _load_particle_buffer(self):
         """
         Load up the internal record buffer with some particles based on a
         gather from the get_block method.
         """
-        while self.get_block():
-            result = self.parse_chunks()
-            self._record_buffer.extend(result)
+        # start again from the read block size for each load
+        self._read_sizes = self._block_sizes()
+        if self.readahead_blocks > 0:
+            self._readahead = BlockReadahead(self._stream_handle, self._read_sizes,
+                                             self.readahead_blocks)
+        try:
+            while self.get_block():
+                result = self.parse_chunks()
+                self._record_buffer.extend(result)
+        finally:
+            self._stop_readahead()
+
+    def _block_sizes(self):
+        """
+        Generate the size of each block to read, doubling from the read block
+        size up to the max read block size
+        """
+        size = self.read_block_size
+        while True:
+            yield size
+            size = max(size, min(size * 2, self.max_read_block_size))
+
+    def _stop_readahead(self):
+        """
+        Stop the readahead thread, if one is running, leaving the file at
+        the first block the parser didn't read
+        """
+        if self._readahead is not None:
+            self._readahead.stop()
+            self._readahead = None
+
+    def _read_block(self, size=None):
+        """
+        Read the next block of the file, from the readahead thread if one is
+        running.  The size requested is kept in _last_read_size.
+        @param size The size of the block to read, None for the next size
+        @retval The data read, an empty string at the end of the file
+        """
+        if self._readahead is not None:
+            if size is None:
+                (self._last_read_size, data) = self._readahead.read()
+                return data
+            self._stop_readahead()
+
+        if size is None:
+            size = next(self._read_sizes)
+        self._last_read_size = size
+        return self._stream_handle.read(size)
 
-    def get_block(self, size=1024):
+    def get_block(self, size=None):
         """
         Get a block of characters for processing
-        @param size The size of the block to try to read
+        @param size The size of the block to try to read, None for the next
+            size from _block_sizes
         @retval The length of data retreived
         @throws EOFError when the end of the file is reached
         """
         # read in some more data
-        data = self._stream_handle.read(size)
+        data = self._read_block(size)
         if data:
             self._chunker.add_chunk(data, ntplib.system_to_ntp_time(time.time()))
             return len(data)
@@ -281,3 +387,280 @@ class BufferLoadingParser(Parser):
             nothing was parsed.
         """            
         raise NotImplementedException("Must write parse_chunks()!")
+
+
+class BlockReadahead(object):
+    """
+    Reads blocks of a file in a background thread, queueing up to a set
+    number of blocks ahead of the parser.  The end of the last block handed
+    to the parser is kept so the file can be put back there when the
+    readahead is stopped, whatever the thread had read by then.
+    """
+
+    def __init__(self, stream_handle, sizes, depth):
+        """
+        @param stream_handle The file to read, which the parser must not read
+            until the readahead is stopped
+        @param sizes An iterator of block sizes to read
+        @param depth The number of blocks to read ahead
+        """
+        self._stream_handle = stream_handle
+        self._sizes = sizes
+        # position of the first block not handed to the parser
+        self._next_position = stream_handle.tell()
+        self._queue = Queue.Queue(depth)
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='BlockReadahead')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self):
+        """
+        Read blocks until the end of the file or until stopped
+        """
+        try:
+            for size in self._sizes:
+                position = self._stream_handle.tell()
+                data = self._stream_handle.read(size)
+                if not self._put((position, size, data, None)) or not data:
+                    return
+        except Exception as e:
+            self._put((None, None, None, e))
+
+    def _put(self, item):
+        """
+        Queue an item, waiting for space until stopped
+        @retval True if the item was queued, False if stopped
+        """
+        while not self._stopped.is_set():
+            try:
+                self._queue.put(item, timeout=READAHEAD_POLL_INTERVAL)
+                return True
+            except Queue.Full:
+                pass
+        return False
+
+    def read(self):
+        """
+        Get the next block
+        @retval (size, data) with the size requested and the data read, data
+            is an empty string at the end of the file
+        @throws any exception raised reading the file
+        """
+        while True:
+            try:
+                (position, size, data, error) = self._queue.get(timeout=READAHEAD_POLL_INTERVAL)
+                break
+            except Queue.Empty:
+                if not self._thread.is_alive() and self._queue.empty():
+                    return (None, '')
+        if error is not None:
+            raise error
+        self._next_position = position + len(data)
+        return (size, data)
+
+    def stop(self):
+        """
+        Stop reading and seek the file back to the first block not handed to
+        the parser
+        """
+        self._stopped.set()
+        self._thread.join()
+        while True:
+            try:
+                self._queue.get_nowait()
+            except Queue.Empty:
+                break
+        self._stream_handle.seek(self._next_position)
+
+
+class RecordArrayParser(Parser):
+    """
+    This class parses binary files made of records that are found by their
+    position in the file rather than by matching their contents.  The rest of
+    the file is read in one go, memory mapped when the stream is a real file,
+    and indexed by the subclass, which can view runs of fixed size records as
+    NumPy record arrays and calculate all their timestamps at once.  The state
+    after each record is kept as its end position in the file, and particles
+    and state dictionaries are only built for the records handed out by
+    get_records.
+    """
+
+    def __init__(self, config, stream_handle, state, state_callback,
+                 publish_callback, exception_callback=None):
+        """
+        @param config The configuration parameters to feed into the parser
+        @param stream_handle An already open file-like filehandle
+        @param state The location in the file to start parsing from.
+           This reflects what has already been published.
+        @param state_callback The callback method from the agent driver
+           (ultimately the agent) to call back when a state needs to be
+           updated
+        @param publish_callback The callback from the agent driver (and
+           ultimately from the agent) where we send our sample particle to
+           be published into ION
+        @param exception_callback The callback from the agent driver (and
+           ultimately from the agent) where we send our error events to
+           be published into ION
+        """
+        # (particle, state) tuples handed out before the indexed records
+        self._record_buffer = deque()
+        self._data = None
+        self._data_start = 0
+        # file positions and NTP timestamps of the indexed records
+        self._starts = None
+        self._ends = None
+        self._timestamps = None
+        self._next_record = 0
+        self.file_complete = False
+
+        super(RecordArrayParser, self).__init__(config, stream_handle, state, None,
+                                                state_callback, publish_callback,
+                                                exception_callback)
+
+    def get_records(self, num_records):
+        """
+        Build, publish and return the next particles
+        @param num_records The number of records to gather
+        @retval Return the list of particles requested, [] if none available
+        """
+        if num_records <= 0:
+            return []
+        if self._starts is None:
+            self._load_records()
+
+        return_list = []
+        state = None
+        while self._record_buffer and len(return_list) < num_records:
+            (particle, state) = self._record_buffer.popleft()
+            return_list.append(particle)
+
+        last_record = None
+        num_indexed = len(self._starts)
+        while len(return_list) < num_records and self._next_record < num_indexed:
+            index = self._next_record
+            self._next_record += 1
+            particle = self._record_particle(index, self._record_data(index),
+                                             float(self._timestamps[index]))
+            if particle:
+                return_list.append(particle)
+                last_record = index
+
+        if return_list:
+            if last_record is not None:
+                state = self._record_state(last_record)
+            self._state = state
+            self._publish_sample(return_list)
+            log.trace("Sending parser state [%s] to driver", self._state)
+            file_ingested = not self._record_buffer and self._next_record >= num_indexed
+            self._state_callback(self._state, file_ingested)
+
+        if not self._record_buffer and self._next_record >= num_indexed:
+            self.close()
+
+        return return_list
+
+    def close(self):
+        """
+        Release the data read from the file, closing the memory map.  This is
+        done once every record has been handed out; records not handed out
+        yet are dropped, and set_state is needed to read the file again.
+        """
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._data = None
+        if self._starts is not None:
+            self._next_record = len(self._starts)
+
+    def _reset(self, position):
+        """
+        Drop the records read so far and read the file again from position
+        the next time records are requested
+        @param position The file position to read from
+        """
+        self.close()
+        self._record_buffer = deque()
+        self._starts = None
+        self._ends = None
+        self._timestamps = None
+        self._next_record = 0
+        self.file_complete = False
+        self._stream_handle.seek(position)
+
+    def _load_records(self):
+        """
+        Read the file from the current stream position to the end and index
+        the records in it
+        """
+        position = self._stream_handle.tell()
+        try:
+            size = os.fstat(self._stream_handle.fileno()).st_size
+        except (AttributeError, IOError, OSError):
+            size = None
+
+        if size:
+            self._data = mmap.mmap(self._stream_handle.fileno(), 0, access=mmap.ACCESS_READ)
+            self._data_start = 0
+            self._stream_handle.seek(0, os.SEEK_END)
+        else:
+            self._data = self._stream_handle.read()
+            self._data_start = position
+
+        (self._starts, self._ends, self._timestamps) = self._index_records(position)
+        self._next_record = 0
+        self.file_complete = True
+        log.debug("Indexed %d records from position %d", len(self._starts), position)
+
+    def _data_end(self):
+        """
+        @retval The file position of the end of the data read
+        """
+        return self._data_start + len(self._data)
+
+    def _record_view(self, dtype, position, count):
+        """
+        View records in the data read as a NumPy array without copying them
+        @param dtype NumPy dtype of one record
+        @param position file position of the first record
+        @param count number of records
+        """
+        return numpy.frombuffer(self._data, dtype, count, position - self._data_start)
+
+    def _raw_data(self, start, end):
+        """
+        @retval The data read between two file positions as a string
+        """
+        return self._data[start - self._data_start:end - self._data_start]
+
+    def _record_data(self, index):
+        """
+        @retval The raw data of an indexed record
+        """
+        return self._raw_data(int(self._starts[index]), int(self._ends[index]))
+
+    def _index_records(self, position):
+        """
+        Find the records in the data read from position to the end of the file
+        @param position The file position the data was read from
+        @retval tuple of NumPy arrays with the start and end file positions and
+            the NTP timestamps of the records
+        """
+        raise NotImplementedException("Must write _index_records()!")
+
+    def _record_particle(self, index, raw_data, timestamp):
+        """
+        Build the particle for an indexed record
+        @param index The index of the record
+        @param raw_data The raw data of the record
+        @param timestamp The NTP timestamp of the record
+        @retval The particle, or None if the record does not produce one
+        """
+        raise NotImplementedException("Must write _record_particle()!")
+
+    def _record_state(self, index):
+        """
+        Build the parser state after an indexed record
+        @param index The index of the record
+        @retval The state dictionary
+        """
+        raise NotImplementedException("Must write _record_state()!")
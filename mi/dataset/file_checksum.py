@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+
+"""
+@package mi.dataset.file_checksum
+@file mi/dataset/file_checksum.py
+@brief md5 checksums of harvested files.  Files are read in fixed size blocks
+    rather than all at once, and checksums are cached by path and verified
+    against the inode, size and modification time so a file is only read
+    again when it changes.  The cache holds a bounded number of files and
+    forgets the least recently checked ones first.
+"""
+
+__license__ = 'Apache 2.0'
+
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+
+from mi.core.log import get_logger ; log = get_logger()
+
+# Size of the blocks read when hashing a file
+CHECKSUM_BLOCK_SIZE = 1024 * 1024
+
+# Number of files whose checksums are cached
+CHECKSUM_CACHE_SIZE = 10000
+
+
+class _ChecksumEntry(object):
+    """
+    Cached checksum of a file
+    """
+    __slots__ = ('inode', 'size', 'mod_time', 'checksum')
+
+    def __init__(self, inode, size, mod_time, checksum):
+        self.inode = inode
+        self.size = size
+        self.mod_time = mod_time
+        self.checksum = checksum
+
+
+class FileChecksumCache(object):
+    """
+    Cache of file md5 checksums.  Safe to use from the harvester threads and
+    the driver.
+
+    A file is hashed again whenever its inode, size or modification time
+    changes.  Extending the hash of a file that grew would need the whole
+    previously hashed prefix to be read to prove it is unchanged, which costs
+    as much as hashing it again.
+    """
+    def __init__(self, block_size=CHECKSUM_BLOCK_SIZE, max_entries=CHECKSUM_CACHE_SIZE):
+        """
+        @param block_size size of the blocks read from the files
+        @param max_entries number of files whose checksums are kept
+        """
+        self._block_size = block_size
+        self._max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def seed(self, path, size, mod_time, checksum):
+        """
+        Add a checksum from persisted driver state.  The inode isn't known, it
+        is filled in the first time the file is checked with the same size and
+        modification time.
+        @param path path to the file
+        @param size file size the checksum was calculated at
+        @param mod_time file modification time the checksum was calculated at
+        @param checksum md5 hex digest
+        """
+        if not checksum:
+            return
+        path = os.path.abspath(path)
+        with self._lock:
+            if path not in self._entries:
+                self._store(path, _ChecksumEntry(None, size, mod_time, checksum))
+
+    def checksum(self, path):
+        """
+        Get the md5 checksum of a file
+        @param path path to the file
+        @retval md5 hex digest
+        @throws OSError, IOError if the file can't be read
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        with self._lock:
+            entry = self._entries.pop(path, None)
+            if entry is not None:
+                # re-insert to mark the file as the most recently checked
+                self._entries[path] = entry
+
+        if entry is not None and entry.size == stat.st_size and entry.mod_time == stat.st_mtime and \
+                entry.inode in (None, stat.st_ino):
+            entry.inode = stat.st_ino
+            return entry.checksum
+
+        md5 = hashlib.md5()
+        with open(path, 'rb') as filehandle:
+            self._update(md5, filehandle, stat.st_size)
+
+        entry = _ChecksumEntry(stat.st_ino, stat.st_size, stat.st_mtime, md5.hexdigest())
+        with self._lock:
+            self._store(path, entry)
+        return entry.checksum
+
+    def _store(self, path, entry):
+        """
+        Cache an entry as the most recently checked, dropping the least
+        recently checked entries past the cache size.  Must be called holding
+        the lock.
+        """
+        self._entries.pop(path, None)
+        self._entries[path] = entry
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    def _update(self, md5, filehandle, length):
+        """
+        Update a hash with the next length bytes of a file
+        """
+        while length > 0:
+            data = filehandle.read(min(self._block_size, length))
+            if not data:
+                break
+            md5.update(data)
+            length -= len(data)
+
+
+# checksum cache shared by the harvesters and drivers in this process
+_cache = FileChecksumCache()
+
+
+def file_checksum(path):
+    """
+    Get the md5 checksum of a file from the shared cache
+    @param path path to the file
+    @retval md5 hex digest
+    """
+    return _cache.checksum(path)
+
+
+def seed_file_checksum(path, size, mod_time, checksum):
+    """
+    Add a persisted checksum to the shared cache
+    """
+    _cache.seed(path, size, mod_time, checksum)
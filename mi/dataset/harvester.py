@@ -14,7 +14,7 @@ __license__ = 'Apache 2.0'
 
 import os
 import glob
-import hashlib
+import fnmatch
 import time
 import re
 
@@ -24,7 +24,9 @@ from gevent.event import Event
 from mi.core.log import get_logger ; log = get_logger()
 from mi.core.poller import DirectoryPoller, ConditionPoller
 from mi.core.common import BaseEnum
-from mi.dataset.dataset_driver import DriverStateKey
+from mi.core.inotify import InotifyWatch, IN_Q_OVERFLOW, WATCH_LOST_MASK
+from mi.dataset.dataset_driver import DriverStateKey, DataSetDriverConfigKeys, HarvesterType
+from mi.dataset.file_checksum import file_checksum, seed_file_checksum
 
 
 class Harvester(object):
@@ -51,6 +53,21 @@ class Harvester(object):
 # used to determine if we should do integer sorting of the files
 NUMBER_UNDERSCORE_MATCHER = re.compile(r'_\d')
 
+def seed_checksums(path, file_state):
+    """
+    Add the checksums stored in the state of a file to the shared checksum cache,
+    so files that haven't changed are not read again after a restart
+    @param path path to the file
+    @param file_state driver state for the file
+    """
+    # the modified state is newer, it takes precedence
+    for state in [file_state.get(DriverStateKey.MODIFIED_STATE), file_state]:
+        if isinstance(state, dict) and state.get(DriverStateKey.FILE_CHECKSUM):
+            seed_file_checksum(path,
+                               state.get(DriverStateKey.FILE_SIZE),
+                               state.get(DriverStateKey.FILE_MOD_DATE),
+                               state.get(DriverStateKey.FILE_CHECKSUM))
+
 class SingleDirectoryPoller(ConditionPoller):
     """
     Monitor a single directory to see if new files have appeared or if files have changed.
@@ -61,8 +78,11 @@ class SingleDirectoryPoller(ConditionPoller):
     @param callback - function to callback when a change in files has occured
     @param exception_callback - function to callback when an exception occurs
     @param interval - polling interval for checking this directory
+    @param use_inotify - only examine files reported by inotify rather than
+        every file in the directory, falls back to polling if inotify isn't available
     """
-    def __init__(self, config, memento, callback, exception_callback=None, interval=1, file_mod_wait=30):
+    def __init__(self, config, memento, callback, exception_callback=None, interval=1, file_mod_wait=30,
+                 use_inotify=False):
         log.debug("Initialize harvester with config: %s", config)
         directory = config.get('directory')
         wildcard = config.get('pattern')
@@ -74,6 +94,8 @@ class SingleDirectoryPoller(ConditionPoller):
         log.debug("Start directory poller path: %s, pattern: %s", directory, wildcard)
         self._found_file_state = memento
         # driver state is not a new instance of memento, it is the same here as in the driver
+        self._directory = directory
+        self._wildcard = wildcard
         self._path = directory + '/' + wildcard
         log.debug("Starting harvester with directory pattern: %s", self._path)
 
@@ -81,17 +103,40 @@ class SingleDirectoryPoller(ConditionPoller):
         # restarts, the queue is emptied so all files that have not been ingested can be added and sent again,
         # but this keeps the harvester from sending the same files over and over to not be put in the driver queue
         self.sent_to_driver_queue = []
+
+        # checksums from the driver state, so unchanged files aren't read again
+        for (file_name, file_state) in memento.iteritems():
+            if isinstance(file_state, dict):
+                seed_checksums(directory + '/' + file_name, file_state)
+
+        # With inotify only the files named in events, and files that were too recently modified to
+        # look at, are examined on each poll.  None means the whole directory needs to be scanned.
+        self._watch = None
+        self._pending_files = None
+        if use_inotify:
+            try:
+                self._watch = InotifyWatch(directory)
+            except OSError as e:
+                log.warn("Unable to watch %s with inotify, polling instead: %s", directory, e)
+
         super(SingleDirectoryPoller,self).__init__(self._check_for_files, callback,
                                                    exception_callback, interval)
 
+    def run(self):
+        try:
+            super(SingleDirectoryPoller, self).run()
+        finally:
+            if self._watch:
+                self._watch.close()
+
     def _check_for_files(self):
         """
         Find any new or modified files and update the harvester state
         """
-        filenames = []
-
-        if os.path.exists(os.path.dirname(self._path)):
-            filenames = glob.glob(self._path)
+        if self._watch is None:
+            filenames = self._scan_files()
+        else:
+            filenames = self._changed_files()
 
         # if there are underscores in the filename, sort by ascii rather than 
         if len(filenames) > 0:
@@ -102,55 +147,112 @@ class SingleDirectoryPoller(ConditionPoller):
 
         new_files = []
         modified_state = {}
+        waiting_files = set()
         # loop over all files in the directory and compare their state to that in the harvester state dictionary
         for i_file in filenames:
-            mod_time = os.path.getmtime(i_file)
-            # check if the file has not been modified in the last X seconds
-            if (mod_time + self.file_mod_wait) < time.time():
-                file_name = os.path.basename(i_file)
-                # find if this file already exists in the found files
-                if file_name in self._found_file_state and self._found_file_state[file_name][DriverStateKey.INGESTED]:
-                    # this file has been ingested (file size and date will only be available for ingested files)
-                    file_size = os.path.getsize(i_file)
-                    if self._found_file_state[file_name][DriverStateKey.FILE_SIZE] != file_size or \
-                    self._found_file_state[file_name][DriverStateKey.FILE_MOD_DATE] != mod_time:
-                       # this file has been ingested, but the file size and times don't match, confirm that
-                       # the checksum is different
-                        with open(i_file, 'rb') as filehandle:
-                            md5_checksum = hashlib.md5(filehandle.read()).hexdigest()
-                        if self._found_file_state[file_name][DriverStateKey.FILE_CHECKSUM] != md5_checksum:
-                            # ingested file has been modified!
-                            if DriverStateKey.MODIFIED_STATE in self._found_file_state[file_name]:
-                                # this file has been modified before
-                                old_state = self._found_file_state[file_name][DriverStateKey.MODIFIED_STATE]
-                                if old_state[DriverStateKey.FILE_SIZE] != file_size or \
-                                old_state[DriverStateKey.FILE_MOD_DATE] != mod_time or \
-                                old_state[DriverStateKey.FILE_CHECKSUM] != md5_checksum:
-                                    # this file has changed since its previous modification, update the
-                                    # modified state
-                                    modified_state[file_name] = {
-                                        DriverStateKey.FILE_SIZE: file_size,
-                                        DriverStateKey.FILE_MOD_DATE: mod_time,
-                                        DriverStateKey.FILE_CHECKSUM: md5_checksum,
-                                    }
-                            else:
-                                # this is the first time this file has been modified
-                                modified_state[file_name] = {
-                                    DriverStateKey.FILE_SIZE: file_size,
-                                    DriverStateKey.FILE_MOD_DATE: mod_time,
-                                    DriverStateKey.FILE_CHECKSUM: md5_checksum,
-                                }
-                else:
-                    # send all files that have not been ingested yet, but keep track in a queue so
-                    # duplicates are not sent
-                    if file_name not in self.sent_to_driver_queue:
-                        # only send this file once
-                        self.sent_to_driver_queue.append(file_name)
-                        new_files.append(file_name)
+            if not self._check_file(i_file, new_files, modified_state):
+                waiting_files.add(i_file)
+
+        if self._watch is not None:
+            self._pending_files = waiting_files
 
         log.debug('found new files: %r, modified_files: %r', new_files, modified_state)
         return (new_files, modified_state)
 
+    def _scan_files(self):
+        """
+        @retval list of all the files in the directory matching the pattern
+        """
+        if os.path.exists(os.path.dirname(self._path)):
+            return glob.glob(self._path)
+        return []
+
+    def _changed_files(self):
+        """
+        Read the inotify events since the last poll
+        @retval list of the files which need to be examined
+        """
+        events = self._watch.read_events()
+
+        if self._pending_files is None or any(mask & IN_Q_OVERFLOW for (mask, name) in events):
+            # first poll, or events were lost, look at every file
+            self._pending_files = set(self._scan_files())
+        else:
+            for (mask, name) in events:
+                if mask & WATCH_LOST_MASK and not name:
+                    log.warn("Lost inotify watch on %s, polling instead", self._directory)
+                    self._watch.close()
+                    self._watch = None
+                    return self._scan_files()
+
+                # glob doesn't match hidden files, don't either
+                if name and fnmatch.fnmatch(name, self._wildcard) and \
+                        (not name.startswith('.') or self._wildcard.startswith('.')):
+                    self._pending_files.add(self._directory + '/' + name)
+
+        return [i_file for i_file in self._pending_files if os.path.exists(i_file)]
+
+    def _check_file(self, i_file, new_files, modified_state):
+        """
+        Compare the state of a file to that in the harvester state dictionary
+        @param i_file path to the file
+        @param new_files list to add the name of the file to if it is new
+        @param modified_state dict to add the file state to if it is an ingested file
+            which has been modified
+        @retval False if the file was modified too recently to look at, True otherwise
+        """
+        try:
+            mod_time = os.path.getmtime(i_file)
+        except OSError:
+            # the file was removed
+            return True
+
+        # check if the file has not been modified in the last X seconds
+        if (mod_time + self.file_mod_wait) >= time.time():
+            return False
+
+        file_name = os.path.basename(i_file)
+        # find if this file already exists in the found files
+        if file_name in self._found_file_state and self._found_file_state[file_name][DriverStateKey.INGESTED]:
+            # this file has been ingested (file size and date will only be available for ingested files)
+            file_size = os.path.getsize(i_file)
+            if self._found_file_state[file_name][DriverStateKey.FILE_SIZE] != file_size or \
+            self._found_file_state[file_name][DriverStateKey.FILE_MOD_DATE] != mod_time:
+                # this file has been ingested, but the file size and times don't match, confirm that
+                # the checksum is different
+                md5_checksum = file_checksum(i_file)
+                if self._found_file_state[file_name][DriverStateKey.FILE_CHECKSUM] != md5_checksum:
+                    # ingested file has been modified!
+                    if DriverStateKey.MODIFIED_STATE in self._found_file_state[file_name]:
+                        # this file has been modified before
+                        old_state = self._found_file_state[file_name][DriverStateKey.MODIFIED_STATE]
+                        if old_state[DriverStateKey.FILE_SIZE] != file_size or \
+                        old_state[DriverStateKey.FILE_MOD_DATE] != mod_time or \
+                        old_state[DriverStateKey.FILE_CHECKSUM] != md5_checksum:
+                            # this file has changed since its previous modification, update the
+                            # modified state
+                            modified_state[file_name] = {
+                                DriverStateKey.FILE_SIZE: file_size,
+                                DriverStateKey.FILE_MOD_DATE: mod_time,
+                                DriverStateKey.FILE_CHECKSUM: md5_checksum,
+                            }
+                    else:
+                        # this is the first time this file has been modified
+                        modified_state[file_name] = {
+                            DriverStateKey.FILE_SIZE: file_size,
+                            DriverStateKey.FILE_MOD_DATE: mod_time,
+                            DriverStateKey.FILE_CHECKSUM: md5_checksum,
+                        }
+        else:
+            # send all files that have not been ingested yet, but keep track in a queue so
+            # duplicates are not sent
+            if file_name not in self.sent_to_driver_queue:
+                # only send this file once
+                self.sent_to_driver_queue.append(file_name)
+                new_files.append(file_name)
+
+        return True
+
     def sort_files(self, filenames):
         """
         Sorts files which have multiple indices separated by underscores in a file name.
@@ -199,6 +301,8 @@ class SingleDirectoryPoller(ConditionPoller):
 class SingleDirectoryHarvester(SingleDirectoryPoller, Harvester):
     """
     Poll a single directory looking for new files with the single directory poller.
+    Setting harvester_type to HarvesterType.INOTIFY_DIRECTORY in the config watches
+    the directory with inotify instead of examining every file on each poll.
     @param config - harvester configuration dictionary
     @param file_mod_wait - integer time to wait after files have been modified
     @param memento - previous harvester state dictionary
@@ -215,13 +319,17 @@ class SingleDirectoryHarvester(SingleDirectoryPoller, Harvester):
             raise TypeError("memento object must be a dict")
         self.callback = file_callback
         self.modified_callback = modified_callback
+        harvester_type = config.get(DataSetDriverConfigKeys.HARVESTER_TYPE, HarvesterType.SINGLE_DIRECTORY)
+        if harvester_type not in (HarvesterType.SINGLE_DIRECTORY, HarvesterType.INOTIFY_DIRECTORY):
+            raise ValueError("Invalid directory harvester type %s" % harvester_type)
         SingleDirectoryPoller.__init__(self,
                                     config,
                                     memento,
                                     self.on_new_files,
                                     exception_callback,
                                     config.get('frequency', 1),
-                                    config.get('file_mod_wait_time', 30))
+                                    config.get('file_mod_wait_time', 30),
+                                    harvester_type == HarvesterType.INOTIFY_DIRECTORY)
 
     def on_new_files(self, file_tuple):
         """
@@ -266,6 +374,7 @@ class SingleFilePoller(ConditionPoller):
                 DriverStateKey.FILE_MOD_DATE: memento[self._filename].get(DriverStateKey.FILE_MOD_DATE),
                 DriverStateKey.FILE_CHECKSUM: memento[self._filename].get(DriverStateKey.FILE_CHECKSUM)
             }
+            seed_checksums(self._path, memento[self._filename])
         else:
             self._found_file_state = {}
         log.debug("Start file poller path: %s, initial state: %s", self._path, self._found_file_state)
@@ -288,8 +397,7 @@ class SingleFilePoller(ConditionPoller):
                     if self._found_file_state[DriverStateKey.FILE_SIZE] != file_size or \
                         self._found_file_state[DriverStateKey.FILE_MOD_DATE] != mod_time:
                         # size or time is different, confirm with checksum
-                        with open(self._path, 'rb') as filehandle:
-                            md5_checksum = hashlib.md5(filehandle.read()).hexdigest()
+                        md5_checksum = file_checksum(self._path)
                         if self._found_file_state[DriverStateKey.FILE_CHECKSUM] != md5_checksum:
                             # file is different, update the state
                             self._found_file_state[DriverStateKey.FILE_SIZE] = file_size
@@ -305,8 +413,7 @@ class SingleFilePoller(ConditionPoller):
                             }
                 else:
                     # no driver state yet, first time opening this file
-                    with open(self._path, 'rb') as filehandle:
-                        md5_checksum = hashlib.md5(filehandle.read()).hexdigest()
+                    md5_checksum = file_checksum(self._path)
 
                     self._found_file_state[DriverStateKey.FILE_SIZE] = file_size
                     self._found_file_state[DriverStateKey.FILE_MOD_DATE] = mod_time
@@ -338,6 +445,9 @@ class SingleFileHarvester(SingleFilePoller, Harvester):
         if not isinstance(memento, dict):
             raise TypeError("memento object must be a dict")
         self.callback = file_callback
+        harvester_type = config.get(DataSetDriverConfigKeys.HARVESTER_TYPE, HarvesterType.SINGLE_FILE)
+        if harvester_type != HarvesterType.SINGLE_FILE:
+            raise ValueError("Invalid single file harvester type %s" % harvester_type)
         SingleFilePoller.__init__(self,
                                 config,
                                 memento,
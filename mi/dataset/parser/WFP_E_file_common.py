@@ -10,12 +10,15 @@ __author__ = 'Emily Hahn, Mike Nicoletti, Maria Lutz'
 __license__ = 'Apache 2.0'
 
 import re
+import struct
+import numpy
 
 from mi.core.log import get_logger
 log = get_logger()
 from mi.core.exceptions import SampleException, NotImplementedException, DatasetParserException
 from mi.core.common import BaseEnum
-from mi.dataset.dataset_parser import BufferLoadingParser
+from mi.core.time import unix_to_ntp_time_array
+from mi.dataset.dataset_parser import RecordArrayParser
 
 # This regex will be used to match the flags for one of the two bit patterns:
 #  0001 0000 0000 0000 0001 0001 0000 0000  (regex: \x00\x01\x00{7}\x01\x00\x01\x00{4})
@@ -59,12 +62,29 @@ SAMPLE_BYTES = 26
 STATUS_BYTES = 16
 STATUS_BYTES_AUGMENTED = 18
 
+# status records start with three 0xFF bytes and one of 0xFA to 0xFF, so read
+# as a big endian unsigned int their first four bytes are at least this
+STATUS_START_MIN = 0xFFFFFFFA
+
+# engineering data samples start with their timestamp
+SAMPLE_DTYPE = numpy.dtype([('timestamp', '>u4'), ('data', 'V%d' % (SAMPLE_BYTES - 4))])
+
 
 class StateKey(BaseEnum):
     POSITION = "position"
 
 
-class WfpEFileParser(BufferLoadingParser):
+class WfpEFileParser(RecordArrayParser):
+    """
+    Common parser for E files, a header followed by engineering data samples,
+    with profile status records between or after them.  Runs of samples are
+    read as NumPy record arrays to find the status records and the sample
+    timestamps.  Subclasses build the sample particles, and status records
+    are skipped unless the subclass builds particles for them too.
+    """
+
+    # set by subclasses that publish status records
+    publishes_status = False
 
     def __init__(self,
                  config,
@@ -75,12 +95,11 @@ class WfpEFileParser(BufferLoadingParser):
                  *args, **kwargs):
 
         self._timestamp = 0.0
-        self._record_buffer = []  # holds tuples of (record, state)
+        self._is_status = None
         self._read_state = {StateKey.POSITION: 0}
         super(WfpEFileParser, self).__init__(config,
                                              stream_handle,
                                              state,
-                                             self.sieve_function,
                                              state_callback,
                                              publish_callback,
                                              *args, **kwargs)
@@ -92,35 +111,6 @@ class WfpEFileParser(BufferLoadingParser):
         else:
             self._parse_header()
 
-    def sieve_function(self, raw_data):
-        """
-        Sort through the raw data to identify new blocks of data that need processing.
-        This is needed instead of a regex because blocks are identified by position
-        in this binary file.
-        """
-        data_index = 0
-        return_list = []
-        raw_data_len = len(raw_data)
-        remain_bytes = raw_data_len
-
-        while data_index < raw_data_len:
-
-            # check if this is a status or data sample message
-            if remain_bytes >= STATUS_BYTES and STATUS_START_MATCHER.match(raw_data[data_index:data_index+4]):
-                return_list.append((data_index, data_index + STATUS_BYTES))
-                data_index += STATUS_BYTES
-            elif remain_bytes >= SAMPLE_BYTES:
-                return_list.append((data_index, data_index + SAMPLE_BYTES))
-                data_index += SAMPLE_BYTES
-            else:
-                log.debug("not enough bytes to deal with")
-                break
-
-            remain_bytes = raw_data_len - data_index
-
-        log.debug("returning sieve list %s", return_list)
-        return return_list
-
     def set_state(self, state_obj):
         """
         initialize the state
@@ -130,11 +120,9 @@ class WfpEFileParser(BufferLoadingParser):
             raise DatasetParserException("Invalid state structure")
         if not (StateKey.POSITION in state_obj):
             raise DatasetParserException("Invalid state keys")
-        self._chunker.clean_all_chunks()
-        self._record_buffer = []
         self._state = state_obj
-        self._read_state = state_obj
-        self._stream_handle.seek(state_obj[StateKey.POSITION])
+        self._read_state = {StateKey.POSITION: state_obj[StateKey.POSITION]}
+        self._reset(state_obj[StateKey.POSITION])
 
     def _increment_state(self, increment):
         """
@@ -158,32 +146,84 @@ class WfpEFileParser(BufferLoadingParser):
         # update the state to show we have read the header
         self._increment_state(HEADER_BYTES)
 
-    def parse_record(self, record):
+    def extract_sample_particle(self, raw_data, timestamp):
         """
-        determine if this is a engineering or data record and parse
-        FLORT and PARAD can copy paste this and insert their own data particle class
-        needs extending for WFP_ENG
+        Build the particle for an engineering data sample, using the particle
+        class from the config.  Subclasses with other particle classes need
+        to override this.
+        @param raw_data the raw data of the sample
+        @param timestamp the sample timestamp in NTP64
         """
-        raise NotImplementedException("parse_record must be implemented")
+        return self._extract_sample(self._particle_class, None, raw_data, timestamp)
 
-    def parse_chunks(self):
+    def extract_status_particle(self, raw_data, timestamp):
         """
-        Parse out any pending data chunks in the chunker. If
-        it is a valid data piece, build a particle, update the position and
-        timestamp. Go until the chunker has no more valid data.
-        @retval a list of tuples with sample particles encountered in this
-            parsing, plus the state. An empty list of nothing was parsed.
+        Build the particle for a profile status record, need to override this
+        and set publishes_status to publish status records
+        @param raw_data the raw data of the status record
+        @param timestamp the profile stop time in NTP64
         """
-        result_particles = []
-        (timestamp, chunk, start, end) = self._chunker.get_next_data_with_index()
+        raise NotImplementedException("extract_status_particle must be implemented")
 
-        while chunk is not None:
-            result_particle = self.parse_record(chunk)
-            if result_particle:
-                result_particles.append(result_particle)
+    def _is_status_record(self, position):
+        """
+        Check if a status record starts at a file position
+        """
+        return STATUS_START_MATCHER.match(self._raw_data(position, position + 4)) is not None
 
-            (timestamp, chunk, start, end) = self._chunker.get_next_data_with_index()
-            self._chunker.get_next_non_data(clean=True)
+    def _index_records(self, position):
+        """
+        Walk forward through the data in runs of samples, up to the next
+        status record.  Any bytes after the last whole record are left alone.
+        @param position The file position the data was read from
+        @retval tuple of arrays of the record start and end positions and timestamps
+        """
+        end = self._data_end()
+        runs = []
+        while True:
+            num_samples = max(end - position, 0) // SAMPLE_BYTES
+            if num_samples:
+                samples = self._record_view(SAMPLE_DTYPE, position, num_samples)
+                status = numpy.flatnonzero(samples['timestamp'] >= STATUS_START_MIN)
+                if len(status):
+                    num_samples = int(status[0])
+                starts = position + SAMPLE_BYTES * numpy.arange(num_samples, dtype=numpy.int64)
+                runs.append((starts, starts + SAMPLE_BYTES,
+                             unix_to_ntp_time_array(samples['timestamp'][:num_samples]),
+                             numpy.zeros(num_samples, dtype=bool)))
+                position += SAMPLE_BYTES * num_samples
+
+            if end - position >= STATUS_BYTES and self._is_status_record(position):
+                if self.publishes_status:
+                    # status records are timestamped with the profile stop time
+                    stop_time = struct.unpack('>I', self._raw_data(position + 8, position + 12))[0]
+                    runs.append((numpy.array([position]), numpy.array([position + STATUS_BYTES]),
+                                 unix_to_ntp_time_array([stop_time]), numpy.ones(1, dtype=bool)))
+                position += STATUS_BYTES
+            else:
+                break
 
-        return result_particles
+        if end > position:
+            log.debug("%d bytes left after the last whole record", end - position)
+        if not runs:
+            self._is_status = numpy.zeros(0, dtype=bool)
+            return (numpy.zeros(0, dtype=numpy.int64), numpy.zeros(0, dtype=numpy.int64),
+                    numpy.zeros(0))
+        (starts, ends, timestamps, is_status) = [numpy.concatenate(column) for column in zip(*runs)]
+        self._is_status = is_status
+        return (starts, ends, timestamps)
+
+    def _record_particle(self, index, raw_data, timestamp):
+        """
+        Build the particle for a sample or status record
+        """
+        self._timestamp = timestamp
+        if self._is_status[index]:
+            return self.extract_status_particle(raw_data, timestamp)
+        return self.extract_sample_particle(raw_data, timestamp)
 
+    def _record_state(self, index):
+        """
+        Build the parser state after a record
+        """
+        return {StateKey.POSITION: int(self._ends[index])}
@@ -13,18 +13,20 @@ initial release
 __author__ = 'Jeff Roy'
 __license__ = 'Apache 2.0'
 
-import copy
 import datetime as dt
 import ntplib
 import re
 import struct
 
 from calendar import timegm
+from collections import deque
 
 from mi.core.log import get_logger
 
 log = get_logger()
 from mi.core.common import BaseEnum
+from mi.core.checksum import sum16
+from mi.core.pd0 import decode_velocity, decode_beam_bytes
 from mi.core.instrument.data_particle import \
     DataParticle, DataParticleKey, DataParticleValue
 from mi.core.exceptions import SampleException, RecoverableSampleException, \
@@ -52,9 +54,6 @@ ADCPS_BOTTOM_TRACK_BYTES = 85
 ADCPA_BOTTOM_TRACK_BYTES = 81
 CHECKSUM_BYTES = 2
 
-#used to verify 16 bit checksum
-CHECKSUM_MODULO = 65535
-
 #IDs of the different parts of the ensemble.
 FIXED_LEADER_ID = 0
 VARIABLE_LEADER_ID = 128
@@ -767,20 +766,8 @@ class AdcpPd0DataParticle(DataParticle):
         """
         Parse the velocity portion of the particle
         """
-        num_cells = self.num_depth_cells
-        offset = ID_BYTES
-
-        water_velocity_east = []
-        water_velocity_north = []
-        water_velocity_up = []
-        error_velocity = []
-        for row in range(0, num_cells):
-            (a, b, c, d) = struct.unpack_from('<4h', data, offset)
-            water_velocity_east.append(a)
-            water_velocity_north.append(b)
-            water_velocity_up.append(c)
-            error_velocity.append(d)
-            offset += VELOCITY_BYTES_PER_CELL
+        (water_velocity_east, water_velocity_north, water_velocity_up,
+         error_velocity) = decode_velocity(data, self.num_depth_cells)
 
         self.final_result.append(self._encode_value(AdcpPd0ParserDataParticleKey.WATER_VELOCITY_EAST,
                                                     water_velocity_east, list))
@@ -795,20 +782,8 @@ class AdcpPd0DataParticle(DataParticle):
         """
         Parse the correlation magnitude portion of the particle
         """
-        num_cells = self.num_depth_cells
-        offset = ID_BYTES
-
-        correlation_magnitude_beam1 = []
-        correlation_magnitude_beam2 = []
-        correlation_magnitude_beam3 = []
-        correlation_magnitude_beam4 = []
-        for row in range(0, num_cells):
-            (a, b, c, d) = struct.unpack_from('<4B', data, offset)
-            correlation_magnitude_beam1.append(a)
-            correlation_magnitude_beam2.append(b)
-            correlation_magnitude_beam3.append(c)
-            correlation_magnitude_beam4.append(d)
-            offset += CORRELATION_BYTES_PER_CELL
+        (correlation_magnitude_beam1, correlation_magnitude_beam2, correlation_magnitude_beam3,
+         correlation_magnitude_beam4) = decode_beam_bytes(data, self.num_depth_cells)
 
         self.final_result.append(self._encode_value(AdcpPd0ParserDataParticleKey.CORRELATION_MAGNITUDE_BEAM1,
                                                     correlation_magnitude_beam1, list))
@@ -823,20 +798,8 @@ class AdcpPd0DataParticle(DataParticle):
         """
         Parse the echo intensity portion of the particle
         """
-        num_cells = self.num_depth_cells
-        offset = ID_BYTES
-
-        echo_intesity_beam1 = []
-        echo_intesity_beam2 = []
-        echo_intesity_beam3 = []
-        echo_intesity_beam4 = []
-        for row in range(0, num_cells):
-            (a, b, c, d) = struct.unpack_from('<4B', data, offset)
-            echo_intesity_beam1.append(a)
-            echo_intesity_beam2.append(b)
-            echo_intesity_beam3.append(c)
-            echo_intesity_beam4.append(d)
-            offset += ECHO_INTENSITY_BYTES_PER_CELL
+        (echo_intesity_beam1, echo_intesity_beam2, echo_intesity_beam3,
+         echo_intesity_beam4) = decode_beam_bytes(data, self.num_depth_cells)
 
         self.final_result.append(self._encode_value(AdcpPd0ParserDataParticleKey.ECHO_INTENSITY_BEAM1,
                                                     echo_intesity_beam1, list))
@@ -851,22 +814,10 @@ class AdcpPd0DataParticle(DataParticle):
         """
         Parse the percent good portion of the particle
 
-        @throws RecoverableSampleException If there is a problem with sample creation
+        @throws SampleException If the data is too short for the number of depth cells
         """
-        num_cells = self.num_depth_cells
-        offset = ID_BYTES
-
-        percent_good_3beam = []
-        percent_transforms_reject = []
-        percent_bad_beams = []
-        percent_good_4beam = []
-        for row in range(0, num_cells):
-            (a, b, c, d) = struct.unpack_from('<4B', data, offset)
-            percent_good_3beam.append(a)
-            percent_transforms_reject.append(b)
-            percent_bad_beams.append(c)
-            percent_good_4beam.append(d)
-            offset += PERCENT_GOOD_BYTES_PER_CELL
+        (percent_good_3beam, percent_transforms_reject, percent_bad_beams,
+         percent_good_4beam) = decode_beam_bytes(data, self.num_depth_cells)
 
         self.final_result.append(self._encode_value(AdcpPd0ParserDataParticleKey.PERCENT_GOOD_3BEAM,
                                                     percent_good_3beam, list))
@@ -1057,7 +1008,7 @@ class AdcpPd0Parser(BufferLoadingParser):
         if not ((StateKey.POSITION in state_obj)):
             raise DatasetParserException("Invalid state keys")
 
-        self._record_buffer = []
+        self._record_buffer = deque()
         self._state = state_obj
         self._read_state = state_obj
         self._chunker.clean_all_chunks()
@@ -1071,6 +1022,12 @@ class AdcpPd0Parser(BufferLoadingParser):
         """
         self._read_state[StateKey.POSITION] += increment
 
+    def _build_state(self, position):
+        """
+        Build the parser state from the file position saved with a record
+        """
+        return {StateKey.POSITION: position}
+
     def parse_chunks(self):
         """
         Parse out any pending data chunks in the chunker. If
@@ -1092,7 +1049,7 @@ class AdcpPd0Parser(BufferLoadingParser):
             if sample:
                 # create particle
                 log.trace("Extracting sample chunk %s with read_state: %s", chunk, self._read_state)
-                result_particles.append((sample, copy.copy(self._read_state)))
+                result_particles.append((sample, self._read_state[StateKey.POSITION]))
 
             (nd_timestamp, non_data, non_start, non_end) = self._chunker.get_next_non_data_with_index(clean=False)
             (timestamp, chunk, start, end) = self._chunker.get_next_data_with_index()
@@ -1150,14 +1107,10 @@ class AdcpPd0Parser(BufferLoadingParser):
             if record_end <= len(input_buffer[0: -CHECKSUM_BYTES]):
                 #make sure the checksum bytes are in the buffer too
 
-                total = 0
-                for i in range(record_start, record_end):
-                    total += ord(input_buffer[i])
-                #add up all the bytes in the record
-
-                checksum = total & CHECKSUM_MODULO  # bitwise and with 65535 or mod vs 65536
+                checksum = sum16(input_buffer[record_start:record_end])
+                #add up all the bytes in the record, modulo 65536
 
-                #log.debug("sieve checksum & total = %d %d ", checksum, total)
+                #log.debug("sieve checksum = %d", checksum)
 
                 if checksum == struct.unpack("<H", input_buffer[record_end: record_end + CHECKSUM_BYTES])[0]:
                     #verify the checksum
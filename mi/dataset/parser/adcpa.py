@@ -26,9 +26,12 @@ import re
 from calendar import timegm
 from functools import partial
 from struct import unpack
+from collections import deque
 
 from mi.core.log import get_logger
 from mi.core.common import BaseEnum
+from mi.core.checksum import sum16
+from mi.core.pd0 import decode_velocity, decode_beam_bytes
 from mi.core.exceptions import SampleException, DatasetParserException
 from mi.core.instrument.chunker import StringChunker
 from mi.core.instrument.data_particle import DataParticle, DataParticleKey
@@ -285,11 +288,7 @@ class ADCPA_PD0_PARSED_DataParticle(DataParticle):
         data = str(self.raw_data)
 
         # Calculate the checksum
-        total = int(0)
-        for i in range(0, length):
-            total += int(ord(data[i]))
-
-        checksum = total & 65535    # bitwise and with 65535 or mod vs 65536
+        checksum = sum16(data[0:length])
 
         if checksum != unpack("<H", self.raw_data[length: length+2])[0]:
             log.debug("Checksum mismatch " + str(checksum) + " != "
@@ -666,9 +665,6 @@ class ADCPA_PD0_PARSED_DataParticle(DataParticle):
 
         @throws SampleException If there is a problem with sample creation
         """
-        N = (len(chunk) - 2) / 2 / 4
-        offset = 0
-
         velocity_data_id = unpack("<H", chunk[0:2])[0]
         if 256 != velocity_data_id:
             raise SampleException("velocity_data_id was not equal to 256")
@@ -676,17 +672,8 @@ class ADCPA_PD0_PARSED_DataParticle(DataParticle):
         self.final_result.append({DataParticleKey.VALUE_ID: ADCPA_PD0_PARSED_KEY.VELOCITY_DATA_ID,
                                   DataParticleKey.VALUE: velocity_data_id})
 
-        water_velocity_east = []
-        water_velocity_north = []
-        water_velocity_up = []
-        error_velocity = []
-        for row in range(0, N):
-            (a, b, c, d) = unpack('<hhhh', chunk[offset + 2: offset + 10])
-            water_velocity_east.append(a)
-            water_velocity_north.append(b)
-            water_velocity_up.append(c)
-            error_velocity.append(d)
-            offset += 4 * 2
+        (water_velocity_east, water_velocity_north, water_velocity_up,
+         error_velocity) = decode_velocity(chunk)
         self.final_result.append({DataParticleKey.VALUE_ID: ADCPA_PD0_PARSED_KEY.WATER_VELOCITY_EAST,
                                   DataParticleKey.VALUE: water_velocity_east})
         self.final_result.append({DataParticleKey.VALUE_ID: ADCPA_PD0_PARSED_KEY.WATER_VELOCITY_NORTH,
@@ -702,9 +689,6 @@ class ADCPA_PD0_PARSED_DataParticle(DataParticle):
 
         @throws SampleException If there is a problem with sample creation
         """
-        N = (len(chunk) - 2) / 4
-        offset = 0
-
         correlation_magnitude_id = unpack("<H", chunk[0:2])[0]
         if 512 != correlation_magnitude_id:
             raise SampleException("correlation_magnitude_id was not equal to 512")
@@ -712,17 +696,8 @@ class ADCPA_PD0_PARSED_DataParticle(DataParticle):
         self.final_result.append({DataParticleKey.VALUE_ID: ADCPA_PD0_PARSED_KEY.CORRELATION_MAGNITUDE_ID,
                                   DataParticleKey.VALUE: correlation_magnitude_id})
 
-        correlation_magnitude_beam1 = []
-        correlation_magnitude_beam2 = []
-        correlation_magnitude_beam3 = []
-        correlation_magnitude_beam4 = []
-        for row in range(0, N):
-            (a, b, c, d) = unpack('<BBBB', chunk[offset + 2: offset + 6])
-            correlation_magnitude_beam1.append(a)
-            correlation_magnitude_beam2.append(b)
-            correlation_magnitude_beam3.append(c)
-            correlation_magnitude_beam4.append(d)
-            offset += 4
+        (correlation_magnitude_beam1, correlation_magnitude_beam2, correlation_magnitude_beam3,
+         correlation_magnitude_beam4) = decode_beam_bytes(chunk)
 
         self.final_result.append({DataParticleKey.VALUE_ID: ADCPA_PD0_PARSED_KEY.CORRELATION_MAGNITUDE_BEAM1,
                                   DataParticleKey.VALUE: correlation_magnitude_beam1})
@@ -739,26 +714,14 @@ class ADCPA_PD0_PARSED_DataParticle(DataParticle):
 
         @throws SampleException If there is a problem with sample creation
         """
-        N = (len(chunk) - 2) / 4
-        offset = 0
-
         echo_intensity_id = unpack("<H", chunk[0:2])[0]
         if 768 != echo_intensity_id:
             raise SampleException("echo_intensity_id was not equal to 768")
         self.final_result.append({DataParticleKey.VALUE_ID: ADCPA_PD0_PARSED_KEY.ECHO_INTENSITY_ID,
                                   DataParticleKey.VALUE: echo_intensity_id})
 
-        echo_intesity_beam1 = []
-        echo_intesity_beam2 = []
-        echo_intesity_beam3 = []
-        echo_intesity_beam4 = []
-        for row in range(0, N):
-            (a, b, c, d) = unpack('<BBBB', chunk[offset + 2: offset + 6])
-            echo_intesity_beam1.append(a)
-            echo_intesity_beam2.append(b)
-            echo_intesity_beam3.append(c)
-            echo_intesity_beam4.append(d)
-            offset += 4
+        (echo_intesity_beam1, echo_intesity_beam2, echo_intesity_beam3,
+         echo_intesity_beam4) = decode_beam_bytes(chunk)
 
         self.final_result.append({DataParticleKey.VALUE_ID: ADCPA_PD0_PARSED_KEY.ECHO_INTENSITY_BEAM1,
                                   DataParticleKey.VALUE: echo_intesity_beam1})
@@ -775,9 +738,6 @@ class ADCPA_PD0_PARSED_DataParticle(DataParticle):
 
         @throws SampleException If there is a problem with sample creation
         """
-        N = (len(chunk) - 2) / 4
-        offset = 0
-
         percent_good_id = unpack("<H", chunk[0:2])[0]
         if 1024 != percent_good_id:
             raise SampleException("percent_good_id was not equal to 1024")
@@ -785,17 +745,9 @@ class ADCPA_PD0_PARSED_DataParticle(DataParticle):
         self.final_result.append({DataParticleKey.VALUE_ID: ADCPA_PD0_PARSED_KEY.PERCENT_GOOD_ID,
                                   DataParticleKey.VALUE: percent_good_id})
 
-        percent_good_3beam = []
-        percent_transforms_reject = []
-        percent_bad_beams = []
-        percent_good_4beam = []
-        for row in range(0, N):
-            (a, b, c, d) = unpack('<BBBB', chunk[offset + 2: offset + 6])
-            percent_good_3beam.append(a)
-            percent_transforms_reject.append(b)
-            percent_bad_beams.append(c)
-            percent_good_4beam.append(d)
-            offset += 4
+        (percent_good_3beam, percent_transforms_reject, percent_bad_beams,
+         percent_good_4beam) = decode_beam_bytes(chunk)
+
         self.final_result.append({DataParticleKey.VALUE_ID: ADCPA_PD0_PARSED_KEY.PERCENT_GOOD_3BEAM,
                                   DataParticleKey.VALUE: percent_good_3beam})
         self.final_result.append({DataParticleKey.VALUE_ID: ADCPA_PD0_PARSED_KEY.PERCENT_TRANSFORMS_REJECT,
@@ -973,7 +925,7 @@ class AdcpaParser(BufferLoadingParser):
                                           *args,
                                           **kwargs)
         self._timestamp = 0.0
-        self._record_buffer = []  # holds tuples of (record, state)
+        self._record_buffer = deque()  # holds tuples of (record, state)
         self._read_state = {StateKey.POSITION: 0}
         if state:
             self.set_state(self._state)
@@ -992,7 +944,7 @@ class AdcpaParser(BufferLoadingParser):
         if not StateKey.POSITION in state_obj:
             raise DatasetParserException("Invalid state keys")
 
-        self._record_buffer = []
+        self._record_buffer = deque()
         self._state = state_obj
         self._read_state = state_obj
 
@@ -1021,7 +973,7 @@ class AdcpaParser(BufferLoadingParser):
         @throws EOFError when the end of the file is reached
         """
         # read in some more data
-        data = self._stream_handle.read()
+        data = ''.join(iter(self._read_block, ''))
         if data:
             self._chunker.add_chunk(data, self._timestamp)
             return len(data)
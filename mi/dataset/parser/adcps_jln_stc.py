@@ -21,6 +21,7 @@ import time
 import binascii
 import calendar
 from dateutil import parser
+from collections import deque
 
 from mi.core.log import get_logger
 log = get_logger()
@@ -269,7 +270,7 @@ class AdcpsJlnStcParser(BufferLoadingParser):
         if not (StateKey.POSITION in state_obj):
             raise DatasetParserException("Invalid state keys")
         self._chunker.clean_all_chunks()
-        self._record_buffer = []
+        self._record_buffer = deque()
         self._saved_header = None
         self._state = state_obj
         self._read_state = state_obj
@@ -17,6 +17,7 @@ from functools import partial
 import copy
 import re
 import string
+from collections import deque
 
 from mi.core.log import get_logger
 log = get_logger()
@@ -261,7 +262,7 @@ class CsppParser(BufferLoadingParser):
         self._data_particle_class = particle_classes_dict.get(DATA_PARTICLE_CLASS_KEY)
 
         # Initialize the record buffer to an empty list
-        self._record_buffer = []
+        self._record_buffer = deque()
 
         # Initialize the read state
         self._read_state = {StateKey.POSITION: 0, StateKey.METADATA_EXTRACTED: False}
@@ -295,7 +296,7 @@ class CsppParser(BufferLoadingParser):
         self._read_state = state_obj
 
         # Clear the record buffer
-        self._record_buffer = []
+        self._record_buffer = deque()
 
         # Need to seek the correct position in the file stream using the read state position.
         self._stream_handle.seek(self._read_state[StateKey.POSITION])
@@ -310,6 +311,14 @@ class CsppParser(BufferLoadingParser):
         """
         self._read_state[StateKey.POSITION] += increment
 
+    def _build_state(self, marker):
+        """
+        Build the parser state from the marker saved with a record
+        @param marker A tuple of the file position and metadata extracted flag
+        """
+        (position, metadata_extracted) = marker
+        return {StateKey.POSITION: position, StateKey.METADATA_EXTRACTED: metadata_extracted}
+
     def _process_data_match(self, data_match, result_particles):
         """
         This method processes a data match.  It will extract a metadata particle and insert it into
@@ -340,10 +349,10 @@ class CsppParser(BufferLoadingParser):
                     # We're going to insert the metadata particle so that it is the first in the list
                     # and set the position to 0, as it cannot have the same position as the non-metadata
                     # particle
-                    result_particles.insert(0, (metadata_particle, {StateKey.POSITION: 0,
-                                                                    StateKey.METADATA_EXTRACTED: True}))
+                    result_particles.insert(0, (metadata_particle, (0, True)))
 
-            result_particles.append((data_particle, copy.copy(self._read_state)))
+            result_particles.append((data_particle, (self._read_state[StateKey.POSITION],
+                                                     self._read_state[StateKey.METADATA_EXTRACTED])))
 
     def _process_header_part_match(self, header_part_match):
         """
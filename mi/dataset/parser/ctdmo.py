@@ -29,6 +29,7 @@ import copy
 from functools import partial
 import re
 import struct
+from collections import deque
 
 from mi.core.time import string_to_ntp_date_time
 
@@ -161,6 +162,9 @@ def convert_hex_ascii_to_int(int_val):
     """
     return int(int_val, 16)
 
+# NTP time of the epoch 2000 instrument timestamps
+TIME_2000_NTP = string_to_ntp_date_time("2000-01-01T00:00:00.00Z")
+
 def generate_particle_timestamp(time_2000):
     """
     This function calculates and returns a timestamp in epoch 1900
@@ -170,7 +174,7 @@ def generate_particle_timestamp(time_2000):
     Returns:
       number of seconds since Jan 1, 1900
     """
-    return int(time_2000, 16) + string_to_ntp_date_time("2000-01-01T00:00:00.00Z")
+    return int(time_2000, 16) + TIME_2000_NTP
 
 
 class CtdmoStateKey(BaseEnum):
@@ -802,7 +806,7 @@ class CtdmoRecoveredCtParser(BufferLoadingParser, CtdmoParser):
             raise DatasetParserException('%s missing in state keys' %
                                          CtdmoStateKey.SERIAL_NUMBER)
 
-        self._record_buffer = []
+        self._record_buffer = deque()
         self._state = state_obj
         self._read_state = state_obj
 
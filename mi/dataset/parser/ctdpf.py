@@ -19,8 +19,10 @@ import ntplib
 from functools import partial
 from dateutil import parser
 from dateutil import tz
+from collections import deque
 
 from mi.core.log import get_logger ; log = get_logger()
+from mi.core.time import iso8601_to_unix_time
 
 from mi.core.common import BaseEnum
 from mi.core.exceptions import SampleException, DatasetParserException
@@ -125,7 +127,7 @@ class CtdpfParser(BufferLoadingParser):
                                           *args,
                                           **kwargs)
         self._timestamp = 0.0
-        self._record_buffer = [] # holds tuples of (record, state)
+        self._record_buffer = deque() # holds tuples of (record, state)
         self._read_state = {StateKey.POSITION:0, StateKey.TIMESTAMP:0.0}
                 
         if state:
@@ -147,7 +149,7 @@ class CtdpfParser(BufferLoadingParser):
         
         self._timestamp = state_obj[StateKey.TIMESTAMP]
         self._timestamp += 1
-        self._record_buffer = []
+        self._record_buffer = deque()
         self._state = state_obj
         self._read_state = state_obj
         
@@ -178,9 +180,7 @@ class CtdpfParser(BufferLoadingParser):
         )
         log.trace("converted ts '%s' to '%s'", ts_str, zulu_ts)
 
-        localtime_offset = float(parser.parse("1970-01-01T00:00:00.00Z").strftime("%s.%f"))
-        converted_time = float(parser.parse(zulu_ts).strftime("%s.%f"))
-        adjusted_time = round(converted_time - localtime_offset)
+        adjusted_time = iso8601_to_unix_time(zulu_ts)
         ntptime = ntplib.system_to_ntp_time(adjusted_time)
 
         log.trace("Converted time \"%s\" (unix: %s) into %s", ts_str, adjusted_time, ntptime)
@@ -15,6 +15,7 @@ __license__ = 'Apache 2.0'
 import re
 import copy
 from functools import partial
+from collections import deque
 
 from mi.core.log import get_logger ; log = get_logger()
 
@@ -112,8 +113,9 @@ class CtdpfkParser(CtdpfParser):
                                           **kwargs)
 
         self._timestamp = 0.0
-        self._record_buffer = [] # holds tuples of (record, state)
+        self._record_buffer = deque() # holds tuples of (record, state)
         self._read_state = {StateKey.POSITION:0, StateKey.TIMESTAMP:0.0}
+        self._configure_reads(config)
 
         if state:
             self.set_state(self._state)
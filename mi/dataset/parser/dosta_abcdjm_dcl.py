@@ -25,14 +25,15 @@ Mal-formed sensor data records and all metadata records produce no particles.
 __author__ = 'Steve Myerson'
 __license__ = 'Apache 2.0'
 
-import calendar
 import copy
 from functools import partial
 import re
+from collections import deque
 
 from mi.core.instrument.chunker import \
     StringChunker
 
+from mi.core.time import utc_to_unix_time
 from mi.core.log import get_logger; log = get_logger()
 
 from mi.dataset.dataset_parser import \
@@ -173,15 +174,13 @@ class DostaAbcdjmDclInstrumentDataParticle(DataParticle):
         # The particle timestamp is the DCL Controller timestamp.
         # The individual fields have already been extracted by the parser.
 
-        timestamp = (
+        elapsed_seconds = utc_to_unix_time(
             int(self.raw_data[SENSOR_GROUP_YEAR]),
             int(self.raw_data[SENSOR_GROUP_MONTH]),
             int(self.raw_data[SENSOR_GROUP_DAY]),
             int(self.raw_data[SENSOR_GROUP_HOUR]),
             int(self.raw_data[SENSOR_GROUP_MINUTE]),
-            int(self.raw_data[SENSOR_GROUP_SECOND]),
-            0, 0, 0)
-        elapsed_seconds = calendar.timegm(timestamp)
+            int(self.raw_data[SENSOR_GROUP_SECOND]))
         self.set_internal_timestamp(unix_time=elapsed_seconds)
 
     def _build_parsed_values(self):
@@ -340,7 +339,7 @@ class DostaAbcdjmDclParser(BufferLoadingParser):
             raise DatasetParserException('%s missing in state keys' %
                                          DostaStateKey.POSITION)
 
-        self._record_buffer = []
+        self._record_buffer = deque()
         self._state = state_obj
         self._read_state = state_obj
 
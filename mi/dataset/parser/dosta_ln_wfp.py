@@ -13,9 +13,7 @@ initial release
 __author__ = 'Mark Worden'
 __license__ = 'Apache 2.0'
 
-import copy
-import gevent
-import ntplib
+import numpy
 import struct
 import binascii
 
@@ -23,7 +21,8 @@ from mi.core.log import get_logger
 log = get_logger()
 from mi.core.common import BaseEnum
 from mi.core.instrument.data_particle import DataParticle
-from mi.core.exceptions import SampleException, UnexpectedDataException
+from mi.core.exceptions import SampleException
+from mi.core.time import unix_to_ntp_time_array
 from mi.dataset.parser.WFP_E_file_common import WfpEFileParser, HEADER_BYTES, STATUS_BYTES_AUGMENTED, \
     STATUS_BYTES, STATUS_START_MATCHER, WFP_E_GLOBAL_RECOVERED_ENG_DATA_SAMPLE_MATCHER, \
     WFP_E_GLOBAL_FLAGS_HEADER_MATCHER, WFP_E_GLOBAL_RECOVERED_ENG_DATA_SAMPLE_BYTES
@@ -120,50 +119,21 @@ class DostaLnWfpParser(WfpEFileParser):
         # update the state to show we have read the header
         self._increment_state(HEADER_BYTES)
 
-    def get_block(self):
+    def _index_records(self, position):
         """
-        This function overwrites the get_block function in dataset_parser.py
-        to  read the entire file rather than break it into chunks.
-        Returns:
-          The length of data retrieved.
-        An EOFError is raised when the end of the file is reached.
+        This method finds the engineering data records in the rest of the file.
+        The file data is gone through in reverse order since the status records
+        have a variable length, then the timestamps at the start of each record
+        are gathered from the data at once.
+        @throws SampleException if the data does not split into whole records
         """
-        # Read in data in blocks so as to not tie up the CPU.
-        block_size = 1024
-        eof = False
-        data = ''
-        while not eof:
-            next_block = self._stream_handle.read(block_size)
-            if next_block:
-                data = data + next_block
-                gevent.sleep(0)
-            else:
-                eof = True
-
-        if data != '':
-            self._chunker.add_chunk(data, self._timestamp)
-            self.file_complete = True
-            return len(data)
-        else:  # EOF
-            self.file_complete = True
-            raise EOFError
-
-    def sieve_function(self, raw_data):
-        """
-        This method sorts through the raw data to identify new blocks of data that need
-        processing.  This is needed instead of a regex because blocks are identified by
-        position in this binary file.
-        """
-        form_list = []
-        raw_data_len = len(raw_data)
+        starts = []
 
-        # Starting from the end of the buffer and working backwards
-        parse_end_point = raw_data_len
+        # Starting from the end of the data and working backwards
+        parse_end_point = self._data_end()
 
-        # We are going to go through the file data in reverse order since we have a
-        # variable length status indicator field.
         # While we do not hit the beginning of the file contents, continue
-        while parse_end_point > 0:
+        while parse_end_point > position:
 
             # Create the different start indices for the three different scenarios
             raw_data_start_index_augmented = parse_end_point-STATUS_BYTES_AUGMENTED
@@ -171,22 +141,22 @@ class DostaLnWfpParser(WfpEFileParser):
             global_recovered_eng_rec_index = parse_end_point-WFP_E_GLOBAL_RECOVERED_ENG_DATA_SAMPLE_BYTES
 
             # Check for an an augmented status first
-            if raw_data_start_index_augmented >= 0 and \
-                    STATUS_START_MATCHER.match(raw_data[raw_data_start_index_augmented:parse_end_point]):
+            if raw_data_start_index_augmented >= position and \
+                    STATUS_START_MATCHER.match(self._raw_data(raw_data_start_index_augmented, parse_end_point)):
                 log.trace("Found OffloadProfileData with decimation factor")
                 parse_end_point = raw_data_start_index_augmented
 
             # Check for a normal status
-            elif raw_data_start_index_normal >= 0 and \
-                    STATUS_START_MATCHER.match(raw_data[raw_data_start_index_normal:parse_end_point]):
+            elif raw_data_start_index_normal >= position and \
+                    STATUS_START_MATCHER.match(self._raw_data(raw_data_start_index_normal, parse_end_point)):
                 log.trace("Found OffloadProfileData without decimation factor")
                 parse_end_point = raw_data_start_index_normal
 
             # If neither, we are dealing with a global wfp e recovered engineering data record,
-            # so we will save the start and end points
-            elif global_recovered_eng_rec_index >= 0:
+            # so we will save the start point
+            elif global_recovered_eng_rec_index >= position:
                 log.trace("Found OffloadEngineeringData")
-                form_list.append((global_recovered_eng_rec_index, parse_end_point))
+                starts.append(global_recovered_eng_rec_index)
                 parse_end_point = global_recovered_eng_rec_index
 
             # We must not have a good file, log some debug info for now
@@ -197,61 +167,18 @@ class DostaLnWfpParser(WfpEFileParser):
                 log.debug("bad file or bad position?")
                 raise SampleException("File size is invalid or improper positioning")
 
-        return_list = form_list[::-1]
+        starts = numpy.array(starts[::-1], dtype=numpy.int64)
 
-        return return_list
+        # the 32-bit unsigned int timestamp is in the first four bytes of each record
+        data = self._record_view(numpy.uint8, self._data_start, self._data_end() - self._data_start)
+        timestamp_bytes = data[(starts - self._data_start)[:, numpy.newaxis] + numpy.arange(4)]
+        timestamps = unix_to_ntp_time_array(timestamp_bytes.view('>u4').ravel())
 
-    def parse_chunks(self):
-        """
-        This method parses out any pending data chunks in the chunker. If
-        it is a valid data piece, build a particle, update the position and
-        timestamp. Go until the chunker has no more valid data.
-        @retval a list of tuples with sample particles encountered in this
-            parsing, plus the state. An empty list of nothing was parsed.
-        """
-        log.debug("parse_chunks")
-        result_particles = []
-        (nd_timestamp, non_data, non_start, non_end) = self._chunker.get_next_non_data_with_index(clean=False)
-        (timestamp, chunk, start, end) = self._chunker.get_next_data_with_index(clean=True)
-        self.handle_non_data(non_data, non_end, start)
-
-        while chunk is not None:
-
-            data_match = WFP_E_GLOBAL_RECOVERED_ENG_DATA_SAMPLE_MATCHER.match(chunk)
-
-            if data_match:
-
-                # Let's first get the 32-bit unsigned int timestamp which should be in the first match group
-                fields_prof = struct.unpack_from('>I', data_match.group(1))
-                timestamp = fields_prof[0]
-                self._timestamp = float(ntplib.system_to_ntp_time(timestamp))
-
-                # particle-ize the data block received, return the record
-                sample = self._extract_sample(self._particle_class,
-                                              None,
-                                              chunk,
-                                              self._timestamp)
-                if sample:
-                    # create particle
-                    log.trace("Extracting sample chunk 0x%s with read_state: %s", binascii.b2a_hex(chunk),
-                              self._read_state)
-                    self._increment_state(len(chunk))
-                    result_particles.append((sample, copy.copy(self._read_state)))
-
-            (nd_timestamp, non_data, non_start, non_end) = self._chunker.get_next_non_data_with_index(clean=False)
-            (timestamp, chunk, start, end) = self._chunker.get_next_data_with_index(clean=True)
-            self.handle_non_data(non_data, non_end, start)
-
-        return result_particles
-
-    def handle_non_data(self, non_data, non_end, start):
+        return (starts, starts + WFP_E_GLOBAL_RECOVERED_ENG_DATA_SAMPLE_BYTES, timestamps)
+
+    def _record_particle(self, index, raw_data, timestamp):
         """
-        This method handles any non-data that is found in the file
+        All the records found are engineering data records
         """
-        # if non-data is expected, handle it here, otherwise it is an error
-        if non_data is not None and non_end <= start:
-            # if this non-data is an error, send an UnexpectedDataException and increment the state
-            self._increment_state(len(non_data))
-            # if non-data is a fatal error, directly call the exception, if it is not use the _exception_callback
-            self._exception_callback(UnexpectedDataException("Found %d bytes of un-expected non-data 0x%s" %
-                                                             (len(non_data), binascii.b2a_hex(non_data))))
+        self._timestamp = timestamp
+        return self.extract_sample_particle(raw_data, timestamp)
@@ -13,16 +13,14 @@ initial release
 __author__ = 'Emily Hahn'
 __license__ = 'Apache 2.0'
 
-import copy
 import re
-import ntplib
 import struct
 
 from mi.core.log import get_logger ; log = get_logger()
 from mi.core.common import BaseEnum
 from mi.core.instrument.data_particle import DataParticle, DataParticleKey
 from mi.core.exceptions import SampleException, DatasetParserException
-from mi.dataset.parser.WFP_E_file_common import WfpEFileParser, StateKey, SAMPLE_BYTES
+from mi.dataset.parser.WFP_E_file_common import WfpEFileParser, StateKey
 
 
 class DataParticleType(BaseEnum):
@@ -77,26 +75,10 @@ class Flort_kn_stc_imodemParserDataParticleTelemetered(Flort_kn_stc_imodemParser
     _data_particle_type = DataParticleType.FLORT_KN_INSTRUMENT_TELEMETERED
 
 class Flort_kn_stc_imodemParser(WfpEFileParser):
-
-    def parse_record(self, record):
-        """
-        parse a FLORT_KN data sample into data particle from the input record
-        """
-        result_particle = []
-        if len(record) >= SAMPLE_BYTES:
-            # pull out the timestamp for this record
-            
-            fields = struct.unpack('>I', record[:4])
-            timestamp = int(fields[0])
-            self._timestamp = float(ntplib.system_to_ntp_time(timestamp))
-            log.debug("Converting record timestamp %f to ntp timestamp %f", timestamp, self._timestamp)
-            sample = self._extract_sample(self._particle_class, None, record, self._timestamp)
-            if sample:
-                # create particle
-                log.trace("Extracting sample %s with read_state: %s", sample, self._read_state)
-                self._increment_state(SAMPLE_BYTES)
-                result_particle = (sample, copy.copy(self._read_state))
-
-        return result_particle
+    """
+    Parser for the FLORT_KN data samples in E files, which are built into
+    particles of the class from the config
+    """
+    pass
 
 
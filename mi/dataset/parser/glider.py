@@ -11,7 +11,6 @@ __license__ = 'Apache 2.0'
 import re
 import numpy as np
 import ntplib
-import copy
 import time
 from datetime import datetime
 
@@ -20,14 +19,14 @@ import importlib
 import sys
 
 from math import copysign
-from functools import partial
+from collections import deque
 
 from mi.core.log import get_logger
 from mi.core.common import BaseEnum
 from mi.core.exceptions import SampleException, DatasetParserException, UnexpectedDataException, RecoverableSampleException
-from mi.core.instrument.chunker import StringChunker
-from mi.core.instrument.data_particle import DataParticle, DataParticleKey
+from mi.core.instrument.data_particle import DataParticle
 from mi.dataset.dataset_parser import BufferLoadingParser
+from mi.dataset.parser.glider_columns import GliderColumns, WHITESPACE_LINE, BAD_LINE, BAD_VALUE_LINE
 
 # start the logger
 log = get_logger()
@@ -96,78 +95,41 @@ class GliderParticle(DataParticle):
     # will be set to true if we have found data when parsed.
     common_parameters = GliderParticleKey.list()
 
-    def _parsed_values(self, key_list):
-
-        log.debug(" @@@ GliderParticle._parsed_values(): Build a particle with keys: %s", key_list)
+    def _build_value_tuple(self):
+        """
+        Look up the schema parameters in the glider data dictionary.  Parameters
+        missing from the row are published as None, as are NaN values.
 
+        @returns list of values in schema order
+        @throws SampleException if the data is not a glider data dictionary or
+            none of the particle parameters are in it
+        """
         if not isinstance(self.raw_data, dict):
             raise SampleException(
                 "%s: Object Instance is not a Glider Parsed Data \
                  dictionary" % self._data_particle_type)
 
-        result = []
-
-        list_of_found_particle_parameters = []
-
-        list_of_missing_particle_parameters = []
-
-        #use this logger when debugging
-        #log.debug(" @@@ @@@ GliderParticle._parsed_values(): raw_data %s", self.raw_data)
-
-        # find if any of the variables from the particle key list are in
-        # the data_dict and keep it
-        #
-        # "key_list" is a list of particle parameter names
-        for key in key_list:
-
-            log.trace("GliderParticle._parsed_values(): About to check if key %s is in raw_data", key)
-
-            # if the item from the particle is in the raw_data (row) we just sampled...
+        values = []
+        found = False
+        for key in self.schema().names:
             if key in self.raw_data:
-                # read the value of the item from the dictionary
                 value = self.raw_data[key]['Data']
+                found = True
 
-                log.trace("GliderParticle._parsed_values(): Found particle item in row of Raw Data: key %s, value: %s", key, value)
-                # check if this value is a string, implying it is one of the three
-                # file info data items in the particle (filename,fileopen time & mission name)
-                # - don't need to perform a NaN check on a string
-                if isinstance(value, str):
-                    # add the value to the record
-                    list_of_found_particle_parameters.append({DataParticleKey.VALUE_ID: key,
-                                   DataParticleKey.VALUE: value})
-                    log.trace("GliderParticle._parsed_values(): Adding Key: %s, value: %s to particle", key, value)
-                else:
-                    # check to see that the value is not a 'NaN'
-                    if np.isnan(value):
-                        log.trace("GliderParticle._parsed_values(): NaN Value: %s", key)
-                        value = None
-
-                    # add the value to the record
-                    list_of_found_particle_parameters.append({DataParticleKey.VALUE_ID: key,
-                                   DataParticleKey.VALUE: value})
-                    log.trace("GliderParticle._parsed_values(): Adding Key: %s, value: %s to particle", key, value)
-
-            # if the item from the particle is NOT the raw_data (row) we just sampled...
+                # strings are the file info items and can't be NaN
+                if not isinstance(value, str) and np.isnan(value):
+                    value = None
             else:
-                # This parameter was not in the row of data (raw_data), but at least one other parameter from the particle
-                # was found in the raw data (row). A None value must be included for this parameter in the particle.
+                # This parameter was not in the row of data, publish it as None
+                # if at least one other parameter was found
                 value = None
-                # add the None value to the result
-                list_of_missing_particle_parameters.append({DataParticleKey.VALUE_ID: key,
-                               DataParticleKey.VALUE: value})
-                log.trace("GliderParticle._parsed_values(): NO DATA in parsed row for particle, using NONE as value for key %s", key)
-
-        # if there is at lease ONE parameter from the particle found in the raw_data (row), publish the particle with
-        # parameter data that has been found and NONEs for paramters that were not found
-        if len(list_of_found_particle_parameters) > 0:
-            result = list_of_found_particle_parameters + list_of_missing_particle_parameters
-        else:
+            values.append(value)
+
+        if not found:
             log.error("No parameters from particle found in input row of Raw Data, particle cannot be created!")
             raise SampleException("No data for particle found")
 
-        log.debug(" ### GliderParticle._parsed_values(): ### result = %s", result)
-
-        return result
+        return values
 
 
 class CtdgvParticleKey(GliderParticleKey):
@@ -181,31 +143,13 @@ class CtdgvParticleKey(GliderParticleKey):
 class CtdgvTelemeteredDataParticle(GliderParticle):
     _data_particle_type = DataParticleType.CTDGV_M_GLIDER_INSTRUMENT
     science_parameters = CtdgvParticleKey.science_parameter_list()
-
-    def _build_parsed_values(self):
-        """
-        Extracts CTDGV data from the glider data dictionary initialized with
-        the particle class and puts the data into a CTDGV Telemetered Data Particle.
-
-        @returns result a list of dictionaries of particle data
-        @throws SampleException if the data is not a glider data dictionary
-        """
-        return self._parsed_values(CtdgvParticleKey.list())
+    _schema = CtdgvParticleKey.list()
 
 
 class CtdgvRecoveredDataParticle(GliderParticle):
     _data_particle_type = DataParticleType.CTDGV_M_GLIDER_INSTRUMENT_RECOVERED
     science_parameters = CtdgvParticleKey.science_parameter_list()
-
-    def _build_parsed_values(self):
-        """
-        Extracts CTDGV data from the glider data dictionary initialized with
-        the particle class and puts the data into a CTDGV Recovered Data Particle.
-
-        @returns result a list of dictionaries of particle data
-        @throws SampleException if the data is not a glider data dictionary
-        """
-        return self._parsed_values(CtdgvParticleKey.list())
+    _schema = CtdgvParticleKey.list()
 
 
 class DostaTelemeteredParticleKey(GliderParticleKey):
@@ -235,31 +179,13 @@ class DostaRecoveredParticleKey(GliderParticleKey):
 class DostaTelemeteredDataParticle(GliderParticle):
     _data_particle_type = DataParticleType.DOSTA_ABCDJM_GLIDER_INSTRUMENT
     science_parameters = DostaTelemeteredParticleKey.science_parameter_list()
-
-    def _build_parsed_values(self):
-        """
-        Takes a GliderParser object and extracts DOSTA data from the
-        data dictionary and puts the data into a DOSTA Data Particle.
-
-        @returns result a list of dictionaries of particle data
-        @throws SampleException if the data is not a glider data dictionary
-        """
-        return self._parsed_values(DostaTelemeteredParticleKey.list())
+    _schema = DostaTelemeteredParticleKey.list()
 
 
 class DostaRecoveredDataParticle(GliderParticle):
     _data_particle_type = DataParticleType.DOSTA_ABCDJM_GLIDER_RECOVERED
     science_parameters = DostaRecoveredParticleKey.science_parameter_list()
-
-    def _build_parsed_values(self):
-        """
-        Takes a GliderParser object and extracts DOSTA data from the
-        data dictionary and puts the data into a DOSTA Data Particle.
-
-        @returns result a list of dictionaries of particle data
-        @throws SampleException if the data is not a glider data dictionary
-        """
-        return self._parsed_values(DostaRecoveredParticleKey.list())
+    _schema = DostaRecoveredParticleKey.list()
 
 
 class FlordParticleKey(GliderParticleKey):
@@ -277,31 +203,13 @@ class FlordParticleKey(GliderParticleKey):
 class FlordTelemeteredDataParticle(GliderParticle):
     _data_particle_type = DataParticleType.FLORD_M_GLIDER_INSTRUMENT
     science_parameters = FlordParticleKey.science_parameter_list()
-
-    def _build_parsed_values(self):
-        """
-        Takes a GliderParser object and extracts FLORD data from the
-        data dictionary and puts the data into a FLORD Telemetered Data Particle.
-
-        @returns result a list of dictionaries of particle data
-        @throws SampleException if the data is not a glider data dictionary
-        """
-        return self._parsed_values(FlordParticleKey.list())
+    _schema = FlordParticleKey.list()
 
 
 class FlordRecoveredDataParticle(GliderParticle):
     _data_particle_type = DataParticleType.FLORD_M_GLIDER_INSTRUMENT_RECOVERED
     science_parameters = FlordParticleKey.science_parameter_list()
-
-    def _build_parsed_values(self):
-        """
-        Takes a GliderParser object and extracts FLORD data from the
-        data dictionary and puts the data into a FLORD Recovered Data Particle.
-
-        @returns result a list of dictionaries of particle data
-        @throws SampleException if the data is not a glider data dictionary
-        """
-        return self._parsed_values(FlordParticleKey.list())
+    _schema = FlordParticleKey.list()
 
 
 class FlortTelemeteredParticleKey(GliderParticleKey):
@@ -329,31 +237,13 @@ class FlortRecoveredParticleKey(GliderParticleKey):
 class FlortTelemeteredDataParticle(GliderParticle):
     _data_particle_type = DataParticleType.FLORT_M_GLIDER_INSTRUMENT
     science_parameters = FlortTelemeteredParticleKey.science_parameter_list()
-
-    def _build_parsed_values(self):
-        """
-        Takes a GliderParser object and extracts FLORT data from the
-        data dictionary and puts the data into a FLORT Data Particle.
-
-        @returns result a list of dictionaries of particle data
-        @throws SampleException if the data is not a glider data dictionary
-        """
-        return self._parsed_values(FlortTelemeteredParticleKey.list())
+    _schema = FlortTelemeteredParticleKey.list()
 
 
 class FlortRecoveredDataParticle(GliderParticle):
     _data_particle_type = DataParticleType.FLORT_M_GLIDER_RECOVERED
     science_parameters = FlortRecoveredParticleKey.science_parameter_list()
-
-    def _build_parsed_values(self):
-        """
-        Takes a GliderParser object and extracts FLORT data from the
-        data dictionary and puts the data into a FLORT Data Particle.
-
-        @returns result a list of dictionaries of particle data
-        @throws SampleException if the data is not a glider data dictionary
-        """
-        return self._parsed_values(FlortRecoveredParticleKey.list())
+    _schema = FlortRecoveredParticleKey.list()
 
 
 class ParadTelemeteredParticleKey(GliderParticleKey):
@@ -372,31 +262,13 @@ class ParadRecoveredParticleKey(GliderParticleKey):
 class ParadTelemeteredDataParticle(GliderParticle):
     _data_particle_type = DataParticleType.PARAD_M_GLIDER_INSTRUMENT
     science_parameters = ParadTelemeteredParticleKey.science_parameter_list()
-
-    def _build_parsed_values(self):
-        """
-        Takes a GliderParser object and extracts PARAD data from the
-        data dictionary and puts the data into a PARAD Data Particle.
-
-        @returns result a list of dictionaries of particle data
-        @throws SampleException if the data is not a glider data dictionary
-        """
-        return self._parsed_values(ParadTelemeteredParticleKey.list())
+    _schema = ParadTelemeteredParticleKey.list()
 
 
 class ParadRecoveredDataParticle(GliderParticle):
     _data_particle_type = DataParticleType.PARAD_M_GLIDER_RECOVERED
     science_parameters = ParadRecoveredParticleKey.science_parameter_list()
-
-    def _build_parsed_values(self):
-        """
-        Takes a GliderParser object and extracts PARAD data from the
-        data dictionary and puts the data into a PARAD Data Particle.
-
-        @returns result a list of dictionaries of particle data
-        @throws SampleException if the data is not a glider data dictionary
-        """
-        return self._parsed_values(ParadRecoveredParticleKey.list())
+    _schema = ParadRecoveredParticleKey.list()
 
 
 class EngineeringRecoveredParticleKey(GliderParticleKey):
@@ -738,16 +610,7 @@ class EngineeringTelemeteredDataParticle(GliderParticle):
     keys_exclude_sci_times.remove(GliderParticleKey.SCI_M_PRESENT_TIME)
     keys_exclude_sci_times.remove(GliderParticleKey.SCI_M_PRESENT_SECS_INTO_MISSION)
 
-    def _build_parsed_values(self):
-        """
-        Takes a GliderParser object and extracts engineering data from the
-        data dictionary and puts the data into a engineering Data Particle.
-
-        @returns result a list of dictionaries of particle data
-        @throws SampleException if the data is not a glider data dictionary
-        """
-        # need to exclude sci times
-        return self._parsed_values(EngineeringTelemeteredDataParticle.keys_exclude_sci_times)
+    _schema = keys_exclude_sci_times
 
 
 class EngineeringMetadataDataParticle(GliderParticle):
@@ -760,16 +623,7 @@ class EngineeringMetadataDataParticle(GliderParticle):
     keys_exclude_times.remove(GliderParticleKey.SCI_M_PRESENT_TIME)
     keys_exclude_times.remove(GliderParticleKey.SCI_M_PRESENT_SECS_INTO_MISSION)
 
-    def _build_parsed_values(self):
-        """
-        Takes a GliderParser object and extracts engineering metadata from the
-        header and puts the data into a Data Particle.
-
-        @returns result a list of dictionaries of particle data
-        @throws SampleException if the data is not a glider data dictionary
-        """
-        # need to exclude m times
-        return self._parsed_values(EngineeringMetadataDataParticle.keys_exclude_times)
+    _schema = keys_exclude_times
 
 
 class EngineeringMetadataRecoveredDataParticle(GliderParticle):
@@ -782,16 +636,7 @@ class EngineeringMetadataRecoveredDataParticle(GliderParticle):
     keys_exclude_times.remove(GliderParticleKey.SCI_M_PRESENT_TIME)
     keys_exclude_times.remove(GliderParticleKey.SCI_M_PRESENT_SECS_INTO_MISSION)
 
-    def _build_parsed_values(self):
-        """
-        Takes a GliderParser object and extracts engineering metadata from the
-        header and puts the data into a Data Particle.
-
-        @returns result a list of dictionaries of particle data
-        @throws SampleException if the data is not a glider data dictionary
-        """
-        # need to exclude all times
-        return self._parsed_values(EngineeringMetadataDataParticle.keys_exclude_times)
+    _schema = keys_exclude_times
 
 
 class EngineeringScienceTelemeteredDataParticle(GliderParticle):
@@ -802,16 +647,7 @@ class EngineeringScienceTelemeteredDataParticle(GliderParticle):
     keys_exclude_times.remove(GliderParticleKey.M_PRESENT_TIME)
     keys_exclude_times.remove(GliderParticleKey.M_PRESENT_SECS_INTO_MISSION)
 
-    def _build_parsed_values(self):
-        """
-        Takes a GliderParser object and extracts engineering data from the
-        data dictionary and puts the data into a engineering Data Particle.
-
-        @returns result a list of dictionaries of particle data
-        @throws SampleException if the data is not a glider data dictionary
-        """
-        # need to exclude m times
-        return self._parsed_values(EngineeringScienceTelemeteredDataParticle.keys_exclude_times)
+    _schema = keys_exclude_times
 
 
 class EngineeringRecoveredDataParticle(GliderParticle):
@@ -822,16 +658,7 @@ class EngineeringRecoveredDataParticle(GliderParticle):
     keys_exclude_sci_times.remove(GliderParticleKey.SCI_M_PRESENT_TIME)
     keys_exclude_sci_times.remove(GliderParticleKey.SCI_M_PRESENT_SECS_INTO_MISSION)
 
-    def _build_parsed_values(self):
-        """
-        Takes a GliderParser object and extracts engineering data from the
-        data dictionary and puts the data into a engineering Data Particle.
-
-        @returns result a list of dictionaries of particle data
-        @throws SampleException if the data is not a glider data dictionary
-        """
-        # need to exclude sci times
-        return self._parsed_values(EngineeringRecoveredDataParticle.keys_exclude_sci_times)
+    _schema = keys_exclude_sci_times
 
 
 class EngineeringScienceRecoveredDataParticle(GliderParticle):
@@ -842,24 +669,15 @@ class EngineeringScienceRecoveredDataParticle(GliderParticle):
     keys_exclude_times.remove(GliderParticleKey.M_PRESENT_TIME)
     keys_exclude_times.remove(GliderParticleKey.M_PRESENT_SECS_INTO_MISSION)
 
-    def _build_parsed_values(self):
-        """
-        Takes a GliderParser object and extracts engineering data from the
-        data dictionary and puts the data into a engineering Data Particle.
-
-        @returns result a list of dictionaries of particle data
-        @throws SampleException if the data is not a glider data dictionary
-        """
-        # need to exclude m times
-        return self._parsed_values(EngineeringScienceRecoveredDataParticle.keys_exclude_times)
+    _schema = keys_exclude_times
 
 class GliderParser(BufferLoadingParser):
     """
     GliderParser parses a Slocum Electric Glider data file that has been
     converted to ASCII from binary and merged with it's corresponding flight or
     science data file, and holds the self describing header data in a header
-    dictionary and the data in a data dictionary using the column labels as the
-    dictionary keys. These dictionaries are used to build the particles.
+    dictionary and the data in GliderColumns using the column labels as the
+    keys. Particles are built from only the columns they publish.
     """
     def __init__(self,
                  config,
@@ -877,21 +695,18 @@ class GliderParser(BufferLoadingParser):
 
         self._stream_handle = stream_handle
 
-        self._record_buffer = []  # holds tuples of (record, state)
+        self._record_buffer = deque()  # holds tuples of (record, state)
         self._read_state = {StateKey.POSITION: 0}
+        self._columns_loaded = False
 
         # specific to the gliders with ascii data, parse the header rows of the input file
         self._read_header()
 
-        # regex for first order parsing of input data from the chunker
-        record_regex = re.compile(r'.*\n')
-        self._whitespace_regex = re.compile(r'\s*$')
-
+        # no sieve function since the data is read into columns, not through the chunker
         super(GliderParser, self).__init__(config,
                                            self._stream_handle,
                                            state,
-                                           partial(StringChunker.regex_sieve_function,
-                                                   regex_list=[record_regex]),
+                                           None,
                                            state_callback,
                                            publish_callback,
                                            exception_callback,
@@ -1048,230 +863,101 @@ class GliderParser(BufferLoadingParser):
         if not (StateKey.POSITION in state_obj):
             raise DatasetParserException("Invalid state keys")
 
-        self._record_buffer = []
+        self._record_buffer = deque()
         self._state = state_obj
         self._read_state = state_obj
+        self._columns_loaded = False
 
         # seek to it
         log.debug("GliderParser._set_state(): seek to position: %d", state_obj[StateKey.POSITION])
         self._stream_handle.seek(state_obj[StateKey.POSITION])
 
-    def _increment_state(self, increment):
+    def _build_state(self, position):
         """
-        Increment the parser position by a certain amount in bytes. This
-        indicates what has been READ from the file, not what has been published.
-        This allows a reload of the file position.
-
-        @param increment Number of bytes to increment the parser position.
+        Build the parser state from the file position saved with a record
         """
+        return {StateKey.POSITION: position}
 
-        oldinc = increment
-        oldstatepos = self._read_state[StateKey.POSITION]
-
-        log.debug("GliderParser._increment_state(): Incrementing current state: %s with inc: %s",
-                  self._read_state, increment)
-        self._read_state[StateKey.POSITION] += increment
-
-        log.trace("GliderParser._increment_state(): Current State Position is %s, + Increment of %s", oldstatepos, oldinc)
-        log.trace("GliderParser._increment_state(): NEW State Position: %s", self._read_state[StateKey.POSITION])
-
-
-    def _read_data(self, data_record):
+    def _load_particle_buffer(self):
         """
-        Read in the column labels, data type, number of bytes of each
-        data type, and the data from an ASCII glider data file.
+        Read the rest of the file into columns and build all of its particles
+        at once, rather than parsing the file a line at a time.
+        @throws EOFError when the end of the file is reached
         """
+        if not self._columns_loaded:
+            columns = GliderColumns.for_stream(self._stream_handle, self._header_dict,
+                                               self._read_state[StateKey.POSITION])
+            self._record_buffer.extend(self._parse_columns(columns))
+            self._columns_loaded = True
 
-        data_dict = {}
-        num_columns = self._header_dict['sensors_per_cycle']
-        data_labels = self._header_dict['labels']
-        num_bytes = self._header_dict['num_of_bytes']
-
-        data = data_record.strip().split()
-
-        log.trace("GliderParser._read_data(): Split data: %s", data)
-
-        if num_columns != len(data):
-
-            log.error("GliderParser._read_data(): Num Of Columns NOT EQUAL to Num of Data items: "
-                      "Expected Columns= %s vs Actual Data= %s", num_columns, len(data))
-
-            raise SampleException('Glider data file does not have the ' +
-                                  'same number of columns as described ' +
-                                  'in the header.\n' +
-                                  'Described: %d, Actual: %d' %
-                                  (num_columns, len(data)))
-
-        # extract record to dictionary
-        for ii in range(0, num_columns, 1):
-            log.trace("GliderParser._read_data(): index: %d label: %s, value: %s", ii, data_labels[ii], data[ii])
-
-            valuePreConversion = data[ii]
-
-            # Check if this data value is a NaN...
-            if valuePreConversion == "NaN":
-                # data is NaN, convert it to a float
-                value = float(valuePreConversion)
-            # Determine what type of data the value is - int or float, or neither
-            else:
-
-                # determine what type of data the value is, based on the number of bytes attribute
-                if (num_bytes[ii] == 1) or (num_bytes[ii] == 2):
-                        stringConverter = int
-                elif (num_bytes[ii] == 4) or (num_bytes[ii] == 8):
-                        stringConverter = float
-                else:
-                        stringConverter = None
-
-                # check to see if this is a latitude/longitude string
-                if ('_lat' in data_labels[ii]) or ('_lon' in data_labels[ii]):
-                    # convert latitude/longitude strings to decimal degrees
-                    value = self._string_to_ddegrees(data[ii])
-
-                    log.trace("GliderParser._read_data(): converted lat/lon %s from %s to %10.5f", data_labels[ii], data[ii], value)
-
-                else:
-                    # convert the string to and int or float, or leave it as a string
-                    if stringConverter is not None:
-                        value = stringConverter(data[ii])
-                    else:
-                        log.trace("GliderParser._read_data(): data value %s was not an int or a float", data[ii])
-                        value = data[ii]
+        self.file_complete = True
+        raise EOFError
 
-            data_dict[data_labels[ii]] = {
-                'Name': data_labels[ii],
-                'Data': value
-            }
-
-        log.trace("Data dict parsed: %s", data_dict)
-
-        return data_dict
-
-    def get_block(self, size=1024):
-        """
-        Need to overload the base class behavior so we can get the last
-        record if it doesn't end with a newline it would be ignored.
-        """
-        length = super(GliderParser, self).get_block(size)
-        log.debug("Buffer read bytes: %d", length)
-
-        if length != size:
-            self._chunker.add_chunk("\n", ntplib.system_to_ntp_time(time.time()))
-
-        return length
-
-    def parse_chunks(self):
+    def _parse_columns(self, columns):
         """
-        Create particles out of chunks and raise an event
+        Create particles from the rows with a value in at least one of the
+        particle science parameters
+        @param columns GliderColumns holding the rows from the current position
         @retval a list of tuples with sample particles encountered in this
             parsing, plus the state. An empty list is returned if nothing was
             parsed.
         """
-        # set defaults
         result_particles = []
+        labels = self._particle_class.schema().names
+        has_data = columns.has_data(self._particle_class.science_parameters)
+        times = columns.values('m_present_time')
 
-        # collect the non-data from the file
-        (nd_timestamp, non_data, non_start, non_end) = self._chunker.get_next_non_data_with_index(clean=False)
-        # collect the data from the file
-        (chunker_timestamp, data_record, start, end) = self._chunker.get_next_data_with_index()
+        for line in xrange(columns.start_line(self._read_state[StateKey.POSITION]), len(columns.line_rows)):
+            row = columns.line_rows[line]
+            self._read_state[StateKey.POSITION] = columns.line_ends[line]
 
-        self.handle_non_data(non_data, non_start, non_end, start)
+            if row == WHITESPACE_LINE:
+                log.debug("## GliderParser._parse_columns(): Only whitespace detected in record. Ignoring.")
 
-        # process a row of data from the file
-        while data_record is not None:
-            log.debug("## GliderParser.parse_chunks(): data record: %s", data_record)
+            elif row == BAD_LINE:
+                self._exception_callback(self._column_count_exception(columns.bad_lines[line]))
 
-            self._increment_state(end)
+            elif row == BAD_VALUE_LINE:
+                self._exception_callback(self._bad_value_exception(*columns.bad_values[line]))
 
-            if self._whitespace_regex.match(data_record):
+            elif times is None:
+                self._exception_callback(SampleException("GliderParser._parse_columns(): unable to find timestamp in data"))
 
-                log.debug("## GliderParser.parse_chunks(): Only whitespace detected in record. Ignoring.")
-
-                # parse the data record into a data dictionary to pass to the particle class
-            else:
+            elif has_data[row]:
+                # m_present_time is the unix timestamp per IDD
+                timestamp = ntplib.system_to_ntp_time(float(times[row]))
+                data_dict = columns.row_values(row, labels, self._string_to_ddegrees)
 
-                exception_detected = False
+                particle = self._extract_sample(self._particle_class, None, data_dict, timestamp)
+                log.debug("===> ## ## ## GliderParser._parse_columns(): PARTICLE NAMED %s CREATED ", particle._data_particle_type)
 
-                try:
-                    # create the dictionary of key/value pairs composed of the labels and the values from the
-                    # record being parsed
-                    # ex: data_dict = {'sci_bsipar_temp': {'Data': 10.67, 'Name': 'sci_bsipar_temp'}, n1, n2, nn}
-                    data_dict = self._read_data(data_record)
-
-                    log.debug("  GliderParser.parse_chunks(): ### ## #### ## ####  data_dict = %s", data_dict)
-
-                except SampleException as e:
-                    exception_detected = True
-                    self._exception_callback(e)
-
-                # from the parsed data, m_present_time is the unix timestamp per IDD
-                try:
-                    if not exception_detected:
-                        record_time = data_dict['m_present_time']['Data']
-                        timestamp = ntplib.system_to_ntp_time(data_dict['m_present_time']['Data'])
-                        log.debug("## GliderParser.parse_chunks(): Converting record timestamp %f to ntp timestamp %f", record_time, timestamp)
-                except KeyError:
-                    exception_detected = True
-                    self._exception_callback(SampleException("GliderParser.parse_chunks(): unable to find timestamp in data"))
-
-                if exception_detected:
-                    # We are done processing this record if we have detected an exception
-                    pass
-
-                # check if
-                elif self._has_science_data(data_dict):
-                    # create the particle
-                    particle = self._extract_sample(self._particle_class, None, data_dict, timestamp)
-                    log.debug("===> ## ## ## GliderParser.parse_chunks(): PARTICLE NAMED %s CREATED ", particle._data_particle_type)
-                    log.debug("===> ## ## ## Particle Params = %s", particle.generate_dict())
-
-                    result_particles.append((particle, copy.copy(self._read_state)))
-                else:
-                    log.debug("No science data found in particle. %s", data_dict)
-
-            # collect the non-data from the file
-            (nd_timestamp, non_data, non_start, non_end) = self._chunker.get_next_non_data_with_index(clean=False)
-            # collect the data from the file
-            (chunker_timestamp, data_record, start, end) = self._chunker.get_next_data_with_index()
-
-            self.handle_non_data(non_data, non_start, non_end, start)
+                result_particles.append((particle, self._read_state[StateKey.POSITION]))
+            else:
+                log.debug("No science data found in line %d", line)
 
-        # publish the results
         return result_particles
 
-    def handle_non_data(self, non_data, non_start, non_end, start):
+    def _column_count_exception(self, num_values):
         """
-        Handle any non-data that is found in the file
+        Build the exception for a row with the wrong number of values
         """
-        # if non-data is expected, handle it here, otherwise it is an error
-        if non_data is not None and non_end <= start:
-
-            self._increment_state(len(non_data))
-
-            log.warn("GliderParser.handle_non_data(): Found data in un-expected non-data from the chunker: %s",
-                     non_data)
+        num_columns = self._header_dict['sensors_per_cycle']
+        log.error("GliderParser: Num Of Columns NOT EQUAL to Num of Data items: "
+                  "Expected Columns= %s vs Actual Data= %s", num_columns, num_values)
 
-            # if non-data is a fatal error, directly call the exception,
-            # if it is not use the _exception_callback
-            self._exception_callback(UnexpectedDataException("Found un-expected non-data: %s" % non_data))
+        return SampleException('Glider data file does not have the ' +
+                               'same number of columns as described ' +
+                               'in the header.\n' +
+                               'Described: %d, Actual: %d' %
+                               (num_columns, num_values))
 
-    def _has_science_data(self, data_dict):
+    def _bad_value_exception(self, label, token):
         """
-        Examine the data_dict to see if it contains particle parameters
+        Build the exception for a row with a value that doesn't match its column type
         """
-        log.trace("## ## ## GliderParser._has_science_data(): _particle_class is %s", self._particle_class)
-        log.trace("## ## ## GliderParser._has_science_data(): Looking for data in science parameters: %s", self._particle_class.science_parameters)
-        for key in data_dict.keys():
-            if key in self._particle_class.science_parameters:
-                value = data_dict[key]['Data']
-                if not np.isnan(value):
-                    log.debug("Found science value for key: %s, value: %s", key, value)
-                    return True
-                else:
-                    log.debug("Science data value is nan: %s %s", key, value)
+        log.error("GliderParser: Failed to convert %s value: '%s'", label, token)
 
-        log.debug("No science data found!")
-        return False
+        return SampleException("Glider data file has a bad %s value: '%s'" % (label, token))
 
     def _string_to_ddegrees(self, pos_str):
         """
@@ -1362,128 +1048,101 @@ class GliderEngineeringParser(GliderParser):
             log.debug('state_obj %s', state_obj)
             raise DatasetParserException("Invalid state keys")
 
-        self._record_buffer = []
+        self._record_buffer = deque()
         self._state = state_obj
         self._read_state = state_obj
+        self._columns_loaded = False
 
         # seek to it
         log.debug("seek to position: %d", state_obj[StateKey.POSITION])
         self._stream_handle.seek(state_obj[StateKey.POSITION])
 
-    def parse_chunks(self):
+    def _build_state(self, marker):
+        """
+        Build the parser state from the marker saved with a record
+        @param marker A tuple of the file position and sent metadata flag
+        """
+        (position, sent_metadata) = marker
+        return {StateKey.POSITION: position, StateKey.SENT_METADATA: sent_metadata}
+
+    def _state_marker(self):
+        """
+        Get the marker of the current read state to save with a record
+        """
+        return (self._read_state[StateKey.POSITION], self._read_state[StateKey.SENT_METADATA])
+
+    def _parse_columns(self, columns):
         """
-        Create particles out of chunks and raise an event
+        Create the particles in the particle class list from each row, and the
+        metadata particle once per file
+        @param columns GliderColumns holding the rows from the current position
         @retval a list of tuples with sample particles encountered in this
             parsing, plus the state. An empty list is returned if nothing was
             parsed.
         """
-        log.trace("GliderEngineeringParser.parse_chunks():         ### ### ### ENTERING ### ### ###")
+        log.trace("GliderEngineeringParser._parse_columns():         ### ### ### ENTERING ### ### ###")
 
-        # set defaults
         result_particles = []
-
-        # collect the non-data from the file
-        (nd_timestamp, non_data, none_start, none_end) = self._chunker.get_next_non_data_with_index(clean=False)
-        # collect the data from the file
-        (chunker_timestamp, data_record, start, end) = self._chunker.get_next_data_with_index()
-
-        self.handle_non_data(non_data, none_start, none_end, start)
-
-        if data_record is None:
-            log.trace("GliderEngineeringParser.parse_chunks():         data_record from Chunker at index start= %s and end= %s is NONE", start, end)
-
-
-        while data_record is not None:
-
-            log.debug("GliderEngineeringParser.parse_chunks(): data record: %s", data_record)
-
-            if self._whitespace_regex.match(data_record):
-
-                log.debug("GliderEngineeringParser.parse_chunks(): Only whitespace detected in record. Ignoring.")
-
-                # parse the data record into a data dictionary to pass to the particle class
-            else:
-
-                exception_detected = False
-
-                try:
-                    # create the dictionary of key/value pairs composed of the labels and the values from the
-                    # record being parsed
-                    data_dict = self._read_data(data_record)
-                except SampleException as e:
-                    exception_detected = True
-                    self._exception_callback(e)
-                    log.warn("GliderEngineeringParser.parse_chunks(): "
-                             "Sample Exception, problem creating data dict from raw data %s", e)
-                    data_dict = {}
-
-                # from the parsed data, m_present_time is the unix timestamp
-                try:
-                    if not exception_detected:
-                        record_time = data_dict['m_present_time']['Data']
-                        timestamp = ntplib.system_to_ntp_time(data_dict['m_present_time']['Data'])
-                        log.debug(" ## ## ## GliderEngineeringParser.parse_chunks(): "
-                                  "Converting record timestamp %f to ntp timestamp %f", record_time, timestamp)
-                except KeyError:
-                    exception_detected = True
-                    self._exception_callback(SampleException(" ## ## ## GliderEngineeringParser.parse_chunks(): "
+        particle_classes = self.list_of_particles_to_produce or []
+        # the columns each particle publishes, and the rows it has data in
+        particle_columns = [(particle, particle.schema().names, columns.has_data(particle.science_parameters))
+                            for particle in particle_classes]
+        times = columns.values('m_present_time')
+
+        for line in xrange(columns.start_line(self._read_state[StateKey.POSITION]), len(columns.line_rows)):
+            row = columns.line_rows[line]
+
+            if row == WHITESPACE_LINE:
+                log.debug("GliderEngineeringParser._parse_columns(): Only whitespace detected in record. Ignoring.")
+                continue
+
+            if not particle_classes:
+                self._exception_callback(SampleException(" ## ## ## GliderEngineeringParser._parse_columns(): "
+                                                         "List of Particles to create is empty or None"))
+                continue
+
+            if row in (BAD_LINE, BAD_VALUE_LINE) or times is None:
+                self._read_state[StateKey.POSITION] = columns.line_ends[line]
+                if row == BAD_LINE:
+                    self._exception_callback(self._column_count_exception(columns.bad_lines[line]))
+                elif row == BAD_VALUE_LINE:
+                    self._exception_callback(self._bad_value_exception(*columns.bad_values[line]))
+                else:
+                    self._exception_callback(SampleException(" ## ## ## GliderEngineeringParser._parse_columns(): "
                                                              "unable to find timestamp in data"))
+                continue
 
-                if exception_detected:
-                    # We are done processing this record if we have detected an exception
-                    pass
-
-                if self.list_of_particles_to_produce is not None and len(self.list_of_particles_to_produce) >= 1:
-
-                    number_of_particles = len(self.list_of_particles_to_produce)
-
-                    # there may be more than one particle in the list, return a particle for each one
-                    for list_index, particle in enumerate(self.list_of_particles_to_produce):
-
-                        log.trace("===> ## ## ## GliderEngineeringParser.parse_chunks(): "
-                                  "list index= %s, num_of_particles= %s, particle= %s",
-                                  list_index, number_of_particles, particle)
+            # m_present_time is the unix timestamp
+            timestamp = ntplib.system_to_ntp_time(float(times[row]))
 
-                        if list_index == number_of_particles - 1:
-                            self._increment_state(end)
+            # there may be more than one particle in the list, return a particle for each one
+            for list_index, (particle, labels, has_data) in enumerate(particle_columns):
 
-                        log.trace("===> ## ## ## GliderEngineeringParser.parse_chunks(): "
-                                  "working on particle %s", particle)
+                if list_index == len(particle_columns) - 1:
+                    self._read_state[StateKey.POSITION] = columns.line_ends[line]
 
-                        # handle this particle if it is an engineering metadata particle
-                        self.handle_metadata_particle(particle, result_particles, timestamp)
+                # handle this particle if it is an engineering metadata particle
+                self.handle_metadata_particle(particle, result_particles, timestamp)
 
-                        # check for the presence of any particle data in the raw data row before continuing
-                        if self._contains_eng_data(data_dict, particle):
+                # check for the presence of any particle data in the raw data row before continuing
+                if has_data[row]:
+                    data_dict = columns.row_values(row, labels, self._string_to_ddegrees)
 
-                            try:
-                                # create the particle
-                                resultant_particle = self._extract_sample(particle, None, data_dict, timestamp)
-                                log.debug("===> ## ## ## GliderEngineeringParser.parse_chunks(): "
-                                          "PARTICLE NAMED %s CREATED", particle._data_particle_type)
-                                log.debug("READ STATE: %s", self._read_state)
-                                result_particles.append((resultant_particle, copy.copy(self._read_state)))
-                            except RecoverableSampleException:
-                                self._exception_callback(RecoverableSampleException("GliderEngineeringParser.parse_chunks(): "
-                                                                                    "Particle class not defined in glider module"))
-
-                        else:
-                            log.debug("===> ## ## ## GliderEngineeringParser.parse_chunks(): "
-                                      "No particle data for %s found in raw data row", particle._data_particle_type)
+                    try:
+                        # create the particle
+                        resultant_particle = self._extract_sample(particle, None, data_dict, timestamp)
+                        log.debug("===> ## ## ## GliderEngineeringParser._parse_columns(): "
+                                  "PARTICLE NAMED %s CREATED", particle._data_particle_type)
+                        result_particles.append((resultant_particle, self._state_marker()))
+                    except RecoverableSampleException:
+                        self._exception_callback(RecoverableSampleException("GliderEngineeringParser._parse_columns(): "
+                                                                            "Particle class not defined in glider module"))
                 else:
-                    self._exception_callback(SampleException(" ## ## ## GliderEngineeringParser.parse_chunks(): "
-                                                             "List of Particles to create is empty or None"))
-
-            # collect the non-data from the file
-            (nd_timestamp, non_data, none_start, none_end) = self._chunker.get_next_non_data_with_index(clean=False)
-            # collect the data from the file
-            (chunker_timestamp, data_record, start, end) = self._chunker.get_next_data_with_index()
-
-            self.handle_non_data(non_data, none_start, none_end, start)
+                    log.debug("===> ## ## ## GliderEngineeringParser._parse_columns(): "
+                              "No particle data for %s found in raw data row", particle._data_particle_type)
 
-        log.trace("GliderEngineeringParser.parse_chunks():         ### ### ### EXITING ### ### ### ")
+        log.trace("GliderEngineeringParser._parse_columns():         ### ### ### EXITING ### ### ### ")
 
-        # publish the results
         return result_particles
 
     def handle_metadata_particle(self, particle, result_particles, timestamp):
@@ -1515,7 +1174,7 @@ class GliderEngineeringParser(GliderParser):
                     log.trace("GliderENGINEEERINGParser.handle_metadata_particle(): "
                               "PARTICLE NAMED %s CREATED ", particle._data_particle_type)
                     self._read_state[StateKey.SENT_METADATA] = True
-                    result_particles.append((particle, copy.copy(self._read_state)))
+                    result_particles.append((particle, self._state_marker()))
                 except RecoverableSampleException:
                     self._exception_callback(RecoverableSampleException("GliderEngineeringParser.handle_metadata_particle(): "
                                                                         "Particle class not defined in glider module"))
@@ -1532,7 +1191,7 @@ class GliderEngineeringParser(GliderParser):
                     log.debug("GliderENGINEEERINGParser.handle_metadata_particle(): "
                               "PARTICLE NAMED %s CREATED ", particle._data_particle_type)
                     self._read_state[StateKey.SENT_METADATA] = True
-                    result_particles.append((particle, copy.copy(self._read_state)))
+                    result_particles.append((particle, self._state_marker()))
                 except RecoverableSampleException:
                     self._exception_callback(RecoverableSampleException("GliderEngineeringParser.handle_metadata_particle(): "
                                                                         "Particle class not defined in glider module"))
@@ -1582,20 +1241,3 @@ class GliderEngineeringParser(GliderParser):
         localtime = time.mktime(converted_time.timetuple())
         utctime = localtime - time.timezone
         return ntplib.system_to_ntp_time(float(utctime))
-
-    def _contains_eng_data(self, data_dict, particle_class):
-        """
-        Examine the data_dict to see if it contains data from the engineering telemetered particle being worked on
-        """
-
-        for key in data_dict.keys():
-
-            # only check for particle params that do not include the two m_ time oriented attributes
-            if key in particle_class.science_parameters:
-                # return true as soon as the first particle non-NaN attribute from the data dict
-                value = data_dict[key]['Data']
-                if not np.isnan(value):
-                    return True
-
-        log.debug("No engineering attributes in the particle found!")
-        return False
\ No newline at end of file
@@ -0,0 +1,272 @@
+#!/usr/bin/env python
+
+"""
+@package mi.dataset.parser.glider_columns
+@file mi/dataset/parser/glider_columns.py
+@brief Columnar reader for the data section of ASCII Slocum glider files.
+    The rows are split in one pass and every numeric column is checked and
+    converted to a NumPy array, typed by the num_of_bytes header row, so particles only
+    look at the columns they publish.  The same merged file is parsed by each
+    of the glider drivers, so the columns are cached by file identity.
+"""
+
+__license__ = 'Apache 2.0'
+
+import os
+import threading
+
+import numpy as np
+
+from mi.core.log import get_logger ; log = get_logger()
+
+# Number of parsed files kept in the cache
+COLUMN_CACHE_SIZE = 4
+
+# line_rows values for lines that aren't data rows
+WHITESPACE_LINE = -1
+BAD_LINE = -2
+BAD_VALUE_LINE = -3
+
+NAN_STRING = 'NaN'
+
+# column kinds
+INT_COLUMN = 'int'
+FLOAT_COLUMN = 'float'
+LATLON_COLUMN = 'latlon'
+STRING_COLUMN = 'string'
+
+
+def column_kind(label, num_of_bytes):
+    """
+    Get the kind of a column from its label and number of bytes
+    """
+    if '_lat' in label or '_lon' in label:
+        return LATLON_COLUMN
+    if num_of_bytes in (1, 2):
+        return INT_COLUMN
+    if num_of_bytes in (4, 8):
+        return FLOAT_COLUMN
+    return STRING_COLUMN
+
+
+class GliderColumns(object):
+    """
+    The data rows of a glider file from a starting position to the end of the
+    file.  Lines are split on newlines as the chunker did, and a final line
+    without a newline is counted as if it had one.
+    """
+    def __init__(self, data, position, header_dict):
+        """
+        @param data the file contents from position to the end
+        @param position file position of the start of data
+        @param header_dict parsed glider header with labels and num_of_bytes
+        """
+        self.position = position
+        self.labels = header_dict['labels']
+        num_columns = header_dict['sensors_per_cycle']
+
+        lines = data.split('\n')
+        if lines[-1] == '':
+            lines.pop()
+
+        # file position at the end of each line, and the index of its data row
+        self.line_ends = []
+        self.line_rows = []
+        # token count of each line that doesn't match the header
+        self.bad_lines = {}
+        # (label, token) of the first value that can't be converted in a line
+        self.bad_values = {}
+        rows = []
+        row_lines = []
+        end = position
+        for line in lines:
+            end += len(line) + 1
+            self.line_ends.append(end)
+            tokens = line.split()
+            if not tokens:
+                self.line_rows.append(WHITESPACE_LINE)
+            elif len(tokens) != num_columns:
+                self.bad_lines[len(self.line_rows)] = len(tokens)
+                self.line_rows.append(BAD_LINE)
+            else:
+                self.line_rows.append(len(rows))
+                row_lines.append(len(self.line_rows) - 1)
+                rows.append(tokens)
+        self.num_rows = len(rows)
+
+        self.kinds = {}
+        self._index = {}
+        for (index, label) in enumerate(self.labels):
+            self.kinds[label] = column_kind(label, header_dict['num_of_bytes'][index])
+            self._index[label] = index
+
+        # int and float columns have a float array, NaN where the data was NaN or
+        # couldn't be converted.  Lat/lon and string columns keep their tokens.
+        numeric = [index for (index, label) in enumerate(self.labels)
+                   if self.kinds[label] in (INT_COLUMN, FLOAT_COLUMN)]
+        self._numeric_index = dict((self.labels[index], position) for (position, index) in enumerate(numeric))
+        self._numeric = np.zeros((len(rows), len(numeric)))
+        if rows:
+            table = np.array(rows)
+            bad_rows = {}
+            for (position, index) in enumerate(numeric):
+                self._numeric[:, position] = self._convert_column(table[:, index], self.labels[index], bad_rows)
+            for (row, bad_value) in bad_rows.iteritems():
+                line = row_lines[row]
+                self.line_rows[line] = BAD_VALUE_LINE
+                self.bad_values[line] = bad_value
+            self._tokens = dict((label, table[:, self._index[label]].tolist())
+                                for label in self.labels if self.kinds[label] in (LATLON_COLUMN, STRING_COLUMN))
+        else:
+            self._tokens = dict((label, []) for label in self.labels
+                                if self.kinds[label] in (LATLON_COLUMN, STRING_COLUMN))
+
+    def _convert_column(self, tokens, label, bad_rows):
+        """
+        Convert the tokens of an int or float column to floats.  Int tokens must
+        be integers or NaN, as int() would require.  Tokens that can't be converted
+        are NaN, and the first bad token of each row is added to bad_rows.
+        @param tokens string array of the column tokens
+        @param label column label
+        @param bad_rows dictionary of {row: (label, token)} to add bad tokens to
+        @retval float array over the data rows
+        """
+        try:
+            values = tokens.astype(np.float64)
+        except ValueError:
+            values = np.empty(len(tokens))
+            for (row, token) in enumerate(tokens):
+                try:
+                    values[row] = float(token)
+                except ValueError:
+                    values[row] = np.nan
+                    bad_rows.setdefault(row, (label, str(token)))
+
+        if self.kinds[label] == INT_COLUMN:
+            valid = (tokens == NAN_STRING) | np.char.isdigit(np.char.lstrip(tokens, '+-'))
+            for row in np.flatnonzero(~valid):
+                values[row] = np.nan
+                bad_rows.setdefault(int(row), (label, str(tokens[row])))
+        return values
+
+    @classmethod
+    def for_stream(cls, stream_handle, header_dict, position):
+        """
+        Read the rows of a stream from position to the end of the file.  Files
+        are read once and shared through the cache, streams without a file
+        descriptor are read every time.
+        @param stream_handle open glider file
+        @param header_dict parsed glider header
+        @param position file position to read rows from
+        """
+        return _cache.columns(stream_handle, header_dict, position)
+
+    def start_line(self, position):
+        """
+        Find the line starting at a file position
+        @retval line index, or None if no line starts there
+        """
+        if position == self.position:
+            return 0
+        index = np.searchsorted(self.line_ends, position)
+        if index < len(self.line_ends) and self.line_ends[index] == position:
+            return int(index) + 1
+        return None
+
+    def has_data(self, labels):
+        """
+        Find the rows with a value in at least one of the columns
+        @param labels column labels, labels missing from the file are ignored
+        @retval boolean array over the data rows
+        """
+        mask = np.zeros(self.num_rows, dtype=bool)
+        if not self.num_rows:
+            return mask
+        for label in labels:
+            if label in self._numeric_index:
+                mask |= ~np.isnan(self._numeric[:, self._numeric_index[label]])
+            elif label in self._tokens:
+                mask |= np.array(self._tokens[label]) != NAN_STRING
+        return mask
+
+    def values(self, label):
+        """
+        Get the values of an int or float column, or None for other columns
+        @retval float array over the data rows
+        """
+        if label not in self._numeric_index:
+            return None
+        return self._numeric[:, self._numeric_index[label]]
+
+    def row_values(self, row, labels, latlon_converter):
+        """
+        Build the data dictionary for one row, only including the given columns
+        @param row data row index
+        @param labels column labels, labels missing from the file are skipped
+        @param latlon_converter function converting lat/lon strings to decimal degrees
+        @retval dictionary of {label: {'Name': label, 'Data': value}}
+        """
+        data_dict = {}
+        for label in labels:
+            kind = self.kinds.get(label)
+            if kind is None:
+                continue
+
+            if kind in (INT_COLUMN, FLOAT_COLUMN):
+                value = float(self._numeric[row, self._numeric_index[label]])
+                if kind == INT_COLUMN and not np.isnan(value):
+                    value = int(value)
+            else:
+                value = self._tokens[label][row]
+                if value == NAN_STRING:
+                    value = float(value)
+                elif kind == LATLON_COLUMN:
+                    value = latlon_converter(value)
+
+            data_dict[label] = {'Name': label, 'Data': value}
+        return data_dict
+
+
+class GliderColumnCache(object):
+    """
+    Cache of parsed glider files keyed by device, inode, size and modification
+    time, holding the most recently used files
+    """
+    def __init__(self, size=COLUMN_CACHE_SIZE):
+        self._size = size
+        self._entries = []
+        self._lock = threading.Lock()
+
+    def columns(self, stream_handle, header_dict, position):
+        """
+        Get the columns of a stream from position to the end of the file
+        """
+        try:
+            stat = os.fstat(stream_handle.fileno())
+            key = (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime)
+        except (AttributeError, IOError, OSError):
+            key = None
+
+        if key is not None:
+            with self._lock:
+                for (entry_key, columns) in self._entries:
+                    if entry_key == key and columns.labels == header_dict['labels'] and \
+                            columns.start_line(position) is not None:
+                        self._entries.remove((entry_key, columns))
+                        self._entries.insert(0, (entry_key, columns))
+                        log.debug("Using cached glider columns for %s", getattr(stream_handle, 'name', key))
+                        stream_handle.seek(0, os.SEEK_END)
+                        return columns
+
+        stream_handle.seek(position)
+        columns = GliderColumns(stream_handle.read(), position, header_dict)
+
+        if key is not None:
+            with self._lock:
+                self._entries.insert(0, (key, columns))
+                del self._entries[self._size:]
+        return columns
+
+
+# column cache shared by the glider parsers in this process
+_cache = GliderColumnCache()
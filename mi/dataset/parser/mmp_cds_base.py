@@ -129,7 +129,8 @@ class MmpCdsParser(BufferLoadingParser):
         @param publish_callback The function to call to provide particles
         """
 
-        # Initialize the record buffer to an empty list
+        # Initialize the record buffer to an empty list, records stay in it and are indexed by the number of
+        # particles returned so it is not a deque
         self._record_buffer = []
 
         if state is None:
@@ -229,23 +230,23 @@ class MmpCdsParser(BufferLoadingParser):
 
         return return_list
 
-    def get_block(self, size=1024):
+    def get_block(self, size=None):
         """
         This function overrides the get_block function in BufferLoadingParser
         to read the entire file rather than break it into chunks.
+        @param size The size of the blocks to read, None for the growing
+            block sizes of BufferLoadingParser
         @return The length of data retrieved.
         @throws EOFError when the end of the file is reached.
         """
         # Read in data in blocks so as to not tie up the CPU.
-        eof = False
-        data = ''
-        while not eof:
-            next_block = self._stream_handle.read(size)
-            if next_block:
-                data = data + next_block
-                gevent.sleep(0)
-            else:
-                eof = True
+        blocks = []
+        next_block = self._read_block(size)
+        while next_block:
+            blocks.append(next_block)
+            gevent.sleep(0)
+            next_block = self._read_block(size)
+        data = ''.join(blocks)
 
         if data != '':
             self._timestamp = float(ntplib.system_to_ntp_time(time.time()))
@@ -19,6 +19,7 @@ import struct
 import binascii
 from datetime import datetime
 import time
+from collections import deque
 
 from mi.core.log import get_logger
 log = get_logger()
@@ -323,7 +324,7 @@ class MopakODclParser(BufferLoadingParser):
            not (StateKey.TIMER_ROLLOVER in state_obj) or \
            not (StateKey.TIMER_START in state_obj):
             raise DatasetParserException("Invalid state keys: %s" % state_obj)
-        self._record_buffer = []
+        self._record_buffer = deque()
         self._chunker.clean_all_chunks()
         self._state = state_obj
         self._read_state = state_obj
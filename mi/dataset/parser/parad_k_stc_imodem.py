@@ -13,8 +13,6 @@ New driver started for PARAD_K_STC_IMODEM
 __author__ = 'Mike Nicoletti, Steve Myerson (recovered)'
 __license__ = 'Apache 2.0'
 
-import copy
-import ntplib
 import struct
 import math
 
@@ -91,45 +89,23 @@ class Parad_k_stc_imodemRecoveredDataParticle(Parad_k_stc_DataParticle):
 
 class Parad_k_stc_Parser(WfpEFileParser):
 
-    def parse_parad_k_record(self, record, particle_type):
+    _data_particle_class = None
+
+    def extract_sample_particle(self, raw_data, timestamp):
         """
-        This is a PARAD_K particle type, and below we pull the proper value from the
-        unpacked data
+        This is a PARAD_K particle type, built with the particle class of the
+        telemetered or recovered parser
         """
-        result_particle = []
-        if len(record) >= SAMPLE_BYTES:
-            # pull out the timestamp for this record
-
-            fields = struct.unpack('>I', record[:4])
-            timestamp = int(fields[0])
-            self._timestamp = float(ntplib.system_to_ntp_time(timestamp))
-            # PARAD_K Data
-            sample = self._extract_sample(particle_type, None, record, self._timestamp)
-            if sample:
-                # create particle
-                self._increment_state(SAMPLE_BYTES)
-                result_particle = (sample, copy.copy(self._read_state))
-
-        return result_particle
+        return self._extract_sample(self._data_particle_class, None, raw_data, timestamp)
 
 
 class Parad_k_stc_imodemParser(Parad_k_stc_Parser):
 
-    def parse_record(self, record):
-        """
-        This is a PARAD_K particle type, and below we pull the proper value from the
-        unpacked data
-        """
-        return self.parse_parad_k_record(record, Parad_k_stc_imodemDataParticle)
+    _data_particle_class = Parad_k_stc_imodemDataParticle
 
 
 class Parad_k_stc_imodemRecoveredParser(Parad_k_stc_Parser):
 
-    def parse_record(self, record):
-        """
-        This is a PARAD_K particle type, and below we pull the proper value from the
-        unpacked data
-        """
-        return self.parse_parad_k_record(record, Parad_k_stc_imodemRecoveredDataParticle)
+    _data_particle_class = Parad_k_stc_imodemRecoveredDataParticle
 
 
@@ -15,12 +15,11 @@ __license__ = 'Apache 2.0'
 
 import copy
 import re
-import ntplib
-import time
-from dateutil import parser
 from functools import partial
+from collections import deque
 
 from mi.core.log import get_logger ; log = get_logger()
+from mi.core.time import iso8601_to_ntp_time
 from mi.core.common import BaseEnum
 from mi.core.instrument.data_particle import DataParticle, DataParticleKey
 from mi.core.exceptions import SampleException, DatasetParserException, UnexpectedDataException
@@ -140,7 +139,7 @@ class RteODclParser(BufferLoadingParser):
         if not ((StateKey.POSITION in state_obj)):
             raise DatasetParserException("Invalid state keys")
         
-        self._record_buffer = []
+        self._record_buffer = deque()
         self._state = state_obj
         self._read_state = state_obj
         self._chunker.clean_all_chunks()
@@ -167,17 +166,15 @@ class RteODclParser(BufferLoadingParser):
         if not match:
             raise ValueError("Invalid time format: %s" % ts_str)
 
-        zulu_ts = "%04d-%02d-%02dT%02d:%02d:%fZ" % (
+        zulu_ts = "%04d-%02d-%02dT%02d:%02d:%09.6fZ" % (
             int(match.group(1)), int(match.group(2)), int(match.group(3)),
             int(match.group(4)), int(match.group(5)), float(match.group(6))
         )
         log.trace("converted ts '%s' to '%s'", ts_str[match.start(0):(match.start(0) + 24)], zulu_ts)
 
-        converted_time = float(parser.parse(zulu_ts).strftime("%s.%f"))
-        adjusted_time = converted_time - time.timezone
-        ntptime = ntplib.system_to_ntp_time(adjusted_time)
+        ntptime = iso8601_to_ntp_time(zulu_ts)
 
-        log.trace("Converted time \"%s\" (unix: %s) into %s", ts_str, adjusted_time, ntptime)
+        log.trace("Converted time \"%s\" into %s", ts_str, ntptime)
         return ntptime
 
     def parse_chunks(self):
@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+
+"""
+@package mi.dataset.parser.sio_block_index
+@file mi/dataset/parser/sio_block_index.py
+@brief On disk index of the validated SIO blocks in a data file.  Each
+    driver reading the same SIO file loads the index, extends it over any
+    data appended since it was last written and saves it again, so the SIO
+    headers in a file are only searched for and checksummed once.
+"""
+
+__license__ = 'Apache 2.0'
+
+import os
+import json
+import bisect
+import hashlib
+import tempfile
+
+from mi.core.log import get_logger ; log = get_logger()
+
+INDEX_VERSION = 1
+
+# Number of bytes before the indexed length which are compared to decide
+# if the data file was only appended to since it was indexed
+APPEND_CHECK_SIZE = 4096
+
+# constants for accessing a block in the index
+BLOCK_START = 0
+BLOCK_END = 1
+BLOCK_INSTRUMENT_ID = 2
+BLOCK_TIMESTAMP = 3
+BLOCK_CHECKSUM = 4
+
+
+class SioBlockIndex(object):
+    """
+    Index of the SIO blocks in one data file.  Blocks are stored as
+    [start, end, instrument id, timestamp, checksum] with start and end
+    offsets into the data as the parser sees it, after un-escaping
+    telemetered data.  Every block starting before the scanned offset
+    is in the index.
+
+    The index only replaces searching for and checksumming blocks.  Parsers
+    still step through every block, whatever its instrument id, because the
+    parser state records each block as processed.
+    """
+    def __init__(self, path):
+        """
+        @param path path of the index file, it need not exist yet
+        """
+        self.path = path
+        self.scanned = 0
+        self.blocks = []
+        self._starts = []
+        self._check = None
+        self._changed = False
+        self._load()
+
+    @classmethod
+    def for_file(cls, index_directory, data_path, recovered):
+        """
+        Get the index for a data file.  Offsets in telemetered files are
+        after un-escaping, so recovered and telemetered indexes are separate.
+        @param index_directory directory holding the index files
+        @param data_path path to the data file
+        @param recovered True if the file is parsed as recovered data
+        """
+        data_path = os.path.abspath(data_path)
+        name = "%s.%s.%s.sioidx" % (os.path.basename(data_path),
+                                    hashlib.md5(data_path).hexdigest()[:12],
+                                    'recovered' if recovered else 'telemetered')
+        return cls(os.path.join(index_directory, name))
+
+    def resume_offset(self, data):
+        """
+        Find where indexing of the data should continue.  If the indexed
+        part of the data has changed the index is discarded.
+        @param data the whole un-escaped data file
+        @retval offset to continue scanning for blocks from
+        """
+        if self.scanned > len(data) or self._check != self._check_digest(data, self.scanned):
+            if self.scanned:
+                log.info("SIO data changed since it was indexed, rebuilding index %s", self.path)
+            self._reset()
+        return self.scanned
+
+    def extend(self, data, blocks, scanned):
+        """
+        Add newly found blocks to the index
+        @param data the whole un-escaped data file
+        @param blocks list of [start, end, instrument id, timestamp, checksum]
+        @param scanned offset up to which all blocks have now been found
+        """
+        for block in blocks:
+            idx = bisect.bisect_left(self._starts, block[BLOCK_START])
+            if idx < len(self._starts) and self._starts[idx] == block[BLOCK_START]:
+                continue
+            self._starts.insert(idx, block[BLOCK_START])
+            self.blocks.insert(idx, block)
+
+        if scanned != self.scanned or blocks:
+            self.scanned = scanned
+            self._check = self._check_digest(data, scanned)
+            self._changed = True
+
+    def discard(self):
+        """
+        Throw away every indexed block, so the data is indexed again from
+        the start.  Used when an indexed block no longer matches the data.
+        """
+        log.info("SIO block index does not match the data, rebuilding index %s", self.path)
+        self._reset()
+        self._changed = True
+
+    def blocks_between(self, start, end):
+        """
+        Get the indexed blocks lying entirely between two offsets
+        @retval list of blocks in file order
+        """
+        idx = bisect.bisect_left(self._starts, start)
+        return [block for block in self.blocks[idx:bisect.bisect_left(self._starts, end)]
+                if block[BLOCK_END] <= end]
+
+    def save(self):
+        """
+        Write the index if it has changed.  The index file is replaced
+        atomically so other drivers never read a partial index.
+        """
+        if not self._changed:
+            return
+
+        index = {
+            'version': INDEX_VERSION,
+            'scanned': self.scanned,
+            'check': self._check,
+            'blocks': self.blocks
+        }
+        try:
+            (handle, temp_path) = tempfile.mkstemp(dir=os.path.dirname(self.path),
+                                                  prefix=os.path.basename(self.path))
+            with os.fdopen(handle, 'w') as index_file:
+                json.dump(index, index_file)
+            os.rename(temp_path, self.path)
+            self._changed = False
+        except (IOError, OSError) as e:
+            log.warn("Failed to write SIO block index %s: %s", self.path, e)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as index_file:
+                index = json.load(index_file)
+        except (IOError, ValueError) as e:
+            log.warn("Ignoring unreadable SIO block index %s: %s", self.path, e)
+            return
+
+        if index.get('version') != INDEX_VERSION:
+            log.info("Ignoring SIO block index %s with version %s", self.path, index.get('version'))
+            return
+
+        self.scanned = index['scanned']
+        self._check = index['check']
+        self.blocks = [[start, end, str(instrument_id), timestamp, checksum]
+                       for (start, end, instrument_id, timestamp, checksum) in index['blocks']]
+        self._starts = [block[BLOCK_START] for block in self.blocks]
+
+    def _reset(self):
+        self.scanned = 0
+        self.blocks = []
+        self._starts = []
+        self._check = self._check_digest('', 0)
+
+    @staticmethod
+    def _check_digest(data, length):
+        return hashlib.md5(data[max(0, length - APPEND_CHECK_SIZE):length]).hexdigest()
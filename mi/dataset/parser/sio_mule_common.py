@@ -13,16 +13,22 @@ The SioMuleParser class is used for Telemetered data files.
 __author__ = 'Emily Hahn'
 __license__ = 'Apache 2.0'
 
+import os
 import re
-import struct
+import mmap
+import bisect
 import gevent
 import time
 import ntplib
+from collections import deque
 
 from mi.core.common import BaseEnum
 from mi.core.log import get_logger; log = get_logger()
 from mi.core.exceptions import DatasetParserException
+from mi.core.checksum import crc16_x25
 from mi.dataset.dataset_parser import BufferLoadingParser
+from mi.dataset.parser.sio_block_index import SioBlockIndex, BLOCK_START, BLOCK_END, \
+    BLOCK_INSTRUMENT_ID, BLOCK_TIMESTAMP, BLOCK_CHECKSUM
 
 # SIO Main controller header (ascii) and data (binary):
 #   Start of header
@@ -62,6 +68,23 @@ SIO_HEADER_GROUP_TIMESTAMP = 3      # POSIX timestamp
 SIO_HEADER_GROUP_BLOCK_NUMBER = 4   # Block Number
 SIO_HEADER_GROUP_CHECKSUM = 5       # checksum
 
+# Length of the SIO controller header, including the start and end bytes
+SIO_HEADER_LENGTH = 33
+
+# Escape sequences in telemetered data
+SIO_ESCAPE_MATCHER = re.compile(b'\x18[\x6b\x58]')
+
+# Smallest read window, large enough for the longest possible SIO block
+MIN_READ_WINDOW_SIZE = SIO_HEADER_LENGTH + 0xFFFF + 1
+
+class SioConfigKey(BaseEnum):
+    # directory for the on disk index of SIO blocks in each file, shared by
+    # all drivers reading the same file.  No index is used if not set.
+    BLOCK_INDEX_DIRECTORY = 'block_index_directory'
+    # if set, the file is memory mapped instead of read into memory and
+    # unprocessed data is parsed this many bytes at a time
+    READ_WINDOW_SIZE = 'read_window_size'
+
 # blocks can be uniquely identified a combination of block number and timestamp,
 # since block numbers roll over after 255
 # each block may contain multiple data samples
@@ -78,6 +101,53 @@ END_IDX = 1
 SAMPLES_PARSED = 2
 SAMPLES_RETURNED = 3
 
+class SioFileBuffer(object):
+    """
+    Read only, memory mapped view of an SIO file, so the file is never read
+    into memory as a whole.  Telemetered data is un-escaped as it is sliced,
+    and offsets are in the un-escaped data, the same as if the whole file had
+    been read and un-escaped.
+    """
+    def __init__(self, stream_handle, unescape):
+        """
+        @param stream_handle An already open file handle
+        @param unescape True to un-escape telemetered data
+        """
+        self.raw_length = os.fstat(stream_handle.fileno()).st_size
+        self._map = None
+        if self.raw_length:
+            self._map = mmap.mmap(stream_handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+        # un-escaped offsets of the characters that were escaped in the file
+        self._escapes = []
+        if unescape and self._map is not None:
+            self._escapes = [match.start(0) - idx
+                             for (idx, match) in enumerate(SIO_ESCAPE_MATCHER.finditer(self._map))]
+
+    def __len__(self):
+        return self.raw_length - len(self._escapes)
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1]
+        (start, stop, step) = key.indices(len(self))
+        if stop <= start:
+            return ''
+        data = self._map[self._raw_offset(start):self._raw_offset(stop)]
+        if self._escapes:
+            data = data.replace(b'\x18\x6b', b'\x2b')
+            data = data.replace(b'\x18\x58', b'\x18')
+        return data
+
+    def startswith(self, prefix, offset=0):
+        return self[offset:offset + len(prefix)] == prefix
+
+    def _raw_offset(self, offset):
+        """
+        Convert an offset in the un-escaped data to an offset in the file
+        """
+        return offset + bisect.bisect_left(self._escapes, offset)
+
 class SioParser(BufferLoadingParser):
 
     def __init__(self, config, stream_handle, state, sieve_fn,
@@ -113,10 +183,21 @@ class SioParser(BufferLoadingParser):
         self.input_file = stream_handle
         self._mid_sample_packets = 0
         self._position = [0,0] # store both the start and end point for this read of data within the file
-        self._record_buffer = []  # holds list of records
+        self._record_buffer = deque()  # holds list of records
         self.recovered = recovered
         self._samples_to_throw_out = None
 
+        self._read_window_size = config.get(SioConfigKey.READ_WINDOW_SIZE)
+        if self._read_window_size is not None and self._read_window_size < MIN_READ_WINDOW_SIZE:
+            log.warn("SIO read window size %d is too small for an SIO block, using %d",
+                     self._read_window_size, MIN_READ_WINDOW_SIZE)
+            self._read_window_size = MIN_READ_WINDOW_SIZE
+
+        self._block_index = None
+        index_directory = config.get(SioConfigKey.BLOCK_INDEX_DIRECTORY)
+        if index_directory and hasattr(stream_handle, 'name'):
+            self._block_index = SioBlockIndex.for_file(index_directory, stream_handle.name, recovered)
+
         # use None flag in unprocessed data to initialize this
         # we read the entire file and get the size of the data
         self._read_state = {
@@ -131,33 +212,9 @@ class SioParser(BufferLoadingParser):
     def calc_checksum(self, data):
         """
         Calculate SIO header checksum of data
+        @retval checksum as an integer
         """
-        crc = 65535
-        if len(data) == 0:
-            return '0000'
-        for iData in range(0, len(data)):
-            short = struct.unpack('H', data[iData] + '\x00')
-            point = 255 & short[0]
-            crc = crc ^ point
-            for i in range(7, -1, -1):
-                if crc & 1:
-                    crc = (crc >> 1) ^ 33800
-                else:
-                    crc >>= 1
-        crc = ~crc
-        # convert to unsigned
-        if crc < 0:
-            crc += 65536
-        # get rid of the '0x' from the hex string
-        crc = "%s" % hex(crc)[2:].upper()
-        # make sure we have the right format for comparing, must be 4 hex digits
-        if len(crc) == 3:
-            crc = '0' + crc
-        elif len(crc) == 2:
-            crc = '00' + crc
-        elif len(crc) == 1:
-            crc = '000' + crc
-        return crc
+        return crc16_x25(data)
 
     def _combine_adjacent_packets(self, packets):
         """
@@ -196,28 +253,72 @@ class SioParser(BufferLoadingParser):
             next_idx += 1
 
         if len(unproc) > next_idx:
-            data = self.all_data[unproc[next_idx][START_IDX]:unproc[next_idx][END_IDX]]
-            self._position = unproc[next_idx]
+            packet = unproc[next_idx]
+            if self._read_window_size:
+                packet = self._next_window(packet)
+            data = self.all_data[packet[START_IDX]:packet[END_IDX]]
+            self._position = packet
         else:
             data = []
         return data
 
+    def _next_window(self, packet):
+        """
+        Limit the data read from a packet to the read window.  Long packets are read
+        one window at a time, each window ending before any SIO block which would be
+        split by the end of the window.
+        @param packet The start and end of the packet to read next
+        @retval The start and end of the data to read
+        """
+        start = packet[START_IDX]
+        if start < self._position[END_IDX] < packet[END_IDX]:
+            # continue from the end of the previous window of this packet
+            start = self._position[END_IDX]
+        elif packet[END_IDX] - start <= self._read_window_size:
+            return packet
+
+        end = min(packet[END_IDX], start + self._read_window_size)
+        if end < packet[END_IDX]:
+            split = self._split_block_start(self.all_data[start:end])
+            if split:
+                end = start + split
+        return [start, end]
+
+    def _split_block_start(self, raw_data):
+        """
+        Find the first SIO block which runs past the end of the data
+        @param raw_data The raw data to search
+        @retval start index of the block or None
+        """
+        for match in SIO_HEADER_MATCHER.finditer(raw_data):
+            if match.end(0) + int(match.group(SIO_HEADER_GROUP_DATA_LENGTH), 16) >= len(raw_data):
+                return match.start(0)
+        return None
+
     def get_num_records(self, num_records):
         """
         Loop through all the in process or unprocessed data until the requested number of records are found
         @param num records number of records to get
         """
         if self.all_data is None:
-            # need to read in the entire data file first and store it because escape sequences shift position of
-            # in process and unprocessed blocks
-            self.all_data = self.read_file()
+            if self._read_window_size and hasattr(self._stream_handle, 'fileno'):
+                # map the file rather than reading it, and un-escape it as it is read
+                self.all_data = SioFileBuffer(self._stream_handle, not self.recovered)
+                orig_len = self.all_data.raw_length
+            else:
+                # need to read in the entire data file first and store it because escape sequences shift position of
+                # in process and unprocessed blocks
+                self.all_data = self.read_file()
+                orig_len = len(self.all_data)
+
+                # need to replace escape chars if telemetered data
+                if not self.recovered:
+                    self.all_data = self.all_data.replace(b'\x18\x6b', b'\x2b')
+                    self.all_data = self.all_data.replace(b'\x18\x58', b'\x18')
             self.file_complete = True
-            orig_len = len(self.all_data)
 
-            # need to replace escape chars if telemetered data
-            if not self.recovered:
-                self.all_data = self.all_data.replace(b'\x18\x6b', b'\x2b')
-                self.all_data = self.all_data.replace(b'\x18\x58', b'\x18')
+            if self._block_index is not None:
+                self._update_block_index()
 
         # if unprocessed data has not been initialized yet, set it to the entire file
         if self._read_state[StateKey.UNPROCESSED_DATA] is None:
@@ -234,6 +335,11 @@ class SioParser(BufferLoadingParser):
                 data = self._get_next_unprocessed_data(self._read_state[StateKey.UNPROCESSED_DATA])
 
             if data and len(self._record_buffer) < num_records:
+                if self._read_window_size:
+                    # drop anything left after the last block of the previous window, so
+                    # block indices found by the sieve are relative to this window
+                    self._chunker.clean_all_chunks()
+
                 # there is more data, add it to the chunker
                 self._chunker.add_chunk(data, ntplib.system_to_ntp_time(time.time()))
 
@@ -392,18 +498,19 @@ class SioParser(BufferLoadingParser):
         Returns:
             A string containing the contents of the entire file.
         """
-        input_buffer = ''
+        input_buffer = []
+        self._read_sizes = self._block_sizes()
 
         while True:
-            # read data in small blocks in order to not block processing
-            next_data = self._stream_handle.read(1024)
+            # read data in blocks in order to not block processing
+            next_data = self._read_block()
             if next_data != '':
-                input_buffer = input_buffer + next_data
+                input_buffer.append(next_data)
                 gevent.sleep(0)
             else:
                 break
 
-        return input_buffer
+        return ''.join(input_buffer)
 
     def packet_exists(self, start, end):
         """
@@ -443,7 +550,7 @@ class SioParser(BufferLoadingParser):
         else:
             self._position = [state_obj[StateKey.UNPROCESSED_DATA][0][START_IDX],
                               state_obj[StateKey.UNPROCESSED_DATA][0][START_IDX]]
-        self._record_buffer = []
+        self._record_buffer = deque()
         self._state = state_obj
         self._read_state = state_obj
 
@@ -458,22 +565,61 @@ class SioParser(BufferLoadingParser):
         # make sure we have cleaned the chunker out of old data so there are no wrap arounds
         self._chunker.clean_all_chunks()
 
-    def sieve_function(self, raw_data):
+    def _update_block_index(self):
         """
-        Sieve function for SIO Parser.
-        Sort through the raw data to identify blocks of data that need processing.
-        This sieve identifies the SIO header, verifies the checksum,
-        calculates the end of the SIO block, and returns a list of
-        start,end indices.
+        Add the blocks in data appended to the file since it was last indexed
+        to the block index, and save it for other drivers reading this file.
+        The data is searched one read window at a time if there is one.
+        """
+        resume = self._block_index.resume_offset(self.all_data)
+        window = self._read_window_size or len(self.all_data)
+        blocks = []
+
+        start = resume
+        while True:
+            data = self.all_data[start:start + window]
+            (found, incomplete) = self._find_blocks(data)
+            blocks.extend([[start + match.start(0), start + end_packet_idx + 1, match.group(SIO_HEADER_GROUP_ID),
+                            int(match.group(SIO_HEADER_GROUP_TIMESTAMP), 16),
+                            int(match.group(SIO_HEADER_GROUP_CHECKSUM), 16)]
+                           for (match, end_packet_idx) in found])
+
+            if start + len(data) >= len(self.all_data):
+                # continue next time from the first block that was cut off at the end of
+                # the file, or where a header may have been cut off
+                scanned = max(start, len(self.all_data) - SIO_HEADER_LENGTH + 1)
+                if incomplete is not None:
+                    scanned = min(scanned, start + incomplete)
+                break
+
+            # search the next window from the block cut off by the end of this window,
+            # or overlapping this one by enough to find a header cut off by it
+            if incomplete:
+                start += incomplete
+            else:
+                start += len(data) - SIO_HEADER_LENGTH + 1
+            gevent.sleep(0)
+
+        self._block_index.extend(self.all_data, blocks, scanned)
+        self._block_index.save()
+
+    def _find_blocks(self, raw_data, pos=0):
+        """
+        Search raw_data for SIO blocks.  Each SIO header is found, the end of
+        the SIO block is calculated from it and the checksum of the block verified.
         @param raw_data The raw data to search
-        @retval list of matched start,end index found in raw_data
+        @param pos Offset into raw_data to start searching from
+        @retval (list of (header match, end of block index) tuples for the valid
+            blocks, start index of the first block running past the end of
+            raw_data or None)
         """
-        return_list = []
+        blocks = []
+        incomplete = None
 
         #
         # Search the entire input buffer to find all possible SIO headers.
         #
-        for match in SIO_HEADER_MATCHER.finditer(raw_data):
+        for match in SIO_HEADER_MATCHER.finditer(raw_data, pos):
             #
             # Calculate the expected end index of the SIO block.
             # If there are enough bytes to comprise an entire SIO block,
@@ -498,30 +644,95 @@ class SioParser(BufferLoadingParser):
                     actual_checksum = self.calc_checksum(
                         raw_data[match.end(0):end_packet_idx])
 
-                    expected_checksum = match.group(SIO_HEADER_GROUP_CHECKSUM)
+                    expected_checksum = int(match.group(SIO_HEADER_GROUP_CHECKSUM), 16)
 
-                    #
-                    # If the checksums match, add the start,end indices to
-                    # the return list.  The end of SIO block byte is included.
-                    #
                     if actual_checksum == expected_checksum:
-                        # even if this is not the right instrument, keep track that
-                        # this packet was processed
-                        if not self.packet_exists(match.start(0), end_packet_idx+1):
-                            self._read_state[StateKey.IN_PROCESS_DATA].append([match.start(0),
-                                                                               end_packet_idx+1,
-                                                                               None, 0])
-                        return_list.append((match.start(0), end_packet_idx+1))
+                        blocks.append((match, end_packet_idx))
                     else:
-                        log.debug("Calculated checksum %s != received checksum %s for header %s and packet %d to %d",
+                        log.debug("Calculated checksum %04X != received checksum %04X for header %s and packet %d to %d",
                                   actual_checksum, expected_checksum,
                                   match.group(0)[1:32],
                                   match.end(0), end_packet_idx)
                 else:
                     log.debug('End packet at %d is not x03 for header %s',
                               end_packet_idx, match.group(0)[1:32])
+            elif incomplete is None:
+                incomplete = match.start(0)
 
-        return return_list
+        return (blocks, incomplete)
+
+    def _indexed_blocks(self, raw_data):
+        """
+        Look up the blocks in raw_data in the block index.  This only works if
+        raw_data is the file data at the current position.  The header of each
+        indexed block is checked against the data, and the index is rebuilt if
+        any of them don't match.
+        @param raw_data The raw data to search
+        @retval list of start,end indices of the blocks in raw_data, or None if
+            raw_data is not at the current position
+        """
+        offset = self._position[START_IDX]
+        if not self.all_data.startswith(raw_data, offset):
+            return None
+
+        blocks = self._block_index.blocks_between(offset, offset + len(raw_data))
+        for block in blocks:
+            if not self._block_matches(raw_data, block[BLOCK_START] - offset, block):
+                self._block_index.discard()
+                self._update_block_index()
+                blocks = self._block_index.blocks_between(offset, offset + len(raw_data))
+                break
+
+        return [(block[BLOCK_START] - offset, block[BLOCK_END] - offset) for block in blocks]
+
+    def _block_matches(self, raw_data, start, block):
+        """
+        Check an indexed block against the header found at its start in the data.
+        This is much cheaper than checksumming the block again, but catches
+        blocks that have moved since they were indexed.
+        @param raw_data The raw data holding the block
+        @param start Start of the block in raw_data
+        @param block The indexed block
+        @retval True if the header matches the indexed block
+        """
+        match = SIO_HEADER_MATCHER.match(raw_data, start)
+        if match is None:
+            return False
+        end = start + block[BLOCK_END] - block[BLOCK_START]
+        return match.group(SIO_HEADER_GROUP_ID) == block[BLOCK_INSTRUMENT_ID] and \
+            int(match.group(SIO_HEADER_GROUP_TIMESTAMP), 16) == block[BLOCK_TIMESTAMP] and \
+            int(match.group(SIO_HEADER_GROUP_CHECKSUM), 16) == block[BLOCK_CHECKSUM] and \
+            match.end(0) + int(match.group(SIO_HEADER_GROUP_DATA_LENGTH), 16) + 1 == end and \
+            raw_data[end - 1:end] == SIO_BLOCK_END
+
+    def sieve_function(self, raw_data):
+        """
+        Sieve function for SIO Parser.
+        Sort through the raw data to identify blocks of data that need processing.
+        This sieve identifies the SIO header, verifies the checksum,
+        calculates the end of the SIO block, and returns a list of
+        start,end indices.  Blocks are taken from the block index, if
+        there is one, instead of searching and checksumming them again.
+        @param raw_data The raw data to search
+        @retval list of matched start,end index found in raw_data
+        """
+        block_list = None
+        if self._block_index is not None:
+            block_list = self._indexed_blocks(raw_data)
+        if block_list is None:
+            (blocks, incomplete) = self._find_blocks(raw_data)
+            block_list = [(match.start(0), end_packet_idx + 1) for (match, end_packet_idx) in blocks]
+
+        #
+        # Add the start,end indices to the return list.  The end of SIO block byte is included.
+        #
+        for (start, end) in block_list:
+            # even if this is not the right instrument, keep track that
+            # this packet was processed
+            if not self.packet_exists(start, end):
+                self._read_state[StateKey.IN_PROCESS_DATA].append([start, end, None, 0])
+
+        return block_list
 
     def _yank_particles(self, num_to_fetch):
         """
@@ -533,18 +744,16 @@ class SioParser(BufferLoadingParser):
         elements it was able to collect.
         """
         return_list = []
+        popleft = self._record_buffer.popleft
         if self._samples_to_throw_out is not None:
-            records_to_return = self._record_buffer[self._samples_to_throw_out:(num_to_fetch+self._samples_to_throw_out)]
-            self._record_buffer = self._record_buffer[(num_to_fetch+self._samples_to_throw_out):]
+            for i in xrange(min(self._samples_to_throw_out, len(self._record_buffer))):
+                popleft()
 
             # reset samples to throw out
             self._samples_to_throw_out = None
-        else:
-            records_to_return = self._record_buffer[:num_to_fetch]
-            self._record_buffer = self._record_buffer[num_to_fetch:]
-        if len(records_to_return) > 0:
-            for item in records_to_return:
-                return_list.append(item)
+        for i in xrange(min(num_to_fetch, len(self._record_buffer))):
+            return_list.append(popleft())
+        if len(return_list) > 0:
             self._publish_sample(return_list)
 
             # need to keep track of which records have actually been returned
@@ -559,6 +559,39 @@ class DostaAbcdjmDclParserUnitTestCase(ParserUnitTestCase):
 
         log.debug('===== END TEST SENSOR DATA =====')
 
+    def test_read_blocks(self):
+        """
+        Read a file in small fixed blocks, in growing blocks and with
+        readahead.  Verify that the particles are the same and that the
+        whole file was read.
+        """
+        log.debug('===== START TEST READ BLOCKS =====')
+        expected_particle = []
+        for expected in EXPECTED_FILE3:
+            particle = DostaAbcdjmDclRecoveredInstrumentDataParticle(expected)
+            expected_particle.append(particle)
+
+        read_configs = [
+            {DataSetDriverConfigKeys.READ_BLOCK_SIZE: 64,
+             DataSetDriverConfigKeys.MAX_READ_BLOCK_SIZE: 64},
+            {DataSetDriverConfigKeys.READ_BLOCK_SIZE: 64},
+            {DataSetDriverConfigKeys.READ_BLOCK_SIZE: 64,
+             DataSetDriverConfigKeys.READAHEAD_BLOCKS: 2}
+        ]
+        rec_config = self.rec_config
+        for read_config in read_configs:
+            self.rec_config = dict(rec_config, **read_config)
+            in_file = self.open_file(FILE3)
+            parser = self.create_rec_parser(in_file)
+
+            result = parser.get_records(len(expected_particle))
+            self.assertEqual(result, expected_particle)
+            self.assertEqual(in_file.tell(), os.path.getsize(in_file.name))
+            self.assertEqual(self.rec_exception_callback_value, None)
+            in_file.close()
+
+        log.debug('===== END TEST READ BLOCKS =====')
+
     def test_set_state(self):
         """
         This test verifies that the state can be changed after starting.
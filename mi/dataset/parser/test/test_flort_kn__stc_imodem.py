@@ -6,7 +6,9 @@
 @author Emily Hahn
 @brief Test code for a Flort_kn__stc_imodem data parser
 """
+import mmap
 import struct, ntplib
+import tempfile
 from StringIO import StringIO
 
 from nose.plugins.attrib import attr
@@ -288,3 +290,50 @@ class Flort_kn__stc_imodemParserUnitTestCase(ParserUnitTestCase):
 	result = self.parser.get_records(4)
 	if len(result) == 4:
 	    self.fail("We got 4 records, the bad data should only make 3")
+
+    def test_status_between_samples(self):
+        """
+        Test that a profile status record between samples is skipped and
+        counted in the position of the following samples
+        """
+        status = "\xff\xff\xff\xff\x00\x00\x00\rR\x9d\xac\xd4R\x9d\xadQ"
+        data = Flort_kn__stc_imodemParserUnitTestCase.TEST_DATA_SHORT
+        self.stream_handle = StringIO(data[:76] + status + data[76:])
+        self.parser = Flort_kn_stc_imodemParser(self.config, self.start_state, self.stream_handle,
+                                                self.state_callback, self.pub_callback)
+
+        result = self.parser.get_records(2)
+        self.assertEqual(result, [self.particle_a_eng, self.particle_b_eng])
+        self.assertEqual(self.state_callback_value[StateKey.POSITION], 76)
+        result = self.parser.get_records(1)
+        self.assert_result(result, 118, self.particle_c_eng, False)
+        result = self.parser.get_records(1)
+        self.assert_result(result, 144, self.particle_d_eng, True)
+
+    def test_file_closed(self):
+        """
+        Test that the memory map of a real file is closed when the state is
+        changed and when the last record has been handed out
+        """
+        self.stream_handle = tempfile.TemporaryFile()
+        self.stream_handle.write(Flort_kn__stc_imodemParserUnitTestCase.TEST_DATA_SHORT)
+        self.stream_handle.seek(0)
+        self.parser = Flort_kn_stc_imodemParser(self.config, self.start_state, self.stream_handle,
+                                                self.state_callback, self.pub_callback)
+
+        result = self.parser.get_records(1)
+        self.assert_result(result, 50, self.particle_a_eng, False)
+        data = self.parser._data
+        self.assert_(isinstance(data, mmap.mmap))
+        self.parser.set_state({StateKey.POSITION: 76})
+        self.assertRaises(ValueError, len, data)
+
+        result = self.parser.get_records(1)
+        self.assert_result(result, 102, self.particle_c_eng, False)
+        data = self.parser._data
+        result = self.parser.get_records(1)
+        self.assert_result(result, 128, self.particle_d_eng, True)
+        self.assertRaises(ValueError, len, data)
+        self.assertEqual(self.parser._data, None)
+        self.assertEqual(self.parser.get_records(1), [])
+        self.stream_handle.close()
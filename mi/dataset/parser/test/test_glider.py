@@ -7,6 +7,9 @@
 @brief Test code for a Glider data parser.
 """
 
+import os
+import shutil
+import tempfile
 from StringIO import StringIO
 
 import numpy as np
@@ -21,6 +24,7 @@ from mi.core.exceptions import SampleException
 from mi.dataset.test.test_parser import ParserUnitTestCase
 from mi.dataset.dataset_driver import DataSetDriverConfigKeys
 from mi.dataset.parser.glider import GliderParser, GliderEngineeringParser, StateKey
+from mi.dataset.parser.glider_columns import GliderColumns, BAD_VALUE_LINE
 from mi.dataset.parser.glider import CtdgvRecoveredDataParticle, CtdgvTelemeteredDataParticle, CtdgvParticleKey
 from mi.dataset.parser.glider import DostaTelemeteredDataParticle, DostaTelemeteredParticleKey
 from mi.dataset.parser.glider import DostaRecoveredDataParticle, DostaRecoveredParticleKey
@@ -158,11 +162,6 @@ NaN 0 NaN NaN NaN NaN NaN NaN NaN NaN NaN NaN NaN NaN NaN NaN NaN NaN NaN NaN Na
 INT_GPS_VALUE = """
 NaN 2012 NaN NaN NaN NaN NaN NaN NaN NaN NaN NaN NaN NaN NaN NaN NaN NaN NaN NaN NaN NaN NaN NaN NaN NaN NaN NaN NaN """
 
-CHUNKER_TEST = """
-0.273273 NaN NaN 0.335 149.608 0.114297 33.9352 -64.3506 NaN NaN NaN 5011.38113678061 -14433.5809717525 NaN 121546 1378349641.79871 NaN NaN NaN 0 NaN NaN NaN NaN NaN NaN NaN 11.00
-3 NaN NaN NaN NaN NaN NaN NaN NaN NaN 1.23569 NaN NaN -0.0820305 121379 1378349475.09927 0.236869 NaN NaN NaN NaN NaN NaN NaN NaN NaN NaN NaN 1
-"""
-
 CTDGV_RECORD = """
 NaN NaN NaN NaN NaN NaN NaN NaN NaN NaN NaN NaN NaN NaN 121147 1378349241.82962 NaN NaN NaN NaN NaN NaN 121147 1378349241.82962 NaN NaN 4.03096 0.021 15.3683
 NaN NaN NaN NaN NaN NaN NaN NaN NaN NaN NaN NaN NaN NaN 121207 1378349302.10907 NaN NaN NaN NaN NaN NaN 121207 1378349302.10907 NaN NaN 4.03113 0.093 15.3703 """
@@ -330,29 +329,6 @@ class GliderParserUnitTestCase(ParserUnitTestCase):
             self.set_data("Foo")
             self.reset_parser()
 
-    def test_chunker(self):
-        """
-        Verify the chunker is returning values we expect.
-        """
-        self.set_data(HEADER, CHUNKER_TEST)
-        self.reset_parser()
-
-        records = CHUNKER_TEST.strip("\n").split("\n")
-        log.debug("Expected Records: %s", records)
-        self.assertEqual(len(records), 2)
-
-        # Load all data into the chunker
-        self.parser.get_block(1024)
-
-        self.assertEqual(CHUNKER_TEST.strip("\n"), self.parser._chunker.buffer.strip("\n"))
-
-        (timestamp, data_record, start, end) = self.parser._chunker.get_next_data_with_index()
-        log.debug("Data Record: %s", data_record)
-        self.assertEqual(records[0]+"\n", data_record)
-
-        (timestamp, data_record, start, end) = self.parser._chunker.get_next_data_with_index()
-        self.assertEqual(records[1]+"\n", data_record)
-
 
 @attr('UNIT', group='mi')
 class CTDGV_Telemetered_GliderTest(GliderParserUnitTestCase):
@@ -398,6 +374,116 @@ class CTDGV_Telemetered_GliderTest(GliderParserUnitTestCase):
         records = self.parser.get_records(1)
         self.assertEqual(len(records), 0)
 
+@attr('UNIT', group='mi')
+class GliderColumnsTest(GliderParserUnitTestCase):
+    """
+    Test reading the glider data section into columns
+    """
+    config = {
+        DataSetDriverConfigKeys.PARTICLE_MODULE: 'mi.dataset.parser.glider',
+        DataSetDriverConfigKeys.PARTICLE_CLASS: 'CtdgvTelemeteredDataParticle'
+    }
+
+    def test_column_types(self):
+        """
+        Columns are typed by their number of bytes, lat/lon columns are converted
+        to decimal degrees and NaN is NaN in every column
+        """
+        header = {'labels': ['c_count', 'm_gps_lat', 'm_name', 'm_value'],
+                  'num_of_bytes': [1, 8, 3, 4],
+                  'sensors_per_cycle': 4}
+        columns = GliderColumns("2 4434.5 abc 1.5\n  \nNaN NaN NaN NaN\n1 2 3\n", 100, header)
+
+        self.assertEqual(columns.num_rows, 2)
+        self.assertEqual(columns.line_ends, [117, 120, 136, 142])
+        self.assertEqual(columns.bad_lines, {3: 3})
+        self.assertEqual(columns.start_line(120), 2)
+        self.assertEqual(columns.start_line(121), None)
+
+        row = columns.row_values(0, header['labels'] + ['missing'], lambda value: 'converted %s' % value)
+        self.assertEqual(sorted(row.keys()), sorted(header['labels']))
+        self.assertEqual([row[label]['Data'] for label in header['labels']],
+                         [2, 'converted 4434.5', 'abc', 1.5])
+        self.assertIsInstance(row['c_count']['Data'], int)
+
+        row = columns.row_values(1, header['labels'], lambda value: None)
+        self.assertTrue(all(np.isnan(row[label]['Data']) for label in header['labels']))
+
+        self.assertEqual(columns.has_data(['m_value']).tolist(), [True, False])
+        self.assertEqual(columns.has_data(['m_name', 'missing']).tolist(), [True, False])
+
+    def test_bad_row(self):
+        """
+        A row with the wrong number of columns is reported and skipped
+        """
+        bad_row = "\nNaN 121147 1378349241.82962 4.03096"
+        self.set_data(HEADER, CTDGV_RECORD.rstrip(" "), bad_row, CTDGV_RECORD)
+        self.reset_parser()
+
+        records = self.parser.get_records(5)
+        self.assertEqual(len(records), 4)
+        self.assertEqual(len(self.error_callback_values), 1)
+        self.assertIsInstance(self.error_callback_values[0], SampleException)
+
+        # the last line has no newline, it is counted as if it did
+        self.assertEqual(self.state_callback_values[-1][StateKey.POSITION],
+                         len(HEADER + CTDGV_RECORD.rstrip(" ") + bad_row + CTDGV_RECORD) + 1)
+
+    def test_bad_value(self):
+        """
+        Values that can't be converted to their column type are found per row,
+        and only the rows holding them are marked bad
+        """
+        header = {'labels': ['c_count', 'm_gps_lat', 'm_value'],
+                  'num_of_bytes': [1, 8, 4],
+                  'sensors_per_cycle': 3}
+        columns = GliderColumns("2 4434.5 1.5\n1.7 4434.5 2.5\n3 4434.5 x\n-4 bad NaN\n", 0, header)
+
+        self.assertEqual(columns.line_rows, [0, BAD_VALUE_LINE, BAD_VALUE_LINE, 3])
+        self.assertEqual(columns.bad_values, {1: ('c_count', '1.7'), 2: ('m_value', 'x')})
+        self.assertEqual(columns.row_values(3, ['c_count'], None)['c_count']['Data'], -4)
+        self.assertEqual(columns.values('m_value')[0], 1.5)
+
+    def test_bad_value_row(self):
+        """
+        A row with a value that can't be converted is reported and skipped, the
+        rows around it are still published
+        """
+        bad_record = CTDGV_RECORD.rstrip(" ").replace("15.3683", "15.3.683")
+        self.set_data(HEADER, bad_record, CTDGV_RECORD)
+        self.reset_parser()
+
+        records = self.parser.get_records(5)
+        self.assertEqual(len(records), 3)
+        self.assertEqual(len(self.error_callback_values), 1)
+        self.assertIsInstance(self.error_callback_values[0], SampleException)
+
+    def test_file_cache(self):
+        """
+        Parsers reading the same file share the columns, including when
+        resuming from a saved position
+        """
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'test.mrg')
+            with open(path, 'w') as data_file:
+                data_file.write(HEADER + CTDGV_RECORD)
+
+            self.test_data = open(path)
+            self.reset_parser()
+            columns = GliderColumns.for_stream(self.test_data, self.parser._header_dict, 1003)
+            self.assertEqual(len(self.parser.get_records(2)), 2)
+            self.assertEqual(self.state_callback_values[-1][StateKey.POSITION], 1321)
+
+            self.test_data = open(path)
+            self.reset_parser({StateKey.POSITION: 1162})
+            self.assertIs(GliderColumns.for_stream(self.test_data, self.parser._header_dict, 1162), columns)
+            self.assert_generate_particle(CtdgvTelemeteredDataParticle, None, 1321)
+            self.assert_no_more_data()
+        finally:
+            shutil.rmtree(directory)
+
+
 @attr('UNIT', group='mi')
 class CTDGV_Recovered_GliderTest(GliderParserUnitTestCase):
     """
@@ -767,6 +853,36 @@ class ENGGliderTest(GliderParserUnitTestCase):
         self.assert_generate_particle(EngineeringScienceTelemeteredDataParticle, record_sci_2, 12479)
         self.assert_no_more_data()
 
+    def test_partial_yank(self):
+        """
+        Verify the state built from the marker of the last record handed out
+        when only part of the buffered records are requested.
+        """
+        self.set_data(HEADER4, ENGSCI_RECORD)
+        self.reset_eng_parser()
+
+        records = self.parser.get_records(2)
+        self.assertEqual(len(records), 2)
+        self.assertEqual(self.get_state_value(), {StateKey.POSITION: 9110, StateKey.SENT_METADATA: True})
+        # the rest of the records are still buffered
+        self.assertEqual(len(self.parser._record_buffer), 3)
+
+        records = self.parser.get_records(2)
+        self.assertEqual(len(records), 2)
+        state = self.get_state_value()
+        self.assertEqual(state, {StateKey.POSITION: 10795, StateKey.SENT_METADATA: True})
+        # the published state is not the parser's own read state
+        self.assertIsNot(state, self.parser._read_state)
+
+        # restarting from the published state picks up with the last row
+        self.set_data(HEADER4, ENGSCI_RECORD)
+        self.reset_eng_parser(state)
+        records = self.parser.get_records(5)
+        self.assertEqual(len(records), 2)
+        self.assertIsInstance(records[0], EngineeringTelemeteredDataParticle)
+        self.assertIsInstance(records[1], EngineeringScienceTelemeteredDataParticle)
+        self.assertEqual(self.get_state_value(), {StateKey.POSITION: 12479, StateKey.SENT_METADATA: True})
+
 @attr('UNIT', group='mi')
 class ENGRecoveredGliderTest(GliderParserUnitTestCase):
     """
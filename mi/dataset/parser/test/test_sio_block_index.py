@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+
+"""
+@package mi.dataset.parser.test.test_sio_block_index
+@file mi/dataset/parser/test/test_sio_block_index.py
+@brief Test the shared SIO block index
+"""
+
+__license__ = 'Apache 2.0'
+
+import os
+import shutil
+import tempfile
+from nose.plugins.attrib import attr
+
+from mi.core.log import get_logger ; log = get_logger()
+
+from mi.dataset.test.test_parser import ParserUnitTestCase
+from mi.dataset.parser.dostad import DostadParser
+from mi.dataset.parser.sio_mule_common import SioParser, SioConfigKey
+from mi.dataset.parser.sio_block_index import SioBlockIndex, BLOCK_INSTRUMENT_ID, BLOCK_START, \
+    APPEND_CHECK_SIZE
+from mi.dataset.dataset_driver import DataSetDriverConfigKeys
+
+from mi.idk.config import Config
+RESOURCE_PATH = os.path.join(Config().base_dir(), 'mi',
+                             'dataset', 'driver', 'mflm',
+                             'dosta', 'resource')
+
+
+@attr('UNIT', group='mi')
+class SioBlockIndexUnitTestCase(ParserUnitTestCase):
+
+    def setUp(self):
+        ParserUnitTestCase.setUp(self)
+        self.directory = tempfile.mkdtemp()
+        self.data_path = os.path.join(self.directory, 'node59p1.dat')
+        with open(os.path.join(RESOURCE_PATH, 'node59p1_shorter.dat'), 'rb') as filehandle:
+            self.data = filehandle.read()
+
+        self.checksum_count = 0
+        calc_checksum = SioParser.calc_checksum
+
+        def counting_checksum(parser, data):
+            self.checksum_count += 1
+            return calc_checksum(parser, data)
+        SioParser.calc_checksum = counting_checksum
+        self.addCleanup(setattr, SioParser, 'calc_checksum', calc_checksum)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, data):
+        with open(self.data_path, 'wb') as filehandle:
+            filehandle.write(data)
+
+    def parse(self, use_index):
+        """
+        Parse the whole data file
+        @retval (particles, final parser state)
+        """
+        config = {
+            DataSetDriverConfigKeys.PARTICLE_MODULE: 'mi.dataset.parser.dostad',
+            DataSetDriverConfigKeys.PARTICLE_CLASS: 'DostadParserDataParticle'
+        }
+        if use_index:
+            config[SioConfigKey.BLOCK_INDEX_DIRECTORY] = self.directory
+
+        states = []
+        particles = []
+        with open(self.data_path, 'rb') as stream_handle:
+            parser = DostadParser(config, None, stream_handle, states.append, lambda x: None, lambda x: None)
+            result = parser.get_records(1)
+            while result:
+                particles.extend(result)
+                result = parser.get_records(1)
+        return (particles, states[-1])
+
+    def test_index_matches_search(self):
+        """
+        Parsing with the block index gives the same particles and state, and
+        a second parser using the index doesn't checksum any blocks
+        """
+        self.write(self.data)
+        expected = self.parse(False)
+        self.assertTrue(len(expected[0]) > 0)
+        searched_count = self.checksum_count
+
+        self.checksum_count = 0
+        self.assertEqual(self.parse(True), expected)
+        self.assertEqual(self.checksum_count, searched_count)
+
+        index = SioBlockIndex.for_file(self.directory, self.data_path, False)
+        self.assertEqual(len(index.blocks), searched_count)
+        self.assertTrue('DO' in [block[BLOCK_INSTRUMENT_ID] for block in index.blocks])
+
+        self.checksum_count = 0
+        self.assertEqual(self.parse(True), expected)
+        self.assertEqual(self.checksum_count, 0)
+
+    def test_growing_file(self):
+        """
+        Only blocks appended to the file since it was indexed are checksummed
+        """
+        self.write(self.data[:5000])
+        self.parse(True)
+
+        self.write(self.data)
+        self.checksum_count = 0
+        expected = self.parse(False)
+        searched_count = self.checksum_count
+
+        self.checksum_count = 0
+        self.assertEqual(self.parse(True), expected)
+        self.assertTrue(0 < self.checksum_count < searched_count)
+
+    def test_replaced_file(self):
+        """
+        The index is rebuilt if the indexed data changes
+        """
+        self.write(self.data)
+        self.parse(True)
+
+        self.write(self.data[1000:])
+        expected = self.parse(False)
+        self.assertEqual(self.parse(True), expected)
+
+    def test_rewritten_before_tail(self):
+        """
+        The index is rebuilt if the data is rewritten before the part used to
+        check for appends, and indexed blocks are no longer where they were
+        """
+        self.write(self.data)
+        self.parse(True)
+        first_start = SioBlockIndex.for_file(self.directory, self.data_path, False).blocks[0][BLOCK_START]
+
+        tail = len(self.data) - 2 * APPEND_CHECK_SIZE
+        self.write('\x00' * 100 + self.data[:tail - 100] + self.data[tail:])
+        expected = self.parse(False)
+
+        self.checksum_count = 0
+        self.assertEqual(self.parse(True), expected)
+        self.assertTrue(self.checksum_count > 0)
+
+        index = SioBlockIndex.for_file(self.directory, self.data_path, False)
+        self.assertEqual(index.blocks[0][BLOCK_START], first_start + 100)
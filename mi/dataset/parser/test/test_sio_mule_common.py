@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+
+"""
+@package mi.dataset.parser.test.test_sio_mule_common
+@file mi/dataset/parser/test/test_sio_mule_common.py
+@brief Test reading SIO files through a memory map, one window at a time
+"""
+
+__license__ = 'Apache 2.0'
+
+import os
+import re
+import copy
+import random
+import shutil
+import tempfile
+from nose.plugins.attrib import attr
+
+from mi.core.log import get_logger ; log = get_logger()
+
+from mi.dataset.test.test_parser import ParserUnitTestCase
+from mi.dataset.parser.dostad import DostadParser
+from mi.dataset.parser.sio_mule_common import SioFileBuffer, SioConfigKey, StateKey
+from mi.dataset.parser.sio_mule_common import MIN_READ_WINDOW_SIZE, SIO_HEADER_REGEX
+from mi.dataset.dataset_driver import DataSetDriverConfigKeys
+
+from mi.idk.config import Config
+RESOURCE_PATH = os.path.join(Config().base_dir(), 'mi',
+                             'dataset', 'driver', 'mflm',
+                             'dosta', 'resource')
+
+
+@attr('UNIT', group='mi')
+class SioStreamingUnitTestCase(ParserUnitTestCase):
+
+    def setUp(self):
+        """
+        Copy the start of node59p1.dat, cut at the first block past two read
+        windows, so the windowed parses still cross window boundaries
+        """
+        ParserUnitTestCase.setUp(self)
+        with open(os.path.join(RESOURCE_PATH, 'node59p1.dat'), 'rb') as stream_handle:
+            data = stream_handle.read()
+        end = re.compile(SIO_HEADER_REGEX).search(data, 2 * MIN_READ_WINDOW_SIZE).start()
+
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'node59p1.dat')
+        with open(self.path, 'wb') as stream_handle:
+            stream_handle.write(data[:end])
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def parse(self, config=None, state=None, max_particles=None):
+        """
+        Parse the data file three records at a time
+        @retval (particles, list of parser states)
+        """
+        parser_config = {
+            DataSetDriverConfigKeys.PARTICLE_MODULE: 'mi.dataset.parser.dostad',
+            DataSetDriverConfigKeys.PARTICLE_CLASS: 'DostadParserDataParticle'
+        }
+        parser_config.update(config or {})
+
+        states = []
+        particles = []
+        with open(self.path, 'rb') as stream_handle:
+            parser = DostadParser(parser_config, copy.deepcopy(state), stream_handle,
+                                  lambda state: states.append(copy.deepcopy(state)),
+                                  lambda x: None, lambda x: None)
+            result = parser.get_records(3)
+            while result:
+                particles.extend(result)
+                if max_particles and len(particles) >= max_particles:
+                    break
+                result = parser.get_records(3)
+        return (particles, states)
+
+    def test_file_buffer(self):
+        """
+        Slices of the mapped file match slices of the un-escaped file
+        """
+        with open(self.path, 'rb') as stream_handle:
+            raw = stream_handle.read()
+            unescaped = raw.replace(b'\x18\x6b', b'\x2b').replace(b'\x18\x58', b'\x18')
+            self.assertNotEqual(len(raw), len(unescaped))
+
+            for (data, unescape) in [(unescaped, True), (raw, False)]:
+                file_buffer = SioFileBuffer(stream_handle, unescape)
+                self.assertEqual(len(file_buffer), len(data))
+                self.assertEqual(file_buffer.raw_length, len(raw))
+                self.assertEqual(file_buffer[:], data)
+
+                rand = random.Random(1)
+                for i in range(200):
+                    start = rand.randint(0, len(data))
+                    end = start + rand.randint(0, 5000)
+                    self.assertEqual(file_buffer[start:end], data[start:end])
+                    self.assertTrue(file_buffer.startswith(data[start:end], start))
+
+    def test_matches_whole_file(self):
+        """
+        Parsing one window at a time gives the same particles and final state as
+        reading the whole file
+        """
+        (expected, expected_states) = self.parse()
+        (particles, states) = self.parse({SioConfigKey.READ_WINDOW_SIZE: MIN_READ_WINDOW_SIZE})
+        self.assertEqual(particles, expected)
+        self.assertEqual(states[-1], expected_states[-1])
+        # the in process data only covers one window
+        self.assertTrue(max([len(state[StateKey.IN_PROCESS_DATA]) for state in states]) <
+                        max([len(state[StateKey.IN_PROCESS_DATA]) for state in expected_states]))
+
+    def test_resume(self):
+        """
+        Parser state saved part way through a windowed parse can be resumed with or
+        without a read window, and the other way around
+        """
+        (expected, expected_states) = self.parse()
+        window_config = {SioConfigKey.READ_WINDOW_SIZE: MIN_READ_WINDOW_SIZE}
+
+        count = len(expected) / 2
+        (particles, states) = self.parse(window_config, max_particles=count)
+        self.assertEqual(particles + self.parse(state=states[-1])[0], expected)
+        self.assertEqual(particles + self.parse(window_config, state=states[-1])[0], expected)
+
+        (particles, states) = self.parse(max_particles=count)
+        self.assertEqual(particles + self.parse(window_config, state=states[-1])[0], expected)
+
+    def test_block_index(self):
+        """
+        The block index is built one window at a time
+        """
+        (expected, expected_states) = self.parse()
+        config = {SioConfigKey.READ_WINDOW_SIZE: MIN_READ_WINDOW_SIZE,
+                  SioConfigKey.BLOCK_INDEX_DIRECTORY: self.directory}
+        for i in range(2):
+            (particles, states) = self.parse(config)
+            self.assertEqual(particles, expected)
+            self.assertEqual(states[-1], expected_states[-1])
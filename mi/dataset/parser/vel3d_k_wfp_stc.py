@@ -29,6 +29,7 @@ import gevent
 import ntplib
 import re
 import struct
+from collections import deque
 
 from mi.core.common import BaseEnum
 from mi.core.exceptions import SampleException, DatasetParserException
@@ -299,16 +300,13 @@ class Vel3dKWfpStcParser(BufferLoadingParser):
         An EOFError is raised when the end of the file is reached.
         """
         # Read in data in blocks so as to not tie up the CPU.
-        BLOCK_SIZE = 1024
-        eof = False
-        data = ''
-        while not eof:
-            next_block = self._stream_handle.read(BLOCK_SIZE)
-            if next_block:
-                data = data + next_block
-                gevent.sleep(0)
-            else:
-                eof = True
+        blocks = []
+        next_block = self._read_block()
+        while next_block:
+            blocks.append(next_block)
+            gevent.sleep(0)
+            next_block = self._read_block()
+        data = ''.join(blocks)
 
         if data != '':
             self._chunker.add_chunk(data, self._timestamp)
@@ -390,7 +388,7 @@ class Vel3dKWfpStcParser(BufferLoadingParser):
         # Initialize parent data.
         #
         self._timestamp = 0.0
-        self._record_buffer = []
+        self._record_buffer = deque()
 
         self._state = state_obj
         self._read_state = state_obj
@@ -18,13 +18,15 @@ import re
 import ntplib
 import struct
 import binascii
+import numpy
 
 from mi.core.log import get_logger ; log = get_logger()
 from mi.core.common import BaseEnum
 from mi.core.instrument.data_particle import DataParticle, DataParticleKey
 from mi.core.exceptions import SampleException, DatasetParserException
 
-from mi.dataset.dataset_parser import BufferLoadingParser
+from mi.core.time import unix_to_ntp_time_array
+from mi.dataset.dataset_parser import RecordArrayParser
 
 EOP_ONLY_MATCHER = re.compile(b'\xFF{11}')
 EOP_REGEX = b'\xFF{11}([\x00-\xFF]{8})'
@@ -34,6 +36,9 @@ DATA_RECORD_BYTES = 11
 TIME_RECORD_BYTES = 8
 FOOTER_BYTES = DATA_RECORD_BYTES + TIME_RECORD_BYTES
 
+# the bytes of one data record, an end of profile marker has them all set to 0xFF
+DATA_RECORD_DTYPE = numpy.dtype((numpy.uint8, DATA_RECORD_BYTES))
+
 class StateKey(BaseEnum):
     POSITION = 'position' # holds the file position
     RECORDS_READ = 'records_read' # holds the number of records read so far
@@ -44,7 +49,7 @@ class WfpMetadataParserDataParticleKey(BaseEnum):
     WFP_TIME_OFF = 'wfp_time_off'
     WFP_NUMBER_SAMPLES = 'wfp_number_samples'
 
-class WfpCFileCommonParser(BufferLoadingParser):
+class WfpCFileCommonParser(RecordArrayParser):
 
     def __init__(self,
                  config,
@@ -66,7 +71,6 @@ class WfpCFileCommonParser(BufferLoadingParser):
         super(WfpCFileCommonParser, self).__init__(config,
                                                    stream_handle,
                                                    state,
-                                                   self.sieve_function,
                                                    state_callback,
                                                    publish_callback,
                                                    exception_callback,
@@ -77,36 +81,6 @@ class WfpCFileCommonParser(BufferLoadingParser):
         if state:
             self.set_state(state)
 
-    def sieve_function(self, raw_data):
-        """
-        Sort through the raw data to identify new blocks of data that need processing.
-        This is needed instead of a regex because blocks are identified by position
-        in this binary file.
-        @param raw_data The raw data read from the file
-        """
-        data_index = 0
-        return_list = []
-        raw_data_len = len(raw_data)
-
-        while data_index < raw_data_len:
-            # check if this is a status or data sample message
-            if EOP_ONLY_MATCHER.match(raw_data[data_index:data_index + DATA_RECORD_BYTES]):
-                if (raw_data_len - (data_index + DATA_RECORD_BYTES)) >= TIME_RECORD_BYTES:
-                    return_list.append((data_index, data_index + DATA_RECORD_BYTES + TIME_RECORD_BYTES))
-                    break;
-                else:
-                    # not enough bytes have been read to get both the end of profile and timestamps, need to wait for more
-                    break
-            else:
-                return_list.append((data_index, data_index + DATA_RECORD_BYTES))
-                data_index += DATA_RECORD_BYTES
-
-            # if the remaining bytes are less than the data sample bytes, we will just have the
-            # timestamp which is parsed in __init__
-            if (raw_data_len - data_index) < DATA_RECORD_BYTES:
-                break
-        return return_list
-
     def extract_metadata_particle(self, raw_data, timestamp):
         """
         Class for extracting metadata for a particular data particle, need to override this 
@@ -177,22 +151,9 @@ class WfpCFileCommonParser(BufferLoadingParser):
         (StateKey.RECORDS_READ in state_obj) or not \
         (StateKey.METADATA_SENT in state_obj):
             raise DatasetParserException("Invalid state keys")
-        self._chunker.clean_all_chunks()
-        self._record_buffer = []
-        self._saved_header = None
         self._state = state_obj
-        self._read_state = state_obj
-        self._stream_handle.seek(state_obj[StateKey.POSITION])
-
-    def _increment_state(self, increment, records_read):
-        """
-        Increment the parser state
-        @param increment the number of bytes to increment the file position 
-        @param timestamp The timestamp completed up to that position
-        @param records_read The number of new records that have been read
-        """
-        self._read_state[StateKey.POSITION] += increment
-        self._read_state[StateKey.RECORDS_READ] += records_read
+        self._read_state = copy.copy(state_obj)
+        self._reset(state_obj[StateKey.POSITION])
 
     def calc_timestamp(self, record_number):
         """
@@ -203,37 +164,41 @@ class WfpCFileCommonParser(BufferLoadingParser):
         timestamp = self._start_time + (self._time_increment * record_number)
         return float(ntplib.system_to_ntp_time(timestamp))
 
-    def parse_chunks(self):
+    def _index_records(self, position):
+        """
+        The data records are all the whole records up to the end of profile
+        marker, their timestamps are spread evenly between the start and end
+        times in the footer.
+        @param position The file position the data was read from
+        @retval tuple of arrays of the record start and end positions and timestamps
         """
-        Parse out any pending data chunks in the chunker. If
-        it is a valid data piece, build a particle, update the position and
-        timestamp. Go until the chunker has no more valid data.
-        @retval a list of tuples with sample particles encountered in this
-            parsing, plus the state. An empty list of nothing was parsed.
-        """     
-        result_particles = []
-
         if not self._read_state[StateKey.METADATA_SENT] and not self.footer_data is None:
             timestamp = float(ntplib.system_to_ntp_time(self._start_time))
             sample = self.extract_metadata_particle(self.footer_data, timestamp)
             self._read_state[StateKey.METADATA_SENT] = True
-            result_particles.append((sample, copy.copy(self._read_state)))
+            self._record_buffer.append((sample, copy.copy(self._read_state)))
 
-        (timestamp, chunk) = self._chunker.get_next_data()
+        num_records = max(self._data_end() - position, 0) // DATA_RECORD_BYTES
+        records = self._record_view(DATA_RECORD_DTYPE, position, num_records)
+        end_of_profile = numpy.flatnonzero((records == 0xFF).all(axis=1))
+        if len(end_of_profile):
+            num_records = int(end_of_profile[0])
 
-        while (chunk != None):
-            # particle-ize the data block received, return the record
-            if EOP_MATCHER.match(chunk):
-                # this is the end of profile matcher, just increment the state
-                self._increment_state(DATA_RECORD_BYTES + TIME_RECORD_BYTES, 0)
-            else:
-                timestamp = self.calc_timestamp(self._read_state[StateKey.RECORDS_READ])
-                sample = self.extract_data_particle(chunk, timestamp)
-                if sample:
-                    # create particle
-                    self._increment_state(DATA_RECORD_BYTES, 1)
-                    result_particles.append((sample, copy.copy(self._read_state)))
+        starts = position + DATA_RECORD_BYTES * numpy.arange(num_records, dtype=numpy.int64)
+        record_numbers = self._read_state[StateKey.RECORDS_READ] + numpy.arange(num_records)
+        timestamps = unix_to_ntp_time_array(self._start_time + self._time_increment * record_numbers)
+        return (starts, starts + DATA_RECORD_BYTES, timestamps)
 
-            (timestamp, chunk) = self._chunker.get_next_data()
+    def _record_particle(self, index, raw_data, timestamp):
+        """
+        Build the data particle for a record
+        """
+        return self.extract_data_particle(raw_data, timestamp)
 
-        return result_particles
\ No newline at end of file
+    def _record_state(self, index):
+        """
+        Build the parser state after a record, counting the records read
+        """
+        return {StateKey.POSITION: int(self._ends[index]),
+                StateKey.RECORDS_READ: self._read_state[StateKey.RECORDS_READ] + index + 1,
+                StateKey.METADATA_SENT: self._read_state[StateKey.METADATA_SENT]}
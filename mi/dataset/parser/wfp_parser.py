@@ -15,10 +15,11 @@ import copy
 import re
 import time
 import ntplib
-from dateutil import parser
 from functools import partial
+from collections import deque
 
 from mi.core.log import get_logger ; log = get_logger()
+from mi.core.time import iso8601_to_unix_time
 
 from mi.core.common import BaseEnum
 from mi.core.exceptions import SampleException, DatasetParserException
@@ -120,9 +121,7 @@ class WfpParticle(DataParticle):
         )
         log.trace("converted ts '%s' to '%s'", ts_string, zulu_ts)
 
-        localtime_offset = float(parser.parse("1970-01-01T00:00:00.00Z").strftime("%s.%f"))
-        converted_time = float(parser.parse(zulu_ts).strftime("%s.%f"))
-        adjusted_time = round(converted_time - localtime_offset)
+        adjusted_time = iso8601_to_unix_time(zulu_ts)
         ntptime = ntplib.system_to_ntp_time(adjusted_time)
 
         return ntptime
@@ -238,7 +237,7 @@ class WfpParser(BufferLoadingParser):
                  *args, **kwargs):
 
         self._timestamp = 0.0
-        self._record_buffer = [] # holds tuples of (record, state)
+        self._record_buffer = deque() # holds tuples of (record, state)
         self._read_state = {StateKey.POSITION:0}
         super(WfpParser, self).__init__(config,
                                           stream_handle,
@@ -309,7 +308,7 @@ class WfpParser(BufferLoadingParser):
         self._chunker.raw_chunk_list = []
         self._chunker.data_chunk_list = []
         self._chunker.nondata_chunk_list = []
-        self._record_buffer = []
+        self._record_buffer = deque()
         self._state = state_obj
         self._read_state = state_obj
 
@@ -489,8 +488,9 @@ class Vel3dkParser(WfpParser):
                  *args, **kwargs):
 
         self._timestamp = 0.0
-        self._record_buffer = [] # holds tuples of (record, state)
+        self._record_buffer = deque() # holds tuples of (record, state)
         self._read_state = {StateKey.POSITION:0}
+        self._configure_reads(config)
 
         super(BufferLoadingParser, self).__init__(config,
                                           stream_handle,
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+
+"""
+@package mi.dataset.test.test_dataset_parser
+@file mi/dataset/test/test_dataset_parser.py
+@brief Test the block readahead of the buffer loading parsers
+"""
+
+__license__ = 'Apache 2.0'
+
+import threading
+import itertools
+from StringIO import StringIO
+
+from nose.plugins.attrib import attr
+from mi.core.unit_test import MiUnitTestCase
+from mi.core.log import get_logger ; log = get_logger()
+
+from mi.dataset.dataset_parser import BlockReadahead
+
+
+class SlowFile(StringIO):
+    """
+    File which holds up a chosen read until it is released
+    """
+    def __init__(self, data, slow_read):
+        StringIO.__init__(self, data)
+        self.reads = 0
+        self.slow_read = slow_read
+        self.reading = threading.Event()
+        self.release = threading.Event()
+
+    def read(self, size=-1):
+        self.reads += 1
+        if self.reads == self.slow_read:
+            self.reading.set()
+            self.release.wait(5)
+        return StringIO.read(self, size)
+
+
+@attr('UNIT', group='mi')
+class BlockReadaheadUnitTestCase(MiUnitTestCase):
+
+    def test_read(self):
+        """
+        Blocks come out in order, then an empty block at the end of the file
+        """
+        readahead = BlockReadahead(StringIO('A' * 10 + 'B' * 10 + 'C' * 5), itertools.repeat(10), 2)
+        self.assertEqual(readahead.read(), (10, 'A' * 10))
+        self.assertEqual(readahead.read(), (10, 'B' * 10))
+        self.assertEqual(readahead.read(), (10, 'C' * 5))
+        self.assertEqual(readahead.read()[1], '')
+        readahead.stop()
+
+    def test_stop_queued(self):
+        """
+        Stopping puts the file back to the first block the parser didn't take
+        """
+        stream = StringIO('A' * 10 + 'B' * 10 + 'C' * 10)
+        readahead = BlockReadahead(stream, itertools.repeat(10), 2)
+        self.assertEqual(readahead.read(), (10, 'A' * 10))
+        readahead.stop()
+        self.assertEqual(stream.read(10), 'B' * 10)
+
+    def test_stop_mid_read(self):
+        """
+        Stopping while the thread is reading a block doesn't lose the block
+        """
+        stream = SlowFile('A' * 10 + 'B' * 10 + 'C' * 10, 2)
+        readahead = BlockReadahead(stream, itertools.repeat(10), 1)
+        self.assertEqual(readahead.read(), (10, 'A' * 10))
+        self.assertTrue(stream.reading.wait(5))
+
+        stopper = threading.Thread(target=readahead.stop)
+        stopper.start()
+        self.assertTrue(readahead._stopped.wait(5))
+        stream.release.set()
+        stopper.join(5)
+        self.assertFalse(stopper.is_alive())
+        self.assertEqual(stream.read(10), 'B' * 10)
@@ -7,11 +7,28 @@
 @brief Test code for the dataset driver base classes
 """
 
+import os
+import re
+import copy
+import shutil
+import tempfile
+
 from nose.plugins.attrib import attr
 
 from mi.core.unit_test import MiUnitTestCase
 from mi.core.exceptions import DataSourceLocationException
+from mi.core.exceptions import ConfigurationException
+from mi.core.exceptions import SampleException
+from mi.core.exceptions import DatasetHarvesterException
 from mi.dataset.dataset_driver import DataSourceLocation
+from mi.dataset.dataset_driver import SimpleDataSetDriver
+from mi.dataset.dataset_driver import MultipleHarvesterDataSetDriver
+from mi.dataset.dataset_driver import HarvesterType
+from mi.dataset.dataset_driver import DataSourceConfigKey
+from mi.dataset.dataset_driver import DataSetDriverConfigKeys
+from mi.dataset.dataset_driver import DriverParameter
+from mi.dataset.dataset_driver import DriverStateKey
+from mi.dataset.dataset_parser import Parser
 
 @attr('UNIT', group='mi')
 class DataSourceLocationUnitTestCase(MiUnitTestCase):
@@ -55,6 +72,222 @@ class DataSourceLocationUnitTestCase(MiUnitTestCase):
         dsl = DataSourceLocation(parser_position=parser_pos1)
         self.assertEqual(dsl.harvester_position, None)
         self.assertEqual(dsl.parser_position, parser_pos1)
-        
-        
-                
\ No newline at end of file
+
+@attr('UNIT', group='mi')
+class MultipleHarvesterUnitTestCase(MiUnitTestCase):
+    """
+    Test the multiple harvester driver configuration
+    """
+    def test_harvester_type(self):
+        """
+        Inotify is only selected in the harvester config, so the driver
+        harvester types reject it rather than silently polling
+        """
+        for harvester_type in [{'a': HarvesterType.INOTIFY_DIRECTORY}, {'a': 'bad'}, HarvesterType.SINGLE_FILE]:
+            with self.assertRaises(DatasetHarvesterException):
+                MultipleHarvesterDataSetDriver({}, None, None, None, None, None, ['a'], harvester_type)
+
+    def test_ingestion_processes(self):
+        """
+        Ingestion processes are only supported by the single harvester driver
+        """
+        config = {
+            DataSourceConfigKey.HARVESTER: {
+                'a': {DataSetDriverConfigKeys.DIRECTORY: '/tmp',
+                      DataSetDriverConfigKeys.PATTERN: '*.txt',
+                      DataSetDriverConfigKeys.INGESTION_PROCESSES: 2}
+            },
+            DataSourceConfigKey.PARSER: {}
+        }
+        with self.assertRaises(ConfigurationException):
+            MultipleHarvesterDataSetDriver(config, None, None, None, None, None, ['a'])
+
+class MatchLine(object):
+    """
+    Particle keeping its regex match, like the phsen and adcps particles,
+    which can't be pickled
+    """
+    def __init__(self, line):
+        self._data_match = re.match(r'(.*)', line)
+
+    def __eq__(self, other):
+        return other == self._data_match.group(1)
+
+class LineParser(Parser):
+    """
+    Parser publishing each line of a file, with the line count as the state.
+    Lines listed in the 'match' config are published as MatchLine particles,
+    lines listed in the 'fail' config raise a ValueError.
+    """
+    def __init__(self, config, state, stream_handle, state_callback, publish_callback, exception_callback):
+        super(LineParser, self).__init__(config, stream_handle, state, None,
+                                         state_callback, publish_callback, exception_callback)
+        self._position = 0
+        if state:
+            self._position = state['position']
+        self._lines = stream_handle.read().splitlines()
+
+    def get_records(self, num_records):
+        records = self._lines[self._position:self._position + num_records]
+        for line in records:
+            if line == 'bad':
+                raise SampleException("bad line")
+            if line in self._config.get('fail', []):
+                raise ValueError("parser failed")
+            self._position += 1
+            if line in self._config.get('match', []):
+                self._publish_sample(MatchLine(line))
+            else:
+                self._publish_sample(line)
+            self._state_callback({'position': self._position}, self._position == len(self._lines))
+        return records
+
+class LineDataSetDriver(SimpleDataSetDriver):
+    def _build_parser(self, parser_state, infile):
+        return LineParser(self._parser_config, parser_state, infile, self._save_parser_state,
+                          self._data_callback, self._sample_exception_callback)
+
+class WaitingLineDataSetDriver(LineDataSetDriver):
+    """
+    Driver which waits for all its ingestion workers to exit before replaying
+    the first file
+    """
+    def _start_ingestion_worker(self, path, file_name):
+        worker = super(WaitingLineDataSetDriver, self)._start_ingestion_worker(path, file_name)
+        self.workers = getattr(self, 'workers', []) + [worker[0]]
+        return worker
+
+    def _replay_parsed_file(self, file_name, process, spool):
+        if not hasattr(self, 'finished_before_replay'):
+            for worker in self.workers:
+                worker.join(30)
+            self.finished_before_replay = [not worker.is_alive() for worker in self.workers]
+        return super(WaitingLineDataSetDriver, self)._replay_parsed_file(file_name, process, spool)
+
+@attr('UNIT', group='mi')
+class ParallelIngestionUnitTestCase(MiUnitTestCase):
+    """
+    Test parsing files in ingestion worker processes
+    """
+    FILES = {
+        'a.txt': ['a1', 'a2', 'a3'],
+        'b.txt': ['b1', 'bad', 'b3'],
+        'c.txt': ['c1', 'c2'],
+        'd.txt': ['d1'],
+    }
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        for (file_name, lines) in self.FILES.iteritems():
+            with open(os.path.join(self.directory, file_name), 'w') as filehandle:
+                filehandle.write('\n'.join(lines))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def ingest(self, processes, memento=None, parser_config=None, driver_class=LineDataSetDriver,
+               raise_errors=True):
+        """
+        Ingest all test files
+        @param raise_errors if False, keep polling after a poll raises
+        @retval (published lines, list of saved driver states, exception events)
+        """
+        published = []
+        states = []
+        events = []
+        config = {
+            DataSourceConfigKey.HARVESTER: {
+                DataSetDriverConfigKeys.DIRECTORY: self.directory,
+                DataSetDriverConfigKeys.PATTERN: '*.txt',
+                DataSetDriverConfigKeys.INGESTION_PROCESSES: processes
+            },
+            DataSourceConfigKey.PARSER: parser_config or {},
+            DataSourceConfigKey.DRIVER: {DriverParameter.RECORDS_PER_SECOND: 10000}
+        }
+        driver = driver_class(config, memento,
+                                   lambda particles: published.extend(particles),
+                                   lambda state: states.append(copy.deepcopy(state)),
+                                   lambda event_type, **kwargs: events.append(event_type),
+                                   lambda e: self.fail("unexpected exception %s" % e))
+        for file_name in sorted(self.FILES):
+            driver._new_file_callback(file_name)
+        while driver._new_file_queue:
+            try:
+                driver._poll()
+            except Exception:
+                if raise_errors:
+                    raise
+        self.driver = driver
+        return (published, states, events)
+
+    def test_matches_serial_ingestion(self):
+        """
+        Parallel ingestion publishes and saves state in the same order as serial ingestion
+        """
+        serial = self.ingest(1)
+        self.assertEqual(serial[0], ['a1', 'a2', 'a3', 'b1', 'c1', 'c2', 'd1'])
+        self.assertEqual(serial[2].count('ResourceAgentErrorEvent'), 1)
+        self.assertEqual(self.ingest(3), serial)
+
+    def test_resume_from_memento(self):
+        """
+        Parallel ingestion picks files up from the parser state in the memento
+        """
+        (published, states, events) = self.ingest(1)
+        # state saved after the second record of a.txt
+        memento = copy.deepcopy(states[len(self.FILES) + 1])
+        self.assertEqual(memento['a.txt'][DriverStateKey.PARSER_STATE], {'position': 2})
+
+        (published, states, events) = self.ingest(2, memento)
+        self.assertEqual(published, ['a3', 'b1', 'c1', 'c2', 'd1'])
+        for file_name in self.FILES:
+            self.assertTrue(states[-1][file_name][DriverStateKey.INGESTED])
+
+    def test_unpicklable_particles(self):
+        """
+        Files whose particles can't be sent from a worker are parsed in process from
+        the last state the worker sent
+        """
+        serial = self.ingest(1)
+        # a2 fails part way through a.txt, c1 in the first batch of c.txt
+        parallel = self.ingest(3, parser_config={'match': ['a2', 'c1']})
+        self.assertEqual(parallel[0], serial[0])
+        self.assertIsInstance(parallel[0][1], MatchLine)
+        self.assertEqual(parallel[1], serial[1])
+        self.assertEqual(parallel[2], serial[2])
+
+    def test_workers_parse_ahead(self):
+        """
+        Workers parse whole files, larger than a pipe buffer, while the driver has
+        not replayed anything yet
+        """
+        # well over the 64 KB a pipe holds once pickled
+        lines = ['x' * 60 + str(i) for i in range(2000)]
+        with open(os.path.join(self.directory, 'e.txt'), 'w') as filehandle:
+            filehandle.write('\n'.join(lines))
+        self.FILES = dict(self.FILES, **{'e.txt': lines})
+
+        serial = self.ingest(1)
+        parallel = self.ingest(5, driver_class=WaitingLineDataSetDriver)
+        self.assertEqual(self.driver.finished_before_replay, [True] * 5)
+        self.assertEqual(parallel, serial)
+
+    def test_worker_failure_keeps_queued_files(self):
+        """
+        A worker failing with an error other than a SampleException only loses
+        its own file, the files after it stay queued and are ingested on the
+        next poll
+        """
+        (published, states, events) = self.ingest(1, parser_config={'fail': ['a2']},
+                                                  raise_errors=False)
+        self.assertEqual(published, ['a1', 'b1', 'c1', 'c2', 'd1'])
+
+        (parallel, states, events) = self.ingest(3, parser_config={'fail': ['a2']},
+                                                 raise_errors=False)
+        self.assertEqual(parallel, published)
+        for file_name in ['b.txt', 'c.txt', 'd.txt']:
+            self.assertTrue(states[-1][file_name][DriverStateKey.INGESTED])
+
+    def test_invalid_process_count(self):
+        with self.assertRaises(ConfigurationException):
+            self.ingest(0)
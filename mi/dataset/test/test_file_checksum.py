@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+
+"""
+@package mi.dataset.test.test_file_checksum
+@file mi/dataset/test/test_file_checksum.py
+@brief Test the cached file checksums
+"""
+
+__license__ = 'Apache 2.0'
+
+import os
+import shutil
+import hashlib
+import tempfile
+
+from nose.plugins.attrib import attr
+from mi.core.unit_test import MiUnitTest
+from mi.core.log import get_logger ; log = get_logger()
+
+from mi.dataset.file_checksum import FileChecksumCache
+
+
+class CountingChecksumCache(FileChecksumCache):
+    """
+    Checksum cache which counts the bytes hashed from files
+    """
+    def __init__(self, block_size, max_entries=10):
+        super(CountingChecksumCache, self).__init__(block_size, max_entries)
+        self.bytes_read = 0
+
+    def _update(self, md5, filehandle, length):
+        self.bytes_read += length
+        super(CountingChecksumCache, self)._update(md5, filehandle, length)
+
+
+@attr('UNIT', group='mi')
+class TestFileChecksumCache(MiUnitTest):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'data.bin')
+        self.cache = CountingChecksumCache(block_size=1000)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, data, mode='ab', mod_time=None):
+        with open(self.path, mode) as filehandle:
+            filehandle.write(data)
+        if mod_time is not None:
+            os.utime(self.path, (mod_time, mod_time))
+
+    def md5(self):
+        with open(self.path, 'rb') as filehandle:
+            return hashlib.md5(filehandle.read()).hexdigest()
+
+    def test_checksum(self):
+        """
+        Test checksums are calculated in blocks and only once while the file is unchanged
+        """
+        self.write(os.urandom(10500))
+        self.assertEqual(self.cache.checksum(self.path), self.md5())
+        self.assertEqual(self.cache.bytes_read, 10500)
+
+        self.assertEqual(self.cache.checksum(self.path), self.md5())
+        self.assertEqual(self.cache.bytes_read, 10500)
+
+        # empty files work as well
+        self.write('', 'wb')
+        self.assertEqual(self.cache.checksum(self.path), hashlib.md5().hexdigest())
+
+    def test_changed(self):
+        """
+        Test a changed file is hashed again from the start
+        """
+        self.write(os.urandom(10000), mod_time=1000000)
+        self.cache.checksum(self.path)
+
+        self.write(os.urandom(2345), mod_time=1000010)
+        self.assertEqual(self.cache.checksum(self.path), self.md5())
+        self.assertEqual(self.cache.bytes_read, 22345)
+
+        # a change far before the end of a file which then grew is found
+        with open(self.path, 'r+b') as filehandle:
+            filehandle.write('x')
+        self.write(os.urandom(655), mod_time=1000020)
+        self.assertEqual(self.cache.checksum(self.path), self.md5())
+        self.assertEqual(self.cache.bytes_read, 35345)
+
+        # and so is a file replaced by another one
+        os.remove(self.path)
+        self.write(os.urandom(14000), mod_time=1000030)
+        self.assertEqual(self.cache.checksum(self.path), self.md5())
+        self.assertEqual(self.cache.bytes_read, 49345)
+
+    def test_cache_size(self):
+        """
+        Test the least recently checked files are dropped from a full cache
+        """
+        paths = [os.path.join(self.directory, 'data%d.bin' % i) for i in range(11)]
+        for path in paths:
+            with open(path, 'wb') as filehandle:
+                filehandle.write('abc')
+
+        for path in paths[:10]:
+            self.cache.checksum(path)
+        self.cache.checksum(paths[0])
+        self.cache.checksum(paths[10])
+        self.assertEqual(len(self.cache._entries), 10)
+        self.assertEqual(self.cache.bytes_read, 33)
+
+        # the first file was checked recently so it is still cached, the
+        # second one was dropped
+        self.cache.checksum(paths[0])
+        self.assertEqual(self.cache.bytes_read, 33)
+        self.cache.checksum(paths[1])
+        self.assertEqual(self.cache.bytes_read, 36)
+
+    def test_seed(self):
+        """
+        Test checksums from the driver state are used while the file is unchanged
+        """
+        self.write('abc', mod_time=1000000)
+        self.cache.seed(self.path, 3, 1000000, 'persisted')
+        self.assertEqual(self.cache.checksum(self.path), 'persisted')
+        self.assertEqual(self.cache.bytes_read, 0)
+
+        self.write('def', mod_time=1000010)
+        self.assertEqual(self.cache.checksum(self.path), self.md5())
+        self.assertEqual(self.cache.bytes_read, 6)
+
+        # seeding doesn't replace calculated checksums
+        self.cache.seed(self.path, 6, 1000010, 'persisted')
+        self.assertEqual(self.cache.checksum(self.path), self.md5())
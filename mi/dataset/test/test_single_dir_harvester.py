@@ -12,12 +12,15 @@ import gevent
 import time
 import shutil
 import hashlib
+import tempfile
 
 from mi.core.log import get_logger ; log = get_logger()
 from nose.plugins.attrib import attr
+from nose.plugins.skip import SkipTest
 from mi.core.unit_test import MiUnitTest
-from mi.dataset.harvester import SingleDirectoryHarvester
-from mi.dataset.dataset_driver import DriverStateKey, DataSetDriverConfigKeys
+from mi.core.inotify import inotify_available
+from mi.dataset.harvester import SingleDirectoryHarvester, SingleDirectoryPoller
+from mi.dataset.dataset_driver import DriverStateKey, DataSetDriverConfigKeys, HarvesterType
 
 TESTDIR = '/tmp/dsatest'
 STOREDIR = '/tmp/stored_dsatest'
@@ -485,3 +488,87 @@ class TestSingleDirHarvester(MiUnitTest):
     
 
 
+
+
+@attr('UNIT', group='mi')
+class TestSingleDirPollerUnit(MiUnitTest):
+    """
+    Check the single directory poller without starting its thread
+    """
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.config = {DataSetDriverConfigKeys.DIRECTORY: self.directory,
+                       DataSetDriverConfigKeys.PATTERN: '*.txt'}
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write_file(self, name, data='abc'):
+        with open(os.path.join(self.directory, name), 'a') as filehandle:
+            filehandle.write(data)
+
+    def assert_poller(self, use_inotify):
+        """
+        Add, modify and remove files and check what the poller finds
+        """
+        memento = {}
+        self.write_file('a.txt')
+        poller = SingleDirectoryPoller(self.config, memento, None, file_mod_wait=0,
+                                       use_inotify=use_inotify)
+        self.assertEqual(poller._check_for_files(), (['a.txt'], {}))
+        self.assertEqual(poller._check_for_files(), ([], {}))
+
+        self.write_file('b.txt')
+        self.write_file('.hidden.txt')
+        self.write_file('c.dat')
+        self.assertEqual(poller._check_for_files(), (['b.txt'], {}))
+
+        # mark a.txt ingested then modify it
+        file_path = os.path.join(self.directory, 'a.txt')
+        memento['a.txt'] = {DriverStateKey.INGESTED: True,
+                            DriverStateKey.FILE_SIZE: 3,
+                            DriverStateKey.FILE_MOD_DATE: os.path.getmtime(file_path),
+                            DriverStateKey.FILE_CHECKSUM: hashlib.md5('abc').hexdigest()}
+        self.write_file('a.txt', 'def')
+        os.remove(os.path.join(self.directory, 'b.txt'))
+        (new_files, modified_state) = poller._check_for_files()
+        self.assertEqual(new_files, [])
+        self.assertEqual(modified_state['a.txt'][DriverStateKey.FILE_CHECKSUM],
+                         hashlib.md5('abcdef').hexdigest())
+        self.assertEqual(modified_state['a.txt'][DriverStateKey.FILE_SIZE], 6)
+
+        # files still being modified are looked at again on the next poll
+        poller.file_mod_wait = 60
+        self.write_file('d.txt')
+        self.assertEqual(poller._check_for_files(), ([], {}))
+        poller.file_mod_wait = 0
+        self.assertEqual(poller._check_for_files()[0], ['d.txt'])
+
+    def test_polling(self):
+        """
+        Test the poller examining every file
+        """
+        self.assert_poller(False)
+
+    def test_inotify(self):
+        """
+        Test the poller only examining the files reported by inotify
+        """
+        if not inotify_available():
+            raise SkipTest("inotify is not available")
+        self.assert_poller(True)
+
+    def test_harvester_type(self):
+        """
+        Test selecting the inotify harvester through the harvester config
+        """
+        config = self.config.copy()
+        config[DataSetDriverConfigKeys.HARVESTER_TYPE] = HarvesterType.INOTIFY_DIRECTORY
+        harvester = SingleDirectoryHarvester(config, None, None, None, None)
+        self.assertEqual(harvester._watch is not None, inotify_available())
+
+        harvester = SingleDirectoryHarvester(self.config, None, None, None, None)
+        self.assertIsNone(harvester._watch)
+
+        config[DataSetDriverConfigKeys.HARVESTER_TYPE] = HarvesterType.SINGLE_FILE
+        self.assertRaises(ValueError, SingleDirectoryHarvester, config, None, None, None, None)
@@ -16,7 +16,7 @@ from mi.core.log import get_logger ; log = get_logger()
 from nose.plugins.attrib import attr
 from mi.core.unit_test import MiUnitTest
 from mi.dataset.harvester import SingleFileHarvester
-from mi.dataset.dataset_driver import DriverStateKey, DataSetDriverConfigKeys
+from mi.dataset.dataset_driver import DriverStateKey, DataSetDriverConfigKeys, HarvesterType
 
 #bin/nosetests -x -v mi/dataset/test/test_single_file_harvester
 TESTDIR = '/tmp/dsatest'
@@ -185,6 +185,11 @@ class TestSingleFileHarvester(MiUnitTest):
         self.assertRaises(TypeError, SingleFileHarvester, (CONFIG, None,
                                                            self.new_data_found_callback,
                                                            self.harvester_exception_callback))
+        # inotify only applies to directory harvesters
+        config = CONFIG.copy()
+        config[DataSetDriverConfigKeys.HARVESTER_TYPE] = HarvesterType.INOTIFY_DIRECTORY
+        self.assertRaises(ValueError, SingleFileHarvester, config, None,
+                          self.new_data_found_callback, self.harvester_exception_callback)
 
     def new_data_found_callback(self, new_state):
         """
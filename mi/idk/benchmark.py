@@ -0,0 +1,629 @@
+"""
+@file mi/idk/benchmark.py
+@brief Offline throughput benchmarks for the MI framework.  Streams are
+    replayed or generated, fed through the code under test and the results
+    are reported as a list of dicts so they can be dumped as JSON and
+    compared between builds.
+"""
+
+__license__ = 'Apache 2.0'
+
+import os
+import sys
+import time
+import json
+import random
+import importlib
+from functools import partial
+
+from mi.core.log import get_logger ; log = get_logger()
+
+from mi.core.common import BaseEnum
+
+from mi.core.instrument.chunker import StringChunker
+from mi.core.instrument.chunker import BufferedStringChunker
+from mi.core import checksum
+from mi.core.instrument.protocol_param_dict import RegexParameter
+from mi.dataset.dataset_driver import DataSetDriverConfigKeys
+from mi.idk.exceptions import IDKException
+
+# Default largest data block the port agent hands to the driver
+DEFAULT_FRAGMENT_SIZE = 1024
+
+# Default amount of data generated for a synthetic stream
+DEFAULT_STREAM_SIZE = 1024 * 1024
+
+# Random seed so generated streams and fragmentation are repeatable
+DEFAULT_SEED = 1
+
+# Default number of times each status dump is parsed
+DEFAULT_PARAM_DICT_REPEAT = 1000
+
+# Default fixed read block sizes compared by the parser benchmark
+DEFAULT_PARSER_BLOCK_SIZES = [1024, 64 * 1024, 1024 * 1024]
+
+# Default number of blocks read ahead in the readahead parser variant
+DEFAULT_READAHEAD_BLOCKS = 4
+
+# Default number of times each file is parsed
+DEFAULT_PARSER_REPEAT = 5
+
+# Particles requested from the parser at a time
+PARSER_BATCH_SIZE = 100
+
+CHUNKERS = {
+    'string': StringChunker,
+    'buffered': BufferedStringChunker,
+}
+
+
+class BenchmarkKey(BaseEnum):
+    """
+    Keys used in the benchmark result dicts
+    """
+    BENCHMARK = 'benchmark'
+    NAME = 'name'
+    VARIANT = 'variant'
+    BYTES = 'bytes'
+    CHUNKS = 'chunks'
+    ELAPSED = 'elapsed'
+    BYTES_PER_SEC = 'bytes_per_sec'
+    CHUNKS_PER_SEC = 'chunks_per_sec'
+    PEAK_BUFFER = 'peak_buffer'
+    FILE = 'file'
+    LINES = 'lines'
+    LINES_PER_SEC = 'lines_per_sec'
+    PARTICLES = 'particles'
+    PARTICLES_PER_SEC = 'particles_per_sec'
+
+
+def _resolve(path):
+    """
+    Resolve a dotted path like 'package.module:Class.attribute'
+    @param path module and attribute path separated by a colon
+    @retval the object the path refers to
+    """
+    (module_name, attribute_path) = path.split(':')
+    result = importlib.import_module(module_name)
+    for attribute in attribute_path.split('.'):
+        result = getattr(result, attribute)
+    return result
+
+
+def _regex_sieve(regex_paths):
+    """
+    Build a sieve from Chunker.regex_sieve_function and compiled regexes
+    @param regex_paths list of paths to compiled regexes, or to callables
+        returning them
+    """
+    regex_list = []
+    for path in regex_paths:
+        regex = _resolve(path)
+        if callable(regex):
+            regex = regex()
+        regex_list.append(regex)
+    return partial(StringChunker.regex_sieve_function, regex_list=regex_list)
+
+
+# Registered sieves and the sample data used to generate their streams. The
+# sample modules are only imported when the benchmark is selected.
+CHUNKER_BENCHMARKS = {
+    'botpt': {
+        'sieve': 'mi.instrument.noaa.botpt.ooicore.driver:Protocol.sieve_function',
+        'samples': ['mi.instrument.noaa.botpt.ooicore.test.test_samples:LILY_VALID_SAMPLE_01',
+                    'mi.instrument.noaa.botpt.ooicore.test.test_samples:HEAT_VALID_SAMPLE_01',
+                    'mi.instrument.noaa.botpt.ooicore.test.test_samples:IRIS_VALID_SAMPLE_01',
+                    'mi.instrument.noaa.botpt.ooicore.test.test_samples:NANO_VALID_SAMPLE_01'],
+    },
+    'botpt_regex_sieve': {
+        'sieve': partial(_regex_sieve,
+                         ['mi.instrument.noaa.botpt.ooicore.particles:HeatSampleParticle.regex_compiled',
+                          'mi.instrument.noaa.botpt.ooicore.particles:IrisSampleParticle.regex_compiled',
+                          'mi.instrument.noaa.botpt.ooicore.particles:NanoSampleParticle.regex_compiled',
+                          'mi.instrument.noaa.botpt.ooicore.particles:LilySampleParticle.regex_compiled',
+                          'mi.instrument.noaa.botpt.ooicore.particles:LilyLevelingParticle.regex_compiled']),
+        'samples': ['mi.instrument.noaa.botpt.ooicore.test.test_samples:LILY_VALID_SAMPLE_01',
+                    'mi.instrument.noaa.botpt.ooicore.test.test_samples:HEAT_VALID_SAMPLE_01',
+                    'mi.instrument.noaa.botpt.ooicore.test.test_samples:IRIS_VALID_SAMPLE_01',
+                    'mi.instrument.noaa.botpt.ooicore.test.test_samples:NANO_VALID_SAMPLE_01'],
+    },
+    'ac_s': {
+        'sieve': 'mi.instrument.wetlabs.ac_s.ooicore.driver:Protocol.sieve_function',
+        'samples': ['mi.instrument.wetlabs.ac_s.ooicore.test.test_driver:OPTAA_SAMPLE'],
+    },
+    'sbe37': {
+        'sieve': 'mi.instrument.seabird.sbe37smb.ooicore.driver:SBE37Protocol.sieve_function',
+        'samples': ['mi.instrument.seabird.sbe37smb.ooicore.test.sample_data:SAMPLE'],
+    },
+    'workhorse': {
+        'sieve': 'mi.instrument.teledyne.workhorse.driver:WorkhorseProtocol.sieve_function',
+        'samples': ['mi.instrument.teledyne.workhorse.test.test_data:RSN_SAMPLE_RAW_DATA'],
+    },
+}
+
+
+def generate_stream(samples, size, seed=DEFAULT_SEED):
+    """
+    Generate a synthetic instrument stream by concatenating randomly chosen
+    samples
+    @param samples list of sample strings
+    @param size minimum number of bytes to generate
+    @param seed random seed
+    @retval stream string
+    """
+    rand = random.Random(seed)
+    stream = []
+    length = 0
+    while length < size:
+        sample = rand.choice(samples)
+        stream.append(sample)
+        length += len(sample)
+    return ''.join(stream)
+
+
+def fragment_stream(stream, fragment_size=DEFAULT_FRAGMENT_SIZE, seed=DEFAULT_SEED):
+    """
+    Break a stream into randomly sized pieces like the port agent would
+    @param stream data to fragment
+    @param fragment_size largest fragment to return
+    @param seed random seed
+    @retval list of fragments
+    """
+    rand = random.Random(seed)
+    fragments = []
+    index = 0
+    while index < len(stream):
+        size = rand.randint(1, fragment_size)
+        fragments.append(stream[index:index+size])
+        index += size
+    return fragments
+
+
+def benchmark_chunker(chunker, fragments, timestamp=3600000000.0):
+    """
+    Feed fragments through a chunker the same way InstrumentProtocol.got_data
+    does and time it
+    @param chunker chunker to feed
+    @param fragments list of data fragments
+    @param timestamp port agent timestamp to use for each fragment
+    @retval dict of results
+    """
+    total_bytes = 0
+    chunks = 0
+    peak_buffer = 0
+
+    start = time.time()
+    for fragment in fragments:
+        chunker.add_chunk(fragment, timestamp)
+        total_bytes += len(fragment)
+        peak_buffer = max(peak_buffer, chunker.get_buffer_size())
+        (ts, chunk) = chunker.get_next_data()
+        while chunk:
+            chunks += 1
+            (ts, chunk) = chunker.get_next_data()
+    elapsed = time.time() - start
+
+    return {
+        BenchmarkKey.BYTES: total_bytes,
+        BenchmarkKey.CHUNKS: chunks,
+        BenchmarkKey.ELAPSED: elapsed,
+        BenchmarkKey.BYTES_PER_SEC: total_bytes / elapsed if elapsed else None,
+        BenchmarkKey.CHUNKS_PER_SEC: chunks / elapsed if elapsed else None,
+        BenchmarkKey.PEAK_BUFFER: peak_buffer,
+    }
+
+
+def run_chunker_benchmarks(names=None, chunker_names=None, stream_file=None,
+                           size=DEFAULT_STREAM_SIZE,
+                           fragment_size=DEFAULT_FRAGMENT_SIZE, seed=DEFAULT_SEED):
+    """
+    Run the registered chunker benchmarks
+    @param names benchmarks to run, all registered benchmarks if None
+    @param chunker_names chunker implementations to compare, all if None
+    @param stream_file recorded stream to replay instead of generating one
+    @param size size of the generated streams
+    @param fragment_size largest fragment handed to the chunker
+    @param seed random seed for stream generation and fragmentation
+    @retval list of result dicts
+    """
+    if names is None:
+        names = sorted(CHUNKER_BENCHMARKS.keys())
+    if chunker_names is None:
+        chunker_names = sorted(CHUNKERS.keys())
+
+    recorded = None
+    if stream_file:
+        with open(stream_file, 'rb') as f:
+            recorded = f.read()
+
+    results = []
+    for name in names:
+        if not name in CHUNKER_BENCHMARKS:
+            raise IDKException("unknown chunker benchmark: %s" % name)
+        config = CHUNKER_BENCHMARKS[name]
+
+        sieve = config['sieve']
+        sieve = _resolve(sieve) if isinstance(sieve, basestring) else sieve()
+
+        if recorded is None:
+            samples = [_resolve(path) for path in config['samples']]
+            stream = generate_stream(samples, size, seed)
+        else:
+            stream = recorded
+        fragments = fragment_stream(stream, fragment_size, seed)
+
+        for chunker_name in chunker_names:
+            log.debug("running chunker benchmark %s with %s chunker", name, chunker_name)
+            result = benchmark_chunker(CHUNKERS[chunker_name](sieve), fragments)
+            result[BenchmarkKey.BENCHMARK] = 'chunker'
+            result[BenchmarkKey.NAME] = name
+            result[BenchmarkKey.VARIANT] = chunker_name
+            results.append(result)
+
+    return results
+
+
+def crc16_x25_bitwise(data):
+    """
+    The original bit by bit SIO block checksum, kept as the baseline for the
+    checksum benchmark
+    """
+    crc = 0xFFFF
+    for byte in bytearray(data):
+        crc ^= byte
+        for i in range(8):
+            if crc & 1:
+                crc = (crc >> 1) ^ checksum.X25_POLY
+            else:
+                crc >>= 1
+    return crc ^ 0xFFFF
+
+def crc16_kermit_nibble(data):
+    """
+    The original two nibble table Kermit CRC from the HPIES driver, kept as
+    the baseline for the checksum benchmark
+    """
+    crcta = [0, 4225, 8450, 12675, 16900, 21125, 25350, 29575,
+             33800, 38025, 42250, 46475, 50700, 54925, 59150, 63375]
+    crctb = [0, 4489, 8978, 12955, 17956, 22445, 25910, 29887,
+             35912, 40385, 44890, 48851, 51820, 56293, 59774, 63735]
+    crc = 0
+    for i in range(0, len(data)):
+        c = crc ^ ord(data[i])
+        crc = (crc >> 8) ^ (crcta[(c & 240) >> 4] ^ crctb[c & 15])
+    return crc
+
+# Checksum implementations to compare. The sio_ checksums are the ones
+# found in the SIO block headers.
+CHECKSUMS = {
+    'sio_bitwise': crc16_x25_bitwise,
+    'sio_table': checksum.crc16_x25_table,
+    'sio_hqx': checksum.crc16_x25_hqx,
+    'kermit_nibble': crc16_kermit_nibble,
+    'kermit_table': checksum.crc16_kermit_table,
+    'kermit_hqx': checksum.crc16_kermit_hqx,
+    'ccitt_table': checksum.crc16_ccitt_table,
+    'ccitt_hqx': checksum.crc16_ccitt_hqx,
+    'xor8_loop': checksum.xor8_loop,
+    'xor8_words': checksum.xor8_words,
+    'xor8_numpy': checksum.xor8_numpy,
+    'xor8': checksum.xor8,
+    'sum16_loop': checksum.sum16_loop,
+    'sum16_builtin': checksum.sum16_builtin,
+    'sum16_numpy': checksum.sum16_numpy,
+    'sum16': checksum.sum16,
+}
+
+# Recorded SIO mule node files checksummed by default
+CHECKSUM_FILES = [os.path.join('mi', 'dataset', 'driver', 'mflm', 'ctd', 'resource', 'node59p1.dat')]
+
+
+def sio_block_payloads(data):
+    """
+    Find the data portion of each SIO block, which is what the SIO parser
+    checksums
+    @param data telemetered SIO mule file contents
+    @retval list of block payload strings
+    """
+    from mi.dataset.parser.sio_mule_common import SIO_HEADER_MATCHER, SIO_HEADER_GROUP_DATA_LENGTH
+    data = data.replace(b'\x18\x6b', b'\x2b').replace(b'\x18\x58', b'\x18')
+    payloads = []
+    for match in SIO_HEADER_MATCHER.finditer(data):
+        end = match.end(0) + int(match.group(SIO_HEADER_GROUP_DATA_LENGTH), 16)
+        if end < len(data):
+            payloads.append(data[match.end(0):end])
+    return payloads
+
+
+def benchmark_checksum(checksum_fn, blocks):
+    """
+    Checksum each block and time it
+    @param checksum_fn checksum function to call
+    @param blocks list of data strings
+    @retval dict of results
+    """
+    total_bytes = sum([len(block) for block in blocks])
+
+    start = time.time()
+    for block in blocks:
+        checksum_fn(block)
+    elapsed = time.time() - start
+
+    return {
+        BenchmarkKey.BYTES: total_bytes,
+        BenchmarkKey.CHUNKS: len(blocks),
+        BenchmarkKey.ELAPSED: elapsed,
+        BenchmarkKey.BYTES_PER_SEC: total_bytes / elapsed if elapsed else None,
+        BenchmarkKey.CHUNKS_PER_SEC: len(blocks) / elapsed if elapsed else None,
+    }
+
+
+def run_checksum_benchmarks(files=None, checksum_names=None):
+    """
+    Run the checksum implementations over the SIO blocks in node files
+    @param files SIO mule files to read blocks from, CHECKSUM_FILES if None
+    @param checksum_names checksum implementations to compare, all if None
+    @retval list of result dicts
+    """
+    if files is None:
+        files = CHECKSUM_FILES
+    if checksum_names is None:
+        checksum_names = sorted(CHECKSUMS.keys())
+
+    results = []
+    for path in files:
+        with open(path, 'rb') as f:
+            blocks = sio_block_payloads(f.read())
+
+        for name in checksum_names:
+            if not name in CHECKSUMS:
+                raise IDKException("unknown checksum: %s" % name)
+            log.debug("running checksum benchmark %s on %s", name, path)
+            result = benchmark_checksum(CHECKSUMS[name], blocks)
+            result[BenchmarkKey.BENCHMARK] = 'checksum'
+            result[BenchmarkKey.NAME] = name
+            result[BenchmarkKey.FILE] = path
+            results.append(result)
+
+    return results
+
+
+# Protocols whose parameter dictionaries are updated from recorded status
+# dumps, and the dictionary method their response handlers call per line
+PARAM_DICT_BENCHMARKS = {
+    'sbe16': {
+        'protocol': 'mi.instrument.seabird.sbe16plus_v2.driver:SBE16Protocol',
+        'prompts': 'mi.instrument.seabird.sbe16plus_v2.driver:Prompt',
+        'newline': 'mi.instrument.seabird.sbe16plus_v2.driver:NEWLINE',
+        'update': 'update',
+        'dumps': ['mi.instrument.seabird.sbe16plus_v2.test.test_driver:SeaBird16plusMixin.VALID_DS_RESPONSE',
+                  'mi.instrument.seabird.sbe16plus_v2.test.test_driver:SeaBird16plusMixin.VALID_DCAL_QUARTZ',
+                  'mi.instrument.seabird.sbe16plus_v2.test.test_driver:SeaBird16plusMixin.VALID_DCAL_STRAIN'],
+    },
+    'sbe26': {
+        'protocol': 'mi.instrument.seabird.sbe26plus.driver:Protocol',
+        'prompts': 'mi.instrument.seabird.sbe26plus.driver:Prompt',
+        'newline': 'mi.instrument.seabird.sbe26plus.driver:NEWLINE',
+        'update': 'multi_match_update',
+        'dumps': ['mi.instrument.seabird.sbe26plus.test.sample_data:SAMPLE_DS'],
+    },
+}
+
+# Parameter dictionary update strategies. 'scan' clears the regex anchors so
+# every regex is searched for every line, as before they were indexed.
+PARAM_DICT_VARIANTS = ['indexed', 'scan']
+
+
+def clear_anchors(param_dict):
+    """
+    Make a parameter dictionary search every regex parameter for every input
+    @param param_dict ProtocolParameterDict to change
+    """
+    for parameter in param_dict._param_dict.values():
+        if isinstance(parameter, RegexParameter):
+            parameter.anchor = ''
+    param_dict._update_index = None
+
+
+def benchmark_param_dict(update, lines, repeat=DEFAULT_PARAM_DICT_REPEAT):
+    """
+    Update a parameter dictionary from each line of a dump and time it
+    @param update bound parameter dictionary update method
+    @param lines list of response lines
+    @param repeat number of times to parse the lines
+    @retval dict of results
+    """
+    total_lines = len(lines) * repeat
+    total_bytes = sum([len(line) for line in lines]) * repeat
+
+    start = time.time()
+    for i in xrange(repeat):
+        for line in lines:
+            update(line)
+    elapsed = time.time() - start
+
+    return {
+        BenchmarkKey.LINES: total_lines,
+        BenchmarkKey.BYTES: total_bytes,
+        BenchmarkKey.ELAPSED: elapsed,
+        BenchmarkKey.LINES_PER_SEC: total_lines / elapsed if elapsed else None,
+        BenchmarkKey.BYTES_PER_SEC: total_bytes / elapsed if elapsed else None,
+    }
+
+
+def run_param_dict_benchmarks(names=None, variants=None, repeat=DEFAULT_PARAM_DICT_REPEAT):
+    """
+    Run the registered parameter dictionary benchmarks
+    @param names benchmarks to run, all registered benchmarks if None
+    @param variants update strategies to compare, all if None
+    @param repeat number of times each dump is parsed
+    @retval list of result dicts
+    """
+    if names is None:
+        names = sorted(PARAM_DICT_BENCHMARKS.keys())
+    if variants is None:
+        variants = PARAM_DICT_VARIANTS
+
+    results = []
+    for name in names:
+        if not name in PARAM_DICT_BENCHMARKS:
+            raise IDKException("unknown parameter dictionary benchmark: %s" % name)
+        config = PARAM_DICT_BENCHMARKS[name]
+
+        newline = _resolve(config['newline'])
+        lines = []
+        for path in config['dumps']:
+            lines.extend(_resolve(path).split(newline))
+
+        for variant in variants:
+            if not variant in PARAM_DICT_VARIANTS:
+                raise IDKException("unknown parameter dictionary variant: %s" % variant)
+            log.debug("running parameter dictionary benchmark %s with %s updates", name, variant)
+            protocol = _resolve(config['protocol'])(_resolve(config['prompts']), newline, lambda *args: None)
+            if variant == 'scan':
+                clear_anchors(protocol._param_dict)
+            result = benchmark_param_dict(getattr(protocol._param_dict, config['update']), lines, repeat)
+            result[BenchmarkKey.BENCHMARK] = 'param_dict'
+            result[BenchmarkKey.NAME] = name
+            result[BenchmarkKey.VARIANT] = variant
+            results.append(result)
+
+    return results
+
+
+# Parsers run over their recorded resource files, the order of their
+# constructor arguments and the config they are built with
+PARSER_BENCHMARKS = {
+    'adcpa': {
+        'parser': 'mi.dataset.parser.adcpa:AdcpaParser',
+        'args': ['config', 'state', 'stream', 'state_callback', 'publish_callback'],
+        'config': {DataSetDriverConfigKeys.PARTICLE_MODULE: 'mi.dataset.parser.adcpa',
+                   DataSetDriverConfigKeys.PARTICLE_CLASS: 'ADCPA_PD0_PARSED_DataParticle'},
+        'files': [os.path.join('mi', 'dataset', 'driver', 'moas', 'gl', 'adcpa', 'resource', 'LB180210.PD0')],
+    },
+    'dosta_abcdjm_dcl': {
+        'parser': 'mi.dataset.parser.dosta_abcdjm_dcl:DostaAbcdjmDclRecoveredParser',
+        'args': ['config', 'stream', 'state', 'state_callback', 'publish_callback', 'exception_callback'],
+        'config': {DataSetDriverConfigKeys.PARTICLE_MODULE: 'mi.dataset.parser.dosta_abcdjm_dcl',
+                   DataSetDriverConfigKeys.PARTICLE_CLASS: None},
+        'files': [os.path.join('mi', 'dataset', 'driver', 'dosta_abcdjm', 'dcl', 'resource', '20041225.dosta4.log')],
+    },
+    'spkir_abj_dcl': {
+        'parser': 'mi.dataset.parser.spkir_abj_dcl:SpkirAbjDclRecoveredParser',
+        'args': ['config', 'stream', 'state', 'state_callback', 'publish_callback', 'exception_callback'],
+        'config': {DataSetDriverConfigKeys.PARTICLE_MODULE: 'mi.dataset.parser.spkir_abj_dcl',
+                   DataSetDriverConfigKeys.PARTICLE_CLASS: None},
+        'files': [os.path.join('mi', 'dataset', 'driver', 'spkir_abj', 'dcl', 'resource', '20071225.spkir7.log')],
+    },
+}
+
+
+def parser_variants(block_sizes=None, readahead_blocks=DEFAULT_READAHEAD_BLOCKS):
+    """
+    Build the read configurations compared by the parser benchmark: each
+    fixed block size, the default growing block sizes, and the growing block
+    sizes with readahead
+    @param block_sizes fixed block sizes, DEFAULT_PARSER_BLOCK_SIZES if None
+    @param readahead_blocks blocks read ahead in the readahead variant
+    @retval list of (variant name, config) tuples
+    """
+    if block_sizes is None:
+        block_sizes = DEFAULT_PARSER_BLOCK_SIZES
+
+    variants = []
+    for size in block_sizes:
+        variants.append(('block_%d' % size,
+                         {DataSetDriverConfigKeys.READ_BLOCK_SIZE: size,
+                          DataSetDriverConfigKeys.MAX_READ_BLOCK_SIZE: size}))
+    variants.append(('adaptive', {}))
+    variants.append(('readahead', {DataSetDriverConfigKeys.READAHEAD_BLOCKS: readahead_blocks}))
+    return variants
+
+
+def benchmark_parser(parser_class, args, config, path, repeat=DEFAULT_PARSER_REPEAT):
+    """
+    Parse a file from start to end and time it
+    @param parser_class parser class to build
+    @param args names of the parser constructor arguments in order
+    @param config parser config
+    @param path file to parse
+    @param repeat number of times to parse the file
+    @retval dict of results
+    """
+    def ignore(*args):
+        pass
+
+    total_bytes = os.path.getsize(path) * repeat
+    particles = 0
+
+    start = time.time()
+    for i in xrange(repeat):
+        with open(path, 'rb') as stream:
+            values = {'config': config, 'state': None, 'stream': stream,
+                      'state_callback': ignore, 'publish_callback': ignore,
+                      'exception_callback': ignore}
+            parser = parser_class(*[values[arg] for arg in args])
+            records = parser.get_records(PARSER_BATCH_SIZE)
+            while records:
+                particles += len(records)
+                records = parser.get_records(PARSER_BATCH_SIZE)
+    elapsed = time.time() - start
+
+    return {
+        BenchmarkKey.BYTES: total_bytes,
+        BenchmarkKey.PARTICLES: particles,
+        BenchmarkKey.ELAPSED: elapsed,
+        BenchmarkKey.BYTES_PER_SEC: total_bytes / elapsed if elapsed else None,
+        BenchmarkKey.PARTICLES_PER_SEC: particles / elapsed if elapsed else None,
+    }
+
+
+def run_parser_benchmarks(names=None, files=None, block_sizes=None,
+                          readahead_blocks=DEFAULT_READAHEAD_BLOCKS, repeat=DEFAULT_PARSER_REPEAT):
+    """
+    Run the registered parser benchmarks at each read block size
+    @param names benchmarks to run, all registered benchmarks if None
+    @param files files to parse instead of the registered resource files
+    @param block_sizes fixed block sizes to compare, DEFAULT_PARSER_BLOCK_SIZES if None
+    @param readahead_blocks blocks read ahead in the readahead variant
+    @param repeat number of times each file is parsed
+    @retval list of result dicts
+    """
+    if names is None:
+        names = sorted(PARSER_BENCHMARKS.keys())
+
+    results = []
+    for name in names:
+        if not name in PARSER_BENCHMARKS:
+            raise IDKException("unknown parser benchmark: %s" % name)
+        entry = PARSER_BENCHMARKS[name]
+        parser_class = _resolve(entry['parser'])
+
+        for path in files or entry['files']:
+            for (variant, read_config) in parser_variants(block_sizes, readahead_blocks):
+                log.debug("running parser benchmark %s on %s with %s reads", name, path, variant)
+                config = dict(entry['config'])
+                config.update(read_config)
+                result = benchmark_parser(parser_class, entry['args'], config, path, repeat)
+                result[BenchmarkKey.BENCHMARK] = 'parser'
+                result[BenchmarkKey.NAME] = name
+                result[BenchmarkKey.VARIANT] = variant
+                result[BenchmarkKey.FILE] = path
+                results.append(result)
+
+    return results
+
+
+def write_results(results, output=None):
+    """
+    Write benchmark results as one JSON object per line
+    @param results list of result dicts
+    @param output file name to write to, stdout if None
+    """
+    out = open(output, 'w') if output else sys.stdout
+    try:
+        for result in results:
+            out.write(json.dumps(result, sort_keys=True) + '\n')
+    finally:
+        if output:
+            out.close()
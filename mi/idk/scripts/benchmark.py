@@ -0,0 +1,99 @@
+"""
+@file mi/idk/scripts/benchmark.py
+@brief Run the offline MI benchmarks and write the results as JSON lines
+"""
+
+import argparse
+
+from mi.idk import benchmark
+
+def run():
+    opts = parseArgs()
+    opts.func(opts)
+
+def run_chunker(opts):
+    results = benchmark.run_chunker_benchmarks(names=opts.name or None,
+                                               chunker_names=opts.chunker or None,
+                                               stream_file=opts.file,
+                                               size=opts.size,
+                                               fragment_size=opts.fragment_size,
+                                               seed=opts.seed)
+    benchmark.write_results(results, opts.output)
+
+def run_checksum(opts):
+    results = benchmark.run_checksum_benchmarks(files=opts.file or None,
+                                                checksum_names=opts.checksum or None)
+    benchmark.write_results(results, opts.output)
+
+def run_param_dict(opts):
+    results = benchmark.run_param_dict_benchmarks(names=opts.name or None,
+                                                  variants=opts.variant or None,
+                                                  repeat=opts.repeat)
+    benchmark.write_results(results, opts.output)
+
+def run_parser(opts):
+    results = benchmark.run_parser_benchmarks(names=opts.name or None,
+                                              files=opts.file or None,
+                                              block_sizes=opts.block_size or None,
+                                              readahead_blocks=opts.readahead_blocks,
+                                              repeat=opts.repeat)
+    benchmark.write_results(results, opts.output)
+
+def parseArgs():
+    parser = argparse.ArgumentParser(description='Run MI benchmarks.')
+    parser.add_argument('-o', '--output', help='File to write JSON results to (default is stdout)')
+    subparsers = parser.add_subparsers(help='benchmark to run')
+
+    chunker = subparsers.add_parser('chunker', help='Chunker and sieve throughput')
+    chunker.add_argument('name', nargs='*',
+                         help='Registered benchmark names (default is all): %s' %
+                              ', '.join(sorted(benchmark.CHUNKER_BENCHMARKS.keys())))
+    chunker.add_argument('-c', '--chunker', action='append', choices=sorted(benchmark.CHUNKERS.keys()),
+                         help='Chunker implementation to run (default is all)')
+    chunker.add_argument('-f', '--file', help='Recorded instrument stream to replay instead of generated data')
+    chunker.add_argument('-s', '--size', type=int, default=benchmark.DEFAULT_STREAM_SIZE,
+                         help='Bytes of generated data')
+    chunker.add_argument('--fragment-size', type=int, default=benchmark.DEFAULT_FRAGMENT_SIZE,
+                         help='Largest data fragment handed to the chunker')
+    chunker.add_argument('--seed', type=int, default=benchmark.DEFAULT_SEED,
+                         help='Random seed for stream generation and fragmentation')
+    chunker.set_defaults(func=run_chunker)
+
+    checksum = subparsers.add_parser('checksum', help='Framing checksum throughput over SIO blocks')
+    checksum.add_argument('file', nargs='*',
+                          help='SIO node files to checksum the blocks of (default is %s)' %
+                               ', '.join(benchmark.CHECKSUM_FILES))
+    checksum.add_argument('-c', '--checksum', action='append', choices=sorted(benchmark.CHECKSUMS.keys()),
+                          help='Checksum implementation to run (default is all)')
+    checksum.set_defaults(func=run_checksum)
+
+    param_dict = subparsers.add_parser('param_dict', help='Parameter dictionary updates from status dumps')
+    param_dict.add_argument('name', nargs='*',
+                            help='Registered benchmark names (default is all): %s' %
+                                 ', '.join(sorted(benchmark.PARAM_DICT_BENCHMARKS.keys())))
+    param_dict.add_argument('-v', '--variant', action='append', choices=benchmark.PARAM_DICT_VARIANTS,
+                            help='Update strategy to run (default is all)')
+    param_dict.add_argument('-r', '--repeat', type=int, default=benchmark.DEFAULT_PARAM_DICT_REPEAT,
+                            help='Number of times each status dump is parsed')
+    param_dict.set_defaults(func=run_param_dict)
+
+    parser_bench = subparsers.add_parser('parser', help='Dataset parser throughput at several read block sizes')
+    parser_bench.add_argument('name', nargs='*',
+                              help='Registered benchmark names (default is all): %s' %
+                                   ', '.join(sorted(benchmark.PARSER_BENCHMARKS.keys())))
+    parser_bench.add_argument('-f', '--file', action='append',
+                              help='File to parse instead of the registered resource files')
+    parser_bench.add_argument('-b', '--block-size', type=int, action='append',
+                              help='Fixed read block size to run (default is %s)' %
+                                   ', '.join([str(size) for size in benchmark.DEFAULT_PARSER_BLOCK_SIZES]))
+    parser_bench.add_argument('--readahead-blocks', type=int, default=benchmark.DEFAULT_READAHEAD_BLOCKS,
+                              help='Blocks read ahead in the readahead variant')
+    parser_bench.add_argument('-r', '--repeat', type=int, default=benchmark.DEFAULT_PARSER_REPEAT,
+                              help='Number of times each file is parsed')
+    parser_bench.set_defaults(func=run_parser)
+
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+
+"""
+@package mi.idk.test.test_benchmark
+@file mi/idk/test/test_benchmark.py
+@brief Test the benchmark harness
+"""
+
+__license__ = 'Apache 2.0'
+
+import os
+import re
+from functools import partial
+from nose.plugins.attrib import attr
+from mi.core.unit_test import MiUnitTest
+
+from mi.core.instrument.chunker import StringChunker
+from mi.core.instrument.chunker import BufferedStringChunker
+from mi.core.instrument.protocol_param_dict import ProtocolParameterDict
+from mi.idk import benchmark
+from mi.idk.benchmark import BenchmarkKey
+
+SAMPLES = ["SATPAR0229,10.01,2206748111,111\r\n",
+           "SATPAR0229,10.02,2206748222,222\r\n",
+           "garbage\r\n"]
+
+STATUS_LINES = ["SBE 16plus V 2.5  SERIAL NO. 6841    28 Feb 2013 16:39:31",
+                "vbatt = 23.4, vlith =  8.0, ioper =  61.4 ma, ipump =   0.3 ma,",
+                "status = not logging",
+                "pump delay = 60 sec"]
+
+SIEVE = partial(StringChunker.regex_sieve_function,
+                regex_list=[re.compile(r'SATPAR\d{4},\d{1,7}.\d\d,\d{10},\d{1,3}')])
+
+@attr('UNIT', group='mi')
+class TestBenchmark(MiUnitTest):
+    """
+    Test the benchmark harness functions
+    """
+    def test_generate_stream(self):
+        """
+        Generated streams are repeatable and at least the requested size
+        """
+        stream = benchmark.generate_stream(SAMPLES, 1000)
+        self.assertTrue(len(stream) >= 1000)
+        self.assertEqual(stream, benchmark.generate_stream(SAMPLES, 1000))
+        self.assertNotEqual(stream, benchmark.generate_stream(SAMPLES, 1000, seed=2))
+
+    def test_fragment_stream(self):
+        """
+        Fragments put back together are the original stream
+        """
+        stream = benchmark.generate_stream(SAMPLES, 10000)
+        fragments = benchmark.fragment_stream(stream, 100)
+        self.assertEqual(''.join(fragments), stream)
+        self.assertTrue(max([len(f) for f in fragments]) <= 100)
+
+    def test_benchmark_chunker(self):
+        """
+        Both chunkers find the same number of chunks in a stream
+        """
+        stream = benchmark.generate_stream(SAMPLES, 10000)
+        expected = len(SIEVE(stream))
+        fragments = benchmark.fragment_stream(stream, 100)
+
+        for chunker_class in [StringChunker, BufferedStringChunker]:
+            result = benchmark.benchmark_chunker(chunker_class(SIEVE), fragments)
+            self.assertEqual(result[BenchmarkKey.BYTES], len(stream))
+            self.assertEqual(result[BenchmarkKey.CHUNKS], expected)
+            self.assertTrue(result[BenchmarkKey.PEAK_BUFFER] > 0)
+
+    def test_benchmark_checksum(self):
+        """
+        The checksum benchmark reads the blocks out of a node file and every
+        implementation gets the checksums in the block headers
+        """
+        from mi.dataset.parser.sio_mule_common import SIO_HEADER_MATCHER, SIO_HEADER_GROUP_CHECKSUM
+        with open(benchmark.CHECKSUM_FILES[0], 'rb') as f:
+            data = f.read()
+        blocks = benchmark.sio_block_payloads(data)
+        data = data.replace(b'\x18\x6b', b'\x2b').replace(b'\x18\x58', b'\x18')
+        self.assertTrue(len(blocks) > 0)
+
+        expected = [int(match.group(SIO_HEADER_GROUP_CHECKSUM), 16) for match in SIO_HEADER_MATCHER.finditer(data)]
+        for name in [name for name in benchmark.CHECKSUMS if name.startswith('sio_')]:
+            checksums = [benchmark.CHECKSUMS[name](block) for block in blocks]
+            # a few blocks in the file are corrupt
+            matched = len([crc for (crc, header) in zip(checksums, expected) if crc == header])
+            self.assertTrue(matched > len(blocks) * 0.9)
+
+        results = benchmark.run_checksum_benchmarks(checksum_names=['sio_table', 'sio_hqx'])
+        self.assertEqual([result[BenchmarkKey.NAME] for result in results], ['sio_table', 'sio_hqx'])
+        for result in results:
+            self.assertEqual(result[BenchmarkKey.BYTES], sum([len(block) for block in blocks]))
+
+    def test_benchmark_parser(self):
+        """
+        The parser benchmark gets the same particles at every block size
+        """
+        results = benchmark.run_parser_benchmarks(names=['dosta_abcdjm_dcl'], block_sizes=[256, 4096], repeat=1)
+        self.assertEqual([result[BenchmarkKey.VARIANT] for result in results],
+                         ['block_256', 'block_4096', 'adaptive', 'readahead'])
+        for result in results:
+            self.assertEqual(result[BenchmarkKey.BYTES], os.path.getsize(benchmark.PARSER_BENCHMARKS['dosta_abcdjm_dcl']['files'][0]))
+            self.assertEqual(result[BenchmarkKey.PARTICLES], 500)
+
+    def test_benchmark_param_dict(self):
+        """
+        Updates with and without regex anchors set the same values
+        """
+        values = []
+        for variant in benchmark.PARAM_DICT_VARIANTS:
+            param_dict = ProtocolParameterDict()
+            param_dict.add('serial', r'SERIAL NO. (\d+)', lambda match: int(match.group(1)), str)
+            param_dict.add('vbatt', r'vbatt = (\d+\.\d+)', lambda match: float(match.group(1)), str)
+            param_dict.add('logging', r'status = (not )?logging', lambda match: match.group(1) is None, str)
+            param_dict.add('delay', r'pump delay = (\d+) sec', lambda match: int(match.group(1)), str)
+            if variant == 'scan':
+                benchmark.clear_anchors(param_dict)
+
+            result = benchmark.benchmark_param_dict(param_dict.update, STATUS_LINES, 10)
+            self.assertEqual(result[BenchmarkKey.LINES], 40)
+            self.assertEqual(result[BenchmarkKey.BYTES], sum([len(line) for line in STATUS_LINES]) * 10)
+            values.append(param_dict.get_all())
+
+        self.assertEqual(values[0], {'serial': 6841, 'vbatt': 23.4, 'logging': False, 'delay': 60})
+        self.assertEqual(values[0], values[1])
@@ -567,7 +567,8 @@ class Protocol(CommandResponseInstrumentProtocol):
                   self._param_dict.get(Parameter.NF),
                   len(chunk),
                   elapsed)
-        self._driver_event(DriverAsyncEvent.SAMPLE, RGASampleParticle(chunk, port_timestamp=ts).generate())
+        self._driver_event(DriverAsyncEvent.SAMPLE,
+                           self._generate_particle(RGASampleParticle(chunk, port_timestamp=ts)))
         # Reset the scheduler and initiate the next scan if we are in the scan state
         if self.get_current_state() == ProtocolState.SCAN:
             self._build_scheduler()
@@ -981,7 +982,8 @@ class Protocol(CommandResponseInstrumentProtocol):
         pd = self._param_dict.get_all()
         log.debug('parameter dictionary: %r', pd)
         ts = ntplib.system_to_ntp_time(time.time())
-        self._driver_event(DriverAsyncEvent.SAMPLE, RGAStatusParticle(pd, port_timestamp=ts).generate())
+        self._driver_event(DriverAsyncEvent.SAMPLE,
+                           self._generate_particle(RGAStatusParticle(pd, port_timestamp=ts)))
 
         # replace the sieve function
         self._build_sieve_function()
@@ -5,7 +5,6 @@
 @brief BOTPT
 Release notes:
 """
-import json
 import re
 import time
 import datetime
@@ -15,7 +14,7 @@ from mi.core.driver_scheduler import DriverSchedulerConfigKey, TriggerType
 from mi.core.instrument.data_particle import DataParticleKey, DataParticleValue
 from mi.core.instrument.protocol_param_dict import ParameterDictVisibility, ParameterDictType
 from mi.core.common import BaseEnum, Units, Prefixes
-from mi.core.instrument.chunker import StringChunker
+from mi.core.instrument.chunker import BufferedStringChunker, ParticleSieve
 from mi.core.instrument.instrument_fsm import ThreadSafeFSM
 from mi.core.instrument.instrument_protocol import CommandResponseInstrumentProtocol, InitializationType
 from mi.core.instrument.instrument_driver import DriverEvent
@@ -60,6 +59,18 @@ NANO_RATE_RESPONSE = '*0001TH'
 
 MAX_BUFFER_SIZE = 2 ** 16
 
+# longest sample line the chunker can find, the longest in practice is
+# a LILY leveling status of about 100 characters
+MAX_SAMPLE_LENGTH = 256
+
+# particles found by the chunker, in the order they are tried on each chunk
+SAMPLE_SIEVE = ParticleSieve([(particle_class, particle_class.regex_compiled())
+                              for particle_class in [particles.LilySampleParticle,
+                                                     particles.LilyLevelingParticle,
+                                                     particles.HeatSampleParticle,
+                                                     particles.IrisSampleParticle,
+                                                     particles.NanoSampleParticle]])
+
 
 class ScheduledJob(BaseEnum):
     """
@@ -327,7 +338,15 @@ class Protocol(CommandResponseInstrumentProtocol):
         self._sent_cmds = []
 
         # create chunker
-        self._chunker = StringChunker(Protocol.sieve_function)
+        self._chunker = BufferedStringChunker(Protocol.sieve_function, max_chunk_length=MAX_SAMPLE_LENGTH)
+
+        # names of the handlers called with the samples of each particle type,
+        # looked up when a sample arrives so the handlers can be replaced
+        self._sample_handlers = {
+            particles.LilySampleParticle: '_check_for_autolevel',
+            particles.LilyLevelingParticle: '_check_completed_leveling',
+            particles.NanoSampleParticle: '_check_pps_sync',
+        }
 
         self._last_data_timestamp = 0
         self.has_pps = True
@@ -344,20 +363,7 @@ class Protocol(CommandResponseInstrumentProtocol):
         @param raw_data: Data to be searched for samples
         @return: list of (start,end) tuples
         """
-        matchers = []
-        return_list = []
-
-        matchers.append(particles.HeatSampleParticle.regex_compiled())
-        matchers.append(particles.IrisSampleParticle.regex_compiled())
-        matchers.append(particles.NanoSampleParticle.regex_compiled())
-        matchers.append(particles.LilySampleParticle.regex_compiled())
-        matchers.append(particles.LilyLevelingParticle.regex_compiled())
-
-        for matcher in matchers:
-            for match in matcher.finditer(raw_data):
-                return_list.append((match.start(), match.end()))
-
-        return return_list
+        return SAMPLE_SIEVE(raw_data)
 
     def _got_chunk(self, chunk, ts):
         """
@@ -367,47 +373,28 @@ class Protocol(CommandResponseInstrumentProtocol):
         @return sample
         @throws InstrumentProtocolException
         """
-        possible_particles = [
-            (particles.LilySampleParticle, self._check_for_autolevel),
-            (particles.LilyLevelingParticle, self._check_completed_leveling),
-            (particles.HeatSampleParticle, None),
-            (particles.IrisSampleParticle, None),
-            (particles.NanoSampleParticle, self._check_pps_sync),
-        ]
-
-        for particle_type, func in possible_particles:
-            sample = self._extract_sample(particle_type, particle_type.regex_compiled(), chunk, ts)
-            if sample:
-                if func:
-                    func(sample)
-                return sample
+        (particle_type, sample) = self._extract_first_sample(SAMPLE_SIEVE, chunk, ts)
+        if sample:
+            handler = self._sample_handlers.get(particle_type)
+            if handler:
+                getattr(self, handler)(sample)
+            return sample
 
         raise InstrumentProtocolException(u'unhandled chunk received by _got_chunk: [{0!r:s}]'.format(chunk))
 
-    def _extract_sample(self, particle_class, regex, line, timestamp, publish=True):
+    def _create_sample(self, particle_class, line, timestamp, publish=True):
         """
         Overridden to set the quality flag for LILY particles that are out of range.
         @param particle_class: Class type for particle
-        @param regex: regular expression to verify data
         @param line: data
         @param timestamp: ntp timestamp
         @param publish: boolean to indicate if sample should be published
         @return: extracted sample
         """
-        sample = None
-        if regex.match(line):
-            if particle_class == particles.LilySampleParticle and self._param_dict.get(Parameter.LEVELING_FAILED):
-                particle = particle_class(line, port_timestamp=timestamp, quality_flag=DataParticleValue.OUT_OF_RANGE)
-            else:
-                particle = particle_class(line, port_timestamp=timestamp)
-            parsed_sample = particle.generate()
-
-            if publish and self._driver_event:
-                self._driver_event(DriverAsyncEvent.SAMPLE, parsed_sample)
-
-            sample = json.loads(parsed_sample)
-
-        return sample
+        if particle_class == particles.LilySampleParticle and self._param_dict.get(Parameter.LEVELING_FAILED):
+            particle = particle_class(line, port_timestamp=timestamp, quality_flag=DataParticleValue.OUT_OF_RANGE)
+            return self._generate_sample(particle, publish)
+        return super(Protocol, self)._create_sample(particle_class, line, timestamp, publish)
 
     def _filter_capabilities(self, events):
         """
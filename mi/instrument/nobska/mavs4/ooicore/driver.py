@@ -1532,7 +1532,7 @@ class mavs4InstrumentProtocol(MenuInstrumentProtocol):
         # (see the Mavs4StatusDataParticle class).
         particle = Mavs4StatusDataParticle(status_params,
                                            preferred_timestamp=DataParticleKey.DRIVER_TIMESTAMP)
-        status = particle.generate()
+        status = self._generate_particle(particle)
 
         # send particle as an event
         self._driver_event(DriverAsyncEvent.SAMPLE, status)
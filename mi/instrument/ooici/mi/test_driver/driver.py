@@ -547,7 +547,7 @@ class Protocol(CommandResponseInstrumentProtocol):
         particle = TestDataParticle(buf, port_timestamp=mi.core.time.time_to_ntp_date_time())
 
         log.debug("_publish_packet, packet size: %d", len(buf))
-        self._driver_event(DriverAsyncEvent.SAMPLE, particle.generate())
+        self._driver_event(DriverAsyncEvent.SAMPLE, self._generate_particle(particle))
 
     def _get_payload_value(self, packet_size):
         if self._payload_cache.get(packet_size):
@@ -1235,7 +1235,7 @@ class InstrumentProtocol(CommandResponseInstrumentProtocol):
         # The status data particle class will use the 'raw_data' variable as a reference to a dictionary object to get
         # access to parameter values (see the Mavs4EngineeringDataParticle class).
         particle = XR_420EngineeringDataParticle(status_params, preferred_timestamp=DataParticleKey.DRIVER_TIMESTAMP)
-        status = particle.generate()
+        status = self._generate_particle(particle)
 
         # send particle as an event
         self._driver_event(DriverAsyncEvent.SAMPLE, status)
@@ -14,7 +14,6 @@ __license__ = 'Apache 2.0'
 
 import time
 import re
-import json
 
 from mi.core.log import get_logger, get_logging_metaclass
 log = get_logger()
@@ -35,6 +34,7 @@ from mi.core.instrument.protocol_cmd_dict import ProtocolCommandDict
 from mi.core.instrument.instrument_protocol import DEFAULT_CMD_TIMEOUT, RE_PATTERN
 
 from mi.core.common import InstErrorCode
+from mi.core.checksum import sum8
 from mi.core.instrument.instrument_fsm import InstrumentFSM
 
 from mi.core.exceptions import InstrumentCommandException, InstrumentException, InstrumentTimeoutException
@@ -267,11 +267,7 @@ class SatlanticPARDataParticle(DataParticle):
 
             line = data[:line_end+1]
             # Calculate checksum on line
-            checksum = 0
-            for char in line:
-                checksum += ord(char)
-
-            checksum = (~checksum + 0x01) & 0xFF
+            checksum = (~sum8(line) + 0x01) & 0xFF
 
             if checksum != received_checksum:
                 log.warn("Calculated checksum %s did not match packet checksum %s.", checksum, received_checksum)
@@ -1188,18 +1184,13 @@ class SatlanticPARInstrumentProtocol(CommandResponseInstrumentProtocol):
                two different events are published: one to notify raw data and
                the other to notify parsed data.
 
-        @retval dict of dicts {'parsed': parsed_sample, 'raw': raw_sample} if
-                the line can be parsed for a sample. Otherwise, None.
+        @retval particle dict if the line can be parsed for a sample.
+                Otherwise, None.
         """
         sample = None
         if regex.match(line):
 
             particle = particle_class(serial_num, firmware, instrument, line, port_timestamp=timestamp)
-            parsed_sample = particle.generate()
-
-            if publish and self._driver_event:
-                self._driver_event(DriverAsyncEvent.SAMPLE, parsed_sample)
-
-            sample = json.loads(parsed_sample)
+            sample = self._generate_sample(particle, publish)
 
         return sample
\ No newline at end of file
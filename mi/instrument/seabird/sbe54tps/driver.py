@@ -38,7 +38,7 @@ from mi.core.exceptions import InstrumentProtocolException
 from mi.core.exceptions import InstrumentParameterExpirationException
 
 from mi.core.instrument.data_particle import DataParticle, DataParticleKey, CommonDataParticleType
-from mi.core.instrument.chunker import StringChunker
+from mi.core.instrument.chunker import StringChunker, ParticleSieve
 
 from mi.instrument.seabird.driver import SeaBirdInstrumentDriver
 from mi.instrument.seabird.driver import SeaBirdProtocol
@@ -1046,6 +1046,14 @@ class SBE54tpsSampleRefOscDataParticle(DataParticle):
 
 ######################################### /PARTICLES #############################
 
+# data blocks found by the chunker and the particles they hold
+SIEVE = ParticleSieve([(SBE54tpsStatusDataParticle, STATUS_DATA_REGEX_MATCHER),
+                       (SBE54tpsConfigurationDataParticle, CONFIGURATION_DATA_REGEX_MATCHER),
+                       (SBE54tpsEventCounterDataParticle, EVENT_COUNTER_DATA_REGEX_MATCHER),
+                       (SBE54tpsHardwareDataParticle, HARDWARE_DATA_REGEX_MATCHER),
+                       (SBE54tpsSampleDataParticle, SAMPLE_DATA_REGEX_MATCHER),
+                       (SBE54tpsSampleRefOscDataParticle, ENGINEERING_DATA_MATCHER)])
+
 
 ###############################################################################
 # Driver
@@ -1200,20 +1208,7 @@ class Protocol(SeaBirdProtocol):
         """
         The method that splits samples
         """
-        return_list = []
-
-        sieve_matchers = [ STATUS_DATA_REGEX_MATCHER,
-                           CONFIGURATION_DATA_REGEX_MATCHER,
-                           EVENT_COUNTER_DATA_REGEX_MATCHER,
-                           HARDWARE_DATA_REGEX_MATCHER,
-                           SAMPLE_DATA_REGEX_MATCHER,
-                           ENGINEERING_DATA_MATCHER ]
-
-        for matcher in sieve_matchers:
-            for match in matcher.finditer(raw_data):
-                return_list.append((match.start(), match.end()))
-
-        return return_list
+        return SIEVE(raw_data)
 
     def _filter_capabilities(self, events):
         """
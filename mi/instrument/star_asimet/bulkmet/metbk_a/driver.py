@@ -14,7 +14,6 @@ __license__ = 'Apache 2.0'
 import re
 import time
 import string
-import json
 import time
 
 from mi.core.log import get_logger ; log = get_logger()
@@ -501,8 +500,8 @@ class Protocol(CommandResponseInstrumentProtocol):
                two different events are published: one to notify raw data and
                the other to notify parsed data.
 
-        @retval dict of dicts {'parsed': parsed_sample, 'raw': raw_sample} if
-                the line can be parsed for a sample. Otherwise, None.
+        @retval particle dict if the line can be parsed for a sample.
+                Otherwise, None.
         @todo Figure out how the agent wants the results for a single poll
             and return them that way from here
         """
@@ -517,14 +516,7 @@ class Protocol(CommandResponseInstrumentProtocol):
                 # save this sample as last_sample for next check        
                 self.last_sample = match.group(0)
             
-            particle = particle_class(line, port_timestamp=timestamp)
-            parsed_sample = particle.generate()
-
-            if publish and self._driver_event:
-                self._driver_event(DriverAsyncEvent.SAMPLE, parsed_sample)
-    
-            sample = json.loads(parsed_sample)
-            return sample
+            sample = self._create_sample(particle_class, line, timestamp, publish)
         return sample
 
     ########################################################################
@@ -23,7 +23,7 @@ from mi.instrument.teledyne.driver import TeledyneProtocol
 from mi.instrument.teledyne.driver import TeledynePrompt
 from mi.instrument.teledyne.driver import TeledyneParameter
 from mi.instrument.teledyne.driver import TeledyneCapability
-from mi.core.instrument.chunker import StringChunker
+from mi.core.instrument.chunker import BufferedStringChunker
 
 from mi.core.log import get_logger
 from struct import unpack
@@ -33,6 +33,10 @@ log = get_logger()
 # newline.
 NEWLINE = '\r\n'
 
+# longest chunk the sieve can find, a PD0 ensemble holding as many bytes
+# as its two byte length allows.  Text responses are much shorter.
+MAX_CHUNK_LENGTH = 2 + 0xFFFF
+
 
 # ##############################################################################
 # Driver
@@ -130,7 +134,7 @@ class WorkhorseProtocol(TeledyneProtocol):
         # Construct protocol superclass.
         TeledyneProtocol.__init__(self, prompts, newline, driver_event)
 
-        self._chunker = StringChunker(WorkhorseProtocol.sieve_function)
+        self._chunker = BufferedStringChunker(WorkhorseProtocol.sieve_function, max_chunk_length=MAX_CHUNK_LENGTH)
 
     def _build_command_dict(self):
         """
@@ -16,6 +16,7 @@ from mi.instrument.teledyne.particles import ADCP_COMPASS_CALIBRATION_DataPartic
 
 from mi.instrument.teledyne.workhorse.driver import WorkhorseInstrumentDriver
 from mi.instrument.teledyne.workhorse.driver import WorkhorseProtocol
+from mi.instrument.teledyne.workhorse.driver import MAX_CHUNK_LENGTH
 
 from mi.instrument.teledyne.driver import TeledyneScheduledJob
 from mi.instrument.teledyne.driver import TeledyneCapability
@@ -54,7 +55,7 @@ from mi.core.exceptions import InstrumentParameterExpirationException
 from mi.core.instrument.instrument_driver import ResourceAgentState
 from mi.instrument.teledyne.driver import TeledyneParameter
 from mi.core.instrument.instrument_driver import DriverParameter
-from mi.core.instrument.chunker import StringChunker
+from mi.core.instrument.chunker import BufferedStringChunker
 from mi.core.instrument.instrument_driver import ConfigMetadataKey
 
 # newline.
@@ -216,7 +217,8 @@ class VADCP_PD0_PARSED_DataParticle(ADCP_PD0_PARSED_DataParticle):
 
 class AdcpPortAgentClient(PortAgentClient):
     def __init__(self, host, port, cmd_port, delim=None):
-        PortAgentClient.__init__(self, host, port, cmd_port, delim=None)
+        # both beams stream at high rate, so frame packets in batches
+        PortAgentClient.__init__(self, host, port, cmd_port, delim=None, batched_recv=True)
         self.info = "This is portAgentClient for VADCP"
 
 
@@ -518,7 +520,7 @@ class Protocol(WorkhorseProtocol):
         # The parameter, comamnd, and driver dictionaries.
         self._param_dict2 = ProtocolParameterDict()
         self._build_param_dict2()
-        self._chunker2 = StringChunker(WorkhorseProtocol.sieve_function)
+        self._chunker2 = BufferedStringChunker(WorkhorseProtocol.sieve_function, max_chunk_length=MAX_CHUNK_LENGTH)
 
     # Overridden for dual(master/slave) instruments
     def set_init_params(self, config):
@@ -1106,7 +1108,7 @@ class Protocol(WorkhorseProtocol):
         particle = RawDataParticle_5thbeam(port_agent_packet.get_as_dict(),
                                            port_timestamp=port_agent_packet.get_timestamp())
 
-        parsed_sample = particle.generate()
+        parsed_sample = self._generate_particle(particle)
         if self._driver_event:
             self._driver_event(DriverAsyncEvent.SAMPLE, parsed_sample)
 
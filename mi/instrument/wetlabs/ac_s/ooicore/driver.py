@@ -33,6 +33,7 @@ from mi.core.instrument.data_particle import DataParticleKey
 from mi.core.instrument.data_particle import CommonDataParticleType
 from mi.core.instrument.chunker import StringChunker
 from mi.core.instrument.driver_dict import DriverDictKey
+from mi.core.checksum import sum16
 
 from struct import pack
 
@@ -179,10 +180,7 @@ class OPTAA_SampleDataParticle(DataParticle):
         record_length = get_two_byte_value(match.group(1), 0)
         
         packet_checksum = get_two_byte_value(record, record_length)
-        checksum = 0
-        for i in range(0, record_length):
-            checksum += ord(record[i])
-            checksum &= 0xffff
+        checksum = sum16(record[0:record_length])
         if checksum != packet_checksum:
             log.debug('OPTAA_SampleDataParticle: Checksum mismatch in data packet, rcvd=%d, calc=%d.'
                       %(packet_checksum, checksum))